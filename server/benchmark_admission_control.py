@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark do controle de admissão das chamadas aos LLMs
+Simula um provedor com limite de chamadas simultâneas e de tokens por janela (429 ao exceder)
+e dispara a mesma carga de casos em lote mais algumas chamadas interativas de duas formas:
+
+  - sem admissão: cada caso chama o provedor e repete por conta própria com backoff
+    exponencial (o comportamento anterior dos serviços)
+  - com admissão: as chamadas passam pelo ControladorAdmissao com o orçamento do provedor
+
+A janela de tokens é comprimida (--janela) para que a simulação rode em segundos.
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from services import admission_control
+from services.admission_control import (
+    ControladorAdmissao, Orcamento, contexto_admissao, PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE
+)
+
+
+class ErroRateLimit(Exception):
+    status_code = 429
+
+
+class ProvedorSimulado:
+    """Provedor com vagas simultâneas e balde de tokens; latência proporcional à saída"""
+
+    def __init__(self, concorrencia: int, tokens_por_janela: int, janela_s: float, s_por_mil_tokens: float):
+        self.concorrencia = concorrencia
+        self.capacidade = tokens_por_janela
+        self.taxa = tokens_por_janela / janela_s
+        self.s_por_mil_tokens = s_por_mil_tokens
+        self._lock = threading.Lock()
+        self._ativas = 0
+        self._saldo = float(tokens_por_janela)
+        self._instante = time.monotonic()
+        self.rejeicoes = 0
+        self.tokens_servidos = 0
+
+    def chamar(self, tokens: int):
+        with self._lock:
+            agora = time.monotonic()
+            self._saldo = min(self.capacidade, self._saldo + (agora - self._instante) * self.taxa)
+            self._instante = agora
+            if self._ativas >= self.concorrencia or self._saldo < tokens:
+                self.rejeicoes += 1
+                raise ErroRateLimit("429 rate limit exceeded")
+            self._ativas += 1
+            self._saldo -= tokens
+        try:
+            time.sleep(tokens / 1000 * self.s_por_mil_tokens)
+        finally:
+            with self._lock:
+                self._ativas -= 1
+                self.tokens_servidos += tokens
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=tokens // 2, output_tokens=tokens - tokens // 2))
+
+
+def chamar_sem_admissao(provedor: ProvedorSimulado, tokens: int, max_tentativas: int):
+    """Retry independente por chamador: backoff exponencial com jitter (base 0.8s) + 0.6s"""
+    for tentativa in range(max_tentativas):
+        try:
+            return provedor.chamar(tokens)
+        except ErroRateLimit:
+            if tentativa == max_tentativas - 1:
+                raise
+            time.sleep(0.6 + admission_control.BACKOFF_BASE_S * 2 ** tentativa
+                       + random.uniform(0, admission_control.JITTER_MAXIMO_S))
+
+
+def executar_carga(modo: str, casos: int, chamadas_por_caso: int, interativas: int, tokens: int,
+                   provedor: ProvedorSimulado, orcamento: Orcamento, max_tentativas: int) -> dict:
+    controlador = ControladorAdmissao({"simulado": orcamento})
+    latencias_interativas, falhas = [], [0]
+    lock = threading.Lock()
+
+    def chamar(case_id: str, prioridade: int):
+        inicio = time.monotonic()
+        try:
+            if modo == "admissao":
+                with contexto_admissao(case_id=case_id, prioridade=prioridade):
+                    controlador.executar("simulado", None, lambda: provedor.chamar(tokens), tokens, max_tentativas)
+            else:
+                chamar_sem_admissao(provedor, tokens, max_tentativas)
+        except ErroRateLimit:
+            with lock:
+                falhas[0] += 1
+        if prioridade == PRIORIDADE_INTERATIVA:
+            with lock:
+                latencias_interativas.append(time.monotonic() - inicio)
+
+    def caso_em_lote(indice: int):
+        for _ in range(chamadas_por_caso):
+            chamar(f"lote-{indice}", PRIORIDADE_LOTE)
+
+    def usuario_interativo(indice: int):
+        time.sleep(0.2 + indice * 0.3)  # Chegam com o lote já em andamento
+        chamar(f"interativo-{indice}", PRIORIDADE_INTERATIVA)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=casos + interativas) as executor:
+        tarefas = [executor.submit(caso_em_lote, i) for i in range(casos)]
+        tarefas += [executor.submit(usuario_interativo, i) for i in range(interativas)]
+        for tarefa in tarefas:
+            tarefa.result()
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "duracao_s": duracao,
+        "tokens_s": provedor.tokens_servidos / duracao,
+        "rejeicoes_429": provedor.rejeicoes,
+        "falhas": falhas[0],
+        "interativa_p50_s": statistics.median(latencias_interativas) if latencias_interativas else 0.0,
+        "interativa_max_s": max(latencias_interativas, default=0.0),
+    }
+
+
+def executar(casos: int, chamadas_por_caso: int, interativas: int, tokens: int, concorrencia: int,
+             tokens_por_janela: int, janela_s: float, s_por_mil_tokens: float, max_tentativas: int, seed: int):
+    print("📊 BENCHMARK DO CONTROLE DE ADMISSÃO")
+    print(f"   Casos em lote: {casos} x {chamadas_por_caso} chamadas de {tokens} tokens | Interativas: {interativas}")
+    print(f"   Provedor: {concorrencia} simultâneas, {tokens_por_janela} tokens a cada {janela_s:g}s")
+
+    resultados = {}
+    for modo in ("sem_admissao", "admissao"):
+        random.seed(seed)
+        provedor = ProvedorSimulado(concorrencia, tokens_por_janela, janela_s, s_por_mil_tokens)
+        orcamento = Orcamento(concorrencia=concorrencia, tokens_por_minuto=tokens_por_janela, janela_s=janela_s)
+        resultados[modo] = executar_carga(modo, casos, chamadas_por_caso, interativas, tokens,
+                                          provedor, orcamento, max_tentativas)
+
+    print(f"\n   {'':<22}{'sem admissão':>16}{'com admissão':>16}")
+    for chave, rotulo, formato in (
+        ("duracao_s", "Tempo total (s)", "{:.2f}"),
+        ("tokens_s", "Tokens servidos/s", "{:.0f}"),
+        ("rejeicoes_429", "Respostas 429", "{}"),
+        ("falhas", "Chamadas falhas", "{}"),
+        ("interativa_p50_s", "Interativa p50 (s)", "{:.2f}"),
+        ("interativa_max_s", "Interativa máx (s)", "{:.2f}"),
+    ):
+        antes = formato.format(resultados["sem_admissao"][chave])
+        depois = formato.format(resultados["admissao"][chave])
+        print(f"   {rotulo:<22}{antes:>16}{depois:>16}")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--casos", type=int, default=12, help="Casos em lote simultâneos")
+    parser.add_argument("--chamadas", type=int, default=4, help="Chamadas por caso em lote")
+    parser.add_argument("--interativas", type=int, default=4, help="Chamadas interativas durante o lote")
+    parser.add_argument("--tokens", type=int, default=2000, help="Tokens por chamada")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Chamadas simultâneas aceitas pelo provedor")
+    parser.add_argument("--tpj", type=int, default=8000, help="Tokens por janela aceitos pelo provedor")
+    parser.add_argument("--janela", type=float, default=1.0, help="Duração da janela de tokens (s)")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos por mil tokens de resposta")
+    parser.add_argument("--tentativas", type=int, default=6, help="Tentativas máximas por chamada")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    executar(args.casos, args.chamadas, args.interativas, args.tokens, args.concorrencia,
+             args.tpj, args.janela, args.latencia, args.tentativas, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark do catálogo de casos
+Compara varreduras de diretório (glob + leitura de instance_metadata.json, sondagem de
+extensões do arquivo enviado) com as consultas indexadas do catálogo SQLite
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from services.case_catalog import CaseCatalog, ARQUIVO_CATALOGO
+
+EXTENSOES_PROCESSO = ("pdf", "docx")
+
+
+def gerar_storage(raiz: Path, casos: int) -> CaseCatalog:
+    """Cria casos sintéticos em disco e os registra no catálogo"""
+    catalogo = CaseCatalog(raiz / ARQUIVO_CATALOGO)
+    rag_storage = raiz / "rag_storage"
+    for i in range(casos):
+        case_id = f"caso-{i:06d}"
+        case_dir = raiz / case_id
+        case_dir.mkdir(parents=True)
+        processo = case_dir / f"processo.{EXTENSOES_PROCESSO[i % 2]}"
+        processo.write_bytes(b"x")
+
+        metadados = {
+            "case_id": case_id, "status": "active", "created_at": f"2026-01-01T00:00:{i % 60:02d}",
+            "directories": {"instance_root": str(rag_storage / f"processo_{case_id}")}
+        }
+        instance_dir = rag_storage / f"processo_{case_id}"
+        instance_dir.mkdir(parents=True)
+        (instance_dir / "instance_metadata.json").write_text(json.dumps(metadados), encoding="utf-8")
+
+        catalogo.registrar_caso(case_id, case_dir, status=("completed", "failed", "running")[i % 3],
+                                artefatos={"processo": {"caminho": str(processo)}})
+        catalogo.registrar_instancia_rag(case_id, metadados)
+    return catalogo
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Mediana do tempo de execução (ms)"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def executar(casos: int, consultas: int):
+    print("📊 BENCHMARK CATÁLOGO DE CASOS")
+    print(f"   Casos em disco: {casos} | Consultas pontuais: {consultas}")
+
+    raiz = Path(tempfile.mkdtemp(prefix="catalogo_bench_"))
+    try:
+        inicio = time.perf_counter()
+        catalogo = gerar_storage(raiz, casos)
+        print(f"   Geração do storage: {time.perf_counter() - inicio:.1f}s")
+        amostra = [f"caso-{random.randrange(casos):06d}" for _ in range(consultas)]
+
+        def listar_por_varredura():
+            return [
+                json.loads(arquivo.read_text(encoding="utf-8"))
+                for arquivo in (raiz / "rag_storage").glob("processo_*/instance_metadata.json")
+            ]
+
+        def localizar_por_sondagem():
+            for case_id in amostra:
+                next((raiz / case_id / f"processo.{ext}" for ext in ("docx", "pdf")
+                      if (raiz / case_id / f"processo.{ext}").exists()), None)
+
+        def localizar_no_catalogo():
+            for case_id in amostra:
+                catalogo.localizar_artefato(case_id, "processo")
+
+        print("\n   Listar instâncias RAG ativas:")
+        print(f"      Varredura de diretórios: {medir(listar_por_varredura, 3):.1f}ms")
+        print(f"      Catálogo:                {medir(catalogo.listar_instancias_rag, 3):.1f}ms")
+
+        print(f"\n   Localizar arquivo enviado ({consultas} casos):")
+        print(f"      Sondagem de extensões: {medir(localizar_por_sondagem, 3):.1f}ms")
+        print(f"      Catálogo:              {medir(localizar_no_catalogo, 3):.1f}ms")
+
+        print("\n   Página de 100 casos com status 'failed':")
+        print(f"      Catálogo: {medir(lambda: catalogo.listar_casos(status='failed', limite=100), 10):.2f}ms")
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--casos", type=int, default=20000, help="Casos sintéticos em disco")
+    parser.add_argument("--consultas", type=int, default=1000, help="Consultas pontuais por medição")
+    args = parser.parse_args()
+    executar(args.casos, args.consultas)
+
+
+if __name__ == "__main__":
+    main()
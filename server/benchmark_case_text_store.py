@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark do texto do caso mapeado em memória
+Repete o acesso da Etapa 3 ao processo_extraido.txt de um caso (tamanho, início e fim do
+texto e as peças essenciais) lendo o arquivo inteiro a cada chamada, como antes, e pelo
+CaseTextStore (mapeamento reaproveitado e fatias por offset), e informa o tempo por chamada.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from services.case_text_store import CaseTextStore
+from services.pje_segmenter import PECAS_ESSENCIAIS, segmentar_processo
+
+STORAGE_DIR = Path(__file__).parent / "storage"
+
+
+def _acesso(texto, indice) -> int:
+    """Uma chamada de _recuperar_texto_original_processo: peças essenciais ou início + fim"""
+    if len(texto) > 30000:
+        if indice and indice.pecas_do_tipo(*PECAS_ESSENCIAIS):
+            return len(indice.fatiar(texto, PECAS_ESSENCIAIS, 30000))
+        return len(texto[:15000]) + len(texto[-15000:])
+    return len(texto)
+
+
+def executar(caminho: Path, chamadas: int):
+    print("📊 BENCHMARK DO TEXTO DO CASO MAPEADO EM MEMÓRIA")
+    print(f"   Arquivo: {caminho} ({caminho.stat().st_size / 1024 / 1024:.2f}MB)")
+    indice = segmentar_processo(caminho.read_text(encoding="utf-8"))
+
+    inicio = time.perf_counter()
+    for _ in range(chamadas):
+        tamanho_leitura = _acesso(caminho.read_text(encoding="utf-8"), indice)
+    leitura = (time.perf_counter() - inicio) / chamadas
+
+    store = CaseTextStore()
+    inicio = time.perf_counter()
+    primeira = None
+    for _ in range(chamadas):
+        tamanho_store = _acesso(store.abrir(caminho), indice)
+        primeira = primeira or time.perf_counter() - inicio
+    mapeado = (time.perf_counter() - inicio) / chamadas
+
+    assert tamanho_leitura == tamanho_store, "fatias diferentes da leitura completa"
+    print(f"\n   {'Modo':<26}{'ms/chamada':>12}")
+    print(f"   {'read_text + fatia':<26}{leitura * 1000:>12.2f}")
+    print(f"   {'CaseTextStore (1ª, mmap)':<26}{primeira * 1000:>12.2f}")
+    print(f"   {'CaseTextStore (média)':<26}{mapeado * 1000:>12.2f}")
+    print(f"\n   Aceleração: {leitura / mapeado:.1f}x em {chamadas} chamadas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arquivo", type=Path, default=None,
+                        help="processo_extraido.txt (padrão: o maior em storage/)")
+    parser.add_argument("--chamadas", type=int, default=200)
+    args = parser.parse_args()
+    caminho = args.arquivo or max(STORAGE_DIR.glob("*/processo_extraido.txt"), key=lambda p: p.stat().st_size)
+    executar(caminho, args.chamadas)
+
+
+if __name__ == "__main__":
+    main()
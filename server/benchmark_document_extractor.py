@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache de extração de documentos
+Gera um acervo sintético de sentenças modelo (DOCX e PDF, padrão: 120 arquivos, como as pastas
+Sentenças_20xx lidas pelo /init-style) e mede a leitura do acervo sem cache (extração de todos
+os arquivos a cada chamada, como antes), na primeira chamada com cache (extração + gravação) e
+nas seguintes (hash pelo índice de estados e texto do cache).
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from services.document_extractor import DocumentExtractor, extrair_texto_documento
+
+PARAGRAFO = (
+    "Vistos etc. Trata-se de reclamação trabalhista em que o reclamante postula horas extras, "
+    "intervalo intrajornada e reflexos. A reclamada contesta alegando o correto pagamento. "
+)
+
+
+def gerar_acervo(pasta: Path, arquivos: int, paragrafos: int):
+    import fitz
+    from docx import Document
+
+    for indice in range(arquivos):
+        if indice % 2:
+            documento = fitz.open()
+            for pagina in range(max(1, paragrafos // 20)):
+                documento.new_page().insert_textbox(
+                    fitz.Rect(36, 36, 576, 806), f"SENTENÇA {indice} - fl. {pagina + 1}\n" + PARAGRAFO * 20, fontsize=8
+                )
+            documento.save(str(pasta / f"sentenca_{indice:03d}.pdf"))
+            documento.close()
+        else:
+            documento = Document()
+            documento.add_paragraph(f"SENTENÇA {indice}")
+            for _ in range(paragrafos):
+                documento.add_paragraph(PARAGRAFO)
+            documento.save(str(pasta / f"sentenca_{indice:03d}.docx"))
+
+
+def _ler_acervo(pasta: Path, extrair) -> int:
+    return sum(len(extrair(arquivo)) for arquivo in sorted(pasta.iterdir()) if arquivo.is_file())
+
+
+def executar(arquivos: int, paragrafos: int, repeticoes: int):
+    print("📊 BENCHMARK DO CACHE DE EXTRAÇÃO DE DOCUMENTOS")
+    with tempfile.TemporaryDirectory() as temporario:
+        raiz = Path(temporario)
+        acervo = raiz / "Sentenças_2024"
+        acervo.mkdir()
+        gerar_acervo(acervo, arquivos, paragrafos)
+        tamanho = sum(arquivo.stat().st_size for arquivo in acervo.iterdir()) / 1024 / 1024
+        print(f"   Acervo: {arquivos} arquivos (DOCX e PDF), {tamanho:.1f}MB")
+
+        inicio = time.perf_counter()
+        caracteres = _ler_acervo(acervo, lambda arquivo: extrair_texto_documento(arquivo, ocr=False))
+        sem_cache = time.perf_counter() - inicio
+
+        extrator = DocumentExtractor(raiz / "artifact_cache")
+        inicio = time.perf_counter()
+        _ler_acervo(acervo, lambda arquivo: extrator.extrair(arquivo, ocr=False))
+        primeira = time.perf_counter() - inicio
+
+        tempos = []
+        for _ in range(repeticoes):
+            # Novo extrator a cada chamada: sem a memória do processo, só o cache em disco
+            extrator = DocumentExtractor(raiz / "artifact_cache")
+            inicio = time.perf_counter()
+            caracteres_cache = _ler_acervo(acervo, lambda arquivo: extrator.extrair(arquivo, ocr=False))
+            tempos.append(time.perf_counter() - inicio)
+        print(f"   Texto: {caracteres:,} caracteres ({caracteres_cache:,} do cache)")
+
+        print(f"\n   {'Modo':<30}{'Tempo (ms)':>12}")
+        print(f"   {'sem cache':<30}{sem_cache * 1000:>12.1f}")
+        print(f"   {'cache (1ª chamada)':<30}{primeira * 1000:>12.1f}")
+        print(f"   {'cache (chamadas seguintes)':<30}{min(tempos) * 1000:>12.1f}")
+        print(f"\n   Aceleração: {sem_cache / min(tempos):.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arquivos", type=int, default=120, help="Sentenças modelo no acervo")
+    parser.add_argument("--paragrafos", type=int, default=80, help="Parágrafos por sentença")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    executar(args.arquivos, args.paragrafos, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
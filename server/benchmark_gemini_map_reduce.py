@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark da extração estruturada map-reduce do GeminiProcessor
+Compara a latência da chamada única (processo inteiro num prompt) com o map-reduce (fragmentos
+por peça em paralelo + mescla) sobre o processo_extraido.txt de um caso. Sem --real, o Gemini é
+simulado por um modelo de latência: fixo + por mil tokens de entrada + por token de saída, com a
+saída (JSON estruturado) crescendo com a entrada até max_output_tokens, e tempo limite da
+chamada. Os tempos simulados são reduzidos por --escala e reportados em segundos equivalentes;
+com --real (GOOGLE_API_KEY) usa a API e o tempo medido.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from services import gemini_processor
+from services.gemini_processor import GeminiProcessor, dividir_em_fragmentos
+
+STORAGE_DIR = Path(__file__).parent / "storage"
+
+
+class GeminiSimulado(GeminiProcessor):
+    """Latência = fixa + entrada/1k tokens + tokens de saída; acima do tempo limite, a chamada falha"""
+
+    SAIDA_BASE_TOKENS = 500
+    SAIDA_TOKENS_POR_ENTRADA = 1 / 50  # Partes, pedidos e fatos crescem com o volume das peças
+    SAIDA_MAXIMA_TOKENS = 8192
+
+    def __init__(self, fixo_s: float, entrada_s_por_mil: float, saida_s_por_token: float,
+                 tempo_limite_s: float, escala: float):
+        self.fixo_s, self.entrada_s_por_mil, self.saida_s_por_token = fixo_s, entrada_s_por_mil, saida_s_por_token
+        self.tempo_limite_s, self.escala = tempo_limite_s, escala
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def gerar_conteudo(self, prompt: str, cache_policy=None, novo_receptor=None):
+        dados = {
+            "numero_processo": next(iter(re.findall(r"\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}", prompt)), None),
+            "partes": [{"nome": nome.strip(), "tipo": tipo.lower()}
+                       for tipo, nome in re.findall(r"(RECLAMANTE|RECLAMADO): (.+)", prompt)],
+            "pedidos": [], "fatos_relevantes": [],
+        }
+        resposta = json.dumps(dados, ensure_ascii=False)
+        entrada = len(prompt) / 4
+        saida = min(self.SAIDA_MAXIMA_TOKENS, self.SAIDA_BASE_TOKENS + entrada * self.SAIDA_TOKENS_POR_ENTRADA)
+        latencia = self.fixo_s + entrada / 1000 * self.entrada_s_por_mil + saida * self.saida_s_por_token
+        with self._lock:
+            self.chamadas += 1
+        time.sleep(min(latencia, self.tempo_limite_s) * self.escala)
+        if latencia > self.tempo_limite_s:
+            raise TimeoutError(f"Gemini simulado: {latencia:.0f}s > {self.tempo_limite_s:.0f}s")
+        if novo_receptor:
+            novo_receptor()(resposta)
+        return SimpleNamespace(text=resposta)
+
+
+def _medir(gemini, texto: str, modo: str):
+    inicio = time.perf_counter()
+    try:
+        processo, erro = gemini.extrair_informacoes_processo(texto, modo=modo), None
+    except Exception as e:
+        processo, erro = None, str(e)
+    return time.perf_counter() - inicio, processo, erro
+
+
+def executar(caminho: Path, real: bool, paralelo: int, escala: float, fixo_s: float, entrada_s_por_mil: float,
+             saida_s_por_token: float, tempo_limite_s: float):
+    print("📊 BENCHMARK DA EXTRAÇÃO MAP-REDUCE (GEMINI)")
+    texto = caminho.read_text(encoding="utf-8")
+    gemini_processor.MAP_REDUCE_PARALELO = paralelo
+    fragmentos = dividir_em_fragmentos(texto)
+    print(f"   Processo: {caminho} ({len(texto):,} caracteres, {len(fragmentos)} fragmentos, {paralelo} em paralelo)")
+
+    if real:
+        gemini, fator = GeminiProcessor(), 1.0
+    else:
+        gemini = GeminiSimulado(fixo_s, entrada_s_por_mil, saida_s_por_token, tempo_limite_s, escala)
+        fator = 1 / escala
+        print(f"   Modelo simulado: {fixo_s}s + {entrada_s_por_mil}s/1k tokens de entrada + "
+              f"{saida_s_por_token * 1000:.0f}ms/token de saída, limite {tempo_limite_s:.0f}s")
+
+    print(f"\n   {'Modo':<14}{'Latência (s)':>14}{'Chamadas':>10}  Resultado")
+    latencias = {}
+    for modo in ("unico", "map_reduce"):
+        chamadas = getattr(gemini, "chamadas", 0)
+        duracao, processo, erro = _medir(gemini, texto, modo)
+        latencias[modo] = duracao * fator
+        chamadas = getattr(gemini, "chamadas", 0) - chamadas
+        print(f"   {modo:<14}{latencias[modo]:>14.1f}{chamadas or '-':>10}  {erro or processo.numero_processo}")
+    print(f"\n   Aceleração do map-reduce: {latencias['unico'] / latencias['map_reduce']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arquivo", type=Path, default=None,
+                        help="processo_extraido.txt (padrão: o maior em storage/)")
+    parser.add_argument("--real", action="store_true", help="Usa a API do Gemini (GOOGLE_API_KEY)")
+    parser.add_argument("--paralelo", type=int, default=4, help="Fragmentos extraídos em paralelo")
+    parser.add_argument("--escala", type=float, default=0.01, help="Fator aplicado às latências simuladas")
+    parser.add_argument("--fixo", type=float, default=2.0, help="Latência fixa por chamada (s)")
+    parser.add_argument("--entrada", type=float, default=0.1, help="Segundos por mil tokens de entrada")
+    parser.add_argument("--saida", type=float, default=0.02, help="Segundos por token de saída")
+    parser.add_argument("--tempo-limite", type=float, default=300.0, help="Tempo limite da chamada (s)")
+    args = parser.parse_args()
+    caminho = args.arquivo or max(STORAGE_DIR.glob("*/processo_extraido.txt"), key=lambda p: p.stat().st_size)
+    executar(caminho, args.real, args.paralelo, args.escala, args.fixo, args.entrada, args.saida, args.tempo_limite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark da extração estruturada em streaming do Gemini
+Simula a geração do JSON de um ProcessoEstruturado a uma taxa fixa de tokens de saída e mede
+quando cada campo (partes, pedidos, fatos_relevantes, ...) fica disponível com o parser
+incremental, comparado à espera pela resposta completa. Mede também o custo do parser por MB.
+"""
+
+import argparse
+import json
+import time
+from types import SimpleNamespace
+
+from services import gemini_processor
+from services.gemini_processor import GeminiProcessor
+from services.json_incremental import parsear_json
+
+
+def processo_sintetico(partes: int, pedidos: int, fatos: int) -> dict:
+    return {
+        "numero_processo": "0000398-03.2024.5.09.0010",
+        "partes": [{"nome": f"PARTE {i} LTDA", "tipo": "requerida", "qualificacao": "empresa " * 5}
+                   for i in range(partes)],
+        "pedidos": [{"descricao": f"Pedido {i} " + "horas extras e reflexos " * 4, "categoria": "horas_extras",
+                     "valor_estimado": "R$ 10.000,00", "deferido": None} for i in range(pedidos)],
+        "fatos_relevantes": [{"descricao": f"Fato {i} " + "jornada de trabalho " * 6, "data": None,
+                              "fonte": "petição inicial"} for i in range(fatos)],
+        "fundamentacao_resumida": "fundamentação " * 40,
+    }
+
+
+class StreamSimulado:
+    """Trechos de ~tokens_por_trecho tokens (4 caracteres/token) a tokens_por_s"""
+
+    def __init__(self, texto: str, tokens_por_s: float, tokens_por_trecho: int):
+        self.texto, self.tokens_por_s, self.tamanho = texto, tokens_por_s, tokens_por_trecho * 4
+        self.text = ""
+
+    def __iter__(self):
+        for inicio in range(0, len(self.texto), self.tamanho):
+            trecho = self.texto[inicio:inicio + self.tamanho]
+            time.sleep(len(trecho) / 4 / self.tokens_por_s)
+            self.text += trecho
+            yield SimpleNamespace(text=trecho)
+
+
+def executar(tokens_por_s: float, tokens_por_trecho: int, partes: int, pedidos: int, fatos: int):
+    print("📊 BENCHMARK DA EXTRAÇÃO EM STREAMING (GEMINI)")
+    texto = json.dumps(processo_sintetico(partes, pedidos, fatos), ensure_ascii=False, indent=2)
+    print(f"   Resposta: {len(texto):,} caracteres (~{len(texto) // 4:,} tokens) a {tokens_por_s:.0f} tokens/s")
+
+    gemini = GeminiProcessor.__new__(GeminiProcessor)
+    gemini.model = SimpleNamespace(
+        model_name="gemini-simulado",
+        generate_content=lambda prompt, generation_config, stream=False: StreamSimulado(
+            texto, tokens_por_s, tokens_por_trecho)
+    )
+    gemini.parametros_geracao = {"temperature": 0.1}
+    gemini.generation_config = SimpleNamespace(max_output_tokens=8192)
+    gemini_processor.MODO_EXTRACAO = "unico"
+
+    inicio = time.perf_counter()
+    disponiveis = {}
+    gemini.extrair_informacoes_processo(
+        "PROCESSO", cache_policy="ignorar",
+        ao_concluir_campo=lambda campo, _valor: disponiveis.setdefault(campo, time.perf_counter() - inicio)
+    )
+    total = time.perf_counter() - inicio
+
+    print(f"\n   {'Campo':<24}{'Disponível (s)':>16}{'Antecipação':>14}")
+    for campo, instante in disponiveis.items():
+        print(f"   {campo:<24}{instante:>16.2f}{(1 - instante / total) * 100:>13.0f}%")
+    print(f"   {'(resposta completa)':<24}{total:>16.2f}")
+
+    grande = "[" + ",".join([texto] * max(1, 1_000_000 // len(texto))) + "]"
+    inicio = time.perf_counter()
+    parsear_json(grande)
+    parser_s = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    json.loads(grande)
+    print(f"\n   Parser incremental: {parser_s / (len(grande) / 1e6) * 1000:.0f}ms/MB "
+          f"(json.loads: {(time.perf_counter() - inicio) / (len(grande) / 1e6) * 1000:.1f}ms/MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens-por-s", type=float, default=300.0, help="Taxa de saída simulada")
+    parser.add_argument("--tokens-por-trecho", type=int, default=40, help="Tokens por trecho do stream")
+    parser.add_argument("--partes", type=int, default=4)
+    parser.add_argument("--pedidos", type=int, default=25)
+    parser.add_argument("--fatos", type=int, default=30)
+    args = parser.parse_args()
+    executar(args.tokens_por_s, args.tokens_por_trecho, args.partes, args.pedidos, args.fatos)
+
+
+if __name__ == "__main__":
+    main()
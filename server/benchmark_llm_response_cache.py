@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache de respostas dos LLMs
+Simula a reexecução de um diálogo (/generate-from-existing): as mesmas chamadas com latência
+simulada do provedor são feitas duas vezes; a segunda sai do cache SQLite. Reporta a latência
+por chamada em cada execução e o custo de consulta do cache com muitas entradas.
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from services import llm_response_cache
+from services.llm_response_cache import LLMResponseCache, chamar_com_cache, ARQUIVO_CACHE_LLM
+
+
+def executar_dialogo(chamadas: int, latencia_s: float, tamanho_resposta: int):
+    """Latência por chamada de uma execução completa do diálogo"""
+    latencias = []
+    for indice in range(chamadas):
+        prompt = f"Seção {indice}: redija a fundamentação do pedido {indice}"
+
+        def chamada():
+            time.sleep(latencia_s)
+            return SimpleNamespace(content=[SimpleNamespace(text="x" * tamanho_resposta)])
+
+        inicio = time.perf_counter()
+        chamar_com_cache("claude", "claude-simulado", {"max_tokens": 8192, "temperature": 0.3}, "SYSTEM",
+                         [{"role": "user", "content": prompt}], chamada, lambda r: r.content[0].text)
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+def executar(chamadas: int, latencia_s: float, tamanho_resposta: int, entradas: int):
+    print("📊 BENCHMARK DO CACHE DE RESPOSTAS DOS LLMs")
+    print(f"   Chamadas por diálogo: {chamadas} | Latência simulada: {latencia_s * 1000:.0f}ms | "
+          f"Resposta: {tamanho_resposta:,} caracteres")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        cache = LLMResponseCache(Path(diretorio) / ARQUIVO_CACHE_LLM)
+        llm_response_cache._cache_global = cache
+
+        primeira = executar_dialogo(chamadas, latencia_s, tamanho_resposta)
+        segunda = executar_dialogo(chamadas, latencia_s, tamanho_resposta)
+        print(f"\n   1ª execução (miss): {statistics.mean(primeira) * 1000:8.1f}ms/chamada | "
+              f"total {sum(primeira):.2f}s")
+        print(f"   2ª execução (hit):  {statistics.mean(segunda) * 1000:8.2f}ms/chamada | "
+              f"total {sum(segunda):.3f}s")
+
+        for indice in range(entradas):
+            cache.armazenar(f"{indice:064x}", "gemini", "m", "y" * tamanho_resposta)
+        inicio = time.perf_counter()
+        for indice in range(0, entradas, max(1, entradas // 1000)):
+            cache.buscar(f"{indice:064x}")
+        consultas = len(range(0, entradas, max(1, entradas // 1000)))
+        print(f"   Consulta com {entradas:,} entradas: "
+              f"{(time.perf_counter() - inicio) / consultas * 1000:.2f}ms | {cache.estatisticas()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chamadas", type=int, default=20, help="Chamadas ao LLM por diálogo")
+    parser.add_argument("--latencia", type=float, default=0.2, help="Latência simulada do provedor (s)")
+    parser.add_argument("--tamanho", type=int, default=12000, help="Caracteres por resposta")
+    parser.add_argument("--entradas", type=int, default=5000, help="Entradas para medir a consulta")
+    args = parser.parse_args()
+    executar(args.chamadas, args.latencia, args.tamanho, args.entradas)
+
+
+if __name__ == "__main__":
+    main()
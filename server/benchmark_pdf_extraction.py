@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark da extração paralela de PDF
+Gera um PDF sintético com o tamanho de um processo real (padrão: 3.000 páginas de texto
+denso), extrai o texto sequencialmente (laço página a página, como antes) e com o extrator
+por intervalos de páginas para cada número de processos, e informa tempo, aceleração e
+eficiência. O texto de cada execução é comparado com o da extração sequencial.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from services import pdf_extractor
+from services.pdf_extractor import extrair_texto_pdf
+
+PARAGRAFO = (
+    "Alega o reclamante que laborava em sobrejornada habitual, sem a devida contraprestação, "
+    "postulando o pagamento de horas extras com adicional de 50% e reflexos em DSR, férias "
+    "acrescidas de 1/3, 13º salário e FGTS, bem como intervalo intrajornada suprimido. "
+)
+
+
+def gerar_pdf(caminho: Path, paginas: int, linhas_por_pagina: int):
+    import fitz
+
+    documento = fitz.open()
+    texto = "\n".join((PARAGRAFO * 2)[i:i + 90] for i in range(0, 90 * linhas_por_pagina, 90))
+    for indice in range(paginas):
+        pagina = documento.new_page()
+        pagina.insert_textbox(fitz.Rect(36, 36, 576, 806), f"fl. {indice + 1}\n{texto}", fontsize=8)
+    documento.save(str(caminho))
+    documento.close()
+
+
+def extrair_sequencial(caminho: Path) -> str:
+    import fitz
+
+    doc = fitz.open(str(caminho))
+    texto_processo = ""
+    for page in doc:
+        texto_processo += page.get_text("text") + "\n"
+    doc.close()
+    return texto_processo
+
+
+def executar(paginas: int, linhas_por_pagina: int, processos: list, repeticoes: int):
+    print("📊 BENCHMARK DE EXTRAÇÃO PARALELA DE PDF")
+    with tempfile.TemporaryDirectory() as temporario:
+        raiz = Path(temporario)
+        pdf = raiz / "processo.pdf"
+        gerar_pdf(pdf, paginas, linhas_por_pagina)
+        print(f"   PDF: {paginas} páginas, {pdf.stat().st_size / 1024 / 1024:.1f}MB | Núcleos: {os.cpu_count()}")
+
+        inicio = time.perf_counter()
+        referencia = extrair_sequencial(pdf)
+        base = time.perf_counter() - inicio
+        print(f"   Texto: {len(referencia):,} caracteres")
+        print(f"\n   {'Modo':<22}{'Tempo (s)':>12}{'Aceleração':>12}{'Eficiência':>12}")
+        print(f"   {'sequencial (laço)':<22}{base:>12.2f}{1.0:>11.2f}x{'':>12}")
+
+        pdf_extractor.PAGINAS_MINIMAS_PARALELO = 1
+        try:
+            for quantidade in processos:
+                # Primeira execução aquece o pool (spawn dos processos), fora da medição
+                extrair_texto_pdf(pdf, raiz / "aquecimento.txt", processos=quantidade)
+                tempos = []
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    texto = extrair_texto_pdf(pdf, raiz / "processo_extraido.txt", processos=quantidade)
+                    tempos.append(time.perf_counter() - inicio)
+                    assert texto == referencia, "texto paralelo difere do sequencial"
+                melhor = min(tempos)
+                print(f"   {f'{quantidade} processo(s)':<22}{melhor:>12.2f}{base / melhor:>11.2f}x"
+                      f"{base / melhor / quantidade:>11.0%}")
+        finally:
+            pdf_extractor.encerrar_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, default=3000, help="Páginas do PDF sintético")
+    parser.add_argument("--linhas", type=int, default=60, help="Linhas de texto por página")
+    parser.add_argument("--processos", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help="Números de processos a medir")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    executar(args.paginas, args.linhas, args.processos, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark do registro de serviços
+Compara o custo por requisição de criar os serviços a cada requisição (comportamento anterior)
+com o uso das instâncias compartilhadas aquecidas na inicialização
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from services.service_registry import ServiceRegistry, FABRICAS_PADRAO
+
+
+def rss_atual_mb() -> float:
+    """RSS atual do processo (Linux /proc)"""
+    with open("/proc/self/status", encoding="utf-8") as status:
+        for linha in status:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def resumir(nome: str, latencias, rss_inicial: float, rss_final: float):
+    ordenadas = sorted(latencias)
+    p95 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))]
+    print(f"   {nome}:")
+    print(f"      Latência por requisição: média {statistics.mean(latencias) * 1000:.1f}ms | p95 {p95 * 1000:.1f}ms")
+    print(f"      RSS: {rss_inicial:.0f}MB -> {rss_final:.0f}MB (crescimento {rss_final - rss_inicial:.0f}MB)")
+
+
+def executar(servicos, requisicoes: int):
+    print("📊 BENCHMARK REGISTRO DE SERVIÇOS")
+    print(f"   Serviços: {', '.join(servicos)} | Requisições: {requisicoes}")
+
+    # ANTES: cada requisição cria os próprios serviços
+    rss_inicial = rss_atual_mb()
+    latencias = []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        registry = ServiceRegistry()
+        for nome in servicos:
+            registry.obter(nome)
+        latencias.append(time.perf_counter() - inicio)
+        del registry
+        gc.collect()
+    resumir("Antes (serviços por requisição)", latencias, rss_inicial, rss_atual_mb())
+
+    # DEPOIS: aquecimento único e instâncias compartilhadas
+    rss_inicial = rss_atual_mb()
+    inicio = time.perf_counter()
+    registry = ServiceRegistry()
+    estado = registry.aquecer(servicos)
+    print(f"   Aquecimento único: {time.perf_counter() - inicio:.2f}s (pronto={estado['pronto']})")
+    latencias = []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        for nome in servicos:
+            registry.obter(nome)
+        latencias.append(time.perf_counter() - inicio)
+    resumir("Depois (registro compartilhado)", latencias, rss_inicial, rss_atual_mb())
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--servicos", default=",".join(FABRICAS_PADRAO),
+                        help="Serviços a medir, separados por vírgula")
+    parser.add_argument("--requisicoes", type=int, default=10, help="Requisições simuladas")
+    args = parser.parse_args()
+
+    load_dotenv()
+    servicos = [nome.strip() for nome in args.servicos.split(",") if nome.strip()]
+    executar(servicos, args.requisicoes)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark do tempo de inicialização (cold start) do servidor e dos scripts
+Executa ``python -X importtime -c "import <módulo>"`` em processos novos para os módulos
+de entrada (main, pacote services e serviços usados por scripts), informa o tempo
+cumulativo de import, os maiores contribuintes e as dependências pesadas carregadas,
+e compara com o orçamento de ORCAMENTO_MS (o mesmo verificado em test_startup_time.py).
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+SERVER_DIR = Path(__file__).resolve().parent
+
+# Dependências que só podem ser carregadas quando o serviço correspondente é instanciado
+MODULOS_PESADOS = (
+    "torch", "sentence_transformers", "transformers", "chromadb",
+    "anthropic", "google.generativeai", "openai", "redis", "fitz", "docx",
+)
+
+# Orçamento de import (ms, tempo cumulativo do -X importtime) por módulo de entrada.
+# main é dominado pelo FastAPI/pydantic; os demais não devem passar de dezenas de ms.
+ORCAMENTO_MS = {
+    "services": 50,
+    "services.semantic_chunker": 250,
+    "services.metrics": 250,
+    "services.job_runner": 400,
+    "services.gemini_processor": 500,
+    "services.intelligent_dialogue_service": 1000,
+    "main": 3000,
+}
+
+_LINHA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def medir_importacao(modulo: str) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """Importa ``modulo`` num processo novo; retorna (ms cumulativo, [(módulo, ms)], pesados carregados)"""
+    ambiente = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=SERVER_DIR, env=ambiente, capture_output=True, text=True, check=True
+    )
+    linhas = []
+    for linha in resultado.stderr.splitlines():
+        encontrado = _LINHA.match(linha)
+        if encontrado:
+            linhas.append((encontrado.group(4), int(encontrado.group(2)) / 1000, len(encontrado.group(3))))
+
+    # Saída em pós-ordem: os imports feitos pelo módulo vêm antes dele, com indentação maior
+    total, maiores = 0.0, []
+    for indice in range(len(linhas) - 1, -1, -1):
+        nome, ms, nivel = linhas[indice]
+        if nome == modulo:
+            total = ms
+            for filho, ms_filho, nivel_filho in reversed(linhas[:indice]):
+                if nivel_filho <= nivel:
+                    break
+                maiores.append((filho, ms_filho))
+            break
+    maiores.sort(key=lambda item: item[1], reverse=True)
+    pesados = sorted({nome for nome, _, _ in linhas if nome in MODULOS_PESADOS})
+    return total, maiores, pesados
+
+
+def executar(modulos: List[str], repeticoes: int, top: int) -> int:
+    print("📊 BENCHMARK DE INICIALIZAÇÃO (python -X importtime)")
+    estourados = 0
+    for modulo in modulos:
+        medidas = [medir_importacao(modulo) for _ in range(repeticoes)]
+        mediana = statistics.median(total for total, _, _ in medidas)
+        _, maiores, pesados = medidas[-1]
+        orcamento = ORCAMENTO_MS.get(modulo)
+        dentro = orcamento is None or mediana <= orcamento
+        estourados += not dentro
+        marcador = "✅" if dentro and not pesados else "❌"
+        limite = f" (orçamento {orcamento}ms)" if orcamento else ""
+        print(f"\n   {marcador} {modulo}: {mediana:.0f}ms{limite}")
+        if pesados:
+            print(f"      Dependências pesadas carregadas: {', '.join(pesados)}")
+        for nome, ms in maiores[:top]:
+            print(f"      {ms:>8.1f}ms  {nome}")
+    return 1 if estourados else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modulos", nargs="*", default=list(ORCAMENTO_MS), help="Módulos de entrada a medir")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Processos por módulo (mediana)")
+    parser.add_argument("--top", type=int, default=5, help="Maiores contribuintes exibidos")
+    args = parser.parse_args()
+    sys.exit(executar(args.modulos, args.repeticoes, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark da coleta de lixo do storage
+Gera uma árvore sintética de casos (storage/ + rag_storage/ com instâncias, cópias do
+template_master, backups e órfãos) e mede o dry-run e a coleta real com a política informada
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from services.case_catalog import CaseCatalog, ARQUIVO_CATALOGO
+from services.storage_gc import StorageGC, PoliticaRetencao
+
+DIA_S = 24 * 3600
+TEMPLATE = json.dumps({"linguagem": {"formal": True, "conectores_tipicos": ["Outrossim", "Destarte"] * 50}})
+
+
+def _envelhecer(caminho: Path, dias: float):
+    instante = time.time() - dias * DIA_S
+    os.utime(caminho, (instante, instante))
+
+
+def gerar_arvore(raiz: Path, casos: int, kb_texto: int, seed: int) -> CaseCatalog:
+    """Casos com idades uniformes em 0-120 dias; 1% de instâncias órfãs e backups antigos"""
+    aleatorio = random.Random(seed)
+    rag = raiz / "rag_storage"
+    (rag / "template_master").mkdir(parents=True)
+    (rag / "template_master" / "estilo_juiza.json").write_text(TEMPLATE, encoding="utf-8")
+    catalogo = CaseCatalog(raiz / ARQUIVO_CATALOGO)
+    texto = "x" * (kb_texto * 1024)
+    sentenca = "SENTENÇA " * 2000
+
+    for i in range(casos):
+        case_id = f"caso-{i:06d}"
+        case_dir = raiz / case_id
+        case_dir.mkdir()
+        (case_dir / "processo.pdf").write_bytes(b"%PDF" + b"0" * 1024)
+        (case_dir / "processo_extraido.txt").write_text(texto, encoding="utf-8")
+        (case_dir / "sentenca_gerada.txt").write_text(sentenca, encoding="utf-8")
+        (case_dir / "dialogo_resultado_completo.json").write_text(
+            json.dumps({"etapas_executadas": [1, 2, 3], "sentenca_final": sentenca}), encoding="utf-8"
+        )
+        instancia = rag / f"processo_{case_id}"
+        (instancia / "estilo_juiza").mkdir(parents=True)
+        (instancia / "estilo_juiza" / "estilo_juiza.json").write_text(TEMPLATE, encoding="utf-8")
+        (instancia / "chroma_db").mkdir()
+        (instancia / "chroma_db" / "chroma.sqlite3").write_bytes(b"0" * 4096)
+
+        idade = aleatorio.uniform(0, 120)
+        catalogo.registrar_caso(case_id, case_dir, status="completed")
+        _envelhecer(case_dir, idade)
+
+        if i % 100 == 0:
+            orfa = rag / f"processo_orfa-{i:06d}"
+            (orfa / "chroma_db").mkdir(parents=True)
+            (orfa / "chroma_db" / "chroma.sqlite3").write_bytes(b"0" * 4096)
+            _envelhecer(orfa, 2)
+            backup = rag / "cleanup_backup" / f"processo_antigo-{i:06d}"
+            backup.mkdir(parents=True)
+            (backup / "instance_metadata.json").write_text("{}", encoding="utf-8")
+            _envelhecer(backup, aleatorio.uniform(0, 90))
+
+    # Atividade no catálogo coerente com a idade do diretório
+    catalogo._conexao().execute("UPDATE casos SET atualizado_em = '2000-01-01T00:00:00'")
+    return catalogo
+
+
+def executar(casos: int, kb_texto: int, retencao_dias: float, seed: int):
+    print("📊 BENCHMARK COLETA DO STORAGE")
+    print(f"   Casos: {casos} | Texto extraído: {kb_texto}KB/caso | Retenção de casos: {retencao_dias:g} dias")
+
+    raiz = Path(tempfile.mkdtemp(prefix="storage_gc_bench_"))
+    try:
+        inicio = time.perf_counter()
+        catalogo = gerar_arvore(raiz, casos, kb_texto, seed)
+        print(f"   Geração da árvore: {time.perf_counter() - inicio:.1f}s")
+
+        gc = StorageGC(raiz, PoliticaRetencao(idade_max_caso_dias=retencao_dias), catalogo)
+
+        relatorio = gc.executar(dry_run=True)
+        print(f"\n   Dry-run: {relatorio.duracao_s:.1f}s | {relatorio.bytes_casos / 1024 ** 2:.0f}MB em casos")
+        for tipo, item in sorted(relatorio.resumo().items()):
+            print(f"      {tipo:<28} {item['quantidade']:>7} ações {item['bytes'] / 1024 ** 2:>9.1f}MB")
+
+        relatorio = gc.executar(dry_run=False)
+        print(f"\n   Coleta: {relatorio.duracao_s:.1f}s | {relatorio.bytes_liberados / 1024 ** 2:.0f}MB liberados | "
+              f"{len(relatorio.erros)} erros")
+
+        relatorio = gc.executar(dry_run=True)
+        print(f"   Dry-run após a coleta: {relatorio.duracao_s:.1f}s | "
+              f"{relatorio.casos_analisados} casos, {len(relatorio.acoes)} ações pendentes")
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--casos", type=int, default=50000, help="Casos sintéticos")
+    parser.add_argument("--kb-texto", type=int, default=16, help="Tamanho do texto extraído por caso (KB)")
+    parser.add_argument("--retencao-dias", type=float, default=90, help="Retenção de casos sem atividade")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    executar(args.casos, args.kb_texto, args.retencao_dias, args.seed)
+
+
+if __name__ == "__main__":
+    main()
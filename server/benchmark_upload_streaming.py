@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark do upload em streaming
+Envia várias audiências de vários GB em paralelo para o /upload-caso (via ASGI, sem rede)
+e verifica que o RSS do processo permanece dentro de um orçamento fixo
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+import main
+
+BOUNDARY = "----benchmarkboundary7MA4YWxkTrZu0gW"
+CHUNK_ENVIO = 1024 * 1024
+
+
+def rss_atual_mb() -> float:
+    """RSS atual do processo (Linux /proc)"""
+    with open("/proc/self/status", encoding="utf-8") as status:
+        for linha in status:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+async def corpo_multipart(tamanho_bytes: int):
+    """Gera o corpo multipart de uma audiência MP4 sintética sem materializá-la em memória"""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="audiencia"; filename="audiencia.mp4"\r\n'
+        f"Content-Type: video/mp4\r\n\r\n"
+    ).encode()
+
+    # Cabeçalho ISO BMFF mínimo ("ftyp") para passar na identificação do tipo
+    cabecalho = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+    yield cabecalho
+
+    bloco = b"\x00" * CHUNK_ENVIO
+    restante = tamanho_bytes - len(cabecalho)
+    while restante > 0:
+        parte = bloco if restante >= CHUNK_ENVIO else bloco[:restante]
+        restante -= len(parte)
+        yield parte
+        # Cede o loop como um socket real faria, intercalando os uploads concorrentes
+        await asyncio.sleep(0)
+
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def enviar(client: httpx.AsyncClient, tamanho_bytes: int) -> float:
+    inicio = time.perf_counter()
+    resposta = await client.post(
+        "/upload-caso",
+        content=corpo_multipart(tamanho_bytes),
+        headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+    resposta.raise_for_status()
+    return time.perf_counter() - inicio
+
+
+async def executar(tamanho_mb: int, concorrencia: int, orcamento_rss_mb: float) -> bool:
+    async def etapa_vazia(case_id: str):
+        return None
+
+    # Pipeline e aquecimento de modelos desligados: o benchmark mede apenas a recepção dos arquivos
+    os.environ["AQUECER_SERVICOS"] = "0"
+    main.ETAPAS_PIPELINE = {nome: etapa_vazia for nome in main.ETAPAS_PIPELINE}
+    main.MAX_UPLOAD_AUDIENCIA_MB = max(main.MAX_UPLOAD_AUDIENCIA_MB, tamanho_mb + 1)
+
+    with tempfile.TemporaryDirectory(prefix="bench_upload_") as storage:
+        main.STORAGE_DIR = Path(storage)
+
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                # Aquecimento: imports e alocações de primeira chamada fora da medição
+                await enviar(client, 8 * 1024 * 1024)
+                rss_base = rss_atual_mb()
+                rss_pico = rss_base
+
+                async def amostrar():
+                    nonlocal rss_pico
+                    while True:
+                        rss_pico = max(rss_pico, rss_atual_mb())
+                        await asyncio.sleep(0.05)
+
+                amostrador = asyncio.create_task(amostrar())
+                inicio = time.perf_counter()
+                duracoes = await asyncio.gather(*[
+                    enviar(client, tamanho_mb * 1024 * 1024) for _ in range(concorrencia)
+                ])
+                total = time.perf_counter() - inicio
+                amostrador.cancel()
+
+    total_mb = tamanho_mb * concorrencia
+    crescimento = rss_pico - rss_base
+
+    print("📊 BENCHMARK UPLOAD STREAMING")
+    print(f"   Uploads concorrentes: {concorrencia} x {tamanho_mb}MB = {total_mb / 1024:.1f}GB")
+    print(f"   Tempo total: {total:.1f}s ({total_mb / total:.0f} MB/s agregados)")
+    print(f"   Tempo por upload: min {min(duracoes):.1f}s / max {max(duracoes):.1f}s")
+    print(f"   RSS base: {rss_base:.0f}MB | pico: {rss_pico:.0f}MB | crescimento: {crescimento:.0f}MB")
+    print(f"   Orçamento de crescimento: {orcamento_rss_mb:.0f}MB")
+
+    dentro = crescimento <= orcamento_rss_mb
+    print("✅ Dentro do orçamento" if dentro else "❌ Orçamento de RSS excedido")
+    return dentro
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanho-mb", type=int, default=2048, help="Tamanho de cada audiência enviada")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Uploads simultâneos")
+    parser.add_argument("--orcamento-rss-mb", type=float, default=64, help="Crescimento máximo de RSS aceito")
+    args = parser.parse_args()
+
+    ok = asyncio.run(executar(args.tamanho_mb, args.concorrencia, args.orcamento_rss_mb))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
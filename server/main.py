@@ -1,15 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import UploadFile, File, HTTPException
+from fastapi import Request, HTTPException, Query
 from fastapi import status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
+import json
+import asyncio
+import shutil
+import time
 import logging
+import re
+import functools
 from uuid import uuid4
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from contextlib import asynccontextmanager, AsyncExitStack
 
 # Configurar logging detalhado
 logging.basicConfig(
@@ -18,24 +25,78 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Parsing libs
-try:
-    import fitz  # PyMuPDF
-except Exception:  # pragma: no cover
-    fitz = None
-try:
-    from docx import Document  # python-docx
-except Exception:  # pragma: no cover
-    Document = None
-
 # Carrega variáveis de ambiente
 load_dotenv()
 
+# Runner de jobs do pipeline (inicializado no lifespan da aplicação)
+job_runner = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializa e finaliza os recursos de background da aplicação"""
+    global job_runner
+    from services.job_runner import JobRunner
+    from services.async_executor import get_async_executor
+    from services.service_registry import get_service_registry
+    from services.event_bus import publicar_evento
+    from services.pdf_extractor import encerrar_pool
+
+    def _observar_job(evento, job):
+        publicar_evento(job.case_id, evento, job_id=job.job_id, status=job.status, erro=job.erro)
+        _case_catalog().atualizar_status(job.case_id, job.status)
+
+    job_runner = JobRunner(
+        STORAGE_DIR,
+        etapas=ETAPAS_PIPELINE,
+        max_workers=int(os.getenv("JOB_WORKERS", "2")),
+        max_retries=int(os.getenv("JOB_MAX_RETRIES", "2")),
+        observador=_observar_job
+    )
+    await job_runner.start()
+
+    # Aquecimento dos serviços compartilhados em background: /health responde de imediato,
+    # /ready só após os modelos e clientes estarem carregados
+    aquecimento = None
+    if os.getenv("AQUECER_SERVICOS", "1") == "1":
+        aquecimento = asyncio.create_task(
+            get_async_executor().run("aquecimento", get_service_registry().aquecer)
+        )
+
+    # Coleta de lixo periódica do storage (STORAGE_GC_INTERVALO_H=0 desliga)
+    coleta = None
+    intervalo_gc_h = float(os.getenv("STORAGE_GC_INTERVALO_H", "6"))
+    if intervalo_gc_h > 0:
+        coleta = asyncio.create_task(_coletar_storage_periodicamente(intervalo_gc_h * 3600))
+    try:
+        yield
+    finally:
+        for tarefa in (aquecimento, coleta):
+            if tarefa and not tarefa.done():
+                tarefa.cancel()
+        await job_runner.stop()
+        get_async_executor().shutdown()
+        encerrar_pool()
+
+async def _coletar_storage_periodicamente(intervalo_s: float):
+    """Executa a coleta do storage em background a cada intervalo (primeira execução após um intervalo)"""
+    from services.async_executor import get_async_executor
+    from services.storage_gc import GCEmExecucao
+
+    while True:
+        await asyncio.sleep(intervalo_s)
+        try:
+            await get_async_executor().run("manutencao", _storage_gc().executar, False)
+        except GCEmExecucao:
+            logger.info("⏭️ Coleta do storage já em andamento, aguardando o próximo ciclo")
+        except Exception as e:
+            logger.error(f"❌ Erro na coleta do storage: {e}")
+
 # Inicializa a aplicação FastAPI
 app = FastAPI(
     title="Sistema de Automação de Sentenças Judiciais",
     description="API para automatizar a geração de sentenças judiciais com IA",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuração do CORS para permitir requisições do frontend
@@ -54,9 +115,34 @@ STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 ALLOWED_PROCESSO = {"pdf", "docx"}
 ALLOWED_AUDIENCIA = {"mp4", "mp3", "wav", "m4a", "aac"}
 
+# Limites de tamanho aplicados durante o streaming do upload
+MAX_UPLOAD_PROCESSO_MB = int(os.getenv("MAX_UPLOAD_PROCESSO_MB", "500"))
+MAX_UPLOAD_AUDIENCIA_MB = int(os.getenv("MAX_UPLOAD_AUDIENCIA_MB", "4096"))
+
+# Envio em lote: máximo de casos por requisição e limite total do corpo multipart
+MAX_BATCH_CASOS = int(os.getenv("MAX_BATCH_CASOS", "200"))
+MAX_BATCH_TOTAL_MB = int(os.getenv("MAX_BATCH_TOTAL_MB", str(64 * 1024)))
+
+# Custo estimado do caso (prioridade na fila: menor custo primeiro). A transcrição domina
+# o tempo do pipeline, por isso cada MB de áudio pesa mais que um MB de processo
+CUSTO_POR_MB_AUDIENCIA = 3.0
+CUSTO_POR_MB_PROCESSO = 1.0
+
+# Tipos reais (magic numbers) aceitos para cada extensão
+TIPOS_POR_EXTENSAO = {
+    "pdf": {"pdf"},
+    "docx": {"zip"},
+    "mp4": {"mp4"},
+    "m4a": {"mp4"},
+    "mp3": {"mp3"},
+    "wav": {"wav"},
+    "aac": {"aac", "mp4"},
+}
+
 class UploadResponse(BaseModel):
     case_id: str
     files: Dict[str, Optional[str]]
+    job_id: Optional[str] = None
 
 class ProcessingResponse(BaseModel):
     case_id: str
@@ -64,6 +150,12 @@ class ProcessingResponse(BaseModel):
     status: str
     message: str
 
+class BatchResponse(BaseModel):
+    batch_id: str
+    casos: List[Dict]
+    rejeitados: List[Dict]
+    orcamentos: Dict[str, int]
+
 @app.get("/")
 async def root():
     """Endpoint raiz da API"""
@@ -73,22 +165,81 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Prontidão: 200 somente após o aquecimento dos serviços compartilhados"""
+    from services.service_registry import get_service_registry
+
+    estado = get_service_registry().status()
+    if not estado["pronto"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=estado)
+    return estado
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
-@app.post("/upload-caso", response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
-async def upload_caso(
-    processo: Optional[UploadFile] = File(default=None, description="PDF/DOCX do processo"),
-    audiencia: Optional[UploadFile] = File(default=None, description="MP4 da audiência")
-):
-    """Recebe upload de 1 arquivo de processo (PDF/DOCX) e 1 de audiência (MP4)"""
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato de exposição do Prometheus (latência por etapa, tokens, retries, fila)"""
+    from services.metrics import get_metrics_registry, CONTENT_TYPE, CASOS_EM_EXECUCAO, FILA_PROFUNDIDADE
+
+    if job_runner is not None:
+        CASOS_EM_EXECUCAO.definir(job_runner.running_count())
+        FILA_PROFUNDIDADE.definir(job_runner.queue_depth())
+    return Response(content=get_metrics_registry().renderizar(), media_type=CONTENT_TYPE)
+
+def _regras_upload():
+    """Regras de aceitação dos campos de arquivo do /upload-caso"""
+    from services.upload_storage import RegraCampo
+
+    return {
+        "processo": RegraCampo(
+            prefixo="processo",
+            extensoes=ALLOWED_PROCESSO,
+            max_bytes=MAX_UPLOAD_PROCESSO_MB * 1024 * 1024,
+            tipos_por_extensao=TIPOS_POR_EXTENSAO
+        ),
+        "audiencia": RegraCampo(
+            prefixo="audiencia",
+            extensoes=ALLOWED_AUDIENCIA,
+            max_bytes=MAX_UPLOAD_AUDIENCIA_MB * 1024 * 1024,
+            tipos_por_extensao=TIPOS_POR_EXTENSAO
+        ),
+    }
+
+@app.post(
+    "/upload-caso",
+    response_model=UploadResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "processo": {"type": "string", "format": "binary", "description": "PDF/DOCX do processo"},
+                            "audiencia": {"type": "string", "format": "binary", "description": "MP4 da audiência"}
+                        }
+                    }
+                }
+            }
+        }
+    }
+)
+async def upload_caso(request: Request):
+    """Recebe upload de 1 arquivo de processo (PDF/DOCX) e 1 de audiência (MP4).
+
+    O corpo multipart é gravado em disco em streaming (memória constante por upload),
+    com limite de tamanho, SHA-256 e identificação do tipo real calculados durante a transferência.
+    """
+    from services.upload_storage import ReceptorUploadStreaming, UploadInvalido
+    from services.atomic_write import escrever_json_atomico
+    from services.tracing import span
+
     logger.info("🚀 INICIANDO UPLOAD DE CASO")
-    
-    if processo is None and audiencia is None:
-        logger.error("❌ Nenhum arquivo enviado")
-        raise HTTPException(status_code=400, detail="Envie ao menos um arquivo: processo e/ou audiência")
 
     case_id = str(uuid4())
     case_dir = STORAGE_DIR / case_id
@@ -97,187 +248,695 @@ async def upload_caso(
     logger.info(f"📁 Case ID gerado: {case_id}")
     logger.info(f"📂 Diretório criado: {case_dir}")
 
-    saved_processo = None
-    saved_audiencia = None
-
-    # Salvar processo
-    if processo is not None:
-        logger.info(f"📄 Processando arquivo: {processo.filename}")
-        proc_ext = (processo.filename or "").split(".")[-1].lower()
-        if proc_ext not in ALLOWED_PROCESSO:
-            logger.error(f"❌ Extensão inválida do processo: .{proc_ext}")
-            raise HTTPException(status_code=400, detail=f"Extensão do processo inválida: .{proc_ext}")
-        proc_path = case_dir / f"processo.{proc_ext}"
-        data = await processo.read()
-        proc_path.write_bytes(data)
-        saved_processo = str(proc_path)
-        logger.info(f"✅ Processo salvo: {proc_path} ({len(data)} bytes)")
-
-    # Salvar audiência
-    if audiencia is not None:
-        logger.info(f"🎥 Processando audiência: {audiencia.filename}")
-        aud_ext = (audiencia.filename or "").split(".")[-1].lower()
-        if aud_ext not in ALLOWED_AUDIENCIA:
-            logger.error(f"❌ Extensão inválida da audiência: .{aud_ext}")
-            raise HTTPException(status_code=400, detail=f"Extensão da audiência inválida: .{aud_ext}")
-        aud_path = case_dir / f"audiencia.{aud_ext}"
-        data = await audiencia.read()
-        aud_path.write_bytes(data)
-        saved_audiencia = str(aud_path)
-        logger.info(f"✅ Audiência salva: {aud_path} ({len(data)} bytes)")
-
-    logger.info(f"🎉 UPLOAD CONCLUÍDO! Case ID: {case_id}")
-    
-    # 🚀 INICIAR PIPELINE AUTOMÁTICO
-    logger.info("🔄 Iniciando pipeline automático...")
+    with span("upload_caso", case_id=case_id, case_dir=case_dir) as span_upload:
+        try:
+            recebidos = await ReceptorUploadStreaming(case_dir, _regras_upload()).receber(request)
+        except UploadInvalido as e:
+            shutil.rmtree(case_dir, ignore_errors=True)
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        except Exception:
+            shutil.rmtree(case_dir, ignore_errors=True)
+            raise
+
+        if not recebidos:
+            logger.error("❌ Nenhum arquivo enviado")
+            shutil.rmtree(case_dir, ignore_errors=True)
+            raise HTTPException(status_code=400, detail="Envie ao menos um arquivo: processo e/ou audiência")
+
+        # Registrar hashes e tipos dos arquivos recebidos
+        arquivos = {campo: arquivo.to_dict() for campo, arquivo in recebidos.items()}
+        escrever_json_atomico(case_dir / "arquivos.json", arquivos)
+        _case_catalog().registrar_caso(case_id, case_dir, artefatos=arquivos)
+
+        span_upload.definir(
+            arquivos=len(recebidos), bytes=sum(arquivo.tamanho_bytes for arquivo in recebidos.values())
+        )
+        saved_processo = recebidos["processo"].caminho if "processo" in recebidos else None
+        saved_audiencia = recebidos["audiencia"].caminho if "audiencia" in recebidos else None
+
+        logger.info(f"🎉 UPLOAD CONCLUÍDO! Case ID: {case_id}")
     
+        # 🚀 ENFILEIRAR PIPELINE AUTOMÁTICO (executado em background pelo JobRunner)
+        job = _enfileirar_pipeline(case_id)
+        logger.info(f"🔄 Pipeline automático enfileirado: job {job.job_id}")
+
+    return UploadResponse(
+        case_id=case_id,
+        files={"processo": saved_processo, "audiencia": saved_audiencia},
+        job_id=job.job_id
+    )
+
+def _estimar_custo_caso(case_dir: Path) -> float:
+    """Custo relativo do pipeline do caso a partir do tamanho dos arquivos enviados"""
+    custo = 0.0
+    processo = _encontrar_arquivo(case_dir, "processo", ALLOWED_PROCESSO)
+    audiencia = _encontrar_arquivo(case_dir, "audiencia", ALLOWED_AUDIENCIA)
+    if processo:
+        custo += processo.stat().st_size / (1024 * 1024) * CUSTO_POR_MB_PROCESSO
+    if audiencia:
+        custo += audiencia.stat().st_size / (1024 * 1024) * CUSTO_POR_MB_AUDIENCIA
+    return round(custo, 3)
+
+def _enfileirar_pipeline(case_id: str, metadados: Optional[Dict] = None):
+    """Submete o pipeline automático (DAG de etapas) ao JobRunner, priorizando casos menores"""
+    from services.event_bus import publicar_evento
+
+    if job_runner is None:
+        raise HTTPException(status_code=503, detail="Executor de jobs não inicializado")
+
+    custo = _estimar_custo_caso(STORAGE_DIR / case_id)
+    job = job_runner.submit(case_id, ["pipeline"], metadados={**(metadados or {}), "custo_estimado": custo},
+                            prioridade=custo)
+    publicar_evento(case_id, "job_enfileirado", job_id=job.job_id, status=job.status)
+    _case_catalog().atualizar_status(case_id, job.status)
+    return job
+
+def _batch_registry():
+    """Registro dos lotes enviados por /batch"""
+    from services.batch_registry import BatchRegistry
+
+    return BatchRegistry(STORAGE_DIR)
+
+def _storage_gc():
+    """Coleta de lixo do storage, protegendo casos com job na fila ou em execução"""
+    from services.storage_gc import StorageGC, STATUS_ATIVOS
+
+    def _job_ativo(case_id: str) -> bool:
+        pipeline = job_runner.get_case_status(case_id) if job_runner else None
+        return bool(pipeline and pipeline.get("status") in STATUS_ATIVOS)
+
+    return StorageGC(STORAGE_DIR, catalogo=_case_catalog(), protegido=_job_ativo)
+
+def _case_catalog():
+    """Catálogo SQLite de casos, artefatos, etapas e instâncias RAG"""
+    from services.case_catalog import get_case_catalog
+
+    return get_case_catalog(STORAGE_DIR)
+
+# Espera máxima pelo lock do caso nas rotas síncronas antes de responder 409
+LOCK_CASO_TIMEOUT_S = float(os.getenv("LOCK_CASO_TIMEOUT_S", "5"))
+
+def _exclusivo_por_caso(timeout: Optional[float] = LOCK_CASO_TIMEOUT_S, em_lote: bool = False):
+    """Executa a rota/etapa com o lock do caso entre workers (uvicorn --workers N).
+
+    Rotas que não obtêm o lock dentro do prazo respondem 409; etapas do JobRunner usam
+    timeout=None e aguardam o término do outro processo. As chamadas aos LLMs feitas dentro
+    entram na fila de admissão com o caso e a classe de prioridade (lote ou interativa).
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        async def _executar(case_id: str, *args, **kwargs):
+            from services.case_lock import lock_caso_async, LockIndisponivel
+            from services.admission_control import contexto_admissao, PRIORIDADE_LOTE, PRIORIDADE_INTERATIVA
+
+            async with AsyncExitStack() as pilha:
+                try:
+                    await pilha.enter_async_context(lock_caso_async(STORAGE_DIR, case_id, timeout=timeout))
+                except LockIndisponivel:
+                    raise HTTPException(status_code=409, detail="Caso em processamento por outra requisição")
+                prioridade = PRIORIDADE_LOTE if em_lote else PRIORIDADE_INTERATIVA
+                with contexto_admissao(case_id=case_id, prioridade=prioridade):
+                    return await func(case_id, *args, **kwargs)
+        return _executar
+    return decorador
+
+def _orcamentos_provedores() -> Dict[str, int]:
+    """Limites de concorrência por provedor (EXECUTOR_<RECURSO>_WORKERS) e casos simultâneos (JOB_WORKERS)"""
+    from services.async_executor import get_async_executor
+
+    limites = get_async_executor().limites
+    return {
+        "whisper": limites["whisper"],
+        "gemini": limites["gemini"],
+        "claude": limites["geracao"],  # A geração orquestra as chamadas ao Claude
+        "casos_simultaneos": job_runner.max_workers if job_runner else 0
+    }
+
+CAMPO_LOTE = re.compile(r"^(processo|audiencia)_([A-Za-z0-9-]{1,64})$")
+
+@app.post(
+    "/batch",
+    response_model=BatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "description": "Pares processo_<n>/audiencia_<n> (ex.: processo_1, audiencia_1, processo_2...)",
+                        "additionalProperties": {"type": "string", "format": "binary"}
+                    }
+                },
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"case_ids": {"type": "array", "items": {"type": "string"}}}
+                    }
+                }
+            }
+        }
+    }
+)
+async def submit_batch(request: Request, case_ids: Optional[List[str]] = Query(None)):
+    """Envio em lote: vários pares processo/audiência (multipart) e/ou casos já armazenados (case_ids).
+
+    Cada caso vira um job do pipeline; a fila do JobRunner executa primeiro os casos de menor
+    custo estimado, e as etapas respeitam os limites de concorrência por provedor.
+    """
+    from services.upload_storage import ReceptorUploadStreaming, UploadInvalido
+    from services.atomic_write import escrever_json_atomico
+
+    if job_runner is None:
+        raise HTTPException(status_code=503, detail="Executor de jobs não inicializado")
+
+    referencias = list(case_ids or [])
+    novos: Dict[str, Path] = {}
+    regras = _regras_upload()
+
+    def _resolver_campo(campo: str):
+        correspondencia = CAMPO_LOTE.match(campo)
+        if not correspondencia:
+            return None
+        tipo, chave = correspondencia.groups()
+        if chave not in novos:
+            if len(novos) + len(referencias) >= MAX_BATCH_CASOS:
+                raise UploadInvalido(f"Lote excede o máximo de {MAX_BATCH_CASOS} casos", status_code=413)
+            novos[chave] = STORAGE_DIR / str(uuid4())
+            novos[chave].mkdir(parents=True, exist_ok=True)
+        return regras[tipo], novos[chave]
+
+    content_type = request.headers.get("content-type", "")
+    recebidos = {}
+    if content_type.startswith("multipart/form-data"):
+        receptor = ReceptorUploadStreaming(
+            None, regras, resolver=_resolver_campo, limite_total=MAX_BATCH_TOTAL_MB * 1024 * 1024
+        )
+        try:
+            recebidos = await receptor.receber(request)
+        except UploadInvalido as e:
+            for case_dir in novos.values():
+                shutil.rmtree(case_dir, ignore_errors=True)
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        except Exception:
+            for case_dir in novos.values():
+                shutil.rmtree(case_dir, ignore_errors=True)
+            raise
+    elif content_type.startswith("application/json"):
+        try:
+            corpo = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Corpo JSON inválido")
+        ids_corpo = corpo.get("case_ids", []) if isinstance(corpo, dict) else []
+        if not isinstance(ids_corpo, list) or not all(isinstance(case_id, str) for case_id in ids_corpo):
+            raise HTTPException(status_code=400, detail="case_ids deve ser uma lista de strings")
+        referencias.extend(ids_corpo)
+
+    if len(novos) + len(referencias) > MAX_BATCH_CASOS:
+        raise HTTPException(status_code=413, detail=f"Lote excede o máximo de {MAX_BATCH_CASOS} casos")
+    if not novos and not referencias:
+        raise HTTPException(status_code=400, detail="Envie pares processo_<n>/audiencia_<n> e/ou case_ids")
+
+    itens, rejeitados = [], []
+    for chave, case_dir in novos.items():
+        arquivos = {
+            tipo: recebidos[f"{tipo}_{chave}"].to_dict()
+            for tipo in ("processo", "audiencia") if f"{tipo}_{chave}" in recebidos
+        }
+        escrever_json_atomico(case_dir / "arquivos.json", arquivos)
+        _case_catalog().registrar_caso(case_dir.name, case_dir, artefatos=arquivos)
+        itens.append({"case_id": case_dir.name, "origem": f"upload:{chave}"})
+
+    for case_id in dict.fromkeys(referencias):
+        case_dir = STORAGE_DIR / case_id
+        if not re.fullmatch(r"[A-Za-z0-9-]+", case_id) or not case_dir.is_dir():
+            rejeitados.append({"case_id": case_id, "motivo": "case_id não encontrado"})
+        elif not (_encontrar_arquivo(case_dir, "processo", ALLOWED_PROCESSO)
+                  or _encontrar_arquivo(case_dir, "audiencia", ALLOWED_AUDIENCIA)):
+            rejeitados.append({"case_id": case_id, "motivo": "caso sem processo nem audiência"})
+        else:
+            itens.append({"case_id": case_id, "origem": "existente"})
+
+    batch_id = str(uuid4())
+    for item in itens:
+        job = _enfileirar_pipeline(item["case_id"], metadados={"batch_id": batch_id})
+        item.update(job_id=job.job_id, custo_estimado=job.metadados["custo_estimado"])
+
+    lote = _batch_registry().criar(itens, rejeitados, _orcamentos_provedores(), batch_id=batch_id)
+    logger.info(f"📦 Lote {batch_id}: {len(itens)} casos enfileirados, {len(rejeitados)} rejeitados")
+
+    return BatchResponse(
+        batch_id=lote["batch_id"],
+        casos=sorted(itens, key=lambda item: item["custo_estimado"]),
+        rejeitados=rejeitados,
+        orcamentos=lote["orcamentos"]
+    )
+
+@app.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Progresso agregado do lote: status por caso, vazão (casos/hora) e estimativa de término"""
+    registry = _batch_registry()
+    lote = registry.obter(batch_id) if re.fullmatch(r"[A-Za-z0-9-]+", batch_id) else None
+    if not lote:
+        raise HTTPException(status_code=404, detail="batch_id não encontrado")
+    return registry.resumo(lote, job_runner.get_job if job_runner else (lambda job_id: None))
+
+@app.post("/storage/gc")
+async def run_storage_gc(dry_run: bool = Query(True, description="Apenas relatório, sem remover nada")):
+    """Coleta de lixo do storage (retenção por idade/tamanho, cache sem referência, órfãos, compactação).
+
+    Por padrão executa em dry-run e devolve o relatório das ações e bytes liberáveis.
+    """
+    from services.async_executor import get_async_executor
+    from services.storage_gc import GCEmExecucao
+
     try:
-        # ETAPA 1: Transcrição automática
-        if saved_audiencia:
-            logger.info("📝 Executando Etapa 1: Transcrição...")
-            await executar_transcricao_automatica(case_id)
-        
-        # ETAPA 2: Processamento Gemini automático  
-        logger.info("🧠 Executando Etapa 2: Processamento Gemini...")
-        await executar_processamento_automatico(case_id)
-        
-        # ETAPA 3: Geração Claude automática
-        logger.info("✍️ Executando Etapa 3: Geração de Sentença...")
-        await executar_geracao_automatica(case_id)
-        
-        logger.info("🎉 PIPELINE AUTOMÁTICO CONCLUÍDO!")
-        
-    except Exception as e:
-        logger.error(f"❌ Erro no pipeline automático: {str(e)}")
-        # Continua e retorna o case_id mesmo se houver erro
+        relatorio = await get_async_executor().run("manutencao", _storage_gc().executar, dry_run)
+    except GCEmExecucao as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return relatorio.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Consulta o estado de um job do pipeline"""
+    job = job_runner.get_job(job_id) if job_runner else None
+    if not job:
+        raise HTTPException(status_code=404, detail="job_id não encontrado")
+    return job
+
+@app.get("/cases")
+async def list_cases(
+    status_caso: Optional[str] = Query(None, alias="status"),
+    desde: Optional[str] = Query(None, description="Criados a partir de (ISO 8601)"),
+    ate: Optional[str] = Query(None, description="Criados até (ISO 8601)"),
+    limite: int = Query(100, ge=1, le=1000),
+    apos: Optional[str] = Query(None, description="case_id do último item da página anterior")
+):
+    """Lista os casos do catálogo (mais recentes primeiro), filtrando por status e data de criação"""
+    catalogo = _case_catalog()
+    casos = catalogo.listar_casos(status=status_caso, criado_desde=desde, criado_ate=ate, limite=limite, apos=apos)
+    return {
+        "casos": casos,
+        "proximo": casos[-1]["case_id"] if len(casos) == limite else None,
+        "por_status": catalogo.contar_por_status()
+    }
+
+@app.get("/cases/{case_id}/status")
+async def get_case_status(case_id: str):
+    """Consulta o estado do pipeline e os artefatos disponíveis de um caso"""
+    from services.pipeline_manifest import PipelineManifest
+
+    case_dir = STORAGE_DIR / case_id
+    if not case_dir.exists():
+        raise HTTPException(status_code=404, detail="case_id não encontrado")
+
+    artefatos = {
+        nome: (case_dir / nome).exists()
+        for nome in [
+            "processo_extraido.txt", "audiencia_transcricao.txt", "processo_estruturado.json",
+            "audiencia_analise.json", "conhecimento_rag.json", "sentenca_gerada.txt"
+        ]
+    }
+    pipeline = job_runner.get_case_status(case_id) if job_runner else None
+    execucao_path = case_dir / "pipeline_execucao.json"
+
+    return {
+        "case_id": case_id,
+        "status": pipeline["status"] if pipeline else "sem_job",
+        "pipeline": pipeline,
+        "execucao": json.loads(execucao_path.read_text(encoding='utf-8')) if execucao_path.exists() else None,
+        "checkpoints": PipelineManifest(case_dir).chaves(),
+        "artefatos": artefatos,
+        "catalogo": _case_catalog().obter_caso(case_id)
+    }
+
+@app.get("/cases/{case_id}/events")
+async def stream_case_events(case_id: str, request: Request, desde: int = 0):
+    """Stream SSE do progresso do caso: etapas do pipeline, etapas do diálogo, chunks e seções da sentença.
+
+    Reenvia os eventos posteriores ao header Last-Event-ID (ou ?desde=) e encerra
+    quando o job do caso conclui ou falha.
+    """
+    from services.event_bus import get_event_bus
+
+    case_dir = STORAGE_DIR / case_id
+    if not case_dir.exists():
+        raise HTTPException(status_code=404, detail="case_id não encontrado")
+
+    ultimo_id = request.headers.get("last-event-id")
+    if ultimo_id and ultimo_id.isdigit():
+        desde = int(ultimo_id)
 
-    return UploadResponse(case_id=case_id, files={"processo": saved_processo, "audiencia": saved_audiencia})
+    pipeline = job_runner.get_case_status(case_id) if job_runner else None
+    intervalo_heartbeat = float(os.getenv("SSE_HEARTBEAT_S", "15"))
+
+    async def _eventos():
+        # Estado atual do job, para clientes que conectam após o início do pipeline
+        yield f"event: estado\ndata: {json.dumps({'case_id': case_id, 'pipeline': pipeline}, ensure_ascii=False, default=str)}\n\n"
+
+        async for evento in get_event_bus().assinar(case_id, desde_id=desde, intervalo_heartbeat=intervalo_heartbeat):
+            if evento is None:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            dados = json.dumps(evento, ensure_ascii=False, default=str)
+            yield f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {dados}\n\n"
+
+    return StreamingResponse(
+        _eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # 🤖 FUNÇÕES AUXILIARES PARA PIPELINE AUTOMÁTICO
+def _encontrar_arquivo(case_dir: Path, prefixo: str, extensoes: set) -> Optional[Path]:
+    """Localiza o arquivo enviado do caso (ex.: processo.pdf, audiencia.mp4) pelo catálogo,
+    sondando as extensões apenas para casos ainda não catalogados"""
+    catalogo = _case_catalog() if case_dir.parent == STORAGE_DIR else None
+    if catalogo:
+        registrado = catalogo.localizar_artefato(case_dir.name, prefixo)
+        if registrado and registrado.suffix.lstrip(".").lower() in extensoes and registrado.exists():
+            return registrado
+
+    for ext in extensoes:
+        caminho = case_dir / f"{prefixo}.{ext}"
+        if caminho.exists():
+            if catalogo:
+                catalogo.registrar_artefato(case_dir.name, prefixo, caminho)
+            return caminho
+    return None
+
+def _extrair_texto_documento(processo_path: Path, destino: Path, ocr: Optional[bool] = None,
+                             estatisticas=None) -> str:
+    """Extrai texto de PDF (PyMuPDF, páginas em paralelo, OCR das digitalizadas) ou DOCX (python-docx)
+    e grava em destino, com o índice de peças do PJe ao lado (processo_indice.json).
+
+    estatisticas (EstatisticasExtracao) recebe o OCR aplicado ao PDF. Chamada bloqueante.
+    """
+    from services.case_text_store import normalizar_quebras
+    from services.document_extractor import extrair_texto_documento
+    from services.pje_segmenter import ARQUIVO_INDICE, salvar_indice, segmentar_processo
+
+    texto_processo = extrair_texto_documento(processo_path, destino, cache_dir=_artifact_cache().cache_dir,
+                                             ocr=ocr, estatisticas=estatisticas)
+
+    # Offsets do índice valem para o arquivo lido em modo texto (\r\n e \r viram \n)
+    salvar_indice(destino.with_name(ARQUIVO_INDICE), segmentar_processo(normalizar_quebras(texto_processo)))
+    return texto_processo
+
+async def _preparar_audio_para_transcricao(audio_file: Path, case_dir: Path) -> Path:
+    """Comprime o áudio com ffmpeg (subprocess assíncrono) quando excede o limite do Whisper"""
+    from services.async_executor import get_async_executor
+
+    tamanho_mb = audio_file.stat().st_size / (1024 * 1024)
+    logger.info(f"📏 Tamanho do arquivo: {tamanho_mb:.1f}MB")
+
+    if tamanho_mb <= 25:
+        return audio_file
+
+    logger.info(f"🔄 Arquivo muito grande ({tamanho_mb:.1f}MB). Extraindo áudio comprimido...")
+    audio_comprimido = case_dir / "audio_temp.mp3"
+    comando = [
+        'ffmpeg', '-i', str(audio_file),
+        '-vn',  # Sem vídeo
+        '-acodec', 'mp3',
+        '-ab', '64k',  # Bitrate baixo
+        '-ar', '16000',  # Sample rate reduzido
+        '-y',  # Sobrescrever
+        str(audio_comprimido)
+    ]
+
+    logger.info(f"🎬 Executando: {' '.join(comando[:6])}...")
+    returncode, _, stderr = await get_async_executor().run_subprocess(comando)
+    if returncode != 0:
+        logger.error(f"❌ Erro no ffmpeg: {stderr}")
+        raise RuntimeError(f"Falha na conversão de áudio: {stderr}")
+
+    logger.info(f"✅ Áudio comprimido: {audio_comprimido.stat().st_size / (1024 * 1024):.1f}MB")
+    return audio_comprimido
+
+def _transcrever_e_salvar(arquivo_audio: Path, case_id: str, case_dir: Path):
+    """Transcreve com Whisper e salva a transcrição. Chamada bloqueante."""
+    from services.service_registry import obter_servico
+
+    whisper_service = obter_servico("whisper")
+    transcricao = whisper_service.transcrever_audiencia(arquivo_audio, case_id)
+    # Remover vínculos anteriores com o cache de artefatos antes de regravar
+    for nome in ("audiencia_transcricao.txt", "audiencia_transcricao.json"):
+        (case_dir / nome).unlink(missing_ok=True)
+    whisper_service.salvar_transcricao(transcricao, case_dir)
+    return transcricao
+
+def _analisar_audiencia(case_id: str, case_dir: Path) -> Optional[Dict]:
+    """Analisa a transcrição da audiência com Gemini, se existir. Chamada bloqueante."""
+    from services.whisper_service import TranscricaoAudiencia
+    from services.service_registry import obter_servico
+
+    transcricao_path = case_dir / "audiencia_transcricao.txt"
+    if not transcricao_path.exists():
+        return None
+
+    transcricao_texto = transcricao_path.read_text(encoding='utf-8')
+    transcricao_mock = TranscricaoAudiencia(
+        texto_completo=transcricao_texto,
+        duracao_segundos=None,
+        idioma_detectado='pt',
+        confianca=None,
+        segmentos=None,
+        metadados={}
+    )
+    whisper_service = obter_servico("whisper")
+    return whisper_service.processar_audiencia_com_gemini(transcricao_mock, case_id)
+
+def _salvar_no_rag(processo_estruturado, analise_audiencia, case_id: str):
+    """Persiste o conhecimento do caso no ChromaDB. Chamada bloqueante."""
+    from services.service_registry import obter_servico
+
+    rag_service = obter_servico("rag")
+    rag_service.salvar_conhecimento_caso(processo_estruturado, analise_audiencia, case_id)
+
+def _executar_dialogo(case_id: str, texto_processo: str, transcricao_audiencia: Optional[str],
+                      cache_policy: Optional[str] = None) -> Dict:
+    """Executa o diálogo inteligente completo (Claude + Gemini + RAG). Chamada bloqueante."""
+    from services.intelligent_dialogue_service import IntelligentDialogueService
+
+    dialogue_service = IntelligentDialogueService(case_id, case_dir=STORAGE_DIR / case_id, cache_policy=cache_policy)
+    return dialogue_service.executar_dialogo_completo(
+        texto_processo=texto_processo,
+        transcricao_audiencia=transcricao_audiencia
+    )
+
+# ♻️ CACHE DE ARTEFATOS (entradas idênticas reaproveitam extração, transcrição e Gemini)
+def _artifact_cache():
+    """Cache de artefatos endereçado por conteúdo, compartilhado entre casos"""
+    from services.artifact_cache import ArtifactCache
+
+    return ArtifactCache(STORAGE_DIR / "artifact_cache")
+
+def _hash_arquivo_enviado(case_dir: Path, campo: str, caminho: Path) -> str:
+    """SHA-256 do arquivo enviado: registrado no upload (arquivos.json) ou calculado. Chamada bloqueante."""
+    from services.artifact_cache import sha256_arquivo
+
+    arquivos_path = case_dir / "arquivos.json"
+    if arquivos_path.exists():
+        registro = json.loads(arquivos_path.read_text(encoding='utf-8')).get(campo)
+        if registro and Path(registro["caminho"]).name == caminho.name:
+            return registro["sha256"]
+    return sha256_arquivo(caminho)
+
+async def _transcrever_com_cache(audio_file: Path, case_id: str, case_dir: Path) -> str:
+    """Transcreve a audiência, reaproveitando a transcrição de um áudio idêntico já processado"""
+    from services.async_executor import get_async_executor
+
+    executor = get_async_executor()
+    cache = _artifact_cache()
+    hash_audio = await executor.run("documentos", _hash_arquivo_enviado, case_dir, "audiencia", audio_file)
+
+    if cache.materializar("transcricao", hash_audio, case_dir):
+        return (case_dir / "audiencia_transcricao.txt").read_text(encoding='utf-8')
+
+    arquivo_para_transcricao = await _preparar_audio_para_transcricao(audio_file, case_dir)
+
+    # Transcrever (thread dedicada ao Whisper)
+    try:
+        transcricao = await executor.run(
+            "whisper", _transcrever_e_salvar, arquivo_para_transcricao, case_id, case_dir
+        )
+    finally:
+        # Limpar temporário
+        if arquivo_para_transcricao != audio_file and arquivo_para_transcricao.exists():
+            arquivo_para_transcricao.unlink()
+            logger.info("🗑️ Arquivo temporário removido")
+
+    cache.armazenar("transcricao", hash_audio, [
+        case_dir / "audiencia_transcricao.txt",
+        case_dir / "audiencia_transcricao.json"
+    ])
+    return transcricao.texto_completo
+
+async def _extrair_texto_com_cache(processo_path: Path, case_dir: Path) -> str:
+    """Extrai o texto do processo para processo_extraido.txt, reaproveitando extrações do mesmo arquivo
+    (e do mesmo modo de OCR; um texto com páginas cujo OCR falhou não vai para o cache)"""
+    from services.async_executor import get_async_executor
+    from services.document_extractor import hash_entrada_extracao, resolver_ocr
+    from services.pdf_extractor import EstatisticasExtracao
+
+    executor = get_async_executor()
+    cache = _artifact_cache()
+    texto_extraido_path = case_dir / "processo_extraido.txt"
+    hash_processo = await executor.run("documentos", _hash_arquivo_enviado, case_dir, "processo", processo_path)
+    ocr = resolver_ocr()
+    hash_entrada = hash_entrada_extracao(hash_processo, processo_path, ocr)
+
+    if cache.materializar("processo_extraido", hash_entrada, case_dir):
+        return texto_extraido_path.read_text(encoding='utf-8')
+
+    estatisticas = EstatisticasExtracao()
+    texto_processo = await executor.run("documentos", _extrair_texto_documento, processo_path, texto_extraido_path,
+                                        ocr=ocr, estatisticas=estatisticas)
+    if estatisticas.ocr_falhas:
+        logger.warning(f"⚠️ processo_extraido não armazenado no cache: OCR falhou nas páginas "
+                       f"{estatisticas.ocr_falhas}")
+        return texto_processo
+    cache.armazenar("processo_extraido", hash_entrada,
+                    [caminho for caminho in (texto_extraido_path, case_dir / "processo_indice.json") if caminho.exists()])
+    return texto_processo
+
+async def _estruturar_processo_com_cache(texto_processo: str, case_dir: Path):
+    """Extrai o ProcessoEstruturado com Gemini, reaproveitando resultados do mesmo texto"""
+    from dataclasses import asdict
+    from services.artifact_cache import sha256_texto
+    from services.async_executor import get_async_executor
+    from services.event_bus import publicar_evento
+    from services.gemini_processor import processo_estruturado_de_dict
+    from services.service_registry import obter_servico
+
+    cache = _artifact_cache()
+    hash_texto = sha256_texto(texto_processo)
+
+    if cache.materializar("processo_estruturado", hash_texto, case_dir):
+        return processo_estruturado_de_dict(cache.ler_json("processo_estruturado", hash_texto))
+
+    def campo_concluido(campo: str, valor):
+        # Campos do JSON chegam em streaming: partes/pedidos/fatos ficam disponíveis antes do fim da resposta
+        publicar_evento(case_dir.name, "estruturacao_campo_concluido", campo=campo,
+                        itens=len(valor) if isinstance(valor, list) else None)
+
+    gemini_processor = obter_servico("gemini")
+    processo_estruturado = await get_async_executor().run(
+        "gemini", gemini_processor.extrair_informacoes_processo, texto_processo, ao_concluir_campo=campo_concluido
+    )
+    cache.armazenar_json(
+        "processo_estruturado", hash_texto, case_dir / "processo_estruturado.json", asdict(processo_estruturado)
+    )
+    return processo_estruturado
+
+async def _analisar_audiencia_com_cache(case_id: str, case_dir: Path) -> Optional[Dict]:
+    """Analisa a transcrição com Gemini, reaproveitando a análise da mesma transcrição"""
+    from services.artifact_cache import sha256_arquivo
+    from services.async_executor import get_async_executor
+    from services.atomic_write import escrever_json_atomico
+
+    transcricao_path = case_dir / "audiencia_transcricao.txt"
+    if not transcricao_path.exists():
+        return None
+
+    cache = _artifact_cache()
+    hash_transcricao = sha256_arquivo(transcricao_path)
+
+    if cache.materializar("analise_audiencia", hash_transcricao, case_dir):
+        return cache.ler_json("analise_audiencia", hash_transcricao)
+
+    analise_audiencia = await get_async_executor().run("gemini", _analisar_audiencia, case_id, case_dir)
+    analise_path = case_dir / "audiencia_analise.json"
+    if analise_audiencia and "erro" not in analise_audiencia:
+        cache.armazenar_json("analise_audiencia", hash_transcricao, analise_path, analise_audiencia)
+    elif analise_audiencia:
+        # Análises com erro (fallback do WhisperService) são salvas no caso, mas não reaproveitadas
+        escrever_json_atomico(analise_path, analise_audiencia)
+    return analise_audiencia
+
 async def executar_transcricao_automatica(case_id: str):
     """Executa transcrição automaticamente"""
-    from services.whisper_service import WhisperService
-    
     case_dir = STORAGE_DIR / case_id
     
     # Encontrar arquivo de áudio
-    audio_file = None
-    for ext in ALLOWED_AUDIENCIA:
-        audio_path = case_dir / f"audiencia.{ext}"
-        if audio_path.exists():
-            audio_file = audio_path
-            break
-    
+    audio_file = _encontrar_arquivo(case_dir, "audiencia", ALLOWED_AUDIENCIA)
     if not audio_file:
         logger.warning("⚠️ Nenhum arquivo de áudio encontrado para transcrição")
         return
     
-    # Verificar tamanho e processar
-    tamanho_mb = audio_file.stat().st_size / (1024 * 1024)
-    logger.info(f"📏 Tamanho do arquivo: {tamanho_mb:.1f}MB")
-    
-    arquivo_para_transcricao = audio_file
-    
-    if tamanho_mb > 25:
-        logger.info(f"🔄 Arquivo muito grande ({tamanho_mb:.1f}MB). Extraindo áudio comprimido...")
-        import subprocess
-        
-        audio_comprimido = case_dir / "audio_temp.mp3"
-        comando = [
-            'ffmpeg', '-i', str(audio_file),
-            '-vn', '-acodec', 'mp3', '-ab', '64k', '-ar', '16000', '-y',
-            str(audio_comprimido)
-        ]
-        
-        resultado = subprocess.run(comando, capture_output=True, text=True)
-        if resultado.returncode == 0:
-            arquivo_para_transcricao = audio_comprimido
-            logger.info(f"✅ Áudio comprimido: {arquivo_para_transcricao.stat().st_size / (1024 * 1024):.1f}MB")
-    
-    # Transcrever
-    whisper_service = WhisperService()
-    transcricao = whisper_service.transcrever_audiencia(arquivo_para_transcricao, case_id)
-    whisper_service.salvar_transcricao(transcricao, case_dir)
-    
-    # Limpar temporário
-    if arquivo_para_transcricao != audio_file and arquivo_para_transcricao.exists():
-        arquivo_para_transcricao.unlink()
+    texto_transcricao = await _transcrever_com_cache(audio_file, case_id, case_dir)
     
-    logger.info(f"✅ Transcrição automática concluída: {len(transcricao.texto_completo)} caracteres")
+    logger.info(f"✅ Transcrição automática concluída: {len(texto_transcricao)} caracteres")
+
+async def executar_extracao_processo(case_id: str):
+    """Extrai o texto do processo para processo_extraido.txt"""
+    from services.atomic_write import escrever_atomico
 
-async def executar_processamento_automatico(case_id: str):
-    """Executa processamento Gemini automaticamente"""
-    from services.gemini_processor import GeminiProcessor
-    from services.rag_service import RAGService
-    from services.whisper_service import TranscricaoAudiencia, WhisperService
-    
     case_dir = STORAGE_DIR / case_id
     
-    # Processar documento
-    gemini_processor = GeminiProcessor()
-    
     # Encontrar processo
-    processo_path = None
-    for ext in ALLOWED_PROCESSO:
-        proc_path = case_dir / f"processo.{ext}"
-        if proc_path.exists():
-            processo_path = proc_path
-            break
-    
+    processo_path = _encontrar_arquivo(case_dir, "processo", ALLOWED_PROCESSO)
     if not processo_path:
         raise Exception("Documento do processo não encontrado")
     
-    # Extrair texto
-    if processo_path.suffix.lower() == '.pdf':
-        doc = fitz.open(str(processo_path))
-        texto_processo = ""
-        for page in doc:
-            texto_processo += page.get_text("text") + "\n"
-        doc.close()
-    else:  # DOCX
-        doc = Document(str(processo_path))
-        texto_processo = '\n'.join([par.text for par in doc.paragraphs if par.text.strip()])
-    
+    # Extrair texto (salvo em processo_extraido.txt para uso posterior no diálogo inteligente)
+    texto_processo = await _extrair_texto_com_cache(processo_path, case_dir)
     logger.info(f"✅ Texto extraído: {len(texto_processo)} caracteres")
     
     # Limitar se muito grande
     if len(texto_processo) > 1500000:
         texto_processo = texto_processo[:1500000] + "... [TEXTO TRUNCADO - MUITO GRANDE]"
         logger.info("✂️ Texto truncado para 1.5M caracteres")
+        texto_extraido_path = case_dir / "processo_extraido.txt"
+        escrever_atomico(texto_extraido_path, texto_processo)
+        logger.info(f"💾 Texto do processo salvo: {texto_extraido_path}")
+
+async def executar_estruturacao_processo(case_id: str):
+    """Estrutura o processo com Gemini (processo_estruturado.json)"""
+    from services.case_text_store import get_case_text_store
+
+    case_dir = STORAGE_DIR / case_id
+    texto_processo = get_case_text_store().abrir(case_dir / "processo_extraido.txt").texto()
     
-    # Salvar texto extraído para uso posterior no diálogo inteligente
-    texto_extraido_path = case_dir / "processo_extraido.txt"
-    texto_extraido_path.write_text(texto_processo, encoding='utf-8')
-    logger.info(f"💾 Texto do processo salvo: {texto_extraido_path}")
-    
-    # Processar com Gemini
-    processo_estruturado = gemini_processor.extrair_informacoes_processo(texto_processo)
+    processo_estruturado = await _estruturar_processo_com_cache(texto_processo, case_dir)
     logger.info(f"✅ Processamento Gemini concluído: {processo_estruturado.numero_processo}")
+
+async def executar_analise_audiencia(case_id: str):
+    """Analisa a transcrição da audiência com Gemini (audiencia_analise.json)"""
+    analise_audiencia = await _analisar_audiencia_com_cache(case_id, STORAGE_DIR / case_id)
+    if analise_audiencia:
+        logger.info(f"✅ Análise da audiência concluída: {len(analise_audiencia.get('depoentes', []))} depoentes")
+
+async def executar_salvamento_rag(case_id: str):
+    """Persiste processo estruturado e análise da audiência no RAG"""
+    from services.async_executor import get_async_executor
+    from services.gemini_processor import processo_estruturado_de_dict
     
-    # Processar transcrição se existir
-    transcricao_path = case_dir / "audiencia_transcricao.txt"
-    analise_audiencia = None
-    if transcricao_path.exists():
-        transcricao_texto = transcricao_path.read_text(encoding='utf-8')
-        transcricao_mock = TranscricaoAudiencia(
-            texto_completo=transcricao_texto,
-            duracao_segundos=None,
-            idioma_detectado='pt',
-            confianca=None,
-            segmentos=None,
-            metadados={}
-        )
-        whisper_service = WhisperService()
-        analise_audiencia = whisper_service.processar_audiencia_com_gemini(transcricao_mock, case_id)
+    case_dir = STORAGE_DIR / case_id
+    processo_estruturado = processo_estruturado_de_dict(
+        json.loads((case_dir / "processo_estruturado.json").read_text(encoding='utf-8'))
+    )
+    analise_path = case_dir / "audiencia_analise.json"
+    analise_audiencia = json.loads(analise_path.read_text(encoding='utf-8')) if analise_path.exists() else None
     
-    # Salvar no RAG
-    rag_service = RAGService()
-    rag_service.salvar_conhecimento_caso(processo_estruturado, analise_audiencia, case_id)
+    await get_async_executor().run("chroma", _salvar_no_rag, processo_estruturado, analise_audiencia, case_id)
     logger.info("✅ Processamento automático concluído e salvo no RAG")
 
+async def executar_processamento_automatico(case_id: str):
+    """Executa processamento Gemini automaticamente (etapas do DAG em sequência)"""
+    await executar_extracao_processo(case_id)
+    await executar_estruturacao_processo(case_id)
+    await executar_analise_audiencia(case_id)
+    await executar_salvamento_rag(case_id)
+
 async def executar_geracao_automatica(case_id: str):
     """Executa geração de sentença usando DIÁLOGO INTELIGENTE com prompt base estruturado"""
-    from services.intelligent_dialogue_service import IntelligentDialogueService
+    from services.async_executor import get_async_executor
+    from services.atomic_write import escrever_atomico, escrever_json_atomico
+    from services.case_text_store import get_case_text_store
     import json
     
     case_dir = STORAGE_DIR / case_id
@@ -291,12 +950,12 @@ async def executar_geracao_automatica(case_id: str):
             logger.warning(f"⚠️ [{case_id}] Texto do processo não encontrado")
             return
         
-        texto_processo = processo_path.read_text(encoding='utf-8')
+        texto_processo = get_case_text_store().abrir(processo_path).texto()
         logger.info(f"📄 Texto do processo carregado: {len(texto_processo)} caracteres")
         
         # Recuperar transcrição da audiência (opcional)
         transcricao_audiencia = None
-        transcricao_path = case_dir / "transcricao.json"
+        transcricao_path = case_dir / "audiencia_transcricao.json"
         
         if transcricao_path.exists():
             transcricao_data = json.loads(transcricao_path.read_text(encoding='utf-8'))
@@ -305,26 +964,22 @@ async def executar_geracao_automatica(case_id: str):
         
         # Executar diálogo inteligente com prompt base estruturado
         # NOVA ABORDAGEM SECTORIAL para sentenças detalhadas
-        dialogue_service = IntelligentDialogueService(case_id)
-        resultado_completo = dialogue_service.executar_dialogo_completo(
-            texto_processo=texto_processo,
-            transcricao_audiencia=transcricao_audiencia
+        # (executado em thread dedicada: o retry com time.sleep não bloqueia o event loop)
+        resultado_completo = await get_async_executor().run(
+            "geracao", _executar_dialogo, case_id, texto_processo, transcricao_audiencia
         )
         
         logger.info(f"✅ DIÁLOGO INTELIGENTE CONCLUÍDO - {len(resultado_completo['etapas_executadas'])} etapas")
         
         # Salvar resultado completo estruturado
         resultado_path = case_dir / "dialogo_resultado_completo.json"
-        resultado_path.write_text(
-            json.dumps(resultado_completo, indent=2, ensure_ascii=False),
-            encoding='utf-8'
-        )
+        escrever_json_atomico(resultado_path, resultado_completo)
         
         # Salvar sentença final
         sentenca_final = resultado_completo.get("sentenca_final", "")
         if sentenca_final:
             sentenca_path = case_dir / "sentenca_gerada.txt"
-            sentenca_path.write_text(sentenca_final, encoding='utf-8')
+            escrever_atomico(sentenca_path, sentenca_final)
             logger.info(f"📝 Sentença gerada com PROMPT BASE: {len(sentenca_final)} caracteres")
         
         logger.info(f"🎉 [{case_id}] GERAÇÃO AUTOMÁTICA COMPLETA COM PROMPT BASE ESTRUTURADO")
@@ -333,14 +988,156 @@ async def executar_geracao_automatica(case_id: str):
         logger.error(f"❌ Erro na geração com diálogo inteligente: {str(e)}")
         raise
 
+# 🕸️ PIPELINE EM DAG: transcrição e extração/estruturação do processo rodam em paralelo;
+# a geração depende apenas do texto extraído e da transcrição
+_pipeline_dag = None
+
+def _obter_pipeline_dag():
+    """DAG de etapas do caso, com limites de concorrência por recurso compartilhados entre casos"""
+    global _pipeline_dag
+    from services.async_executor import get_async_executor
+    from services.pipeline_dag import PipelineDAG, EtapaDAG
+    from services.event_bus import publicar_evento
+
+    if _pipeline_dag is None:
+        _pipeline_dag = PipelineDAG([
+            EtapaDAG("transcricao", _etapa_com_checkpoint("transcricao", executar_transcricao_automatica),
+                     entradas=["audiencia"], saidas=["transcricao"], recurso="whisper"),
+            EtapaDAG("extracao", _etapa_com_checkpoint("extracao", executar_extracao_processo),
+                     entradas=["processo"], saidas=["processo_extraido"], recurso="documentos"),
+            EtapaDAG("estruturacao", _etapa_com_checkpoint("estruturacao", executar_estruturacao_processo),
+                     entradas=["processo_extraido"], saidas=["processo_estruturado"], recurso="gemini"),
+            EtapaDAG("analise_audiencia", _etapa_com_checkpoint("analise_audiencia", executar_analise_audiencia),
+                     entradas=["transcricao"], saidas=["analise_audiencia"], recurso="gemini"),
+            EtapaDAG("rag", _etapa_com_checkpoint("rag", executar_salvamento_rag),
+                     entradas=["processo_estruturado"], entradas_opcionais=["analise_audiencia"],
+                     saidas=["rag"], recurso="chroma"),
+            # Geração retoma internamente por etapa do diálogo, seção e chunk de continuação
+            EtapaDAG("geracao", _etapa_com_checkpoint("geracao", executar_geracao_automatica),
+                     entradas=["processo_extraido"], entradas_opcionais=["transcricao"],
+                     saidas=["sentenca"], recurso="geracao"),
+        ], limites_recurso=get_async_executor().limites,
+           observador=lambda case_id, evento, dados: publicar_evento(case_id, evento, **dados))
+    return _pipeline_dag
+
+def _hash_entradas_caso(case_dir: Path) -> str:
+    """Hash dos arquivos enviados do caso (SHA-256 registrados no upload ou nome/tamanho/mtime)"""
+    from services.pipeline_manifest import hash_conteudo
+
+    arquivos_path = case_dir / "arquivos.json"
+    if arquivos_path.exists():
+        arquivos = json.loads(arquivos_path.read_text(encoding='utf-8'))
+        return hash_conteudo({campo: dados["sha256"] for campo, dados in arquivos.items()})
+
+    enviados = [
+        caminho for caminho in (
+            _encontrar_arquivo(case_dir, "processo", ALLOWED_PROCESSO),
+            _encontrar_arquivo(case_dir, "audiencia", ALLOWED_AUDIENCIA)
+        ) if caminho
+    ]
+    return hash_conteudo([(c.name, c.stat().st_size, c.stat().st_mtime_ns) for c in enviados])
+
+# Artefatos produzidos por cada etapa do DAG (registrados no catálogo com hash e tamanho)
+ARTEFATOS_POR_ETAPA = {
+    "transcricao": ("audiencia_transcricao.txt", "audiencia_transcricao.json"),
+    "extracao": ("processo_extraido.txt", "processo_indice.json"),
+    "estruturacao": ("processo_estruturado.json",),
+    "analise_audiencia": ("audiencia_analise.json",),
+    "geracao": ("dialogo_resultado_completo.json", "sentenca_gerada.txt"),
+}
+
+def _registrar_etapa_no_catalogo(case_id: str, case_dir: Path, etapa: str, duracao: float):
+    """Registra a etapa concluída e os artefatos que ela produziu. Chamada bloqueante (hash dos arquivos)."""
+    from services.artifact_cache import sha256_arquivo
+
+    artefatos = {
+        nome: {"caminho": str(case_dir / nome), "sha256": sha256_arquivo(case_dir / nome)}
+        for nome in ARTEFATOS_POR_ETAPA.get(etapa, ()) if (case_dir / nome).exists()
+    }
+    _case_catalog().registrar_etapa(case_id, case_dir, etapa, "concluida", duracao, artefatos)
+
+def _etapa_com_checkpoint(nome: str, executar):
+    """Envolve a etapa do DAG: pulada na retomada se já concluída para as mesmas entradas e com
+    todos os artefatos da etapa (ARTEFATOS_POR_ETAPA) presentes no caso"""
+    from services.pipeline_manifest import PipelineManifest
+    from services.event_bus import publicar_evento
+    from services.metrics import ETAPA_PIPELINE_DURACAO
+    from services.tracing import span
+    from services.async_executor import get_async_executor
+
+    async def _executar(case_id: str):
+        case_dir = STORAGE_DIR / case_id
+        manifest = PipelineManifest(case_dir)
+        chave, hash_entrada = f"pipeline:{nome}", _hash_entradas_caso(case_dir)
+
+        with span(f"etapa:{nome}", case_id=case_id, case_dir=case_dir) as span_etapa:
+            ausentes = [arquivo for arquivo in ARTEFATOS_POR_ETAPA.get(nome, ()) if not (case_dir / arquivo).exists()]
+            if manifest.concluido(chave, hash_entrada) and ausentes:
+                # Ex.: processo_extraido.txt apagado ou cópia restaurada sem os artefatos
+                logger.warning(f"⚠️ [{case_id}] Etapa '{nome}' concluída sem {', '.join(ausentes)}: reexecutando")
+            elif manifest.concluido(chave, hash_entrada):
+                logger.info(f"⏭️ [{case_id}] Etapa '{nome}' já concluída, retomando a partir da próxima")
+                publicar_evento(case_id, "etapa_reaproveitada", etapa=nome)
+                span_etapa.definir(reaproveitada=True)
+                _case_catalog().registrar_etapa(case_id, case_dir, nome, "reaproveitada")
+                return
+
+            inicio = time.perf_counter()
+            try:
+                await executar(case_id)
+            except Exception:
+                ETAPA_PIPELINE_DURACAO.observar(time.perf_counter() - inicio, etapa=nome, status="falhou")
+                _case_catalog().registrar_etapa(case_id, case_dir, nome, "falhou", time.perf_counter() - inicio)
+                raise
+            duracao = time.perf_counter() - inicio
+            ETAPA_PIPELINE_DURACAO.observar(duracao, etapa=nome, status="concluida")
+            manifest.registrar(chave, hash_entrada)
+            await get_async_executor().run("documentos", _registrar_etapa_no_catalogo, case_id, case_dir, nome, duracao)
+
+    return _executar
+
+async def executar_pipeline_automatico(case_id: str):
+    """Executa o DAG de etapas do caso e registra tempos e caminho crítico em pipeline_execucao.json"""
+    from services.atomic_write import escrever_json_atomico
+    from services.pipeline_dag import FalhaPipeline
+    from services.tracing import span
+    
+    case_dir = STORAGE_DIR / case_id
+    disponiveis = set()
+    if _encontrar_arquivo(case_dir, "processo", ALLOWED_PROCESSO):
+        disponiveis.add("processo")
+    if _encontrar_arquivo(case_dir, "audiencia", ALLOWED_AUDIENCIA):
+        disponiveis.add("audiencia")
+    
+    execucao_path = case_dir / "pipeline_execucao.json"
+    with span("pipeline", case_id=case_id, case_dir=case_dir, artefatos_iniciais=sorted(disponiveis)) as span_pipeline:
+        try:
+            relatorio = await _obter_pipeline_dag().executar(case_id, disponiveis)
+        except FalhaPipeline as e:
+            escrever_json_atomico(execucao_path, e.relatorio)
+            raise
+        span_pipeline.definir(caminho_critico=relatorio["caminho_critico"])
+    escrever_json_atomico(execucao_path, relatorio)
+
+# Etapas executadas pelo JobRunner ("transcricao", "processamento" e "geracao" mantidas
+# para retomar jobs enfileirados antes do pipeline em DAG)
+ETAPAS_PIPELINE = {
+    nome: _exclusivo_por_caso(timeout=None, em_lote=True)(etapa)
+    for nome, etapa in {
+        "pipeline": executar_pipeline_automatico,
+        "transcricao": executar_transcricao_automatica,
+        "processamento": executar_processamento_automatico,
+        "geracao": executar_geracao_automatica,
+    }.items()
+}
+
 # ETAPA 1: Transcrever áudio com Whisper
 @app.post("/step1-transcribe/{case_id}", response_model=ProcessingResponse)
+@_exclusivo_por_caso()
 async def step1_transcribe_audio(case_id: str):
     """ETAPA 1: Transcreve áudio da audiência usando Whisper"""
     logger.info(f"🎤 INICIANDO ETAPA 1 - TRANSCRIÇÃO WHISPER - Case ID: {case_id}")
     
-    from services.whisper_service import WhisperService
-    
     case_dir = STORAGE_DIR / case_id
     if not case_dir.exists():
         logger.error(f"❌ Case ID não encontrado: {case_id}")
@@ -351,75 +1148,28 @@ async def step1_transcribe_audio(case_id: str):
     try:
         # Encontrar arquivo de áudio
         logger.info("🔍 Procurando arquivo de áudio...")
-        audio_file = None
-        for ext in ALLOWED_AUDIENCIA:
-            audio_path = case_dir / f"audiencia.{ext}"
-            logger.info(f"   Verificando: {audio_path}")
-            if audio_path.exists():
-                audio_file = audio_path
-                logger.info(f"✅ Arquivo de áudio encontrado: {audio_file}")
-                break
+        audio_file = _encontrar_arquivo(case_dir, "audiencia", ALLOWED_AUDIENCIA)
         
         if not audio_file:
             logger.error("❌ Nenhum arquivo de áudio encontrado")
             raise HTTPException(status_code=404, detail="Arquivo de áudio não encontrado")
         
-        # Verificar tamanho do arquivo
-        tamanho_mb = audio_file.stat().st_size / (1024 * 1024)
-        logger.info(f"📏 Tamanho do arquivo: {tamanho_mb:.1f}MB")
-        
-        arquivo_para_transcricao = audio_file
+        logger.info(f"✅ Arquivo de áudio encontrado: {audio_file}")
         
-        # Se arquivo muito grande, extrair áudio comprimido
-        if tamanho_mb > 25:
-            logger.info(f"🔄 Arquivo muito grande ({tamanho_mb:.1f}MB). Extraindo áudio comprimido...")
-            import subprocess
-            
-            # Criar arquivo de áudio comprimido
-            audio_comprimido = case_dir / "audio_temp.mp3"
-            
-            comando = [
-                'ffmpeg', '-i', str(audio_file),
-                '-vn',  # Sem vídeo
-                '-acodec', 'mp3',
-                '-ab', '64k',  # Bitrate baixo
-                '-ar', '16000',  # Sample rate reduzido
-                '-y',  # Sobrescrever
-                str(audio_comprimido)
-            ]
-            
-            logger.info(f"🎬 Executando: {' '.join(comando[:6])}...")
-            resultado = subprocess.run(comando, capture_output=True, text=True)
-            
-            if resultado.returncode != 0:
-                logger.error(f"❌ Erro no ffmpeg: {resultado.stderr}")
-                raise HTTPException(status_code=500, detail=f"Falha na conversão de áudio: {resultado.stderr}")
-            
-            arquivo_para_transcricao = audio_comprimido
-            tamanho_novo = arquivo_para_transcricao.stat().st_size / (1024 * 1024)
-            logger.info(f"✅ Áudio comprimido: {tamanho_novo:.1f}MB")
-        
-        # Transcrever com Whisper
+        # Transcrever com Whisper e salvar (comprimindo o áudio se muito grande)
         logger.info("🤖 Iniciando transcrição com OpenAI Whisper...")
-        whisper_service = WhisperService()
-        transcricao = whisper_service.transcrever_audiencia(arquivo_para_transcricao, case_id)
-        logger.info(f"✅ Transcrição concluída! ({len(transcricao.texto_completo)} caracteres)")
-        
-        # Limpar arquivo temporário se criado
-        if arquivo_para_transcricao != audio_file and arquivo_para_transcricao.exists():
-            arquivo_para_transcricao.unlink()
-            logger.info("🗑️ Arquivo temporário removido")
+        try:
+            texto_transcricao = await _transcrever_com_cache(audio_file, case_id, case_dir)
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=str(e))
         
-        # Salvar transcrição
-        logger.info("💾 Salvando transcrição...")
-        whisper_service.salvar_transcricao(transcricao, case_dir)
-        logger.info("✅ Transcrição salva com sucesso!")
+        logger.info(f"✅ Transcrição concluída e salva! ({len(texto_transcricao)} caracteres)")
         
         return ProcessingResponse(
             case_id=case_id,
             step="transcribe_audio",
             status="completed",
-            message=f"Áudio transcrito com sucesso. {len(transcricao.texto_completo)} caracteres."
+            message=f"Áudio transcrito com sucesso. {len(texto_transcricao)} caracteres."
         )
         
     except Exception as e:
@@ -427,13 +1177,14 @@ async def step1_transcribe_audio(case_id: str):
 
 # ETAPA 2: Processar com Gemini
 @app.post("/step2-process/{case_id}", response_model=ProcessingResponse)
+@_exclusivo_por_caso()
 async def step2_process_with_gemini(case_id: str):
     """ETAPA 2: Processa documentos e transcrição com Gemini"""
     logger.info(f"🧠 INICIANDO ETAPA 2 - PROCESSAMENTO GEMINI - Case ID: {case_id}")
     
-    from services.gemini_processor import GeminiProcessor
-    from services.rag_service import RAGService
+    from services.async_executor import get_async_executor
     
+    executor = get_async_executor()
     case_dir = STORAGE_DIR / case_id
     if not case_dir.exists():
         logger.error(f"❌ Case ID não encontrado: {case_id}")
@@ -442,45 +1193,25 @@ async def step2_process_with_gemini(case_id: str):
     logger.info(f"📂 Diretório encontrado: {case_dir}")
     
     try:
-        # Processar documento do processo
-        logger.info("🤖 Inicializando Gemini Processor...")
-        gemini_processor = GeminiProcessor()
-        
         # Encontrar e processar documento
         logger.info("🔍 Procurando documento do processo...")
-        processo_path = None
-        for ext in ALLOWED_PROCESSO:
-            proc_path = case_dir / f"processo.{ext}"
-            logger.info(f"   Verificando: {proc_path}")
-            if proc_path.exists():
-                processo_path = proc_path
-                logger.info(f"✅ Documento encontrado: {processo_path}")
-                break
+        processo_path = _encontrar_arquivo(case_dir, "processo", ALLOWED_PROCESSO)
 
         if not processo_path:
             logger.error("❌ Documento do processo não encontrado")
             raise HTTPException(status_code=404, detail="Documento do processo não encontrado")
         
+        logger.info(f"✅ Documento encontrado: {processo_path}")
+        
         # Extrair texto e processar
         logger.info(f"📄 Extraindo texto de: {processo_path.suffix}")
         
         try:
-            if processo_path.suffix.lower() == '.pdf':
-                doc = fitz.open(str(processo_path))
-                texto_processo = ""
-                for page in doc:
-                    texto_processo += page.get_text("text") + "\n"
-                doc.close()
-            else:  # DOCX
-                doc = Document(str(processo_path))
-                texto_processo = '\n'.join([par.text for par in doc.paragraphs if par.text.strip()])
+            # Texto salvo em processo_extraido.txt para uso posterior no diálogo inteligente
+            texto_processo = await _extrair_texto_com_cache(processo_path, case_dir)
             
             logger.info(f"✅ Texto extraído: {len(texto_processo)} caracteres")
-            
-            # Salvar texto extraído para uso posterior no diálogo inteligente
-            texto_extraido_path = case_dir / "processo_extraido.txt"
-            texto_extraido_path.write_text(texto_processo, encoding='utf-8')
-            logger.info(f"💾 Texto do processo salvo: {texto_extraido_path}")
+            logger.info(f"💾 Texto do processo salvo: {case_dir / 'processo_extraido.txt'}")
             
             # Gemini 1.5 Pro suporta até 2M tokens (~1.6M caracteres)
             # Só truncar se for extremamente grande (acima de 1.5M chars)
@@ -491,7 +1222,7 @@ async def step2_process_with_gemini(case_id: str):
             logger.info("🧠 Processando com Gemini...")
             
             try:
-                processo_estruturado = gemini_processor.extrair_informacoes_processo(texto_processo)
+                processo_estruturado = await _estruturar_processo_com_cache(texto_processo, case_dir)
                 logger.info(f"✅ Processamento Gemini concluído: {processo_estruturado.numero_processo}")
             except Exception as gemini_error:
                 if "quota" in str(gemini_error).lower() or "429" in str(gemini_error):
@@ -527,26 +1258,10 @@ async def step2_process_with_gemini(case_id: str):
             raise HTTPException(status_code=500, detail=f"Erro no processamento Gemini: {str(e)}")
         
         # Processar transcrição da audiência se existir
-        transcricao_path = case_dir / "audiencia_transcricao.txt"
-        analise_audiencia = None
-        if transcricao_path.exists():
-            transcricao_texto = transcricao_path.read_text(encoding='utf-8')
-            # Criar objeto TranscricaoAudiencia mock para análise
-            from services.whisper_service import TranscricaoAudiencia, WhisperService
-            transcricao_mock = TranscricaoAudiencia(
-                texto_completo=transcricao_texto,
-                duracao_segundos=None,
-                idioma_detectado='pt',
-                confianca=None,
-                segmentos=None,
-                metadados={}
-            )
-            whisper_service = WhisperService()
-            analise_audiencia = whisper_service.processar_audiencia_com_gemini(transcricao_mock, case_id)
+        analise_audiencia = await _analisar_audiencia_com_cache(case_id, case_dir)
         
         # Salvar no RAG
-        rag_service = RAGService()
-        rag_service.salvar_conhecimento_caso(processo_estruturado, analise_audiencia, case_id)
+        await executor.run("chroma", _salvar_no_rag, processo_estruturado, analise_audiencia, case_id)
         
         return ProcessingResponse(
             case_id=case_id,
@@ -560,13 +1275,16 @@ async def step2_process_with_gemini(case_id: str):
 
 # ETAPA 3: Gerar sentença com Claude
 @app.post("/step3-generate/{case_id}", response_model=ProcessingResponse)
+@_exclusivo_por_caso()
 async def step3_generate_sentence(case_id: str):
     """ETAPA 3: Gera sentença consultando RAG com Claude"""
     logger.info(f"✍️ INICIANDO ETAPA 3 - GERAÇÃO CLAUDE - Case ID: {case_id}")
     
-    from services.claude_service import ClaudeService
-    from services.rag_service import RAGService
+    from services.service_registry import obter_servico
+    from services.async_executor import get_async_executor
+    from services.atomic_write import escrever_atomico
     
+    executor = get_async_executor()
     case_dir = STORAGE_DIR / case_id
     if not case_dir.exists():
         logger.error(f"❌ Case ID não encontrado: {case_id}")
@@ -577,20 +1295,20 @@ async def step3_generate_sentence(case_id: str):
     try:
         # Consultar conhecimento no RAG
         logger.info("📚 Consultando conhecimento no RAG...")
-        rag_service = RAGService()
-        conhecimento_caso = rag_service.recuperar_conhecimento_caso(case_id)
+        rag_service = await executor.run("chroma", obter_servico, "rag")
+        conhecimento_caso = await executor.run("chroma", rag_service.recuperar_conhecimento_caso, case_id)
         logger.info(f"✅ Conhecimento recuperado: {len(str(conhecimento_caso))} caracteres")
         
         # Gerar sentença com Claude
         logger.info("🤖 Iniciando geração de sentença com Claude...")
-        claude_service = ClaudeService()
-        sentenca = claude_service.gerar_sentenca_com_rag(conhecimento_caso, case_id)
+        claude_service = obter_servico("claude")
+        sentenca = await executor.run("claude", claude_service.gerar_sentenca_com_rag, conhecimento_caso, case_id)
         logger.info(f"✅ Sentença gerada! ({len(sentenca)} caracteres)")
         
         # Salvar sentença
         logger.info("💾 Salvando sentença...")
         sentenca_path = case_dir / "sentenca.txt"
-        sentenca_path.write_text(sentenca, encoding='utf-8')
+        escrever_atomico(sentenca_path, sentenca)
         logger.info(f"✅ Sentença salva: {sentenca_path}")
         logger.info("🎉 ETAPA 3 CONCLUÍDA! Sentença gerada com sucesso!")
         
@@ -605,14 +1323,37 @@ async def step3_generate_sentence(case_id: str):
         raise HTTPException(status_code=500, detail=f"Erro na geração da sentença: {str(e)}")
 
 @app.get("/download/{case_id}/sentenca")
-async def download_sentence(case_id: str):
+async def download_sentence(case_id: str, stream: bool = False):
     """Download da sentença gerada.
     Aceita tanto 'sentenca.txt' (etapa 3) quanto 'sentenca_gerada.txt' (pipeline automático).
+    Com stream=true, durante a geração envia as seções já concluídas de 'sentenca_parcial.txt'
+    (resposta chunked) e acompanha o arquivo até a geração terminar.
     """
+    from services.partial_artifact import ArtefatoParcial, STATUS_EM_ANDAMENTO
+    from services.job_runner import ESTADOS_FINAIS
+
     case_dir = STORAGE_DIR / case_id
     path_options = [case_dir / "sentenca.txt", case_dir / "sentenca_gerada.txt"]
     sentenca_path = next((p for p in path_options if p.exists()), None)
 
+    if stream:
+        parcial = ArtefatoParcial(case_dir / "sentenca_parcial.txt")
+        estado = parcial.estado()
+        def _job_ativo() -> bool:
+            pipeline = job_runner.get_case_status(case_id) if job_runner else None
+            return bool(pipeline) and pipeline["status"] not in ESTADOS_FINAIS
+
+        # Geração em andamento, ou pipeline ainda antes da geração (aguarda a primeira seção)
+        if (estado and estado["status"] == STATUS_EM_ANDAMENTO) or (not sentenca_path and _job_ativo()):
+            return StreamingResponse(
+                parcial.acompanhar(
+                    intervalo=float(os.getenv("SENTENCA_STREAM_INTERVALO_S", "0.5")),
+                    em_execucao=_job_ativo
+                ),
+                media_type="text/plain; charset=utf-8",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
     if not sentenca_path:
         raise HTTPException(status_code=404, detail="Sentença não encontrada")
 
@@ -623,23 +1364,38 @@ async def download_sentence(case_id: str):
     )
 
 @app.post("/generate-from-existing/{case_id}", response_model=ProcessingResponse)
-async def generate_from_existing(case_id: str):
+@_exclusivo_por_caso()
+async def generate_from_existing(case_id: str, reiniciar: bool = False):
     """Gera sentença usando arquivos já existentes (sem reprocessar APIs).
 
     Usa 'processo_extraido.txt' e, se existir, 'transcricao.json' ou 'audiencia_transcricao.txt'.
+    Retoma do primeiro checkpoint ausente do diálogo (etapas, seções e chunks já concluídos
+    são reaproveitados); use reiniciar=true para descartá-los e gerar do zero (as respostas
+    em cache dos LLMs também são renovadas).
     """
     import json
-    from services.intelligent_dialogue_service import IntelligentDialogueService
+    from services.async_executor import get_async_executor
+    from services.atomic_write import escrever_atomico, escrever_json_atomico
+    from services.case_text_store import get_case_text_store
+    from services.pipeline_manifest import PipelineManifest
+    from services.event_bus import publicar_evento
+    from services.tracing import span
 
     case_dir = STORAGE_DIR / case_id
     if not case_dir.exists():
         raise HTTPException(status_code=404, detail="case_id não encontrado")
 
+    manifest = PipelineManifest(case_dir)
+    if reiniciar:
+        removidos = manifest.remover("dialogo:")
+        logger.info(f"🗑️ [{case_id}] {removidos} checkpoints do diálogo descartados")
+    checkpoints_anteriores = len(manifest.chaves("dialogo:"))
+
     # Carregar processo extraído
     processo_path = case_dir / "processo_extraido.txt"
     if not processo_path.exists():
         raise HTTPException(status_code=404, detail="processo_extraido.txt não encontrado")
-    texto_processo = processo_path.read_text(encoding='utf-8')
+    texto_processo = get_case_text_store().abrir(processo_path).texto()
 
     # Carregar transcrição (opcional)
     transcricao_audiencia = None
@@ -652,31 +1408,34 @@ async def generate_from_existing(case_id: str):
         transcricao_audiencia = transcricao_txt.read_text(encoding='utf-8')
 
     # Executar diálogo inteligente (usa RAG avançado setorial internamente)
-    dialogue_service = IntelligentDialogueService(case_id)
-    resultado_completo = dialogue_service.executar_dialogo_completo(
-        texto_processo=texto_processo,
-        transcricao_audiencia=transcricao_audiencia
-    )
+    publicar_evento(case_id, "geracao_iniciada", checkpoints_reaproveitaveis=checkpoints_anteriores)
+    with span("generate_from_existing", case_id=case_id, case_dir=case_dir, reiniciar=reiniciar):
+        resultado_completo = await get_async_executor().run(
+            "geracao", _executar_dialogo, case_id, texto_processo, transcricao_audiencia,
+            cache_policy="renovar" if reiniciar else None
+        )
+    publicar_evento(case_id, "geracao_concluida", caracteres=len(resultado_completo.get("sentenca_final", "")))
 
     # Salvar
     resultado_path = case_dir / "dialogo_resultado_completo.json"
-    resultado_path.write_text(
-        json.dumps(resultado_completo, indent=2, ensure_ascii=False),
-        encoding='utf-8'
-    )
+    escrever_json_atomico(resultado_path, resultado_completo)
 
     sentenca_final = resultado_completo.get("sentenca_final", "")
     if sentenca_final:
-        (case_dir / "sentenca_gerada.txt").write_text(sentenca_final, encoding='utf-8')
+        escrever_atomico(case_dir / "sentenca_gerada.txt", sentenca_final)
 
     return ProcessingResponse(
         case_id=case_id,
         step="generate_from_existing",
         status="completed",
-        message="Geração concluída a partir de arquivos existentes"
+        message=(
+            "Geração concluída a partir de arquivos existentes"
+            + (f" ({checkpoints_anteriores} checkpoints reaproveitados)" if checkpoints_anteriores else "")
+        )
     )
 
 @app.post("/init-style/{case_id}", response_model=ProcessingResponse)
+@_exclusivo_por_caso()
 async def init_style_from_examples(case_id: str, max_docs: int = 30):
     """Inicializa o estilo da juíza para o caso usando sentenças modelos locais.
 
@@ -684,6 +1443,10 @@ async def init_style_from_examples(case_id: str, max_docs: int = 30):
     de arquivos .docx e .pdf como exemplos de estilo no RAG isolado do caso.
     """
     from services.enhanced_rag_service import EnhancedRAGService
+    from services.async_executor import get_async_executor
+    from services.document_extractor import get_document_extractor
+
+    executor = get_async_executor()
     sentences_root = Path(__file__).resolve().parent.parent
     folders = [
         sentences_root / "Sentenças_2023",
@@ -692,59 +1455,48 @@ async def init_style_from_examples(case_id: str, max_docs: int = 30):
     ]
 
     samples: list[str] = []
+    extrator = get_document_extractor()
 
-    def read_docx(path: Path) -> str:
+    def read_document(path: Path) -> str:
         try:
-            if Document is None:
-                return ""
-            doc = Document(str(path))
-            text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-            return text
+            return extrator.extrair(path)
         except Exception:
             return ""
 
-    def read_pdf(path: Path) -> str:
-        try:
-            if fitz is None:
-                return ""
-            doc = fitz.open(str(path))
-            text = "\n".join(page.get_text("text") for page in doc)
-            doc.close()
-            return text
-        except Exception:
-            return ""
-
-    for folder in folders:
-        if not folder.exists():
-            continue
-        for file in folder.iterdir():
-            if not file.is_file():
+    def collect_samples():
+        for folder in folders:
+            if not folder.exists():
                 continue
-            ext = file.suffix.lower()
-            content = ""
-            if ext == ".docx":
-                content = read_docx(file)
-            elif ext == ".pdf":
-                content = read_pdf(file)
-            # .doc não suportado diretamente por python-docx; ignorar por ora
-
-            if content:
-                # Normalizar e limitar tamanho por documento para não estourar memória
-                content = content.strip()
-                if len(content) > 20000:
-                    content = content[:20000]
-                samples.append(content)
-
-            if len(samples) >= max_docs:
-                break
-        if len(samples) >= max_docs:
-            break
+            for file in folder.iterdir():
+                if not file.is_file():
+                    continue
+                ext = file.suffix.lower()
+                content = ""
+                if ext in (".docx", ".pdf"):
+                    # Texto do cache de extração enquanto o arquivo não mudar
+                    content = read_document(file)
+                # .doc não suportado diretamente por python-docx; ignorar por ora
+
+                if content:
+                    # Normalizar e limitar tamanho por documento para não estourar memória
+                    content = content.strip()
+                    if len(content) > 20000:
+                        content = content[:20000]
+                    samples.append(content)
+
+                if len(samples) >= max_docs:
+                    return
+
+    await executor.run("documentos", collect_samples)
 
     if not samples:
         raise HTTPException(status_code=404, detail="Nenhuma sentença modelo encontrada (.docx/.pdf)")
 
-    rag = EnhancedRAGService(case_id)
-    rag.initialize_judge_style(samples, force_reload=True)
+    def init_style():
+        rag = EnhancedRAGService(case_id)
+        rag.initialize_judge_style(samples, force_reload=True)
+
+    await executor.run("chroma", init_style)
 
     return ProcessingResponse(
         case_id=case_id,
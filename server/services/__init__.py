@@ -2,49 +2,68 @@
 Serviços de processamento de IA para geração de sentenças judiciais
 Inclui novos serviços de instâncias isoladas para evitar contaminação entre casos
 PARTE B: RAG Otimizado e Contextual implementado
-"""
-
-from .gemini_processor import GeminiProcessor, ProcessoEstruturado
-from .whisper_service import WhisperService, TranscricaoAudiencia
-from .rag_service import RAGService
-from .claude_service import ClaudeService
-from .instance_manager import InstanceManager
-from .isolated_rag_service import IsolatedRAGService
 
-# PARTE B: Componentes RAG Otimizado
-from .optimized_embedding_service import OptimizedEmbeddingService, EmbeddingResult
-from .semantic_chunker import SemanticChunker, SemanticChunk, ChunkType
-from .contextual_retriever import ContextualRetriever, QueryContext, QueryType, RetrievalResult
-from .enhanced_rag_service import EnhancedRAGService
+Os serviços são carregados sob demanda (PEP 562): ``from services import SemanticChunker``
+importa apenas o módulo do chunker, sem torch, chromadb ou os SDKs dos LLMs.
+"""
 
-# MÓDULO 2: Diálogo Inteligente Avançado
-from .intelligent_dialogue_service import IntelligentDialogueService
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = [
+# Nome exportado -> submódulo que o define
+_EXPORTACOES = {
     # Core services
-    'GeminiProcessor',
-    'ProcessoEstruturado',
-    'WhisperService', 
-    'TranscricaoAudiencia',
-    'RAGService',
-    'ClaudeService',
-    
+    'GeminiProcessor': 'gemini_processor',
+    'ProcessoEstruturado': 'gemini_processor',
+    'WhisperService': 'whisper_service',
+    'TranscricaoAudiencia': 'whisper_service',
+    'RAGService': 'rag_service',
+    'ClaudeService': 'claude_service',
+
     # Instâncias isoladas
-    'InstanceManager',
-    'IsolatedRAGService',
-    
+    'InstanceManager': 'instance_manager',
+    'IsolatedRAGService': 'isolated_rag_service',
+
     # RAG Otimizado (PARTE B)
-    'OptimizedEmbeddingService',
-    'EmbeddingResult',
-    'SemanticChunker',
-    'SemanticChunk',
-    'ChunkType',
-    'ContextualRetriever',
-    'QueryContext',
-    'QueryType',
-    'RetrievalResult',
-    'EnhancedRAGService',
-    
+    'OptimizedEmbeddingService': 'optimized_embedding_service',
+    'EmbeddingResult': 'optimized_embedding_service',
+    'SemanticChunker': 'semantic_chunker',
+    'SemanticChunk': 'semantic_chunker',
+    'ChunkType': 'semantic_chunker',
+    'ContextualRetriever': 'contextual_retriever',
+    'QueryContext': 'contextual_retriever',
+    'QueryType': 'contextual_retriever',
+    'RetrievalResult': 'contextual_retriever',
+    'EnhancedRAGService': 'enhanced_rag_service',
+
     # MÓDULO 2: Diálogo Inteligente
-    'IntelligentDialogueService'
-]
+    'IntelligentDialogueService': 'intelligent_dialogue_service',
+}
+
+__all__ = list(_EXPORTACOES)
+
+if TYPE_CHECKING:  # pragma: no cover - apenas para analisadores estáticos
+    from .gemini_processor import GeminiProcessor, ProcessoEstruturado
+    from .whisper_service import WhisperService, TranscricaoAudiencia
+    from .rag_service import RAGService
+    from .claude_service import ClaudeService
+    from .instance_manager import InstanceManager
+    from .isolated_rag_service import IsolatedRAGService
+    from .optimized_embedding_service import OptimizedEmbeddingService, EmbeddingResult
+    from .semantic_chunker import SemanticChunker, SemanticChunk, ChunkType
+    from .contextual_retriever import ContextualRetriever, QueryContext, QueryType, RetrievalResult
+    from .enhanced_rag_service import EnhancedRAGService
+    from .intelligent_dialogue_service import IntelligentDialogueService
+
+
+def __getattr__(nome: str):
+    modulo = _EXPORTACOES.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nome)
+    globals()[nome] = valor  # Próximos acessos não passam por __getattr__
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
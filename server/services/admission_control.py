@@ -0,0 +1,438 @@
+"""
+Controle de Admissão das Chamadas aos LLMs
+Orçamentos por provedor e modelo (chamadas simultâneas e tokens por minuto) compartilhados pelo
+processo, ou por todos os workers com Redis. Os pedidos aguardam numa fila com classes de
+prioridade (rotas interativas antes dos jobs em lote) e partilha justa entre casos, e um 429
+pausa o provedor para todos os chamadores em vez de cada caso repetir por conta própria.
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Callable, List, Iterator, Tuple
+from uuid import uuid4
+
+from .metrics import ADMISSAO_ESPERA, ADMISSAO_FILA, LLM_RETRIES, registrar_uso_llm, tokens_da_resposta
+from .tracing import span_atual
+
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_LOTE = 1
+NOMES_PRIORIDADE = {PRIORIDADE_INTERATIVA: "interativa", PRIORIDADE_LOTE: "lote"}
+
+CARACTERES_POR_TOKEN = 4
+
+# Orçamento padrão por provedor (sobrescrevível via ADMISSAO_<PROVEDOR>_CONCORRENCIA / _TPM;
+# por modelo via ADMISSAO_LIMITES_MODELOS='{"claude:<modelo>": {"concorrencia": 2, "tpm": 40000}}')
+LIMITES_PADRAO = {
+    "claude": {"concorrencia": 4, "tpm": 80000},
+    "gemini": {"concorrencia": 4, "tpm": 2000000},
+    "whisper": {"concorrencia": 2, "tpm": None},
+}
+
+INTERVALO_MAXIMO_ESPERA_S = 0.25   # Reavaliação periódica (liberações em outros workers não notificam)
+MEIA_VIDA_PARTILHA_S = 60.0        # Decaimento do consumo recente usado na partilha justa
+BACKOFF_BASE_S = 0.8
+JITTER_MAXIMO_S = 0.5
+BACKOFF_MAXIMO_S = 60.0
+VALIDADE_CONCESSAO_S = float(os.getenv("ADMISSAO_CONCESSAO_TTL_S", "900"))
+
+_prioridade_atual: contextvars.ContextVar[int] = contextvars.ContextVar("prioridade_admissao", default=PRIORIDADE_INTERATIVA)
+_caso_atual: contextvars.ContextVar[str] = contextvars.ContextVar("caso_admissao", default="")
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissaoExpirada(TimeoutError):
+    """O pedido não foi admitido dentro do prazo"""
+
+
+@dataclass
+class Orcamento:
+    """Capacidade de um provedor/modelo"""
+    concorrencia: int
+    tokens_por_minuto: Optional[int] = None
+    janela_s: float = 60.0  # Reposição completa dos tokens (60s nos provedores; menor em simulações)
+
+    @property
+    def taxa_por_s(self) -> float:
+        return self.tokens_por_minuto / self.janela_s if self.tokens_por_minuto else 0.0
+
+
+@contextmanager
+def contexto_admissao(case_id: Optional[str] = None, prioridade: Optional[int] = None) -> Iterator[None]:
+    """Define caso e classe de prioridade das chamadas feitas no bloco (propaga às threads do executor)"""
+    tokens = []
+    if case_id is not None:
+        tokens.append((_caso_atual, _caso_atual.set(case_id)))
+    if prioridade is not None:
+        tokens.append((_prioridade_atual, _prioridade_atual.set(prioridade)))
+    try:
+        yield
+    finally:
+        for variavel, token in reversed(tokens):
+            variavel.reset(token)
+
+
+def estimar_tokens(*textos: str, saida_maxima: int = 0) -> int:
+    """Estimativa de tokens de entrada (caracteres / 4) somada ao máximo de saída"""
+    return sum(len(texto or "") for texto in textos) // CARACTERES_POR_TOKEN + saida_maxima
+
+
+def eh_rate_limit(erro: Exception) -> bool:
+    if getattr(erro, "status_code", None) == 429:
+        return True
+    mensagem = str(erro).lower()
+    return "429" in mensagem or "rate limit" in mensagem or "acceleration limit" in mensagem or "resource exhausted" in mensagem
+
+
+def _retry_after(erro: Exception) -> Optional[float]:
+    resposta = getattr(erro, "response", None)
+    cabecalhos = getattr(resposta, "headers", None) or {}
+    try:
+        return float(cabecalhos.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+# -------------------------------------------------------------- backends
+
+class BackendLocal:
+    """Baldes de tokens e vagas de concorrência em memória (um processo)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._saldos: Dict[str, Tuple[float, float]] = {}
+        self._concessoes: Dict[str, set] = {}
+        self._pausas: Dict[str, float] = {}
+
+    def tentar(self, chave: str, orcamento: Orcamento, tokens: int, concessao: str) -> float:
+        """Admite o pedido (0) ou informa a espera sugerida em segundos"""
+        agora = time.monotonic()
+        with self._lock:
+            pausa = self._pausas.get(chave, 0.0)
+            if agora < pausa:
+                return pausa - agora
+            ativas = self._concessoes.setdefault(chave, set())
+            if len(ativas) >= orcamento.concorrencia:
+                return INTERVALO_MAXIMO_ESPERA_S
+            if orcamento.tokens_por_minuto:
+                saldo, instante = self._saldos.get(chave, (float(orcamento.tokens_por_minuto), agora))
+                saldo = min(float(orcamento.tokens_por_minuto), saldo + (agora - instante) * orcamento.taxa_por_s)
+                if saldo < tokens:
+                    self._saldos[chave] = (saldo, agora)
+                    return (tokens - saldo) / orcamento.taxa_por_s
+                self._saldos[chave] = (saldo - tokens, agora)
+            ativas.add(concessao)
+            return 0.0
+
+    def liberar(self, chave: str, concessao: str):
+        with self._lock:
+            self._concessoes.get(chave, set()).discard(concessao)
+
+    def ajustar(self, chave: str, delta_tokens: float):
+        """Devolve (positivo) ou cobra (negativo) a diferença entre estimativa e consumo real"""
+        with self._lock:
+            if chave in self._saldos:
+                saldo, instante = self._saldos[chave]
+                self._saldos[chave] = (saldo + delta_tokens, instante)
+
+    def pausar(self, chave: str, segundos: float):
+        with self._lock:
+            self._pausas[chave] = max(self._pausas.get(chave, 0.0), time.monotonic() + segundos)
+
+
+_SCRIPT_TENTAR = """
+local agora = tonumber(ARGV[1])
+local capacidade = tonumber(ARGV[2])
+local taxa = tonumber(ARGV[3])
+local tokens = tonumber(ARGV[4])
+local concorrencia = tonumber(ARGV[5])
+local pausa = tonumber(redis.call('GET', KEYS[3]) or '0')
+if agora < pausa then return tostring(pausa - agora) end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', agora)
+if redis.call('ZCARD', KEYS[2]) >= concorrencia then return ARGV[8] end
+if capacidade > 0 then
+    local estado = redis.call('HMGET', KEYS[1], 'saldo', 'instante')
+    local saldo = tonumber(estado[1]) or capacidade
+    local instante = tonumber(estado[2]) or agora
+    saldo = math.min(capacidade, saldo + (agora - instante) * taxa)
+    if saldo < tokens then
+        redis.call('HSET', KEYS[1], 'saldo', saldo, 'instante', agora)
+        return tostring((tokens - saldo) / taxa)
+    end
+    redis.call('HSET', KEYS[1], 'saldo', saldo - tokens, 'instante', agora)
+    redis.call('EXPIRE', KEYS[1], 3600)
+end
+redis.call('ZADD', KEYS[2], agora + tonumber(ARGV[7]), ARGV[6])
+redis.call('EXPIRE', KEYS[2], 3600)
+return '0'
+"""
+
+_SCRIPT_AJUSTAR = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'saldo', ARGV[1])
+end
+return 0
+"""
+
+_SCRIPT_PAUSAR = """
+local ate = tonumber(ARGV[1])
+if ate > tonumber(redis.call('GET', KEYS[1]) or '0') then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', math.ceil(tonumber(ARGV[2]) * 1000) + 1000)
+end
+return 0
+"""
+
+
+class BackendRedis:
+    """Mesmo contrato do BackendLocal, com estado no Redis compartilhado pelos workers.
+
+    As vagas de concorrência são concessões com validade (sorted set), liberadas mesmo que
+    o worker morra no meio da chamada.
+    """
+
+    def __init__(self, url: str, prefixo: str = "sentencas:admissao"):
+        try:
+            import redis  # Opcional; só carregado quando ADMISSAO_REDIS_URL está definido
+        except ImportError:  # pragma: no cover
+            raise RuntimeError("Pacote redis não instalado")
+        self.cliente = redis.Redis.from_url(url)
+        self.prefixo = prefixo
+        self._tentar = self.cliente.register_script(_SCRIPT_TENTAR)
+        self._ajustar = self.cliente.register_script(_SCRIPT_AJUSTAR)
+        self._pausar = self.cliente.register_script(_SCRIPT_PAUSAR)
+
+    def _chaves(self, chave: str) -> List[str]:
+        return [f"{self.prefixo}:{chave}:{sufixo}" for sufixo in ("saldo", "concessoes", "pausa")]
+
+    def tentar(self, chave: str, orcamento: Orcamento, tokens: int, concessao: str) -> float:
+        resultado = self._tentar(keys=self._chaves(chave), args=[
+            time.time(), orcamento.tokens_por_minuto or 0, orcamento.taxa_por_s, tokens,
+            orcamento.concorrencia, concessao, VALIDADE_CONCESSAO_S, INTERVALO_MAXIMO_ESPERA_S
+        ])
+        return float(resultado)
+
+    def liberar(self, chave: str, concessao: str):
+        self.cliente.zrem(self._chaves(chave)[1], concessao)
+
+    def ajustar(self, chave: str, delta_tokens: float):
+        self._ajustar(keys=self._chaves(chave)[:1], args=[delta_tokens])
+
+    def pausar(self, chave: str, segundos: float):
+        self._pausar(keys=self._chaves(chave)[2:], args=[time.time() + segundos, segundos])
+
+
+# -------------------------------------------------------------- controlador
+
+@dataclass
+class _Pedido:
+    chave: str
+    case_id: str
+    prioridade: int
+    tokens: int
+    sequencia: int
+    concessao: str
+
+
+class Permissao:
+    """Chamada admitida: reconcilia os tokens consumidos e sinaliza rate limits"""
+
+    def __init__(self, controlador: "ControladorAdmissao", pedido: _Pedido):
+        self._controlador = controlador
+        self._pedido = pedido
+
+    def registrar_resposta(self, resposta):
+        entrada, saida = tokens_da_resposta(resposta)
+        if entrada is None and saida is None:
+            return
+        real = (entrada or 0) + (saida or 0)
+        self._controlador._reconciliar(self._pedido, real)
+
+    def sinalizar_rate_limit(self, erro: Exception) -> float:
+        """Pausa o provedor/modelo para todos os chamadores; retorna a pausa aplicada"""
+        return self._controlador._pausar_apos_429(self._pedido.chave, _retry_after(erro))
+
+
+class ControladorAdmissao:
+    """
+    Fila de admissão por orçamento (provedor:modelo).
+
+    A ordem de atendimento é (classe de prioridade, consumo recente do caso, chegada): o pedido
+    interativo passa à frente dos jobs em lote e, dentro da mesma classe, o caso que menos
+    consumiu recentemente é atendido primeiro. Só o primeiro da fila tenta a admissão, para que
+    pedidos grandes não sejam preteridos indefinidamente pelos pequenos.
+    """
+
+    def __init__(self, limites: Optional[Dict[str, Orcamento]] = None, backend=None):
+        self.limites = dict(limites) if limites is not None else limites_do_ambiente()
+        self.backend = backend or BackendLocal()
+        self._cond = threading.Condition()
+        self._filas: Dict[str, List[_Pedido]] = {}
+        self._consumo: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._falhas_seguidas: Dict[str, int] = {}
+        self._sequencia = itertools.count()
+
+    def orcamento(self, provedor: str, modelo: Optional[str]) -> Tuple[str, Optional[Orcamento]]:
+        """Chave e orçamento do modelo (ou do provedor); None se não houver limite configurado"""
+        chave = f"{provedor}:{modelo}" if modelo else provedor
+        return chave, self.limites.get(chave) or self.limites.get(provedor)
+
+    @contextmanager
+    def admitir(self, provedor: str, modelo: Optional[str] = None, tokens_estimados: int = 0,
+                timeout: Optional[float] = None) -> Iterator[Permissao]:
+        """Aguarda a vez e a capacidade do orçamento; a vaga é liberada ao sair do bloco"""
+        chave, orcamento = self.orcamento(provedor, modelo)
+        pedido = _Pedido(chave, _caso_atual.get(), _prioridade_atual.get(), max(0, int(tokens_estimados)),
+                         next(self._sequencia), uuid4().hex)
+        if orcamento is None:
+            yield Permissao(self, pedido)
+            return
+
+        if orcamento.tokens_por_minuto:
+            # Um pedido maior que o balde nunca seria admitido
+            pedido.tokens = min(pedido.tokens, orcamento.tokens_por_minuto)
+        self._aguardar_vez(pedido, orcamento, provedor, timeout)
+        try:
+            yield Permissao(self, pedido)
+        finally:
+            self.backend.liberar(chave, pedido.concessao)
+            with self._cond:
+                self._cond.notify_all()
+
+    def _aguardar_vez(self, pedido: _Pedido, orcamento: Orcamento, provedor: str, timeout: Optional[float]):
+        inicio = time.monotonic()
+        with self._cond:
+            fila = self._filas.setdefault(pedido.chave, [])
+            fila.append(pedido)
+            ADMISSAO_FILA.definir(len(fila), orcamento=pedido.chave)
+            try:
+                while True:
+                    espera = INTERVALO_MAXIMO_ESPERA_S
+                    if self._proximo(fila) is pedido:
+                        espera = self.backend.tentar(pedido.chave, orcamento, pedido.tokens, pedido.concessao)
+                        if espera <= 0:
+                            break
+                    if timeout is not None:
+                        restante = timeout - (time.monotonic() - inicio)
+                        if restante <= 0:
+                            raise AdmissaoExpirada(f"Sem capacidade em {pedido.chave} após {timeout:g}s")
+                        espera = min(espera, restante)
+                    self._cond.wait(min(espera, INTERVALO_MAXIMO_ESPERA_S))
+            finally:
+                fila.remove(pedido)
+                ADMISSAO_FILA.definir(len(fila), orcamento=pedido.chave)
+                self._cond.notify_all()
+            self._somar_consumo(pedido.chave, pedido.case_id, pedido.tokens or 1)
+
+        espera_total = time.monotonic() - inicio
+        ADMISSAO_ESPERA.observar(espera_total, provedor=provedor, prioridade=NOMES_PRIORIDADE.get(pedido.prioridade, "interativa"))
+        if espera_total > 0.001:
+            span_atual().somar("espera_admissao_s", round(espera_total, 3))
+
+    def _proximo(self, fila: List[_Pedido]) -> _Pedido:
+        return min(fila, key=lambda p: (p.prioridade, self._consumo_recente(p.chave, p.case_id), p.sequencia))
+
+    def _consumo_recente(self, chave: str, case_id: str) -> float:
+        valor, instante = self._consumo.get((chave, case_id), (0.0, 0.0))
+        return valor * 0.5 ** ((time.monotonic() - instante) / MEIA_VIDA_PARTILHA_S)
+
+    def _somar_consumo(self, chave: str, case_id: str, tokens: float):
+        self._consumo[(chave, case_id)] = (self._consumo_recente(chave, case_id) + tokens, time.monotonic())
+
+    def _reconciliar(self, pedido: _Pedido, tokens_reais: int):
+        self.backend.ajustar(pedido.chave, pedido.tokens - tokens_reais)
+        with self._cond:
+            self._somar_consumo(pedido.chave, pedido.case_id, tokens_reais - pedido.tokens)
+            self._falhas_seguidas.pop(pedido.chave, None)
+
+    def _pausar_apos_429(self, chave: str, retry_after: Optional[float]) -> float:
+        with self._cond:
+            falhas = self._falhas_seguidas.get(chave, 0)
+            self._falhas_seguidas[chave] = falhas + 1
+        pausa = retry_after if retry_after is not None else min(
+            BACKOFF_MAXIMO_S, BACKOFF_BASE_S * 2 ** falhas + random.uniform(0.0, JITTER_MAXIMO_S)
+        )
+        self.backend.pausar(chave, pausa)
+        return pausa
+
+    def executar(self, provedor: str, modelo: Optional[str], chamada: Callable[[], Any],
+                 tokens_estimados: int = 0, max_tentativas: int = 6) -> Any:
+        """
+        Executa a chamada ao LLM sob admissão, repetindo em caso de 429
+
+        A pausa após um 429 vale para todo o orçamento (respeitando Retry-After quando
+        informado), e a nova tentativa volta para a fila com a mesma prioridade.
+        """
+        for tentativa in range(1, max_tentativas + 1):
+            with self.admitir(provedor, modelo, tokens_estimados) as permissao:
+                try:
+                    resposta = chamada()
+                except Exception as e:
+                    if tentativa == max_tentativas or not eh_rate_limit(e):
+                        raise
+                    pausa = permissao.sinalizar_rate_limit(e)
+                    LLM_RETRIES.incrementar(provedor=provedor)
+                    span_atual().somar("retries_429")
+                    logger.warning(
+                        f"⚠️ Rate limit em {provedor} (tentativa {tentativa}/{max_tentativas}); "
+                        f"orçamento pausado por {pausa:.2f}s"
+                    )
+                    continue
+                permissao.registrar_resposta(resposta)
+                registrar_uso_llm(provedor, resposta)
+                return resposta
+
+
+def limites_do_ambiente() -> Dict[str, Orcamento]:
+    """Orçamentos padrão com sobrescritas das variáveis de ambiente"""
+    limites = {}
+    for provedor, padrao in LIMITES_PADRAO.items():
+        concorrencia = os.getenv(f"ADMISSAO_{provedor.upper()}_CONCORRENCIA")
+        tpm = os.getenv(f"ADMISSAO_{provedor.upper()}_TPM")
+        limites[provedor] = Orcamento(
+            concorrencia=int(concorrencia) if concorrencia else padrao["concorrencia"],
+            tokens_por_minuto=(int(tpm) or None) if tpm else padrao["tpm"]
+        )
+    por_modelo = os.getenv("ADMISSAO_LIMITES_MODELOS")
+    if por_modelo:
+        for chave, valores in json.loads(por_modelo).items():
+            limites[chave] = Orcamento(concorrencia=int(valores["concorrencia"]), tokens_por_minuto=valores.get("tpm"))
+    return limites
+
+
+_controlador_global: Optional[ControladorAdmissao] = None
+_lock_global = threading.Lock()
+
+
+def get_admission_controller() -> ControladorAdmissao:
+    """Controlador compartilhado pelo processo (estado no Redis se ADMISSAO_REDIS_URL estiver definido)"""
+    global _controlador_global
+    with _lock_global:
+        if _controlador_global is None:
+            backend = None
+            url = os.getenv("ADMISSAO_REDIS_URL")
+            if url:
+                try:
+                    backend = BackendRedis(url)
+                    logger.info("🚦 Controle de admissão com estado no Redis (compartilhado entre workers)")
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis indisponível para o controle de admissão ({e}); usando estado local")
+            _controlador_global = ControladorAdmissao(backend=backend)
+        return _controlador_global
+
+
+def chamar_llm(provedor: str, modelo: Optional[str], chamada: Callable[[], Any],
+               tokens_estimados: int = 0, max_tentativas: int = 6) -> Any:
+    """Atalho para ``get_admission_controller().executar(...)``"""
+    if os.getenv("ADMISSAO_ATIVA", "1") != "1":
+        resposta = chamada()
+        registrar_uso_llm(provedor, resposta)
+        return resposta
+    return get_admission_controller().executar(provedor, modelo, chamada, tokens_estimados, max_tentativas)
@@ -0,0 +1,191 @@
+"""
+Cache de Artefatos Endereçado por Conteúdo
+Reaproveita texto extraído, transcrição Whisper, ProcessoEstruturado e análise da audiência
+entre casos com as mesmas entradas (mesmo arquivo/texto + mesma versão de extrator/modelo/prompt)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from uuid import uuid4
+
+from .atomic_write import escrever_json_atomico
+from .tracing import span_atual
+
+# Versão de cada tipo de artefato: incrementar ao alterar extrator, modelo ou prompt,
+# invalidando automaticamente as entradas geradas pela versão anterior
+VERSOES_ARTEFATOS = {
+    "processo_extraido": "pymupdf-python_docx-ocr-indice_pje/v3",
+    "ocr_pagina": "tesseract/300dpi-cinza/v1",
+    "texto_documento": "pymupdf-python_docx-ocr/v1",
+    "transcricao": "whisper-1/pt/v1",
+    "processo_estruturado": "gemini-1.5-pro/extracao-map_reduce/v2",
+    "analise_audiencia": "gemini-1.5-pro/audiencia/v1",
+}
+
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+
+def sha256_arquivo(caminho: Path) -> str:
+    """SHA-256 do conteúdo de um arquivo, lido em blocos"""
+    hash_arquivo = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b""):
+            hash_arquivo.update(bloco)
+    return hash_arquivo.hexdigest()
+
+
+def sha256_texto(texto: str) -> str:
+    """SHA-256 de um texto (UTF-8)"""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def vincular_arquivo(origem: Path, destino: Path):
+    """
+    Vincula o arquivo de origem ao destino por hardlink (cópia se não suportado).
+    O destino existente é removido antes, para nunca escrever através de um link.
+    """
+    destino.unlink(missing_ok=True)
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copy2(origem, destino)
+
+
+class ArtifactCache:
+    """
+    Armazena artefatos em {cache_dir}/{tipo}/{chave}/, onde a chave é o SHA-256
+    de (tipo, versão do artefato, hash da entrada). Entradas são imutáveis:
+    gravadas em diretório temporário e publicadas com rename atômico.
+    """
+
+    def __init__(self, cache_dir: Path, versoes: Optional[Dict[str, str]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = Path(cache_dir)
+        self.versoes = versoes or VERSOES_ARTEFATOS
+
+    def chave(self, tipo: str, hash_entrada: str) -> str:
+        """Chave da entrada para o tipo de artefato e o hash do conteúdo de entrada"""
+        if tipo not in self.versoes:
+            raise ValueError(f"Tipo de artefato desconhecido: {tipo}")
+        return hashlib.sha256(f"{tipo}\0{self.versoes[tipo]}\0{hash_entrada}".encode("utf-8")).hexdigest()
+
+    def _diretorio_entrada(self, tipo: str, hash_entrada: str) -> Path:
+        return self.cache_dir / tipo / self.chave(tipo, hash_entrada)
+
+    def buscar(self, tipo: str, hash_entrada: str) -> Optional[Dict[str, Any]]:
+        """Retorna os metadados da entrada em cache, ou None se ausente"""
+        meta_path = self._diretorio_entrada(tipo, hash_entrada) / "meta.json"
+        if not meta_path.exists():
+            return None
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def materializar(self, tipo: str, hash_entrada: str, destino_dir: Path) -> bool:
+        """
+        Vincula os arquivos da entrada em cache ao diretório do caso
+
+        Returns:
+            True se a entrada existia e foi vinculada
+        """
+        meta = self.buscar(tipo, hash_entrada)
+        if meta is None:
+            self.logger.info(f"🔍 Cache miss: {tipo} ({hash_entrada[:12]}…)")
+            span_atual().definir(**{f"cache_{tipo}": "miss"})
+            return False
+
+        entrada_dir = self._diretorio_entrada(tipo, hash_entrada)
+        for nome in meta["arquivos"]:
+            vincular_arquivo(entrada_dir / nome, Path(destino_dir) / nome)
+        try:
+            # Último uso da entrada (ordem LRU da coleta do storage)
+            os.utime(entrada_dir / "meta.json")
+        except OSError:
+            pass
+
+        self.logger.info(f"♻️ Cache hit: {tipo} ({hash_entrada[:12]}…) -> {', '.join(meta['arquivos'])}")
+        span_atual().definir(**{f"cache_{tipo}": "hit"})
+        return True
+
+    def armazenar(self, tipo: str, hash_entrada: str, arquivos: List[Path]) -> Path:
+        """
+        Publica os arquivos gerados como entrada do cache
+
+        Args:
+            tipo: Tipo do artefato (chave de VERSOES_ARTEFATOS)
+            hash_entrada: Hash do conteúdo que originou o artefato
+            arquivos: Arquivos gerados (vinculados, não movidos)
+
+        Returns:
+            Diretório da entrada publicada
+        """
+        entrada_dir = self._diretorio_entrada(tipo, hash_entrada)
+        if (entrada_dir / "meta.json").exists():
+            return entrada_dir
+
+        temporario = entrada_dir.parent / f".{entrada_dir.name}.{uuid4().hex}.tmp"
+        temporario.mkdir(parents=True, exist_ok=True)
+        try:
+            for arquivo in arquivos:
+                vincular_arquivo(Path(arquivo), temporario / Path(arquivo).name)
+
+            meta = {
+                "tipo": tipo,
+                "versao": self.versoes[tipo],
+                "hash_entrada": hash_entrada,
+                "arquivos": [Path(arquivo).name for arquivo in arquivos],
+                "criado_em": datetime.now().isoformat()
+            }
+            (temporario / "meta.json").write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.rename(temporario, entrada_dir)
+            self.logger.info(f"💾 Artefato em cache: {tipo} ({hash_entrada[:12]}…)")
+        except OSError:
+            # Outra execução publicou a mesma entrada primeiro
+            shutil.rmtree(temporario, ignore_errors=True)
+            if not (entrada_dir / "meta.json").exists():
+                raise
+        return entrada_dir
+
+    def ler_json(self, tipo: str, hash_entrada: str) -> Optional[Any]:
+        """Conteúdo do único arquivo JSON de uma entrada, ou None se ausente"""
+        meta = self.buscar(tipo, hash_entrada)
+        if meta is None:
+            return None
+        caminho = self._diretorio_entrada(tipo, hash_entrada) / meta["arquivos"][0]
+        return json.loads(caminho.read_text(encoding="utf-8"))
+
+    def armazenar_json(self, tipo: str, hash_entrada: str, destino: Path, dados: Any) -> Path:
+        """Grava o artefato JSON no diretório do caso e o publica no cache"""
+        destino = Path(destino)
+        escrever_json_atomico(destino, dados)
+        return self.armazenar(tipo, hash_entrada, [destino])
+
+    def ler_texto(self, tipo: str, hash_entrada: str) -> Optional[str]:
+        """Conteúdo do único arquivo de texto de uma entrada (sem vínculo a um caso), ou None se ausente"""
+        meta = self.buscar(tipo, hash_entrada)
+        if meta is None:
+            return None
+        entrada_dir = self._diretorio_entrada(tipo, hash_entrada)
+        try:
+            texto = (entrada_dir / meta["arquivos"][0]).read_text(encoding="utf-8")
+            os.utime(entrada_dir / "meta.json")
+        except OSError:
+            return None
+        return texto
+
+    def armazenar_texto(self, tipo: str, hash_entrada: str, texto: str, nome: str = "texto.txt") -> Path:
+        """Publica um texto que não pertence a nenhum caso (coletado pela retenção do cache, sem referências)"""
+        temporario = self.cache_dir / tipo / f".{uuid4().hex}.tmp"
+        temporario.mkdir(parents=True, exist_ok=True)
+        try:
+            (temporario / nome).write_text(texto, encoding="utf-8")
+            return self.armazenar(tipo, hash_entrada, [temporario / nome])
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
@@ -0,0 +1,112 @@
+"""
+Camada de Execução Assíncrona para chamadas bloqueantes
+Isola chamadas síncronas (SDKs Claude/Gemini/Whisper, ChromaDB, PyMuPDF) em executores
+dedicados e limitados por classe de recurso, mantendo o event loop do FastAPI livre
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Tuple, List
+
+# Limite padrão de threads por classe de recurso (sobrescrevível via EXECUTOR_<RECURSO>_WORKERS)
+LIMITES_PADRAO = {
+    "whisper": 2,    # Upload/transcrição OpenAI Whisper
+    "gemini": 4,     # Chamadas Google Gemini
+    "claude": 4,     # Chamadas Anthropic Claude
+    "geracao": 2,    # Diálogo inteligente completo (orquestra Claude + Gemini + RAG)
+    "chroma": 1,     # Escritas no ChromaDB (cliente persistente não é seguro para escrita concorrente)
+    "documentos": 2,  # Extração de texto de PDF/DOCX
+    "aquecimento": 1,  # Carga dos serviços e modelos compartilhados na inicialização
+    "manutencao": 1    # Coleta de lixo e compactação do storage
+}
+
+
+class AsyncExecutor:
+    """Executores limitados por classe de recurso para código síncrono"""
+
+    def __init__(self, limites: Optional[Dict[str, int]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.limites = dict(LIMITES_PADRAO)
+        for recurso in self.limites:
+            valor_env = os.getenv(f"EXECUTOR_{recurso.upper()}_WORKERS")
+            if valor_env:
+                self.limites[recurso] = int(valor_env)
+        if limites:
+            self.limites.update(limites)
+
+        self._executores: Dict[str, ThreadPoolExecutor] = {}
+
+    def executor(self, recurso: str) -> ThreadPoolExecutor:
+        """Retorna (criando sob demanda) o executor da classe de recurso"""
+        if recurso not in self.limites:
+            raise ValueError(f"Classe de recurso desconhecida: {recurso}")
+
+        if recurso not in self._executores:
+            self._executores[recurso] = ThreadPoolExecutor(
+                max_workers=max(1, self.limites[recurso]),
+                thread_name_prefix=f"exec-{recurso}"
+            )
+        return self._executores[recurso]
+
+    async def run(self, recurso: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Executa função síncrona no executor do recurso sem bloquear o event loop
+
+        Args:
+            recurso: Classe de recurso (whisper, gemini, claude, geracao, chroma, documentos)
+            func: Função síncrona a executar
+            *args, **kwargs: Argumentos repassados à função
+
+        Returns:
+            Resultado da função
+        """
+        loop = asyncio.get_running_loop()
+        # Copia o contexto (ex.: span de tracing ativo) para a thread do executor
+        chamada = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await loop.run_in_executor(self.executor(recurso), chamada)
+
+    async def run_subprocess(self, comando: List[str], timeout: Optional[float] = None) -> Tuple[int, str, str]:
+        """
+        Executa processo externo (ex.: ffmpeg) com subprocess nativo do asyncio
+
+        Returns:
+            Tupla (returncode, stdout, stderr)
+        """
+        processo = await asyncio.create_subprocess_exec(
+            *comando,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(processo.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            processo.kill()
+            await processo.wait()
+            raise
+
+        return (
+            processo.returncode,
+            stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace')
+        )
+
+    def shutdown(self, wait: bool = False):
+        """Finaliza todos os executores"""
+        for executor in self._executores.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
+        self._executores = {}
+
+
+_executor_global: Optional[AsyncExecutor] = None
+
+
+def get_async_executor() -> AsyncExecutor:
+    """Retorna a instância de AsyncExecutor compartilhada pelo processo"""
+    global _executor_global
+    if _executor_global is None:
+        _executor_global = AsyncExecutor()
+    return _executor_global
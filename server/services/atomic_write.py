@@ -0,0 +1,34 @@
+"""
+Escrita Atômica de Artefatos
+Grava em arquivo temporário no mesmo diretório, faz fsync e publica com os.replace:
+leitores (inclusive de outros workers) veem o conteúdo anterior ou o novo, nunca parcial.
+Substituir a entrada do diretório também nunca escreve através de um hardlink do cache.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Union
+from uuid import uuid4
+
+
+def escrever_atomico(caminho: Path, conteudo: Union[str, bytes], encoding: str = "utf-8", fsync: bool = True):
+    """Grava texto ou bytes em ``caminho`` de forma atômica"""
+    caminho = Path(caminho)
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.{uuid4().hex[:8]}.tmp")
+    dados = conteudo.encode(encoding) if isinstance(conteudo, str) else conteudo
+    try:
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(dados)
+            if fsync:
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+
+
+def escrever_json_atomico(caminho: Path, dados: Any, indent: int = 2, fsync: bool = True):
+    """Serializa ``dados`` como JSON (UTF-8, sem escapes ASCII) e grava de forma atômica"""
+    escrever_atomico(caminho, json.dumps(dados, indent=indent, ensure_ascii=False), fsync=fsync)
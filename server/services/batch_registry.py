@@ -0,0 +1,130 @@
+"""
+Registro de Lotes de Casos
+Agrupa os jobs de um envio em lote (upload de vários processos/audiências ou casos já
+armazenados) e calcula o progresso agregado e a vazão do lote
+"""
+
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+from uuid import uuid4
+
+from .atomic_write import escrever_json_atomico
+from .job_runner import STATUS_CONCLUIDO, STATUS_FALHOU, ESTADOS_FINAIS
+
+
+class BatchRegistry:
+    """Lotes persistidos em ``storage/batches/{batch_id}.json``"""
+
+    def __init__(self, storage_dir: Path):
+        self.logger = logging.getLogger(__name__)
+        self.batches_dir = Path(storage_dir) / "batches"
+        self.batches_dir.mkdir(parents=True, exist_ok=True)
+
+    def criar(self,
+              itens: List[Dict[str, Any]],
+              rejeitados: Optional[List[Dict[str, Any]]] = None,
+              orcamentos: Optional[Dict[str, int]] = None,
+              batch_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Registra um lote
+
+        Args:
+            itens: Casos do lote ({"case_id", "job_id", "custo_estimado", "origem"})
+            rejeitados: Entradas recusadas, com o motivo
+            orcamentos: Limites de concorrência por provedor em vigor
+            batch_id: ID do lote (gerado se omitido)
+
+        Returns:
+            Dados do lote persistido
+        """
+        lote = {
+            "batch_id": batch_id or str(uuid4()),
+            "criado_em": datetime.now().isoformat(),
+            "itens": itens,
+            "rejeitados": rejeitados or [],
+            "orcamentos": orcamentos or {}
+        }
+        self._persistir(lote)
+        self.logger.info(f"📦 Lote {lote['batch_id']} criado: {len(itens)} casos, {len(lote['rejeitados'])} rejeitados")
+        return lote
+
+    def obter(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Dados do lote, ou None se não existir"""
+        caminho = self.batches_dir / f"{batch_id}.json"
+        if not caminho.exists():
+            return None
+        return json.loads(caminho.read_text(encoding='utf-8'))
+
+    def resumo(self, lote: Dict[str, Any], obter_job: Callable[[str], Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Progresso agregado do lote a partir do estado atual dos jobs
+
+        Returns:
+            Contagem por status, vazão (casos/hora), duração média por caso e estimativa de término
+        """
+        agora = datetime.now()
+        criado_em = datetime.fromisoformat(lote["criado_em"])
+        por_status: Dict[str, int] = {}
+        casos = []
+        duracoes = []
+        ultimo_fim = None
+
+        for item in lote["itens"]:
+            job = obter_job(item["job_id"]) or {}
+            status = job.get("status", "desconhecido")
+            por_status[status] = por_status.get(status, 0) + 1
+
+            inicios = [e["iniciado_em"] for e in job.get("etapas", []) if e.get("iniciado_em")]
+            duracao = None
+            if status in ESTADOS_FINAIS and inicios:
+                fim = datetime.fromisoformat(job["atualizado_em"])
+                duracao = (fim - datetime.fromisoformat(min(inicios))).total_seconds()
+                ultimo_fim = max(ultimo_fim or fim, fim)
+                if status == STATUS_CONCLUIDO:
+                    duracoes.append(duracao)
+
+            casos.append({
+                "case_id": item["case_id"],
+                "job_id": item["job_id"],
+                "status": status,
+                "custo_estimado": item.get("custo_estimado"),
+                "duracao_s": round(duracao, 1) if duracao is not None else None,
+                "erro": job.get("erro")
+            })
+
+        total = len(lote["itens"])
+        concluidos = por_status.get(STATUS_CONCLUIDO, 0)
+        falhos = por_status.get(STATUS_FALHOU, 0)
+        finalizados = sum(quantidade for status, quantidade in por_status.items() if status in ESTADOS_FINAIS)
+        finalizado = total > 0 and finalizados == total
+
+        decorrido = ((ultimo_fim if finalizado and ultimo_fim else agora) - criado_em).total_seconds()
+        vazao_por_hora = finalizados / decorrido * 3600 if decorrido > 0 and finalizados else 0.0
+        restante_s = (total - finalizados) / vazao_por_hora * 3600 if vazao_por_hora and not finalizado else None
+
+        return {
+            "batch_id": lote["batch_id"],
+            "criado_em": lote["criado_em"],
+            "total": total,
+            "concluidos": concluidos,
+            "falhos": falhos,
+            "em_andamento": total - finalizados,
+            "finalizado": finalizado,
+            "por_status": por_status,
+            "vazao": {
+                "casos_por_hora": round(vazao_por_hora, 2),
+                "decorrido_s": round(decorrido, 1),
+                "duracao_media_caso_s": round(sum(duracoes) / len(duracoes), 1) if duracoes else None,
+                "estimativa_restante_s": round(restante_s, 1) if restante_s is not None else None
+            },
+            "orcamentos": lote.get("orcamentos", {}),
+            "rejeitados": lote.get("rejeitados", []),
+            "casos": casos
+        }
+
+    def _persistir(self, lote: Dict[str, Any]):
+        destino = self.batches_dir / f"{lote['batch_id']}.json"
+        escrever_json_atomico(destino, lote)
@@ -0,0 +1,425 @@
+"""
+Catálogo de Casos (SQLite)
+Índice transacional de casos, artefatos (hash/tamanho), status das etapas e instâncias RAG,
+substituindo varreduras de diretórios (glob em rag_storage, sondagem de extensões) por
+consultas em índices B-tree: O(log n) mesmo com centenas de milhares de casos em disco
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterator
+
+ARQUIVO_CATALOGO = "catalogo.db"
+
+STATUS_CASO_RECEBIDO = "received"
+STATUS_INSTANCIA_ATIVA = "active"
+STATUS_INSTANCIA_REMOVIDA = "removed"
+
+# Artefatos gerados pelo pipeline, indexados pelo nome do arquivo no diretório do caso
+ARTEFATOS_GERADOS = (
+    "processo_extraido.txt", "audiencia_transcricao.txt", "audiencia_transcricao.json",
+    "processo_estruturado.json", "audiencia_analise.json", "conhecimento_rag.json",
+    "dialogo_resultado_completo.json", "sentenca_gerada.txt"
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS casos (
+    case_id TEXT PRIMARY KEY,
+    case_dir TEXT NOT NULL,
+    status TEXT NOT NULL,
+    criado_em TEXT NOT NULL,
+    atualizado_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_casos_criado ON casos (criado_em, case_id);
+CREATE INDEX IF NOT EXISTS idx_casos_status ON casos (status, criado_em, case_id);
+
+CREATE TABLE IF NOT EXISTS artefatos (
+    case_id TEXT NOT NULL REFERENCES casos (case_id) ON DELETE CASCADE,
+    nome TEXT NOT NULL,
+    caminho TEXT NOT NULL,
+    sha256 TEXT,
+    tamanho_bytes INTEGER,
+    atualizado_em TEXT NOT NULL,
+    PRIMARY KEY (case_id, nome)
+);
+CREATE INDEX IF NOT EXISTS idx_artefatos_sha256 ON artefatos (sha256);
+
+CREATE TABLE IF NOT EXISTS etapas (
+    case_id TEXT NOT NULL REFERENCES casos (case_id) ON DELETE CASCADE,
+    etapa TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duracao_s REAL,
+    atualizado_em TEXT NOT NULL,
+    PRIMARY KEY (case_id, etapa)
+);
+
+CREATE TABLE IF NOT EXISTS instancias_rag (
+    case_id TEXT PRIMARY KEY,
+    caminho TEXT NOT NULL,
+    status TEXT NOT NULL,
+    criado_em TEXT NOT NULL,
+    metadados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_instancias_status ON instancias_rag (status, criado_em);
+"""
+
+
+class CaseCatalog:
+    """Catálogo SQLite (WAL) com uma conexão por thread; cada escrita é uma transação"""
+
+    def __init__(self, caminho_db: Path):
+        self.logger = logging.getLogger(__name__)
+        self.caminho_db = Path(caminho_db)
+        self.caminho_db.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+        self._conexao().executescript(ESQUEMA)
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.caminho_db), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transacao(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE ... COMMIT (ROLLBACK em caso de erro)"""
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _agora() -> str:
+        return datetime.now().isoformat()
+
+    @staticmethod
+    def _garantir_caso(conn: sqlite3.Connection, case_id: str, case_dir: Path, agora: str):
+        conn.execute(
+            "INSERT OR IGNORE INTO casos (case_id, case_dir, status, criado_em, atualizado_em) VALUES (?, ?, ?, ?, ?)",
+            (case_id, str(case_dir), STATUS_CASO_RECEBIDO, agora, agora)
+        )
+
+    @staticmethod
+    def _gravar_artefato(conn: sqlite3.Connection, case_id: str, nome: str, caminho: Path,
+                         sha256: Optional[str], tamanho_bytes: Optional[int], agora: str):
+        if tamanho_bytes is None and Path(caminho).exists():
+            tamanho_bytes = Path(caminho).stat().st_size
+        conn.execute(
+            """INSERT INTO artefatos (case_id, nome, caminho, sha256, tamanho_bytes, atualizado_em)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (case_id, nome) DO UPDATE SET
+                   caminho = excluded.caminho, sha256 = excluded.sha256,
+                   tamanho_bytes = excluded.tamanho_bytes, atualizado_em = excluded.atualizado_em""",
+            (case_id, nome, str(caminho), sha256, tamanho_bytes, agora)
+        )
+
+    # ------------------------------------------------------------------ casos
+
+    def registrar_caso(self, case_id: str, case_dir: Path, status: str = STATUS_CASO_RECEBIDO,
+                       artefatos: Optional[Dict[str, Dict[str, Any]]] = None,
+                       criado_em: Optional[str] = None):
+        """
+        Registra (ou atualiza) o caso e seus artefatos numa única transação
+
+        Args:
+            case_id: ID do caso
+            case_dir: Diretório do caso em storage/
+            status: Status do caso
+            artefatos: {nome: {"caminho", "sha256", "tamanho_bytes"}}
+            criado_em: Data de criação (ISO); padrão: agora
+        """
+        agora = self._agora()
+        with self._transacao() as conn:
+            conn.execute(
+                """INSERT INTO casos (case_id, case_dir, status, criado_em, atualizado_em) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (case_id) DO UPDATE SET
+                       case_dir = excluded.case_dir, status = excluded.status, atualizado_em = excluded.atualizado_em""",
+                (case_id, str(case_dir), status, criado_em or agora, agora)
+            )
+            for nome, dados in (artefatos or {}).items():
+                self._gravar_artefato(conn, case_id, nome, Path(dados["caminho"]),
+                                      dados.get("sha256"), dados.get("tamanho_bytes"), agora)
+
+    def atualizar_status(self, case_id: str, status: str) -> bool:
+        """Atualiza o status do caso; False se o caso não estiver catalogado"""
+        with self._transacao() as conn:
+            cursor = conn.execute(
+                "UPDATE casos SET status = ?, atualizado_em = ? WHERE case_id = ?",
+                (status, self._agora(), case_id)
+            )
+        return cursor.rowcount > 0
+
+    def obter_caso(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """Caso com artefatos e etapas, ou None"""
+        conn = self._conexao()
+        linha = conn.execute("SELECT * FROM casos WHERE case_id = ?", (case_id,)).fetchone()
+        if linha is None:
+            return None
+        caso = dict(linha)
+        caso["artefatos"] = self.artefatos(case_id)
+        caso["etapas"] = {
+            e["etapa"]: dict(e)
+            for e in conn.execute(
+                "SELECT etapa, status, duracao_s, atualizado_em FROM etapas WHERE case_id = ?", (case_id,)
+            )
+        }
+        return caso
+
+    def listar_casos(self, status: Optional[str] = None, criado_desde: Optional[str] = None,
+                     criado_ate: Optional[str] = None, limite: int = 100,
+                     apos: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Casos mais recentes primeiro, com filtros por status e intervalo de criação
+
+        Args:
+            apos: case_id do último item da página anterior (paginação por chave, sem OFFSET)
+        """
+        condicoes, parametros = [], []
+        if status:
+            condicoes.append("status = ?")
+            parametros.append(status)
+        if criado_desde:
+            condicoes.append("criado_em >= ?")
+            parametros.append(criado_desde)
+        if criado_ate:
+            condicoes.append("criado_em <= ?")
+            parametros.append(criado_ate)
+        if apos:
+            referencia = self._conexao().execute(
+                "SELECT criado_em FROM casos WHERE case_id = ?", (apos,)
+            ).fetchone()
+            if referencia:
+                condicoes.append("(criado_em, case_id) < (?, ?)")
+                parametros.extend([referencia["criado_em"], apos])
+
+        sql = "SELECT * FROM casos"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY criado_em DESC, case_id DESC LIMIT ?"
+        parametros.append(limite)
+        return [dict(linha) for linha in self._conexao().execute(sql, parametros)]
+
+    def resumo_casos(self) -> Dict[str, tuple]:
+        """{case_id: (status, atualizado_em)} de todos os casos (uma única consulta)"""
+        return {
+            linha["case_id"]: (linha["status"], linha["atualizado_em"])
+            for linha in self._conexao().execute("SELECT case_id, status, atualizado_em FROM casos")
+        }
+
+    def contar_por_status(self) -> Dict[str, int]:
+        """Quantidade de casos por status"""
+        return {
+            linha["status"]: linha["total"]
+            for linha in self._conexao().execute("SELECT status, COUNT(*) AS total FROM casos GROUP BY status")
+        }
+
+    def remover_caso(self, case_id: str):
+        """Remove o caso, seus artefatos e etapas do catálogo"""
+        with self._transacao() as conn:
+            conn.execute("DELETE FROM casos WHERE case_id = ?", (case_id,))
+
+    # -------------------------------------------------------------- artefatos
+
+    def registrar_artefato(self, case_id: str, nome: str, caminho: Path, sha256: Optional[str] = None,
+                           tamanho_bytes: Optional[int] = None):
+        """Registra um artefato do caso (catalogando o caso, se necessário)"""
+        agora = self._agora()
+        with self._transacao() as conn:
+            self._garantir_caso(conn, case_id, Path(caminho).parent, agora)
+            self._gravar_artefato(conn, case_id, nome, Path(caminho), sha256, tamanho_bytes, agora)
+
+    def artefatos(self, case_id: str) -> Dict[str, Dict[str, Any]]:
+        """Artefatos registrados do caso: {nome: {"caminho", "sha256", "tamanho_bytes", "atualizado_em"}}"""
+        return {
+            linha["nome"]: {chave: linha[chave] for chave in ("caminho", "sha256", "tamanho_bytes", "atualizado_em")}
+            for linha in self._conexao().execute(
+                "SELECT * FROM artefatos WHERE case_id = ? ORDER BY nome", (case_id,)
+            )
+        }
+
+    def localizar_artefato(self, case_id: str, nome: str) -> Optional[Path]:
+        """Caminho registrado do artefato, ou None"""
+        linha = self._conexao().execute(
+            "SELECT caminho FROM artefatos WHERE case_id = ? AND nome = ?", (case_id, nome)
+        ).fetchone()
+        return Path(linha["caminho"]) if linha else None
+
+    # ----------------------------------------------------------------- etapas
+
+    def registrar_etapa(self, case_id: str, case_dir: Path, etapa: str, status: str,
+                        duracao_s: Optional[float] = None,
+                        artefatos: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Registra o status de uma etapa do pipeline e os artefatos que ela produziu (mesma transação)"""
+        agora = self._agora()
+        with self._transacao() as conn:
+            self._garantir_caso(conn, case_id, case_dir, agora)
+            conn.execute(
+                """INSERT INTO etapas (case_id, etapa, status, duracao_s, atualizado_em) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (case_id, etapa) DO UPDATE SET
+                       status = excluded.status, duracao_s = excluded.duracao_s,
+                       atualizado_em = excluded.atualizado_em""",
+                (case_id, etapa, status, duracao_s, agora)
+            )
+            for nome, dados in (artefatos or {}).items():
+                self._gravar_artefato(conn, case_id, nome, Path(dados["caminho"]),
+                                      dados.get("sha256"), dados.get("tamanho_bytes"), agora)
+
+    # --------------------------------------------------------- instâncias RAG
+
+    def registrar_instancia_rag(self, case_id: str, metadados: Dict[str, Any]):
+        """Registra (ou substitui) a instância RAG isolada do caso"""
+        with self._transacao() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO instancias_rag (case_id, caminho, status, criado_em, metadados)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (
+                    case_id,
+                    metadados.get("directories", {}).get("instance_root", ""),
+                    metadados.get("status", STATUS_INSTANCIA_ATIVA),
+                    metadados.get("created_at", self._agora()),
+                    json.dumps(metadados, ensure_ascii=False)
+                )
+            )
+
+    def obter_instancia_rag(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """Metadados da instância RAG do caso, ou None"""
+        linha = self._conexao().execute(
+            "SELECT metadados FROM instancias_rag WHERE case_id = ?", (case_id,)
+        ).fetchone()
+        return json.loads(linha["metadados"]) if linha else None
+
+    def listar_instancias_rag(self, status: str = STATUS_INSTANCIA_ATIVA) -> List[Dict[str, Any]]:
+        """Metadados das instâncias RAG com o status informado"""
+        return [
+            json.loads(linha["metadados"])
+            for linha in self._conexao().execute(
+                "SELECT metadados FROM instancias_rag WHERE status = ? ORDER BY criado_em", (status,)
+            )
+        ]
+
+    def atualizar_status_instancia(self, case_id: str, status: str):
+        """Atualiza o status da instância RAG (ex.: removida no cleanup)"""
+        with self._transacao() as conn:
+            linha = conn.execute("SELECT metadados FROM instancias_rag WHERE case_id = ?", (case_id,)).fetchone()
+            if linha is None:
+                return
+            metadados = json.loads(linha["metadados"])
+            metadados["status"] = status
+            conn.execute(
+                "UPDATE instancias_rag SET status = ?, metadados = ? WHERE case_id = ?",
+                (status, json.dumps(metadados, ensure_ascii=False), case_id)
+            )
+
+    # --------------------------------------------------------------- migração
+
+    def indexar_storage(self, storage_dir: Path) -> Dict[str, int]:
+        """
+        Popula o catálogo a partir de uma varredura única de storage/ (casos anteriores ao catálogo)
+
+        Returns:
+            Quantidade de casos e instâncias RAG indexados
+        """
+        storage_dir = Path(storage_dir)
+        casos = instancias = 0
+
+        with self._transacao() as conn:
+            for case_dir in storage_dir.iterdir():
+                if not case_dir.is_dir():
+                    continue
+
+                enviados = {}
+                arquivos_path = case_dir / "arquivos.json"
+                if arquivos_path.exists():
+                    try:
+                        enviados = json.loads(arquivos_path.read_text(encoding='utf-8'))
+                    except (OSError, ValueError):
+                        enviados = {}
+
+                artefatos = {}
+                for campo in ("processo", "audiencia"):
+                    if campo in enviados:
+                        artefatos[campo] = enviados[campo]
+                        continue
+                    encontrado = next(case_dir.glob(f"{campo}.*"), None)
+                    if encontrado:
+                        artefatos[campo] = {"caminho": str(encontrado)}
+                for nome in ARTEFATOS_GERADOS:
+                    if (case_dir / nome).exists():
+                        artefatos[nome] = {"caminho": str(case_dir / nome)}
+
+                # Diretórios sem envio nem artefato do pipeline (cache, lotes, rag_storage) não são casos
+                if not artefatos:
+                    continue
+
+                agora = self._agora()
+                criado_em = datetime.fromtimestamp(case_dir.stat().st_mtime).isoformat()
+                conn.execute(
+                    "INSERT OR IGNORE INTO casos (case_id, case_dir, status, criado_em, atualizado_em) VALUES (?, ?, ?, ?, ?)",
+                    (case_dir.name, str(case_dir), STATUS_CASO_RECEBIDO, criado_em, agora)
+                )
+                for nome, dados in artefatos.items():
+                    self._gravar_artefato(conn, case_dir.name, nome, Path(dados["caminho"]),
+                                          dados.get("sha256"), dados.get("tamanho_bytes"), agora)
+                casos += 1
+
+            rag_storage = storage_dir / "rag_storage"
+            if rag_storage.exists():
+                for metadata_file in rag_storage.glob("processo_*/instance_metadata.json"):
+                    try:
+                        metadados = json.loads(metadata_file.read_text(encoding='utf-8'))
+                    except (OSError, ValueError) as e:
+                        self.logger.warning(f"⚠️ Metadados inválidos em {metadata_file}: {e}")
+                        continue
+                    conn.execute(
+                        """INSERT OR IGNORE INTO instancias_rag (case_id, caminho, status, criado_em, metadados)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        (
+                            metadados.get("case_id", metadata_file.parent.name[len("processo_"):]),
+                            str(metadata_file.parent),
+                            metadados.get("status", STATUS_INSTANCIA_ATIVA),
+                            metadados.get("created_at", self._agora()),
+                            json.dumps(metadados, ensure_ascii=False)
+                        )
+                    )
+                    instancias += 1
+
+        self.logger.info(f"🗂️ Catálogo indexado: {casos} casos, {instancias} instâncias RAG")
+        return {"casos": casos, "instancias_rag": instancias}
+
+
+# Catálogos por diretório de storage (processo inteiro)
+_catalogos: Dict[str, CaseCatalog] = {}
+_lock_catalogos = threading.Lock()
+
+
+def get_case_catalog(storage_dir: Optional[Path] = None) -> CaseCatalog:
+    """
+    Catálogo de ``storage_dir`` (padrão: server/storage); na primeira abertura de um catálogo
+    inexistente, indexa os casos e instâncias RAG já presentes em disco
+    """
+    storage_dir = Path(storage_dir or Path(__file__).resolve().parent.parent / "storage")
+    chave = str(storage_dir.resolve())
+    with _lock_catalogos:
+        catalogo = _catalogos.get(chave)
+        if catalogo is None:
+            novo = not (storage_dir / ARQUIVO_CATALOGO).exists()
+            catalogo = CaseCatalog(storage_dir / ARQUIVO_CATALOGO)
+            if novo:
+                catalogo.indexar_storage(storage_dir)
+            _catalogos[chave] = catalogo
+    return catalogo
@@ -0,0 +1,152 @@
+"""
+Locks por Caso entre Processos
+Locks de arquivo (flock) em storage/.locks/{case_id}.lock, válidos entre workers do uvicorn,
+threads e corrotinas. Reentrantes dentro do mesmo fluxo lógico: o conjunto de locks mantidos
+fica num contextvar, propagado às tasks do DAG e às threads do AsyncExecutor.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from pathlib import Path
+from typing import Optional, Iterator, AsyncIterator, Dict
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: exclusão apenas dentro do processo
+    fcntl = None
+
+DIRETORIO_LOCKS = ".locks"
+
+INTERVALO_INICIAL_S = 0.01
+INTERVALO_MAXIMO_S = 0.25
+
+_locks_mantidos: contextvars.ContextVar[frozenset] = contextvars.ContextVar("locks_mantidos", default=frozenset())
+
+# Fallback sem fcntl
+_locks_processo: Dict[str, threading.Lock] = {}
+_lock_registro = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class LockIndisponivel(TimeoutError):
+    """O lock não foi obtido dentro do prazo (outro worker está usando o caso)"""
+
+
+class LockArquivo:
+    """Lock exclusivo sobre um arquivo; cada instância é uma descrição de arquivo independente"""
+
+    def __init__(self, caminho: Path):
+        self.caminho = Path(caminho)
+        self._fd: Optional[int] = None
+        self._lock_processo: Optional[threading.Lock] = None
+
+    def tentar(self) -> bool:
+        """Tenta obter o lock sem bloquear"""
+        if fcntl is None:
+            with _lock_registro:
+                lock = _locks_processo.setdefault(str(self.caminho), threading.Lock())
+            if lock.acquire(blocking=False):
+                self._lock_processo = lock
+                return True
+            return False
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def liberar(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        if self._lock_processo is not None:
+            self._lock_processo.release()
+            self._lock_processo = None
+
+
+def caminho_lock_caso(storage_dir: Path, case_id: str) -> Path:
+    """Arquivo de lock do caso (fora do diretório do caso, que pode ser removido)"""
+    return Path(storage_dir) / DIRETORIO_LOCKS / f"{case_id}.lock"
+
+
+def lock_mantido(storage_dir: Path, case_id: str) -> bool:
+    """O fluxo atual já mantém o lock do caso"""
+    return str(caminho_lock_caso(storage_dir, case_id)) in _locks_mantidos.get()
+
+
+def _prazo_esgotado(inicio: float, timeout: Optional[float]) -> bool:
+    return timeout is not None and time.monotonic() - inicio >= timeout
+
+
+@contextmanager
+def lock_caso(storage_dir: Path, case_id: str, timeout: Optional[float] = None) -> Iterator[None]:
+    """
+    Lock exclusivo do caso para código síncrono (threads do executor)
+
+    Args:
+        timeout: Espera máxima em segundos (None: indefinida; 0: apenas uma tentativa)
+
+    Raises:
+        LockIndisponivel: prazo esgotado
+    """
+    caminho = caminho_lock_caso(storage_dir, case_id)
+    if str(caminho) in _locks_mantidos.get():
+        yield
+        return
+
+    lock = LockArquivo(caminho)
+    inicio, intervalo = time.monotonic(), INTERVALO_INICIAL_S
+    while not lock.tentar():
+        if _prazo_esgotado(inicio, timeout):
+            raise LockIndisponivel(f"Caso {case_id} em uso por outro processo")
+        time.sleep(intervalo)
+        intervalo = min(intervalo * 2, INTERVALO_MAXIMO_S)
+
+    espera = time.monotonic() - inicio
+    if espera > 1:
+        logger.info(f"🔒 [{case_id}] Lock do caso obtido após {espera:.1f}s de espera")
+    token = _locks_mantidos.set(_locks_mantidos.get() | {str(caminho)})
+    try:
+        yield
+    finally:
+        _locks_mantidos.reset(token)
+        lock.liberar()
+
+
+@asynccontextmanager
+async def lock_caso_async(storage_dir: Path, case_id: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+    """Lock exclusivo do caso para corrotinas: aguarda sem bloquear o event loop"""
+    caminho = caminho_lock_caso(storage_dir, case_id)
+    if str(caminho) in _locks_mantidos.get():
+        yield
+        return
+
+    lock = LockArquivo(caminho)
+    inicio, intervalo = time.monotonic(), INTERVALO_INICIAL_S
+    while not lock.tentar():
+        if _prazo_esgotado(inicio, timeout):
+            raise LockIndisponivel(f"Caso {case_id} em uso por outro processo")
+        await asyncio.sleep(intervalo)
+        intervalo = min(intervalo * 2, INTERVALO_MAXIMO_S)
+
+    espera = time.monotonic() - inicio
+    if espera > 1:
+        logger.info(f"🔒 [{case_id}] Lock do caso obtido após {espera:.1f}s de espera")
+    token = _locks_mantidos.set(_locks_mantidos.get() | {str(caminho)})
+    try:
+        yield
+    finally:
+        _locks_mantidos.reset(token)
+        lock.liberar()
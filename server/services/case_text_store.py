@@ -0,0 +1,214 @@
+"""
+Texto do Caso Mapeado em Memória
+processo_extraido.txt (~1.3MB) era relido por inteiro a cada uso na geração. O TextoCaso mapeia
+o arquivo UTF-8 (mmap) e mantém pontos de controle caractere -> byte a cada BLOCO_BYTES: uma
+fatia por offset de caractere decodifica só os bytes do trecho (mais um bloco nas pontas), e o
+tamanho em caracteres vem do índice, sem decodificar o arquivo. Linhas (índice de quebras,
+montado sob demanda), páginas e peças (processo_indice.json) também saem por offset. Os offsets
+são os do texto lido com ``read_text(encoding="utf-8")``: ``\r\n`` e ``\r`` viram ``\n``.
+
+O CaseTextStore do processo reaproveita o mapeamento enquanto o arquivo não muda (tamanho,
+mtime e inode); uma nova extração publicada com os.replace gera outro mapeamento.
+"""
+
+import logging
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+BLOCO_BYTES = 16 * 1024
+MAX_ABERTOS = int(os.getenv("CASE_TEXT_STORE_MAX", "32"))
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_quebras(texto: str) -> str:
+    """Quebras de linha como na leitura em modo texto (universal newlines)"""
+    return texto.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _fim_de_bloco(dados, posicao: int) -> int:
+    """Recua ``posicao`` para não dividir um caractere UTF-8 nem um par \\r\\n entre blocos"""
+    while posicao > 0 and 0x80 <= dados[posicao] < 0xC0:
+        posicao -= 1
+    if dados[posicao - 1] == 0x0D:
+        posicao -= 1
+    return posicao
+
+
+class TextoCaso:
+    """
+    Texto UTF-8 mapeado em memória com fatias por offset de caractere
+
+    Suporta ``len()`` e fatias ``texto[inicio:fim]`` como uma str, então pode ser passado a
+    IndiceProcesso.fatiar no lugar do texto completo.
+    """
+
+    def __init__(self, caminho: Path):
+        self.caminho = Path(caminho)
+        with open(self.caminho, "rb") as arquivo:
+            estado = os.fstat(arquivo.fileno())
+            # O mapeamento continua válido depois de fechado o descritor (e de um os.replace)
+            self._dados = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) if estado.st_size else b""
+        self.assinatura: Tuple[int, int, int] = (estado.st_size, estado.st_mtime_ns, estado.st_ino)
+        self._caracteres, self._bytes = self._indexar()
+        self._linhas: Optional[array] = None
+        self._indice = None
+        self._lock = threading.Lock()
+
+    def _indexar(self) -> Tuple[array, array]:
+        """Pontos de controle (caractere, byte) no início de cada bloco e no fim do arquivo"""
+        caracteres, posicoes = array("q", [0]), array("q", [0])
+        total, inicio = 0, 0
+        while inicio < len(self._dados):
+            fim = min(inicio + BLOCO_BYTES, len(self._dados))
+            if fim < len(self._dados):
+                fim = _fim_de_bloco(self._dados, fim)
+            total += len(self._decodificar(inicio, fim))
+            caracteres.append(total)
+            posicoes.append(fim)
+            inicio = fim
+        return caracteres, posicoes
+
+    def _decodificar(self, inicio: int, fim: int) -> str:
+        return normalizar_quebras(self._dados[inicio:fim].decode("utf-8"))
+
+    def __len__(self) -> int:
+        return self._caracteres[-1]
+
+    def __getitem__(self, chave):
+        if isinstance(chave, slice):
+            inicio, fim, passo = chave.indices(len(self))
+            if passo != 1:
+                return self.fatia(0, len(self))[chave]
+            return self.fatia(inicio, fim)
+        indice = chave + len(self) if chave < 0 else chave
+        if not 0 <= indice < len(self):
+            raise IndexError("índice de caractere fora do texto")
+        return self.fatia(indice, indice + 1)
+
+    def __str__(self) -> str:
+        return self.texto()
+
+    def fatia(self, inicio: int, fim: int) -> str:
+        """Caracteres [inicio, fim): decodifica apenas os blocos que contêm o trecho"""
+        inicio, fim = max(0, inicio), min(fim, len(self))
+        if fim <= inicio:
+            return ""
+        primeiro = bisect_right(self._caracteres, inicio) - 1
+        ultimo = bisect_left(self._caracteres, fim)
+        trecho = self._decodificar(self._bytes[primeiro], self._bytes[ultimo])
+        base = self._caracteres[primeiro]
+        return trecho[inicio - base:fim - base]
+
+    def texto(self) -> str:
+        """Texto completo (para os prompts que precisam do processo inteiro)"""
+        return self._decodificar(0, len(self._dados))
+
+    @property
+    def numero_de_linhas(self) -> int:
+        return len(self._inicios_linhas()) - 1
+
+    def linha(self, numero: int) -> str:
+        """Linha ``numero`` (a partir de 1), sem a quebra"""
+        inicios = self._inicios_linhas()
+        if not 1 <= numero < len(inicios):
+            raise IndexError("linha fora do texto")
+        return self.fatia(inicios[numero - 1], inicios[numero]).rstrip("\n")
+
+    def _inicios_linhas(self) -> array:
+        """Offsets de caractere do início de cada linha (e o fim do texto), montados no primeiro uso"""
+        with self._lock:
+            if self._linhas is None:
+                inicios = array("q", [0])
+                for bloco in range(len(self._bytes) - 1):
+                    trecho, base = self._decodificar(self._bytes[bloco], self._bytes[bloco + 1]), self._caracteres[bloco]
+                    posicao = trecho.find("\n")
+                    while posicao != -1:
+                        inicios.append(base + posicao + 1)
+                        posicao = trecho.find("\n", posicao + 1)
+                if inicios[-1] != len(self):
+                    inicios.append(len(self))
+                self._linhas = inicios
+            return self._linhas
+
+    @property
+    def indice(self):
+        """IndiceProcesso do caso (processo_indice.json ao lado do texto), carregado uma vez por versão"""
+        from .pje_segmenter import carregar_indice
+
+        with self._lock:
+            if self._indice is None:
+                self._indice = carregar_indice(self.caminho.parent, self)
+            return self._indice
+
+    def peca(self, id_peca: str) -> Optional[str]:
+        """Texto da peça pelo ID do PJe"""
+        peca = self.indice.peca_por_id(id_peca) if self.indice else None
+        return self.fatia(peca.inicio, peca.fim) if peca else None
+
+    def pagina(self, numero: int) -> Optional[str]:
+        """Texto da página (Fls. do PJe ou página do PDF)"""
+        paginas = self.indice.paginas if self.indice else []
+        for posicao, (inicio, pagina) in enumerate(paginas):
+            if pagina == numero:
+                fim = paginas[posicao + 1][0] if posicao + 1 < len(paginas) else len(self)
+                return self.fatia(inicio, fim)
+        return None
+
+
+class CaseTextStore:
+    """Mapeamentos abertos dos textos dos casos (LRU), revalidados pelo stat do arquivo"""
+
+    def __init__(self, max_abertos: int = MAX_ABERTOS):
+        self.max_abertos = max_abertos
+        self._abertos: "OrderedDict[Path, TextoCaso]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def abrir(self, caminho: Path) -> TextoCaso:
+        """
+        TextoCaso do arquivo, reaproveitado enquanto tamanho, mtime e inode não mudarem
+
+        Raises:
+            FileNotFoundError: Arquivo inexistente
+        """
+        caminho = Path(caminho).resolve()
+        estado = caminho.stat()
+        assinatura = (estado.st_size, estado.st_mtime_ns, estado.st_ino)
+        with self._lock:
+            texto = self._abertos.get(caminho)
+            if texto is not None and texto.assinatura == assinatura:
+                self._abertos.move_to_end(caminho)
+                return texto
+
+        # Mapeamentos descartados são fechados quando o último leitor os libera
+        texto = TextoCaso(caminho)
+        with self._lock:
+            self._abertos[caminho] = texto
+            self._abertos.move_to_end(caminho)
+            while len(self._abertos) > self.max_abertos:
+                self._abertos.popitem(last=False)
+        logger.debug(f"🗺️ Texto mapeado: {caminho} ({len(texto)} caracteres)")
+        return texto
+
+    def descartar(self, caminho: Path):
+        with self._lock:
+            self._abertos.pop(Path(caminho).resolve(), None)
+
+
+_store_global: Optional[CaseTextStore] = None
+_lock_global = threading.Lock()
+
+
+def get_case_text_store() -> CaseTextStore:
+    """Store compartilhado pelo processo"""
+    global _store_global
+    with _lock_global:
+        if _store_global is None:
+            _store_global = CaseTextStore()
+        return _store_global
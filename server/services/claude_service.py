@@ -3,7 +3,6 @@ Serviço Claude para geração de sentenças judiciais
 Consulta conhecimento RAG e gera sentenças estruturadas
 """
 
-import anthropic
 import os
 import logging
 from pathlib import Path
@@ -11,6 +10,10 @@ from typing import Dict, Any, Optional, List
 import json
 import time
 
+from .admission_control import chamar_llm, estimar_tokens
+from .llm_response_cache import chamar_com_cache
+from .tracing import rastrear, span_atual
+
 class ClaudeService:
     """Serviço para geração de sentenças usando Claude com consulta RAG"""
     
@@ -20,6 +23,8 @@ class ClaudeService:
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY não encontrada nas variáveis de ambiente")
         
+        import anthropic
+
         self.client = anthropic.Anthropic(api_key=self.api_key)
         self.logger = logging.getLogger(__name__)
         
@@ -81,37 +86,34 @@ IMPORTANTE:
 - Se informações estiverem incompletas, mencione explicitamente
 """
     
-    def gerar_sentenca_com_rag(self, conhecimento_caso: Dict[str, Any], case_id: str) -> str:
+    @rastrear("claude.gerar_sentenca_com_rag")
+    def gerar_sentenca_com_rag(self, conhecimento_caso: Dict[str, Any], case_id: str,
+                               cache_policy: Optional[str] = None) -> str:
         """
         Gera sentença consultando conhecimento RAG
         
         Args:
             conhecimento_caso: Conhecimento completo do caso do RAG
             case_id: ID do caso para logs
+            cache_policy: Política do cache de respostas (usar | renovar | ignorar)
             
         Returns:
             str: Sentença judicial completa
         """
         
+        import anthropic
+
         self.logger.info(f"[{case_id}] Iniciando geração de sentença com Claude")
         
         try:
             # Construir prompt com conhecimento do RAG
             user_prompt = self._build_prompt_from_rag(conhecimento_caso)
+            span_atual().definir(prompt_chars=len(user_prompt))
             
             start_time = time.time()
             
             # Gerar sentença com Claude
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                system=self.system_prompt,
-                messages=[{
-                    "role": "user",
-                    "content": user_prompt
-                }]
-            )
+            response = self._criar_mensagem(user_prompt, cache_policy=cache_policy)
             
             duration = time.time() - start_time
             sentenca = response.content[0].text
@@ -126,7 +128,26 @@ IMPORTANTE:
         except Exception as e:
             self.logger.error(f"[{case_id}] Erro inesperado na geração: {str(e)}")
             raise Exception(f"Erro na geração da sentença: {str(e)}")
-    
+
+    def _criar_mensagem(self, prompt: str, max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None, usar_system: bool = True,
+                        cache_policy: Optional[str] = None):
+        """messages.create sob o controle de admissão do processo (orçamento e fila compartilhados),
+        consultando antes o cache de respostas"""
+        max_tokens = max_tokens or self.max_tokens
+        parametros = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": self.temperature if temperature is None else temperature,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if usar_system:
+            parametros["system"] = self.system_prompt
+        return criar_mensagem_com_cache(
+            self.client, parametros, cache_policy,
+            tokens_estimados=estimar_tokens(parametros.get("system", ""), prompt, saida_maxima=max_tokens)
+        )
+
     def _build_prompt_from_rag(self, conhecimento_caso: Dict[str, Any]) -> str:
         """Constrói prompt a partir do conhecimento RAG"""
         
@@ -250,31 +271,26 @@ Redija a sentença completa agora:
         
         return prompt
 
-    def gerar_resposta(self, prompt: str) -> str:
+    @rastrear("claude.gerar_resposta")
+    def gerar_resposta(self, prompt: str, cache_policy: Optional[str] = None) -> str:
         """Gera uma resposta livre do Claude usando o system prompt atual.
 
         Args:
             prompt: Prompt de usuário completo
+            cache_policy: Política do cache de respostas (usar | renovar | ignorar)
 
         Returns:
             str: Texto de saída do modelo
         """
+        span_atual().definir(prompt_chars=len(prompt))
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                system=self.system_prompt,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
+            response = self._criar_mensagem(prompt, cache_policy=cache_policy)
             return response.content[0].text
         except Exception as e:
             self.logger.error(f"Erro ao gerar resposta livre com Claude: {e}")
             raise
     
+    @rastrear("claude.gerar_fundamentacao_especifica")
     def gerar_fundamentacao_especifica(
         self, 
         conhecimento_caso: Dict[str, Any], 
@@ -313,17 +329,10 @@ INSTRUÇÕES:
 
 Estrutura: Alegações → Prova → Fundamentação Legal → Conclusão
 """
+        span_atual().definir(prompt_chars=len(prompt))
         
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                temperature=0.1,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
+            response = self._criar_mensagem(prompt, max_tokens=2048, temperature=0.1, usar_system=False)
             
             self.logger.info(f"[{case_id}] Fundamentação específica gerada para: {pedido_especifico}")
             return response.content[0].text
@@ -331,3 +340,24 @@ Estrutura: Alegações → Prova → Fundamentação Legal → Conclusão
         except Exception as e:
             self.logger.error(f"[{case_id}] Erro na fundamentação específica: {e}")
             raise
+
+
+def criar_mensagem_com_cache(client, parametros: Dict[str, Any], cache_policy: Optional[str] = None,
+                             tokens_estimados: int = 0):
+    """
+    messages.create sob o controle de admissão, consultando antes o cache de respostas
+
+    Args:
+        client: Cliente anthropic.Anthropic
+        parametros: Argumentos de messages.create (model, max_tokens, temperature, system, messages)
+        cache_policy: Política do cache de respostas (usar | renovar | ignorar)
+    """
+    config = {nome: valor for nome, valor in parametros.items() if nome not in ("model", "system", "messages")}
+    return chamar_com_cache(
+        "claude", parametros["model"], config, parametros.get("system"), parametros["messages"],
+        lambda: chamar_llm("claude", parametros["model"], lambda: client.messages.create(**parametros),
+                           tokens_estimados=tokens_estimados),
+        lambda resposta: resposta.content[0].text,
+        cache_policy=cache_policy,
+        metadados_da_resposta=lambda resposta: {"stop_reason": getattr(resposta, "stop_reason", None)}
+    )
@@ -0,0 +1,179 @@
+"""
+Extração de Texto de Documentos com Cache Versionado
+Único ponto de extração de PDF (PyMuPDF por intervalos de páginas, OCR das digitalizadas) e
+DOCX (python-docx) para o pipeline, o /init-style, o processador de sentenças reais e o
+Gemini. O texto extraído vai para o cache de artefatos sob o hash do conteúdo e a versão do
+extrator ("texto_documento" em VERSOES_ARTEFATOS). Um índice (caminho, tamanho, mtime) ->
+hash evita reler o arquivo inteiro para calculá-lo: documentos inalterados (as 100+ sentenças
+modelo do /init-style) saem do cache em milissegundos.
+
+PDFs extraídos sem OCR (Tesseract indisponível, OCR_ATIVO=0) ficam numa entrada à parte, e um
+texto com páginas cujo OCR falhou não vai para o cache: a próxima extração com OCR funcionando
+não reaproveita páginas digitalizadas vazias.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .artifact_cache import ArtifactCache, sha256_arquivo
+from .atomic_write import escrever_atomico, escrever_json_atomico
+from .case_text_store import normalizar_quebras
+from .pdf_extractor import EstatisticasExtracao, ocr_disponivel
+from .tracing import span_atual
+
+EXTENSOES_SUPORTADAS = (".pdf", ".docx")
+TIPO_ARTEFATO = "texto_documento"
+# Índice de hashes por estado do arquivo, ao lado das entradas do cache
+DIRETORIO_ESTADOS = "estado_documentos"
+# Sufixo do hash de entrada de um PDF extraído sem OCR
+SUFIXO_SEM_OCR = "+sem_ocr"
+CACHE_DIR_PADRAO = Path(os.getenv(
+    "ARTIFACT_CACHE_DIR", Path(__file__).resolve().parent.parent / "storage" / "artifact_cache"
+))
+
+logger = logging.getLogger(__name__)
+
+
+def resolver_ocr(ocr: Optional[bool] = None) -> bool:
+    """Modo de OCR efetivo da extração (padrão: se o Tesseract estiver disponível)"""
+    return ocr_disponivel() if ocr is None else ocr
+
+
+def hash_entrada_extracao(hash_documento: str, caminho: Path, ocr: bool) -> str:
+    """Hash de entrada do texto extraído em cache: o de um PDF extraído sem OCR leva SUFIXO_SEM_OCR"""
+    if Path(caminho).suffix.lower() == ".pdf" and not ocr:
+        return hash_documento + SUFIXO_SEM_OCR
+    return hash_documento
+
+
+def extrair_texto_documento(caminho: Path, destino: Optional[Path] = None, cache_dir: Optional[Path] = None,
+                            ocr: Optional[bool] = None,
+                            estatisticas: Optional[EstatisticasExtracao] = None) -> str:
+    """
+    Extrai o texto de um PDF ou DOCX (sem cache do documento). Chamada bloqueante.
+
+    Args:
+        caminho: Documento de origem
+        destino: Arquivo de texto gravado atomicamente (opcional)
+        cache_dir: Cache de artefatos para o OCR das páginas digitalizadas
+        ocr: Aplica OCR às páginas digitalizadas (padrão: se o Tesseract estiver disponível)
+        estatisticas: Preenchido com o OCR aplicado ao PDF (páginas com falha)
+
+    Raises:
+        ValueError: Extensão não suportada
+    """
+    caminho = Path(caminho)
+    extensao = caminho.suffix.lower()
+    if extensao == ".pdf":
+        from .pdf_extractor import extrair_texto_pdf
+
+        return extrair_texto_pdf(caminho, destino, cache_dir=cache_dir, ocr=ocr, estatisticas=estatisticas)
+    if extensao == ".docx":
+        from docx import Document
+
+        documento = Document(str(caminho))
+        texto = "\n".join(paragrafo.text for paragrafo in documento.paragraphs if paragrafo.text.strip())
+        if destino:
+            escrever_atomico(Path(destino), texto)
+        return texto
+    raise ValueError(f"Tipo de documento não suportado: {caminho.suffix}")
+
+
+class DocumentExtractor:
+    """Extração com cache: hash do conteúdo + versão do extrator -> texto"""
+
+    def __init__(self, cache_dir: Optional[Path] = CACHE_DIR_PADRAO):
+        self.cache = ArtifactCache(Path(cache_dir)) if cache_dir else None
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def hash_documento(self, caminho: Path) -> str:
+        """SHA-256 do documento, recalculado só quando caminho, tamanho ou mtime mudam"""
+        caminho = Path(caminho).resolve()
+        estado = caminho.stat()
+        chave = (str(caminho), estado.st_size, estado.st_mtime_ns)
+        with self._lock:
+            if chave in self._hashes:
+                return self._hashes[chave]
+
+        registro_path = None
+        if self.cache:
+            registro_path = (self.cache.cache_dir / DIRETORIO_ESTADOS /
+                             f"{hashlib.sha256(str(caminho).encode('utf-8')).hexdigest()}.json")
+            try:
+                registro = json.loads(registro_path.read_text(encoding="utf-8"))
+                if (registro["tamanho"], registro["mtime_ns"]) == (estado.st_size, estado.st_mtime_ns):
+                    with self._lock:
+                        self._hashes[chave] = registro["sha256"]
+                    return registro["sha256"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+        hash_documento = sha256_arquivo(caminho)
+        with self._lock:
+            self._hashes[chave] = hash_documento
+        if registro_path:
+            try:
+                registro_path.parent.mkdir(parents=True, exist_ok=True)
+                escrever_json_atomico(registro_path, {
+                    "caminho": str(caminho), "tamanho": estado.st_size,
+                    "mtime_ns": estado.st_mtime_ns, "sha256": hash_documento,
+                })
+            except OSError as e:
+                logger.warning(f"⚠️ Não foi possível registrar o hash de {caminho.name}: {e}")
+        return hash_documento
+
+    def extrair(self, caminho: Path, ocr: Optional[bool] = None) -> str:
+        """
+        Texto do documento, do cache quando o mesmo conteúdo já foi extraído pela versão atual
+
+        Quebras de linha saem normalizadas (\\r\\n e \\r -> \\n), iguais nas duas origens.
+
+        Raises:
+            ValueError: Extensão não suportada
+        """
+        caminho = Path(caminho)
+        if caminho.suffix.lower() not in EXTENSOES_SUPORTADAS:
+            raise ValueError(f"Tipo de documento não suportado: {caminho.suffix}")
+        if not self.cache:
+            return normalizar_quebras(extrair_texto_documento(caminho, ocr=ocr))
+
+        ocr = resolver_ocr(ocr)
+        hash_entrada = hash_entrada_extracao(self.hash_documento(caminho), caminho, ocr)
+        texto = self.cache.ler_texto(TIPO_ARTEFATO, hash_entrada)
+        if texto is not None:
+            span_atual().definir(**{f"cache_{TIPO_ARTEFATO}": "hit"})
+            return texto
+
+        span_atual().definir(**{f"cache_{TIPO_ARTEFATO}": "miss"})
+        estatisticas = EstatisticasExtracao()
+        texto = normalizar_quebras(extrair_texto_documento(
+            caminho, cache_dir=self.cache.cache_dir, ocr=ocr, estatisticas=estatisticas
+        ))
+        if estatisticas.ocr_falhas:
+            logger.warning(f"⚠️ Texto de {caminho.name} não armazenado no cache: OCR falhou em "
+                           f"{len(estatisticas.ocr_falhas)} página(s)")
+            return texto
+        try:
+            self.cache.armazenar_texto(TIPO_ARTEFATO, hash_entrada, texto)
+        except OSError as e:
+            logger.warning(f"⚠️ Texto de {caminho.name} não armazenado no cache: {e}")
+        return texto
+
+
+_extrator_global: Optional[DocumentExtractor] = None
+_lock_global = threading.Lock()
+
+
+def get_document_extractor() -> DocumentExtractor:
+    """Extrator compartilhado pelo processo (cache em ARTIFACT_CACHE_DIR ou storage/artifact_cache)"""
+    global _extrator_global
+    with _lock_global:
+        if _extrator_global is None:
+            _extrator_global = DocumentExtractor()
+        return _extrator_global
@@ -9,31 +9,34 @@ from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 
+from .atomic_write import escrever_json_atomico
 from .instance_manager import InstanceManager
+from .tracing import rastrear, span_atual
+from .service_registry import obter_servico
 from .optimized_embedding_service import OptimizedEmbeddingService, EmbeddingResult
 from .semantic_chunker import SemanticChunker, SemanticChunk, ChunkType
 from .contextual_retriever import ContextualRetriever, QueryContext, QueryType, RetrievalResult
-import chromadb
-from chromadb.config import Settings
 
 class EnhancedRAGService:
     """RAG Service com otimizações semânticas e contextuais"""
     
-    def __init__(self, case_id: str):
+    def __init__(self, case_id: str, embedding_service: Optional[OptimizedEmbeddingService] = None):
         self.case_id = case_id
         self.logger = logging.getLogger(__name__)
         
-        # Componentes otimizados
+        # Componentes otimizados (modelos de embedding compartilhados pelo processo)
         self.instance_manager = InstanceManager()
-        self.embedding_service = OptimizedEmbeddingService()
+        self.embedding_service = embedding_service or obter_servico("embeddings")
         self.chunker = SemanticChunker(max_chunk_size=800, overlap_size=100)
         self.retriever = ContextualRetriever(self.embedding_service)
         
-        # Inicializar instância isolada
-        self.instance_info = self.instance_manager.create_isolated_instance(case_id)
+        # Instância isolada: reaproveitada se já existir (recriá-la apagaria o Chroma em uso por outro worker)
+        self.instance_info = self.instance_manager.get_or_create_instance(case_id)
         self.rag_path = Path(self.instance_info["directories"]["instance_root"])
         
         # ChromaDB isolado
+        import chromadb
+        from chromadb.config import Settings
         self.chroma_client = chromadb.PersistentClient(
             path=str(self.rag_path / "chroma_db"),
             settings=Settings(anonymized_telemetry=False)
@@ -106,7 +109,7 @@ class EnhancedRAGService:
         
         # Salvar em batch
         if all_chunks:
-            collection.add(
+            collection.upsert(
                 documents=all_chunks,
                 embeddings=all_embeddings,
                 metadatas=all_metadatas,
@@ -177,7 +180,7 @@ class EnhancedRAGService:
         
         # Salvar em batch
         if all_chunks:
-            collection.add(
+            collection.upsert(
                 documents=all_chunks,
                 embeddings=all_embeddings,
                 metadatas=all_metadatas,
@@ -218,7 +221,7 @@ class EnhancedRAGService:
                 "created_at": datetime.now().isoformat()
             }
             
-            collection.add(
+            collection.upsert(
                 documents=[chunk.content],
                 embeddings=[embedding_result.embedding.tolist()],
                 metadatas=[metadata],
@@ -227,6 +230,7 @@ class EnhancedRAGService:
         
         self.logger.info(f"Salvo contexto do diálogo etapa {dialogue_step}")
     
+    @rastrear("rag.query_knowledge")
     def query_knowledge(self, 
                        query: str, 
                        query_type: QueryType = None,
@@ -266,6 +270,10 @@ class EnhancedRAGService:
         
         # Diversificar resultados
         diversified_results = self.retriever.diversify_results(results, max_per_type=4)
+        span_atual().definir(
+            query_chars=len(query), fontes=len(sources), chunks_candidatos=len(all_chunks),
+            chunks_relevantes=len(results), resultados=len(diversified_results)
+        )
         
         # Preparar resposta
         response = {
@@ -407,8 +415,7 @@ class EnhancedRAGService:
             }
             
             backup_file = self.rag_path / "conhecimento_rag.json"
-            with open(backup_file, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, ensure_ascii=False, indent=2)
+            escrever_json_atomico(backup_file, backup_data)
                 
             self.logger.info("Backup do conhecimento salvo")
             
@@ -0,0 +1,161 @@
+"""
+Barramento de Eventos de Progresso por Caso
+Publica eventos de etapas do pipeline e das seções da sentença (de threads ou do event loop)
+e os entrega aos assinantes do stream SSE, com histórico para reconexão via Last-Event-ID
+
+Os eventos carregam o texto das seções e dos chunks gerados: o histórico de um caso expira
+EVENTOS_RETENCAO_S após o evento final do job (tempo para uma reconexão receber o fim), e
+só os EVENTOS_MAX_CASOS casos publicados mais recentemente são mantidos.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, AsyncIterator, Deque, Tuple
+
+# Eventos que encerram o stream do caso
+EVENTOS_FINAIS = {"job_concluido", "job_falhou"}
+
+MAX_HISTORICO_POR_CASO = 2000
+RETENCAO_APOS_FINAL_S = float(os.getenv("EVENTOS_RETENCAO_S", "600"))
+MAX_CASOS_COM_HISTORICO = int(os.getenv("EVENTOS_MAX_CASOS", "200"))
+
+
+class EventBus:
+    """Eventos em memória por caso: histórico limitado + filas dos assinantes ativos"""
+
+    def __init__(self, max_historico: int = MAX_HISTORICO_POR_CASO,
+                 retencao_apos_final_s: float = RETENCAO_APOS_FINAL_S,
+                 max_casos: int = MAX_CASOS_COM_HISTORICO):
+        self.logger = logging.getLogger(__name__)
+        self.max_historico = max_historico
+        self.retencao_apos_final_s = retencao_apos_final_s
+        self.max_casos = max_casos
+        self._lock = threading.Lock()
+        self._sequencia = 0
+        # Ordem de publicação mais recente por último (LRU)
+        self._historico: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._expira_em: Dict[str, float] = {}
+        self._assinantes: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def publicar(self, case_id: str, tipo: str, **dados) -> Dict[str, Any]:
+        """
+        Publica um evento do caso. Seguro para chamadas a partir de threads do executor.
+
+        Args:
+            case_id: ID do caso
+            tipo: Tipo do evento (ex.: etapa_iniciada, secao_concluida)
+            **dados: Conteúdo do evento (serializável em JSON)
+        """
+        with self._lock:
+            self._sequencia += 1
+            evento = {
+                "id": self._sequencia,
+                "case_id": case_id,
+                "tipo": tipo,
+                "timestamp": datetime.now().isoformat(),
+                "dados": dados
+            }
+            historico = self._historico.setdefault(case_id, deque(maxlen=self.max_historico))
+            historico.append(evento)
+            self._historico.move_to_end(case_id)
+            agora = time.monotonic()
+            if tipo in EVENTOS_FINAIS:
+                self._expira_em[case_id] = agora + self.retencao_apos_final_s
+            elif tipo == "job_iniciado":
+                self._expira_em.pop(case_id, None)
+            self._expurgar(agora)
+            assinantes = list(self._assinantes.get(case_id, []))
+
+        for loop, fila in assinantes:
+            try:
+                loop.call_soon_threadsafe(fila.put_nowait, evento)
+            except RuntimeError:
+                pass  # Loop do assinante já encerrado
+        return evento
+
+    def _expurgar(self, agora: float):
+        """Descarta históricos expirados e os menos recentes acima de max_casos (com o lock)"""
+        for case_id, expira_em in list(self._expira_em.items()):
+            if expira_em <= agora:
+                self._historico.pop(case_id, None)
+                del self._expira_em[case_id]
+        while len(self._historico) > self.max_casos:
+            case_id, _ = self._historico.popitem(last=False)
+            self._expira_em.pop(case_id, None)
+
+    def historico(self, case_id: str, desde_id: int = 0) -> List[Dict[str, Any]]:
+        """Eventos do caso com id maior que desde_id"""
+        with self._lock:
+            return [evento for evento in self._historico.get(case_id, ()) if evento["id"] > desde_id]
+
+    async def assinar(self, case_id: str, desde_id: int = 0,
+                      intervalo_heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Itera os eventos do caso: primeiro o histórico após desde_id, depois os novos.
+
+        Produz None a cada intervalo_heartbeat sem eventos (para keep-alive do SSE).
+        Encerra após um evento final (EVENTOS_FINAIS).
+        """
+        fila: asyncio.Queue = asyncio.Queue()
+        assinante = (asyncio.get_running_loop(), fila)
+        with self._lock:
+            pendentes = [evento for evento in self._historico.get(case_id, ()) if evento["id"] > desde_id]
+            self._assinantes.setdefault(case_id, []).append(assinante)
+
+        # Um evento final do histórico só encerra o stream se nenhum job foi iniciado depois dele
+        ultimo_inicio = max((i for i, evento in enumerate(pendentes) if evento["tipo"] == "job_iniciado"), default=-1)
+
+        ultimo_id = desde_id
+        try:
+            for indice, evento in enumerate(pendentes):
+                ultimo_id = evento["id"]
+                yield evento
+                if evento["tipo"] in EVENTOS_FINAIS and indice > ultimo_inicio:
+                    return
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=intervalo_heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if evento["id"] <= ultimo_id:
+                    continue  # Já entregue pelo histórico
+                ultimo_id = evento["id"]
+                yield evento
+                if evento["tipo"] in EVENTOS_FINAIS:
+                    return
+        finally:
+            with self._lock:
+                assinantes = self._assinantes.get(case_id, [])
+                if assinante in assinantes:
+                    assinantes.remove(assinante)
+                if not assinantes:
+                    self._assinantes.pop(case_id, None)
+
+    def limpar(self, case_id: str):
+        """Descarta o histórico do caso"""
+        with self._lock:
+            self._historico.pop(case_id, None)
+            self._expira_em.pop(case_id, None)
+
+
+_bus_global: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Retorna o barramento de eventos compartilhado pelo processo"""
+    global _bus_global
+    if _bus_global is None:
+        _bus_global = EventBus()
+    return _bus_global
+
+
+def publicar_evento(case_id: str, tipo: str, **dados) -> Dict[str, Any]:
+    """Atalho para get_event_bus().publicar(...)"""
+    return get_event_bus().publicar(case_id, tipo, **dados)
@@ -3,14 +3,34 @@ Módulo para processamento de processos jurídicos com Google Gemini
 Extrai informações estruturadas de processos trabalhistas usando prompting otimizado
 """
 
-import google.generativeai as genai
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Callable
+import contextvars
 import json
+import logging
 import os
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 import re
 
+from .admission_control import chamar_llm, estimar_tokens
+from .json_incremental import ParserJSONIncremental, parsear_json
+from .llm_response_cache import POLITICA_RENOVAR, RespostaEmCache, chamar_com_cache
+from .pje_segmenter import TIPO_SUMARIO, segmentar_processo
+from .tracing import rastrear, span_atual
+
+# Extração map-reduce de processos muito longos (GEMINI_EXTRACAO_MODO: auto | unico | map_reduce)
+MODO_EXTRACAO = os.getenv("GEMINI_EXTRACAO_MODO", "auto")
+MAP_REDUCE_LIMIAR_CARACTERES = int(os.getenv("GEMINI_MAP_REDUCE_LIMIAR", "200000"))
+FRAGMENTO_MAX_CARACTERES = int(os.getenv("GEMINI_FRAGMENTO_CARACTERES", "120000"))
+MAP_REDUCE_PARALELO = int(os.getenv("GEMINI_MAP_REDUCE_PARALELO", "4"))
+# Respostas JSON geradas em streaming e interpretadas incrementalmente
+STREAMING_JSON = os.getenv("GEMINI_STREAMING", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
 @dataclass
 class ParteProcesso:
     """Informações de uma parte do processo"""
@@ -92,42 +112,137 @@ class GeminiProcessor:
         if not api_key:
             raise ValueError("GOOGLE_API_KEY não encontrada nas variáveis de ambiente")
         
+        import google.generativeai as genai
+
         genai.configure(api_key=api_key)
         
         # GEMINI 1.5 PRO com MÁXIMA JANELA DE CONTEXTO (2M tokens)
         self.model = genai.GenerativeModel('gemini-1.5-pro')
         
         # Configurações otimizadas para processos jurídicos longos
-        self.generation_config = genai.GenerationConfig(
-            temperature=0.1,  # Baixa para precisão jurídica
-            top_p=0.95,
-            top_k=40,
-            max_output_tokens=8192,  # Aumentado para respostas mais completas
-            candidate_count=1
+        self.parametros_geracao = {
+            "temperature": 0.1,  # Baixa para precisão jurídica
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 8192,  # Aumentado para respostas mais completas
+            "candidate_count": 1
+        }
+        self.generation_config = genai.GenerationConfig(**self.parametros_geracao)
+    
+    def gerar_conteudo(self, prompt: str, cache_policy: Optional[str] = None,
+                       novo_receptor: Optional[Callable[[], Callable[[str], Any]]] = None):
+        """
+        generate_content sob o controle de admissão do processo (orçamento e fila compartilhados),
+        consultando antes o cache de respostas (cache_policy: usar | renovar | ignorar)
+
+        Com novo_receptor, a resposta é gerada em streaming e cada trecho é repassado assim que
+        chega ao receptor criado para a tentativa: uma nova tentativa após um 429 no meio do
+        stream começa num receptor novo, sem o texto parcial da anterior (uma resposta em cache
+        é repassada inteira). O retorno continua sendo a resposta completa.
+        """
+        if novo_receptor is None:
+            gerar = lambda: self.model.generate_content(prompt, generation_config=self.generation_config)
+        else:
+            # O stream é consumido dentro da admissão: a vaga fica ocupada até o último trecho
+            gerar = lambda: self._consumir_stream(
+                self.model.generate_content(prompt, generation_config=self.generation_config, stream=True),
+                novo_receptor()
+            )
+        resposta = chamar_com_cache(
+            "gemini", self.model.model_name, self.parametros_geracao, None, [{"role": "user", "content": prompt}],
+            lambda: chamar_llm(
+                "gemini", self.model.model_name, gerar,
+                tokens_estimados=estimar_tokens(prompt, saida_maxima=self.generation_config.max_output_tokens)
+            ),
+            lambda resposta: resposta.text,
+            cache_policy=cache_policy
         )
+        if novo_receptor and isinstance(resposta, RespostaEmCache):
+            novo_receptor()(resposta.text)
+        return resposta
     
-    def extrair_informacoes_processo(self, texto_processo: str) -> ProcessoEstruturado:
+    @staticmethod
+    def _consumir_stream(stream, ao_receber_trecho: Callable[[str], Any]):
+        """Repassa o texto de cada trecho; o stream consumido expõe .text e usage_metadata completos"""
+        for trecho in stream:
+            try:
+                texto = trecho.text
+            except ValueError:
+                continue  # Trecho sem partes de texto (ex.: o último, ao atingir max_output_tokens)
+            ao_receber_trecho(texto)
+        return stream
+    
+    def gerar_json(self, prompt: str, cache_policy: Optional[str] = None,
+                   ao_concluir_campo: Optional[Callable[[str, Any], None]] = None) -> Any:
+        """
+        Gera e interpreta uma resposta JSON, em streaming (GEMINI_STREAMING) com parser
+        incremental: cada campo do objeto raiz vai para ao_concluir_campo assim que se fecha, e
+        uma resposta truncada é reparada pela estrutura. Se a resposta veio do cache e não é um
+        JSON válido, gera de novo substituindo a entrada (renovar) em vez de repetir o mesmo erro.
+
+        Cada tentativa usa um parser novo; um campo emitido por um stream interrompido (429)
+        pode ser emitido de novo, com o valor da tentativa que concluiu.
+
+        Raises:
+            ValueError: Nenhum JSON válido, nem após gerar de novo uma resposta em cache
+        """
+        erro = None
+        for politica in (cache_policy, POLITICA_RENOVAR):
+            parsers: List[ParserJSONIncremental] = []
+
+            def novo_parser() -> Callable[[str], Any]:
+                parsers.append(ParserJSONIncremental(ao_concluir_campo))
+                return parsers[-1].alimentar
+
+            response = self.gerar_conteudo(
+                prompt, cache_policy=politica, novo_receptor=novo_parser if STREAMING_JSON else None
+            )
+            if not parsers:
+                novo_parser()(response.text)
+            parser = parsers[-1]
+            try:
+                resultado = parser.finalizar()
+            except ValueError as e:
+                if not isinstance(response, RespostaEmCache):
+                    raise
+                erro = e
+                continue
+            if not parser.concluido:
+                logger.warning("⚠️ Resposta JSON do Gemini truncada: reparada pela estrutura")
+                span_atual().definir(json_reparado=True)
+            return resultado
+        raise erro
+    
+    @rastrear("gemini.extrair_informacoes_processo")
+    def extrair_informacoes_processo(self, texto_processo: str, modo: Optional[str] = None,
+                                     cache_policy: Optional[str] = None,
+                                     ao_concluir_campo: Optional[Callable[[str, Any], None]] = None
+                                     ) -> ProcessoEstruturado:
         """
         Extrai informações estruturadas do texto do processo
         
         Args:
             texto_processo: Texto completo do processo judicial
+            modo: "unico" (uma chamada), "map_reduce" (fragmentos por peça em paralelo) ou
+                "auto" (map-reduce acima de MAP_REDUCE_LIMIAR_CARACTERES); padrão: GEMINI_EXTRACAO_MODO
+            cache_policy: Política do cache de respostas (usar | renovar | ignorar)
+            ao_concluir_campo: Recebe (campo, valor) de cada campo do JSON assim que se fecha no
+                stream (partes antes de pedidos, ...); no map-reduce, os campos já mesclados
             
         Returns:
             ProcessoEstruturado: Informações organizadas do processo
         """
+        modo = modo or MODO_EXTRACAO
+        if modo == "map_reduce" or (modo == "auto" and len(texto_processo) > MAP_REDUCE_LIMIAR_CARACTERES):
+            return self._extrair_map_reduce(texto_processo, cache_policy, ao_concluir_campo)
         
         # Prompt estruturado para extração de informações
         prompt = self._criar_prompt_extracao(texto_processo)
+        span_atual().definir(prompt_chars=len(prompt), modo="unico")
         
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
-            
-            # Parse da resposta JSON
-            resultado_json = self._extrair_json_resposta(response.text)
+            # Geração e parse da resposta JSON
+            resultado_json = self.gerar_json(prompt, cache_policy=cache_policy, ao_concluir_campo=ao_concluir_campo)
             
             # Converter para objeto estruturado
             return self._converter_para_processo_estruturado(resultado_json)
@@ -135,8 +250,59 @@ class GeminiProcessor:
         except Exception as e:
             raise Exception(f"Erro ao processar com Gemini: {str(e)}")
     
-    def _criar_prompt_extracao(self, texto_processo: str) -> str:
-        """Cria prompt estruturado para extração de informações"""
+    def _extrair_map_reduce(self, texto_processo: str, cache_policy: Optional[str] = None,
+                            ao_concluir_campo: Optional[Callable[[str, Any], None]] = None) -> ProcessoEstruturado:
+        """
+        Map: cada fragmento (peças consecutivas até FRAGMENTO_MAX_CARACTERES) é extraído numa
+        chamada própria, até MAP_REDUCE_PARALELO em paralelo. Reduce: mesclar_extracoes na ordem
+        dos autos. Se algum fragmento falhar, a extração falha depois de todos concluírem: um
+        resultado parcial não pode ser gravado no cache de artefatos nem marcar a etapa como
+        concluída. Os fragmentos bem-sucedidos ficam no cache de respostas, e uma nova tentativa
+        só paga pelos que falharam.
+        """
+        inicio = time.perf_counter()
+        fragmentos = dividir_em_fragmentos(texto_processo)
+        total = len(fragmentos)
+
+        def extrair_fragmento(posicao: int, trecho: str, pecas: List[str]) -> Dict[str, Any]:
+            prompt = self._criar_prompt_extracao(trecho, fragmento=(posicao + 1, total, pecas))
+            return self.gerar_json(prompt, cache_policy=cache_policy)
+
+        parciais, falhas = [], []
+        with ThreadPoolExecutor(max_workers=max(1, min(MAP_REDUCE_PARALELO, total)),
+                                thread_name_prefix="gemini-map") as pool:
+            # Cada fragmento herda o contexto da chamada (caso/prioridade da admissão, span atual)
+            futuros = [
+                pool.submit(contextvars.copy_context().run, extrair_fragmento, posicao, trecho, pecas)
+                for posicao, (trecho, pecas) in enumerate(fragmentos)
+            ]
+            for posicao, futuro in enumerate(futuros):
+                try:
+                    parciais.append(futuro.result())
+                except Exception as e:
+                    falhas.append(posicao + 1)
+                    logger.warning(f"⚠️ Fragmento {posicao + 1}/{total} da extração falhou: {e}")
+
+        span_atual().definir(modo="map_reduce", fragmentos=total, fragmentos_falhos=len(falhas),
+                             caracteres=len(texto_processo))
+        if falhas:
+            raise Exception(
+                f"Erro ao processar com Gemini: {len(falhas)} de {total} fragmentos falharam "
+                f"({', '.join(map(str, falhas))})"
+            )
+        logger.info(
+            f"🧩 Extração map-reduce: {total} fragmentos "
+            f"em {time.perf_counter() - inicio:.1f}s"
+        )
+        mesclado = mesclar_extracoes(parciais)
+        if ao_concluir_campo:
+            for campo, valor in mesclado.items():
+                ao_concluir_campo(campo, valor)
+        return self._converter_para_processo_estruturado(mesclado)
+    
+    def _criar_prompt_extracao(self, texto_processo: str,
+                               fragmento: Optional[Tuple[int, int, List[str]]] = None) -> str:
+        """Cria prompt estruturado para extração de informações (de todo o processo ou de um fragmento)"""
         
         prompt_base = """
 TAREFA: Extrair informações estruturadas de um processo trabalhista brasileiro.
@@ -150,6 +316,13 @@ REGRAS IMPORTANTES:
 
 TEXTO DO PROCESSO:
 """
+        if fragmento:
+            posicao, total, pecas = fragmento
+            prompt_base = prompt_base.replace("TEXTO DO PROCESSO:", f"""ATENÇÃO: este é o TRECHO {posicao} de {total} do processo ({'; '.join(pecas[:12])}{'; ...' if len(pecas) > 12 else ''}).
+- Extraia APENAS o que consta neste trecho; os demais trechos são extraídos separadamente
+- Campos sem informação neste trecho ficam null e listas ficam vazias
+
+TEXTO DO TRECHO:""")
         
         prompt_instrucoes = """
 
@@ -250,43 +423,11 @@ Responda APENAS com o JSON estruturado, sem texto adicional.
         return prompt_base + texto_processo + prompt_instrucoes
 
     def _extrair_json_resposta(self, resposta_texto: str) -> Dict[str, Any]:
-        """Extrai JSON da resposta do Gemini"""
-        
-        # Procurar por JSON na resposta
-        json_match = re.search(r'```json\s*(.*?)\s*```', resposta_texto, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            # Tentar encontrar JSON sem marcadores
-            json_str = resposta_texto.strip()
-        
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
-            # Fallback: tentar limpeza adicional
-            json_limpo = self._limpar_json(json_str)
-            try:
-                return json.loads(json_limpo)
-            except json.JSONDecodeError:
-                raise Exception(f"Não foi possível extrair JSON válido da resposta: {str(e)}")
+        """Extrai JSON da resposta do Gemini (cercas de markdown, comentários e truncamento tratados pelo parser)"""
+        return parsear_json(resposta_texto)
     
-    def _limpar_json(self, json_str: str) -> str:
-        """Limpa string JSON para melhorar parsing"""
-        
-        # Remover comentários e texto extra
-        json_str = re.sub(r'//.*?$', '', json_str, flags=re.MULTILINE)
-        json_str = re.sub(r'/\*.*?\*/', '', json_str, flags=re.DOTALL)
-        
-        # Encontrar início e fim do objeto JSON
-        inicio = json_str.find('{')
-        fim = json_str.rfind('}')
-        
-        if inicio != -1 and fim != -1:
-            return json_str[inicio:fim+1]
-        
-        return json_str
-    
-    def _converter_para_processo_estruturado(self, dados_json: Dict[str, Any]) -> ProcessoEstruturado:
+    @staticmethod
+    def _converter_para_processo_estruturado(dados_json: Dict[str, Any]) -> ProcessoEstruturado:
         """Converte dados JSON para objeto ProcessoEstruturado"""
         
         # Converter partes
@@ -371,6 +512,7 @@ Responda APENAS com o JSON estruturado, sem texto adicional.
             custas_processuais=dados_json.get('custas_processuais')
         )
     
+    @rastrear("gemini.gerar_termos_jurisprudencia")
     def gerar_termos_jurisprudencia(self, processo: ProcessoEstruturado) -> List[str]:
         """
         Gera termos de busca para jurisprudência com base no processo
@@ -403,10 +545,7 @@ Exemplo: "justa causa configuração", "dano moral trabalhista", "horas extras s
 """
         
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config
-            )
+            response = self.gerar_conteudo(prompt)
             
             termos_texto = response.text.strip()
             # Dividir por vírgula e limpar
@@ -424,6 +563,129 @@ Exemplo: "justa causa configuração", "dano moral trabalhista", "horas extras s
             
             return termos_fallback[:5]
 
+def dividir_em_fragmentos(texto_processo: str, max_caracteres: Optional[int] = None) -> List[Tuple[str, List[str]]]:
+    """
+    Divide o processo em fragmentos de peças consecutivas (índice do PJe) com até max_caracteres
+    (padrão: FRAGMENTO_MAX_CARACTERES)
+
+    Peças maiores que o limite são cortadas na última página (ou quebra de linha) antes dele;
+    o SUMÁRIO fica de fora. Sem marcadores do PJe, o texto é cortado em quebras de linha.
+
+    Returns:
+        Lista de (texto do fragmento, rótulos das peças), na ordem dos autos
+    """
+    max_caracteres = max_caracteres or FRAGMENTO_MAX_CARACTERES
+    indice = segmentar_processo(texto_processo)
+    inicios_paginas = [inicio for inicio, _ in indice.paginas]
+    unidades = []
+    for peca in indice.pecas:
+        if peca.tipo == TIPO_SUMARIO:
+            continue
+        inicio = peca.inicio
+        while peca.fim - inicio > max_caracteres:
+            limite = inicio + max_caracteres
+            corte = max((p for p in inicios_paginas if inicio < p <= limite), default=None)
+            corte = corte or (texto_processo.rfind("\n", inicio + 1, limite) + 1) or limite
+            unidades.append((inicio, corte, peca.rotulo))
+            inicio = corte
+        unidades.append((inicio, peca.fim, peca.rotulo))
+
+    grupos: List[List[Tuple[int, int, str]]] = []
+    for unidade in unidades:
+        if grupos and unidade[1] - grupos[-1][0][0] <= max_caracteres:
+            grupos[-1].append(unidade)
+        else:
+            grupos.append([unidade])
+    return [
+        (texto_processo[grupo[0][0]:grupo[-1][1]], list(dict.fromkeys(rotulo for _, _, rotulo in grupo)))
+        for grupo in grupos
+    ]
+
+
+# Reduce: chave de deduplicação de cada lista de objetos, campos em que vale o último valor
+# dos autos (decisão, salário final) e listas de textos unidas sem repetição
+CHAVES_DEDUPLICACAO = {
+    "partes": ("nome",),
+    "pedidos": ("categoria", "descricao"),
+    "fatos_relevantes": ("descricao",),
+    "testemunhas": ("nome",),
+    "normas_coletivas": ("sindicato", "vigencia"),
+}
+CAMPOS_ULTIMO_VALOR = ("salario_final", "decisao_final", "fundamentacao_resumida", "honorarios_fixados",
+                       "custas_processuais")
+
+
+def _normalizar(valor: Any) -> str:
+    """Texto para comparação: sem acentos, caixa e pontuação"""
+    texto = valor if isinstance(valor, str) else json.dumps(valor, sort_keys=True, ensure_ascii=False)
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii").casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", texto).split())
+
+
+def _vazio(valor: Any) -> bool:
+    return valor is None or valor == "" or valor == [] or valor == {}
+
+
+def _unir(atual: List[Any], novos: List[Any]) -> List[Any]:
+    vistos = {_normalizar(item) for item in atual}
+    resultado = list(atual)
+    for item in novos:
+        chave = _normalizar(item)
+        if chave and chave not in vistos:
+            vistos.add(chave)
+            resultado.append(item)
+    return resultado
+
+
+def _completar(base: Dict[str, Any], novo: Dict[str, Any]):
+    """Preenche os campos vazios do item já extraído e une listas e dicts"""
+    for campo, valor in novo.items():
+        atual = base.get(campo)
+        if _vazio(atual):
+            base[campo] = valor
+        elif isinstance(atual, list) and isinstance(valor, list):
+            base[campo] = _unir(atual, valor)
+        elif isinstance(atual, dict) and isinstance(valor, dict):
+            base[campo] = {**valor, **atual}
+
+
+def mesclar_extracoes(parciais: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Mescla as extrações dos fragmentos (na ordem dos autos) de forma determinística
+
+    Listas de objetos são deduplicadas pela chave normalizada (o primeiro item é completado
+    pelos seguintes); escalares ficam com o primeiro valor não vazio, exceto CAMPOS_ULTIMO_VALOR.
+    """
+    resultado: Dict[str, Any] = {}
+    indices: Dict[str, Dict[Tuple[str, ...], Dict[str, Any]]] = {campo: {} for campo in CHAVES_DEDUPLICACAO}
+    for parcial in parciais:
+        for campo, valor in parcial.items():
+            if campo in CHAVES_DEDUPLICACAO:
+                itens = resultado.setdefault(campo, [])
+                for item in valor if isinstance(valor, list) else []:
+                    if not isinstance(item, dict):
+                        continue
+                    chave = tuple(_normalizar(item.get(nome) or "") for nome in CHAVES_DEDUPLICACAO[campo])
+                    if not any(chave):
+                        continue
+                    if chave in indices[campo]:
+                        _completar(indices[campo][chave], item)
+                    else:
+                        indices[campo][chave] = dict(item)
+                        itens.append(indices[campo][chave])
+            elif isinstance(valor, list):
+                resultado[campo] = _unir(resultado.get(campo) or [], valor)
+            elif not _vazio(valor) and (campo in CAMPOS_ULTIMO_VALOR or _vazio(resultado.get(campo))):
+                resultado[campo] = valor
+            else:
+                resultado.setdefault(campo, None)
+    return resultado
+
+
+def processo_estruturado_de_dict(dados_json: Dict[str, Any]) -> ProcessoEstruturado:
+    """Reconstrói ProcessoEstruturado a partir de um dict (ex.: dataclasses.asdict salvo em cache)"""
+    return GeminiProcessor._converter_para_processo_estruturado(dados_json)
+
 # Função de conveniência para uso direto
 def processar_arquivo_processo(arquivo_path: str) -> ProcessoEstruturado:
     """
@@ -438,22 +700,12 @@ def processar_arquivo_processo(arquivo_path: str) -> ProcessoEstruturado:
     
     # Importar função de extração de texto
     from pathlib import Path
+    from .document_extractor import get_document_extractor
     
     arquivo = Path(arquivo_path)
     
-    # Extrair texto do arquivo
-    if arquivo.suffix.lower() == '.docx':
-        from docx import Document
-        doc = Document(str(arquivo))
-        texto_completo = '\n'.join([par.text for par in doc.paragraphs if par.text.strip()])
-    else:
-        # Para PDFs, usar PyMuPDF
-        import fitz
-        doc = fitz.open(str(arquivo))
-        texto_completo = ""
-        for page in doc:
-            texto_completo += page.get_text("text") + "\n"
-        doc.close()
+    # Extrair texto do arquivo (PDF ou DOCX, com cache de extração)
+    texto_completo = get_document_extractor().extrair(arquivo)
     
     if len(texto_completo) < 100:
         raise ValueError("Arquivo muito pequeno ou não foi possível extrair texto")
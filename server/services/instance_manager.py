@@ -11,8 +11,11 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import logging
 from uuid import uuid4
-import chromadb
-from chromadb.config import Settings
+
+from .artifact_cache import vincular_arquivo
+from .atomic_write import escrever_atomico, escrever_json_atomico
+from .case_catalog import get_case_catalog, STATUS_INSTANCIA_ATIVA, STATUS_INSTANCIA_REMOVIDA
+from .case_lock import lock_caso, LockIndisponivel
 
 class InstanceManager:
     """Gerencia instâncias isoladas por processo"""
@@ -25,6 +28,9 @@ class InstanceManager:
         
         # Criar estrutura base
         self._initialize_storage_structure()
+        
+        # Catálogo indexado das instâncias (evita glob + leitura de todos os instance_metadata.json)
+        self.catalogo = get_case_catalog(self.base_storage)
     
     def _initialize_storage_structure(self):
         """Inicializa estrutura de storage"""
@@ -122,26 +128,15 @@ class InstanceManager:
         }
         
         # Salvar templates no master
-        (self.template_master / "estrutura_sentenca.json").write_text(
-            json.dumps(estrutura_sentenca, indent=2, ensure_ascii=False),
-            encoding='utf-8'
-        )
-        
-        (self.template_master / "estilo_juiza.json").write_text(
-            json.dumps(estilo_juiza, indent=2, ensure_ascii=False),
-            encoding='utf-8'
-        )
-        
-        (self.template_master / "conhecimento_base.json").write_text(
-            json.dumps(conhecimento_base, indent=2, ensure_ascii=False),
-            encoding='utf-8'
-        )
+        escrever_json_atomico(self.template_master / "estrutura_sentenca.json", estrutura_sentenca)
+        escrever_json_atomico(self.template_master / "estilo_juiza.json", estilo_juiza)
+        escrever_json_atomico(self.template_master / "conhecimento_base.json", conhecimento_base)
         
         self.logger.info("📝 Templates master criados")
     
     def create_isolated_instance(self, case_id: str) -> Dict[str, Any]:
         """
-        Cria instância completamente isolada para um processo
+        Cria instância completamente isolada para um processo (recria se já existir)
         
         Args:
             case_id: ID único do caso
@@ -150,6 +145,19 @@ class InstanceManager:
             Dict com informações da instância criada
         """
         
+        # Lock do caso entre processos: outro worker pode estar gravando no Chroma desta instância
+        with lock_caso(self.base_storage, case_id):
+            return self._create_instance(case_id)
+    
+    def get_or_create_instance(self, case_id: str) -> Dict[str, Any]:
+        """Retorna a instância existente do caso, criando-a apenas se ainda não existir"""
+        
+        with lock_caso(self.base_storage, case_id):
+            if (self.rag_storage / f"processo_{case_id}" / "instance_metadata.json").exists():
+                return self.get_instance_info(case_id)
+            return self._create_instance(case_id)
+    
+    def _create_instance(self, case_id: str) -> Dict[str, Any]:
         try:
             # Criar namespace da instância
             instance_dir = self.rag_storage / f"processo_{case_id}"
@@ -193,10 +201,8 @@ class InstanceManager:
             }
             
             # Salvar metadados
-            (instance_dir / "instance_metadata.json").write_text(
-                json.dumps(instance_metadata, indent=2, ensure_ascii=False),
-                encoding='utf-8'
-            )
+            escrever_json_atomico(instance_dir / "instance_metadata.json", instance_metadata)
+            self.catalogo.registrar_instancia_rag(case_id, instance_metadata)
             
             self.logger.info(f"🔒 [{case_id}] Instância isolada criada: {instance_dir}")
             return instance_metadata
@@ -206,22 +212,23 @@ class InstanceManager:
             raise Exception(f"Falha na criação da instância: {str(e)}")
     
     def _copy_master_template_to_instance(self, instance_dir: Path):
-        """Copia template master para instância local"""
+        """Vincula o template master à instância local"""
         
         estilo_dir = instance_dir / "estilo_juiza"
         
-        # Copiar todos os arquivos do template master
+        # Vincular (hardlink) os arquivos do template master: imutáveis, não precisam de cópia por instância
         for template_file in self.template_master.glob("*.json"):
             if template_file.name != "initialized.flag":
-                shutil.copy2(template_file, estilo_dir / template_file.name)
+                vincular_arquivo(template_file, estilo_dir / template_file.name)
         
         # Criar timestamp de cópia
-        (estilo_dir / "copied_at.txt").write_text(
-            datetime.now().isoformat(), encoding='utf-8'
-        )
+        escrever_atomico(estilo_dir / "copied_at.txt", datetime.now().isoformat(), fsync=False)
     
     def _create_isolated_chromadb(self, case_id: str, instance_dir: Path):
         """Cria ChromaDB isolado para a instância"""
+        import chromadb
+        from chromadb.config import Settings
+
         
         chroma_dir = instance_dir / "chroma_db"
         chroma_dir.mkdir(exist_ok=True)
@@ -261,16 +268,17 @@ class InstanceManager:
             "created_at": datetime.now().isoformat()
         }
         
-        (instance_dir / "chroma_config.json").write_text(
-            json.dumps(chroma_config, indent=2, ensure_ascii=False),
-            encoding='utf-8'
-        )
+        escrever_json_atomico(instance_dir / "chroma_config.json", chroma_config)
         
         self.logger.info(f"🗃️ [{case_id}] ChromaDB isolado criado")
     
     def get_instance_info(self, case_id: str) -> Dict[str, Any]:
         """Recupera informações de uma instância existente"""
         
+        metadata = self.catalogo.obter_instancia_rag(case_id)
+        if metadata and metadata.get("status") == STATUS_INSTANCIA_ATIVA:
+            return metadata
+        
         instance_dir = self.rag_storage / f"processo_{case_id}"
         
         if not instance_dir.exists():
@@ -283,21 +291,9 @@ class InstanceManager:
         return json.loads(metadata_file.read_text(encoding='utf-8'))
     
     def list_active_instances(self) -> List[Dict[str, Any]]:
-        """Lista todas as instâncias ativas"""
-        
-        instances = []
-        
-        for instance_dir in self.rag_storage.glob("processo_*"):
-            if instance_dir.is_dir():
-                metadata_file = instance_dir / "instance_metadata.json"
-                if metadata_file.exists():
-                    try:
-                        metadata = json.loads(metadata_file.read_text(encoding='utf-8'))
-                        instances.append(metadata)
-                    except Exception as e:
-                        self.logger.warning(f"Erro ao ler metadados de {instance_dir}: {e}")
+        """Lista todas as instâncias ativas (consulta indexada no catálogo)"""
         
-        return instances
+        return self.catalogo.listar_instancias_rag(STATUS_INSTANCIA_ATIVA)
     
     def cleanup_instance(self, case_id: str, force: bool = False):
         """Remove instância isolada (cleanup)"""
@@ -323,10 +319,14 @@ class InstanceManager:
             # Backup antes de remover (opcional)
             backup_dir = self.rag_storage / "cleanup_backup" / f"processo_{case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             backup_dir.parent.mkdir(exist_ok=True)
-            shutil.move(str(instance_dir), str(backup_dir))
+            with lock_caso(self.base_storage, case_id, timeout=0):
+                shutil.move(str(instance_dir), str(backup_dir))
+                self.catalogo.atualizar_status_instancia(case_id, STATUS_INSTANCIA_REMOVIDA)
             
             self.logger.info(f"🧹 [{case_id}] Instância movida para backup: {backup_dir}")
             
+        except LockIndisponivel:
+            self.logger.warning(f"⚠️ [{case_id}] Instância em uso por outro processo, pulando cleanup")
         except Exception as e:
             self.logger.error(f"❌ [{case_id}] Erro no cleanup: {str(e)}")
     
@@ -4,23 +4,34 @@ Implementa o prompt base estruturado em 3 etapas com Claude-Gemini
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from datetime import datetime
 import json
-import time
-import random
 try:
     import numpy as np
 except ImportError:
     np = None
 
-from .claude_service import ClaudeService
+from .claude_service import ClaudeService, criar_mensagem_com_cache
 from .gemini_processor import GeminiProcessor
 from .enhanced_rag_service import EnhancedRAGService
 from .jurisprudence_analyzer import JurisprudenceAnalyzer
 from .evidence_analyzer import EvidenceAnalyzer
 from .enhanced_prompt_generator import EnhancedPromptGenerator
 from .sectorial_sentence_generator import SectorialSentenceGenerator
+from .service_registry import obter_servico
+from .pipeline_manifest import PipelineManifest, hash_conteudo
+from .event_bus import publicar_evento
+from .partial_artifact import ArtefatoParcial, STATUS_INTERROMPIDO
+from .metrics import Histograma, ETAPA_DIALOGO_DURACAO, SECAO_DURACAO
+from .tracing import span
+from .admission_control import estimar_tokens
+from .pje_segmenter import PECAS_ESSENCIAIS, carregar_indice
+from .case_text_store import get_case_text_store
+
+# Incrementar ao alterar prompts ou o fluxo do diálogo, invalidando checkpoints anteriores
+VERSAO_DIALOGO = "dialogo-v1"
 
 class IntelligentDialogueService:
     """
@@ -28,18 +39,26 @@ class IntelligentDialogueService:
     Segue o prompt base estruturado em 3 etapas
     """
     
-    def __init__(self, case_id: str):
+    def __init__(self, case_id: str, case_dir: Optional[Path] = None, cache_policy: Optional[str] = None):
         self.case_id = case_id
+        self.case_dir = Path(case_dir) if case_dir else Path(__file__).parent.parent / "storage" / case_id
         self.logger = logging.getLogger(__name__)
+        # Política do cache de respostas dos LLMs em todas as chamadas do diálogo
+        # (usar | renovar | ignorar; padrão: LLM_CACHE_POLITICA)
+        self.cache_policy = cache_policy
         
-        # Serviços especializados
-        self.claude = ClaudeService()
-        self.gemini = GeminiProcessor()
+        # Checkpoints para retomar o diálogo do primeiro item ausente
+        self.manifest = PipelineManifest(self.case_dir)
+        self._hash_entradas = ""
+        
+        # Serviços especializados (clientes compartilhados pelo processo)
+        self.claude: ClaudeService = obter_servico("claude")
+        self.gemini: GeminiProcessor = obter_servico("gemini")
         self.rag = EnhancedRAGService(case_id)
         self.jurisprudence = JurisprudenceAnalyzer()
         self.evidence = EvidenceAnalyzer()
         self.prompt_generator = EnhancedPromptGenerator()
-        self.sectorial_generator = SectorialSentenceGenerator(case_id)
+        self.sectorial_generator = SectorialSentenceGenerator(case_id, cache_policy=cache_policy)
         
         # Contexto do diálogo
         self.dialogue_context = {
@@ -67,25 +86,50 @@ class IntelligentDialogueService:
         
         self.logger.info(f"[{self.case_id}] 🎯 INICIANDO DIÁLOGO INTELIGENTE ESTRUTURADO")
         
+        # Todos os checkpoints do diálogo derivam do hash das entradas
+        self._hash_entradas = hash_conteudo(VERSAO_DIALOGO, texto_processo, transcricao_audiencia or "")
+        
         try:
             # ETAPA 1: Resumo Sistematizado 
-            etapa1_resultado = self._executar_etapa_1_resumo_sistematizado(texto_processo)
+            etapa1_resultado = self._checkpoint(
+                "dialogo:ETAPA_1", hash_conteudo(self._hash_entradas),
+                lambda: self._executar_etapa_1_resumo_sistematizado(texto_processo),
+                cronometro=(ETAPA_DIALOGO_DURACAO, {"etapa": "ETAPA_1"})
+            )
+            self.dialogue_context["etapa_atual"] = 1
+            self.dialogue_context["resumo_processo"] = etapa1_resultado
             self._salvar_contexto_dialogo("ETAPA_1", etapa1_resultado)
+            self._publicar_etapa_dialogo("ETAPA_1", etapa1_resultado)
             
             # ETAPA 2: Análise da Prova Oral
             etapa2_resultado = None
             if transcricao_audiencia:
-                etapa2_resultado = self._executar_etapa_2_analise_prova_oral(
-                    transcricao_audiencia, etapa1_resultado
+                etapa2_resultado = self._checkpoint(
+                    "dialogo:ETAPA_2", hash_conteudo(self._hash_entradas, etapa1_resultado["conteudo_completo"]),
+                    lambda: self._executar_etapa_2_analise_prova_oral(transcricao_audiencia, etapa1_resultado),
+                    cronometro=(ETAPA_DIALOGO_DURACAO, {"etapa": "ETAPA_2"})
                 )
+                self.dialogue_context["etapa_atual"] = 2
+                self.dialogue_context["analise_prova_oral"] = etapa2_resultado
                 self._salvar_contexto_dialogo("ETAPA_2", etapa2_resultado)
+                self._publicar_etapa_dialogo("ETAPA_2", etapa2_resultado)
             
             # ETAPA 3: Fundamentação Guiada APRIMORADA
             # TEMPORÁRIO: Usar método anterior até corrigir problemas
-            etapa3_resultado = self._executar_etapa_3_fundamentacao_guiada(
-                etapa1_resultado, etapa2_resultado
+            etapa3_resultado = self._checkpoint(
+                "dialogo:ETAPA_3",
+                hash_conteudo(
+                    self._hash_entradas,
+                    etapa1_resultado["conteudo_completo"],
+                    etapa2_resultado["conteudo_completo"] if etapa2_resultado else ""
+                ),
+                lambda: self._executar_etapa_3_fundamentacao_guiada(etapa1_resultado, etapa2_resultado),
+                cronometro=(ETAPA_DIALOGO_DURACAO, {"etapa": "ETAPA_3"})
             )
+            self.dialogue_context["etapa_atual"] = 3
+            self.dialogue_context["fundamentacao_guiada"] = etapa3_resultado
             self._salvar_contexto_dialogo("ETAPA_3", etapa3_resultado)
+            self._publicar_etapa_dialogo("ETAPA_3", etapa3_resultado)
             
             # Resultado final estruturado
             resultado_completo = {
@@ -258,10 +302,8 @@ Execute a análise seguindo EXATAMENTE o formato especificado acima.
 """
         
         # Gemini executa análise estruturada
-        response = self.gemini.model.generate_content(
-            prompt_completo,
-            generation_config=self.gemini.generation_config
-        )
+        with span("gemini.generate_content", prompt_chars=len(prompt_completo)):
+            response = self.gemini.gerar_conteudo(prompt_completo, cache_policy=self.cache_policy)
         
         resultado_etapa_1 = {
             "etapa": "ETAPA_1_RESUMO_SISTEMATIZADO",
@@ -495,16 +537,21 @@ Nada mais.
 • **Estilo da juíza**: Use conectores sofisticados, análise minuciosa de provas
 """
         
-        # Recuperar conhecimento específico para fundamentação completa
-        conhecimento_fundamentacao = self.rag.query_knowledge(
-            query="fundamentação jurídica dispositivos legais CLT precedentes TST análise probatória depoimentos",
-            sources=["estilo_juiza", "caso_atual", "dialogo_contexto"],
-            top_k=15
-        )
-        
         # Preparar contexto das etapas anteriores
         resumo_processo = contexto_etapa_1.get('conteudo_completo', '')
         prova_oral = contexto_etapa_2.get('conteudo_completo', '') if contexto_etapa_2 else "Não foi realizada análise de prova oral."
+        hash_etapa_3 = hash_conteudo(self._hash_entradas, resumo_processo, prova_oral)
+        
+        # Recuperar conhecimento específico para fundamentação completa
+        # (checkpoint: a retomada reutiliza o mesmo contexto e preserva os checkpoints das seções)
+        conhecimento_fundamentacao = self._checkpoint(
+            "dialogo:ETAPA_3:conhecimento", hash_etapa_3,
+            lambda: self._convert_to_serializable(self.rag.query_knowledge(
+                query="fundamentação jurídica dispositivos legais CLT precedentes TST análise probatória depoimentos",
+                sources=["estilo_juiza", "caso_atual", "dialogo_contexto"],
+                top_k=15
+            ))
+        )
         
         # DIÁLOGO INTELIGENTE: Claude faz perguntas específicas para Gemini
         self.logger.info(f"[{self.case_id}] 🤝 INICIANDO DIÁLOGO CLAUDE ↔ GEMINI")
@@ -540,14 +587,15 @@ PERGUNTA 5: [pergunta específica]
 """
         
         # Claude gera as perguntas
-        response_claude_questoes = self._claude_request(
-            system=self.claude.system_prompt,
-            user=prompt_claude_questoes,
-            max_tokens=2000,
-            temperature=0.1
+        questoes_claude = self._checkpoint(
+            "dialogo:ETAPA_3:questoes", hash_conteudo(hash_etapa_3, prompt_claude_questoes),
+            lambda: self._claude_request(
+                system=self.claude.system_prompt,
+                user=prompt_claude_questoes,
+                max_tokens=2000,
+                temperature=0.1
+            ).content[0].text
         )
-        
-        questoes_claude = response_claude_questoes.content[0].text
         self.logger.info(f"[{self.case_id}] ❓ Claude gerou 5 questões específicas")
         
         # FASE 2: Gemini responde às perguntas específicas do Claude
@@ -561,6 +609,9 @@ O Juiz responsável pelo caso fez as seguintes perguntas específicas que você
 TEXTO COMPLETO DO PROCESSO PARA ANÁLISE:
 {resumo_processo[:20000] + '...' if len(resumo_processo) > 20000 else resumo_processo}
 
+ÍNDICE DE PEÇAS DOS AUTOS (tipo, ID e folhas):
+{self._indice_pecas_processo()}
+
 TEXTO ORIGINAL DO PROCESSO (para extração precisa):
 {self._recuperar_texto_original_processo()}
 
@@ -587,12 +638,10 @@ RESPOSTA 8: [procedimentos detalhados conforme prova oral]
 """
         
         # Gemini responde às perguntas específicas
-        gemini_response = self.gemini.model.generate_content(
-            prompt_gemini_respostas,
-            generation_config=self.gemini.generation_config
+        respostas_gemini = self._checkpoint(
+            "dialogo:ETAPA_3:respostas", hash_conteudo(hash_etapa_3, prompt_gemini_respostas),
+            lambda: self._gemini_texto(prompt_gemini_respostas)
         )
-        
-        respostas_gemini = gemini_response.text
         self.logger.info(f"[{self.case_id}] 💡 Gemini forneceu respostas detalhadas")
         
         # FASE 3: Claude usa as respostas do Gemini para gerar sentença completa
@@ -601,7 +650,7 @@ RESPOSTA 8: [procedimentos detalhados conforme prova oral]
                 prompt_base=prompt_etapa_3_template,
                 resumo_processo=resumo_processo,
                 prova_oral=prova_oral,
-                conhecimento_fundamentacao=self._convert_to_serializable(conhecimento_fundamentacao),
+                conhecimento_fundamentacao=conhecimento_fundamentacao,
                 questoes_claude=questoes_claude,
                 respostas_gemini=respostas_gemini,
                 alvo_caracteres_total=15000
@@ -644,24 +693,36 @@ RESPOSTA 8: [procedimentos detalhados conforme prova oral]
     def _recuperar_texto_original_processo(self) -> str:
         """Recupera o texto original otimizado para evitar timeouts do Gemini"""
         try:
-            from pathlib import Path
-            case_dir = Path(__file__).parent.parent / "storage" / self.case_id
-            processo_path = case_dir / "processo_extraido.txt"
+            processo_path = self.case_dir / "processo_extraido.txt"
             
             if processo_path.exists():
-                texto_original = processo_path.read_text(encoding='utf-8')
+                # Texto mapeado em memória: só os trechos usados são lidos
+                texto_original = get_case_text_store().abrir(processo_path)
                 # Limitar a 30k caracteres para evitar timeout do Gemini
                 if len(texto_original) > 30000:
-                    # Pegar início e fim do texto para manter contexto
+                    # Peças essenciais (inicial, contestação, réplica, ata) pelo índice do PJe
+                    indice = texto_original.indice
+                    if indice and indice.pecas_do_tipo(*PECAS_ESSENCIAIS):
+                        return indice.fatiar(texto_original, PECAS_ESSENCIAIS, 30000)
+                    # Sem peças identificadas: início e fim do texto para manter contexto
                     inicio = texto_original[:15000]
                     fim = texto_original[-15000:]
                     return f"{inicio}\n\n[... TEXTO TRUNCADO PARA OTIMIZAÇÃO ...]\n\n{fim}"
-                return texto_original
+                return texto_original.texto()
             else:
                 return "TEXTO ORIGINAL NÃO DISPONÍVEL"
         except Exception as e:
             self.logger.error(f"Erro ao recuperar texto original: {str(e)}")
             return "ERRO AO ACESSAR TEXTO ORIGINAL"
+
+    def _indice_pecas_processo(self) -> str:
+        """Lista de peças dos autos (tipo, ID e folhas) para citação precisa nos prompts"""
+        try:
+            indice = carregar_indice(self.case_dir)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Índice de peças indisponível: {str(e)}")
+            return "NÃO DISPONÍVEL"
+        return indice.resumo() if indice and indice.pecas else "NÃO DISPONÍVEL"
     
     def _salvar_contexto_dialogo(self, etapa: str, resultado: Dict[str, Any]):
         """Salva contexto do diálogo no RAG para consultas futuras"""
@@ -744,7 +805,9 @@ RESPOSTA 8: [procedimentos detalhados conforme prova oral]
             texto_processo = self._recuperar_texto_original_processo()
             
             # Usar Gemini com prompt aprimorado para extração completa
-            processo_estruturado = self.gemini.extrair_informacoes_processo(texto_processo)
+            processo_estruturado = self.gemini.extrair_informacoes_processo(
+                texto_processo, cache_policy=self.cache_policy
+            )
             
             return {
                 "numero_processo": processo_estruturado.numero_processo,
@@ -903,7 +966,29 @@ RESPOSTA 8: [procedimentos detalhados conforme prova oral]
         """
         Gera a sentença completa por seções com laço de continuação até atingir um alvo mínimo de caracteres.
         Mantém o Prompt Base e evita repetições/cabeçalhos duplicados.
+        Cada seção concluída é anexada a sentenca_parcial.txt, que pode ser lida durante a geração.
         """
+        parcial = ArtefatoParcial(self.case_dir / "sentenca_parcial.txt")
+        try:
+            texto_final = self._gerar_secoes_longform(
+                parcial, prompt_base, resumo_processo, prova_oral, conhecimento_fundamentacao,
+                questoes_claude, respostas_gemini, alvo_caracteres_total
+            )
+        except Exception:
+            parcial.finalizar(STATUS_INTERROMPIDO)
+            raise
+        parcial.finalizar()
+        return texto_final
+
+    def _gerar_secoes_longform(self,
+                               parcial: ArtefatoParcial,
+                               prompt_base: str,
+                               resumo_processo: str,
+                               prova_oral: str,
+                               conhecimento_fundamentacao: Dict[str, Any],
+                               questoes_claude: str,
+                               respostas_gemini: str,
+                               alvo_caracteres_total: int) -> str:
         contexto_comum = f"""
 {prompt_base}
 
@@ -957,13 +1042,20 @@ REGRAS GERAIS:
 
         # Cabeçalho SENTENÇA e transição padrão
         partes.append("SENTENÇA\n")
+        parcial.iniciar(partes[0])
 
-        for nome_secao, alvo_chars, inserir_transicao_relatorio in secoes_alvo:
-            texto_secao = self._gerar_secao_com_continuacao(
-                contexto_comum=contexto_comum,
-                nome_secao=nome_secao,
-                alvo_caracteres=alvo_chars,
-                max_iter=12
+        hash_contexto = hash_conteudo(self._hash_entradas, contexto_comum)
+        
+        for ordem, (nome_secao, alvo_chars, inserir_transicao_relatorio) in enumerate(secoes_alvo, start=1):
+            texto_secao = self._checkpoint(
+                f"dialogo:secao:{nome_secao}", hash_conteudo(hash_contexto, nome_secao, alvo_chars),
+                lambda: self._gerar_secao_com_continuacao(
+                    contexto_comum=contexto_comum,
+                    nome_secao=nome_secao,
+                    alvo_caracteres=alvo_chars,
+                    max_iter=12
+                ),
+                cronometro=(SECAO_DURACAO, {"secao": nome_secao})
             )
 
             if inserir_transicao_relatorio:
@@ -972,19 +1064,37 @@ REGRAS GERAIS:
                     texto_secao = texto_secao.rstrip() + "\n\nÉ o relatório. Decide-se.\n"
 
             partes.append(texto_secao.strip() + "\n\n")
+            parcial.anexar(partes[-1])
+            publicar_evento(
+                self.case_id, "secao_concluida",
+                secao=nome_secao, ordem=ordem, total_secoes=len(secoes_alvo),
+                caracteres=len(texto_secao.strip()), texto=texto_secao.strip()
+            )
 
         texto_final = "".join(partes).strip()
 
         # Garantir alvo total aproximado
         if len(texto_final) < alvo_caracteres_total:
             # Complementar DISPOSITIVO com continuação se necessário
-            complemento = self._gerar_secao_com_continuacao(
-                contexto_comum=contexto_comum,
-                nome_secao="DISPOSITIVO (COMPLEMENTO)",
-                alvo_caracteres=(alvo_caracteres_total - len(texto_final)) + 400,
-                max_iter=6
+            alvo_complemento = (alvo_caracteres_total - len(texto_final)) + 400
+            complemento = self._checkpoint(
+                "dialogo:secao:DISPOSITIVO (COMPLEMENTO)",
+                hash_conteudo(hash_contexto, "DISPOSITIVO (COMPLEMENTO)", alvo_complemento),
+                lambda: self._gerar_secao_com_continuacao(
+                    contexto_comum=contexto_comum,
+                    nome_secao="DISPOSITIVO (COMPLEMENTO)",
+                    alvo_caracteres=alvo_complemento,
+                    max_iter=6
+                ),
+                cronometro=(SECAO_DURACAO, {"secao": "DISPOSITIVO (COMPLEMENTO)"})
             )
             texto_final = (texto_final + "\n" + complemento).strip()
+            parcial.anexar("\n" + complemento.strip())
+            publicar_evento(
+                self.case_id, "secao_concluida",
+                secao="DISPOSITIVO (COMPLEMENTO)", ordem=len(secoes_alvo) + 1, total_secoes=len(secoes_alvo),
+                caracteres=len(complemento), texto=complemento
+            )
 
         return texto_final
 
@@ -1000,6 +1110,7 @@ REGRAS GERAIS:
         acumulado = ""
         iteracoes = 0
         continuar = True
+        hash_secao = hash_conteudo(self._hash_entradas, contexto_comum, nome_secao)
 
         while continuar and iteracoes < max_iter:
             iteracoes += 1
@@ -1030,14 +1141,25 @@ INSTRUÇÃO ESPECÍFICA (CONTINUAÇÃO DA MESMA SEÇÃO):
 {instrucao}
 """
 
-            response = self._claude_request(
-                system=self.claude.system_prompt,
-                user=user_content,
-                max_tokens=self.claude.max_tokens,
-                temperature=self.claude.temperature
-            )
+            # Cada chunk de continuação é um checkpoint: a entrada é o texto acumulado até aqui
+            uso: Dict[str, Any] = {}
 
-            texto = response.content[0].text if response and response.content else ""
+            def _gerar_chunk():
+                response = self._claude_request(
+                    system=self.claude.system_prompt,
+                    user=user_content,
+                    max_tokens=self.claude.max_tokens,
+                    temperature=self.claude.temperature
+                )
+                usage = getattr(response, "usage", None)
+                uso["tokens_entrada"] = getattr(usage, "input_tokens", None)
+                uso["tokens_saida"] = getattr(usage, "output_tokens", None)
+                return response.content[0].text if response and response.content else ""
+
+            texto = self._checkpoint(
+                f"dialogo:secao:{nome_secao}:chunk:{iteracoes}", hash_conteudo(hash_secao, acumulado),
+                _gerar_chunk
+            )
 
             # Remover a tag de continuação caso venha no meio
             texto = texto.replace("CONTINUAR##", "").rstrip()
@@ -1053,6 +1175,13 @@ INSTRUÇÃO ESPECÍFICA (CONTINUAÇÃO DA MESMA SEÇÃO):
                         texto = texto[len(prefix):].lstrip()
 
             acumulado += ("\n" if acumulado and not acumulado.endswith("\n") else "") + texto
+            publicar_evento(
+                self.case_id, "chunk",
+                secao=nome_secao, iteracao=iteracoes, texto=texto,
+                caracteres=len(texto), caracteres_secao=len(acumulado), alvo_caracteres=alvo_caracteres,
+                tokens_entrada=uso.get("tokens_entrada"), tokens_saida=uso.get("tokens_saida"),
+                reaproveitado=not uso
+            )
 
             # Critérios de parada
             if len(acumulado) >= alvo_caracteres:
@@ -1067,35 +1196,52 @@ INSTRUÇÃO ESPECÍFICA (CONTINUAÇÃO DA MESMA SEÇÃO):
         # Sanitização final: remover duplas quebras excessivas
         return acumulado.strip()
 
-    def _claude_request(self, system: str, user: str, max_tokens: int, temperature: float):
-        """Executa chamada ao Claude com retries exponenciais e jitter em caso de rate limit (429)."""
-        max_retries = 6
-        base_backoff = 0.8
-        for attempt in range(max_retries):
-            try:
-                resp = self.claude.client.messages.create(
-                    model=self.claude.model,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    system=system,
-                    messages=[{"role": "user", "content": user}]
-                )
-                # Pausa leve para respeitar limites de aceleração de tokens/min
-                time.sleep(0.6)
-                return resp
-            except Exception as e:
-                msg = str(e).lower()
-                if "429" in msg or "rate limit" in msg or "acceleration limit" in msg:
-                    sleep_s = base_backoff * (2 ** attempt) + random.uniform(0.0, 0.5)
-                    self.logger.warning(f"Rate limit detectado (tentativa {attempt+1}/{max_retries}). Aguardando {sleep_s:.2f}s para retry.")
-                    time.sleep(sleep_s)
-                    continue
-                raise
-        # Última tentativa sem backoff adicional
-        return self.claude.client.messages.create(
-            model=self.claude.model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            system=system,
-            messages=[{"role": "user", "content": user}]
-        )
+    def _checkpoint(self, chave: str, hash_entrada: str, gerar: Callable[[], Any],
+                    cronometro: Optional[Tuple[Histograma, Dict[str, str]]] = None) -> Any:
+        """Reaproveita o checkpoint concluído com a mesma entrada ou gera e registra o valor.
+        Com cronometro (histograma, labels), a duração da geração é observada na métrica."""
+        with span(chave, case_id=self.case_id, case_dir=self.case_dir) as span_checkpoint:
+            valor = self.manifest.obter(chave, hash_entrada)
+            if valor is not None:
+                self.logger.info(f"[{self.case_id}] ⏭️ Checkpoint reaproveitado: {chave}")
+                span_checkpoint.definir(reaproveitado=True)
+                return valor
+
+            span_checkpoint.definir(reaproveitado=False)
+            if cronometro:
+                histograma, labels = cronometro
+                with histograma.cronometrar(**labels):
+                    valor = gerar()
+            else:
+                valor = gerar()
+            if isinstance(valor, str):
+                span_checkpoint.definir(caracteres=len(valor))
+            self.manifest.registrar(chave, hash_entrada, valor)
+            return valor
+
+    def _gemini_texto(self, prompt: str) -> str:
+        with span("gemini.generate_content", prompt_chars=len(prompt)):
+            return self.gemini.gerar_conteudo(prompt, cache_policy=self.cache_policy).text
+
+    def _publicar_etapa_dialogo(self, etapa: str, resultado: Dict[str, Any]):
+        conteudo = resultado.get("conteudo_completo") or resultado.get("sentenca_completa") or ""
+        publicar_evento(self.case_id, "dialogo_etapa_concluida", etapa=etapa, caracteres=len(conteudo))
+
+    def _claude_request(self, system: str, user: str, max_tokens: int, temperature: float,
+                        cache_policy: Optional[str] = None):
+        """Executa chamada ao Claude sob o controle de admissão (orçamento compartilhado, fila por
+        prioridade e pausa global do provedor em caso de rate limit 429), consultando antes o cache
+        de respostas (cache_policy da chamada ou, se omitida, a do diálogo)."""
+        with span("claude.messages", prompt_chars=len(system) + len(user), max_tokens=max_tokens):
+            return criar_mensagem_com_cache(
+                self.claude.client,
+                {
+                    "model": self.claude.model,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "system": system,
+                    "messages": [{"role": "user", "content": user}]
+                },
+                cache_policy or self.cache_policy,
+                tokens_estimados=estimar_tokens(system, user, saida_maxima=max_tokens)
+            )
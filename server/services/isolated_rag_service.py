@@ -8,10 +8,9 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict, Any, Optional, List
-import chromadb
-from chromadb.config import Settings
 from datetime import datetime
 
+from .atomic_write import escrever_json_atomico
 from .gemini_processor import ProcessoEstruturado
 from .instance_manager import InstanceManager
 
@@ -31,21 +30,18 @@ class IsolatedRAGService:
         # Inicializar InstanceManager
         self.instance_manager = InstanceManager()
         
-        # Verificar se instância existe
-        try:
-            self.instance_info = self.instance_manager.get_instance_info(case_id)
-            self.instance_dir = Path(self.instance_info['directories']['instance_root'])
-        except ValueError:
-            # Criar instância se não existir
-            self.logger.info(f"[{case_id}] Criando nova instância isolada")
-            self.instance_info = self.instance_manager.create_isolated_instance(case_id)
-            self.instance_dir = Path(self.instance_info['directories']['instance_root'])
+        # Obter a instância existente ou criá-la (sob o lock do caso, sem corrida entre workers)
+        self.instance_info = self.instance_manager.get_or_create_instance(case_id)
+        self.instance_dir = Path(self.instance_info['directories']['instance_root'])
         
         # Inicializar ChromaDB isolado
         self._initialize_isolated_chromadb()
     
     def _initialize_isolated_chromadb(self):
         """Inicializa ChromaDB isolado para esta instância"""
+        import chromadb
+        from chromadb.config import Settings
+
         
         chroma_dir = self.instance_dir / "chroma_db"
         
@@ -227,10 +223,7 @@ class IsolatedRAGService:
             # Backup em arquivo JSON na instância
             dados_caso_dir = self.instance_dir / "dados_caso_atual"
             conhecimento_path = dados_caso_dir / "conhecimento_caso.json"
-            conhecimento_path.write_text(
-                json.dumps(conhecimento_caso, indent=2, ensure_ascii=False),
-                encoding='utf-8'
-            )
+            escrever_json_atomico(conhecimento_path, conhecimento_caso)
             
             self.logger.info(f"💾 [{self.case_id}] Conhecimento do caso salvo na instância isolada")
             
@@ -315,10 +308,7 @@ Valor: {processo.get('valor_causa', 'N/A')}
             # Backup em arquivo na instância
             contexto_dir = self.instance_dir / "contexto_dialogo"
             dialogo_path = contexto_dir / f"{dialogo_step}.json"
-            dialogo_path.write_text(
-                json.dumps(conteudo, indent=2, ensure_ascii=False),
-                encoding='utf-8'
-            )
+            escrever_json_atomico(dialogo_path, conteudo)
             
             self.logger.info(f"💬 [{self.case_id}] Contexto do diálogo {dialogo_step} salvo")
             
@@ -0,0 +1,373 @@
+"""
+Motor de Jobs em Background para o Pipeline de Casos
+Executa as etapas (transcrição, processamento, geração) fora da requisição HTTP
+com pool de workers limitado, retries e estado persistido por caso
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+from uuid import uuid4
+
+from .atomic_write import escrever_atomico
+from .case_lock import LockArquivo
+
+# Estados possíveis de um job e de suas etapas
+STATUS_PENDENTE = "pending"
+STATUS_NA_FILA = "queued"
+STATUS_EXECUTANDO = "running"
+STATUS_CONCLUIDO = "completed"
+STATUS_FALHOU = "failed"
+
+ESTADOS_FINAIS = {STATUS_CONCLUIDO, STATUS_FALHOU}
+
+EtapaCallable = Callable[[str], Awaitable[Any]]
+
+
+@dataclass
+class JobEtapa:
+    """Estado de uma etapa do pipeline dentro de um job"""
+    nome: str
+    status: str = STATUS_PENDENTE
+    tentativas: int = 0
+    iniciado_em: Optional[str] = None
+    concluido_em: Optional[str] = None
+    erro: Optional[str] = None
+
+
+@dataclass
+class Job:
+    """Job de processamento de um caso"""
+    job_id: str
+    case_id: str
+    status: str
+    etapas: List[JobEtapa]
+    criado_em: str
+    atualizado_em: str
+    erro: Optional[str] = None
+    metadados: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        etapas = [JobEtapa(**etapa) for etapa in data.get("etapas", [])]
+        return cls(
+            job_id=data["job_id"],
+            case_id=data["case_id"],
+            status=data.get("status", STATUS_NA_FILA),
+            etapas=etapas,
+            criado_em=data.get("criado_em", datetime.now().isoformat()),
+            atualizado_em=data.get("atualizado_em", datetime.now().isoformat()),
+            erro=data.get("erro"),
+            metadados=data.get("metadados", {})
+        )
+
+
+class JobRunner:
+    """
+    Executor de jobs in-process com fila de prioridade, pool limitado de workers e retries.
+
+    A fila atende primeiro a menor prioridade (ex.: custo estimado do caso, para
+    executar os jobs mais curtos antes); prioridades iguais seguem a ordem de chegada.
+
+    O estado de cada job é gravado em ``storage/jobs/{job_id}.json`` e espelhado em
+    ``storage/{case_id}/pipeline_status.json``. Jobs não finalizados são recolocados
+    na fila quando o runner é reiniciado, pulando as etapas já concluídas.
+
+    Com vários processos (``uvicorn --workers N``) sobre o mesmo storage, cada job é
+    reivindicado por um lock de arquivo (``jobs/{job_id}.lock``) antes de executar:
+    um job em execução em outro processo não é recuperado nem executado em duplicidade.
+    """
+
+    def __init__(self,
+                 storage_dir: Path,
+                 etapas: Dict[str, EtapaCallable],
+                 max_workers: int = 2,
+                 max_retries: int = 2,
+                 retry_backoff: float = 5.0,
+                 observador: Optional[Callable[[str, Job], None]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.storage_dir = Path(storage_dir)
+        self.jobs_dir = self.storage_dir / "jobs"
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+        self.etapas = etapas
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.observador = observador  # Notificado com (evento, job) nas transições do job
+
+        self._fila: Optional[asyncio.PriorityQueue] = None
+        self._sequencia = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+
+    # -------------------------
+    # CICLO DE VIDA
+    # -------------------------
+    async def start(self):
+        """Inicia os workers e recupera jobs pendentes do disco"""
+        if self._workers:
+            return
+
+        self._fila = asyncio.PriorityQueue()
+        for i in range(self.max_workers):
+            self._workers.append(asyncio.create_task(self._worker(i), name=f"job-worker-{i}"))
+
+        # Jobs submetidos antes do start ficaram apenas em memória
+        for job in self._jobs.values():
+            if job.status not in ESTADOS_FINAIS:
+                self._enfileirar(job)
+
+        recuperados = self._recuperar_jobs_pendentes()
+        self.logger.info(f"⚙️ JobRunner iniciado: {self.max_workers} workers, {recuperados} jobs recuperados")
+
+    async def stop(self):
+        """Cancela os workers (jobs em execução serão retomados no próximo start)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._fila = None
+        self.logger.info("⏹️ JobRunner finalizado")
+
+    # -------------------------
+    # API PÚBLICA
+    # -------------------------
+    def submit(self,
+               case_id: str,
+               etapas: List[str],
+               metadados: Optional[Dict[str, Any]] = None,
+               prioridade: float = 0.0) -> Job:
+        """
+        Cria e enfileira um job para o caso
+
+        Args:
+            case_id: ID do caso
+            etapas: Nomes das etapas a executar, em ordem
+            metadados: Informações adicionais gravadas junto ao job
+            prioridade: Menor valor é executado primeiro (persistida em metadados)
+
+        Returns:
+            Job: Job criado (já persistido)
+        """
+        desconhecidas = [nome for nome in etapas if nome not in self.etapas]
+        if desconhecidas:
+            raise ValueError(f"Etapas desconhecidas: {desconhecidas}")
+
+        agora = datetime.now().isoformat()
+        job = Job(
+            job_id=str(uuid4()),
+            case_id=case_id,
+            status=STATUS_NA_FILA,
+            etapas=[JobEtapa(nome=nome) for nome in etapas],
+            criado_em=agora,
+            atualizado_em=agora,
+            metadados={**(metadados or {}), "prioridade": prioridade}
+        )
+
+        self._jobs[job.job_id] = job
+        self._persistir(job)
+        self._enfileirar(job)
+
+        self.logger.info(f"📥 [{case_id}] Job {job.job_id} enfileirado: {etapas}")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna o estado de um job (memória ou disco)"""
+        job = self._jobs.get(job_id)
+        if job:
+            return job.to_dict()
+
+        job_path = self.jobs_dir / f"{job_id}.json"
+        if job_path.exists():
+            return json.loads(job_path.read_text(encoding='utf-8'))
+        return None
+
+    def get_case_status(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna o estado do último job de um caso"""
+        status_path = self.storage_dir / case_id / "pipeline_status.json"
+        if status_path.exists():
+            return json.loads(status_path.read_text(encoding='utf-8'))
+        return None
+
+    def queue_depth(self) -> int:
+        """Número de jobs aguardando execução"""
+        return self._fila.qsize() if self._fila else 0
+
+    def running_count(self) -> int:
+        """Número de jobs em execução"""
+        return sum(1 for job in self._jobs.values() if job.status == STATUS_EXECUTANDO)
+
+    # -------------------------
+    # EXECUÇÃO
+    # -------------------------
+    def _enfileirar(self, job: Job):
+        if self._fila is not None:
+            prioridade = job.metadados.get("prioridade", 0.0)
+            self._fila.put_nowait((prioridade, next(self._sequencia), job.job_id))
+
+    async def _worker(self, indice: int):
+        while True:
+            _, _, job_id = await self._fila.get()
+            reivindicacao = None
+            try:
+                job = self._jobs.get(job_id)
+                if job and job.status not in ESTADOS_FINAIS:
+                    reivindicacao = self._reivindicar(job)
+                    if reivindicacao is not None:
+                        await self._executar_job(job)
+            except Exception as e:
+                self.logger.error(f"❌ Worker {indice}: erro inesperado no job {job_id}: {str(e)}")
+            finally:
+                if reivindicacao is not None:
+                    if self._jobs[job_id].status in ESTADOS_FINAIS:
+                        reivindicacao.caminho.unlink(missing_ok=True)
+                    reivindicacao.liberar()
+                self._fila.task_done()
+
+    def _reivindicar(self, job: Job) -> Optional[LockArquivo]:
+        """Obtém o lock exclusivo do job; None se outro processo já o executa ou concluiu"""
+        reivindicacao = LockArquivo(self.jobs_dir / f"{job.job_id}.lock")
+        if not reivindicacao.tentar():
+            self.logger.info(f"⏭️ [{job.case_id}] Job {job.job_id} em execução em outro processo")
+            return None
+
+        # Outro processo pode ter concluído o job entre o enfileiramento e a reivindicação
+        job_path = self.jobs_dir / f"{job.job_id}.json"
+        try:
+            em_disco = Job.from_dict(json.loads(job_path.read_text(encoding='utf-8')))
+        except (OSError, ValueError, KeyError):
+            em_disco = None
+        if em_disco is not None and em_disco.status in ESTADOS_FINAIS:
+            self._jobs[job.job_id] = em_disco
+            reivindicacao.liberar()
+            return None
+        return reivindicacao
+
+    async def _executar_job(self, job: Job):
+        job.status = STATUS_EXECUTANDO
+        self._persistir(job)
+        self._notificar("job_iniciado", job)
+        self.logger.info(f"🔄 [{job.case_id}] Executando job {job.job_id}")
+
+        for etapa in job.etapas:
+            if etapa.status == STATUS_CONCLUIDO:
+                continue
+
+            sucesso = await self._executar_etapa(job, etapa)
+            if not sucesso:
+                job.status = STATUS_FALHOU
+                job.erro = f"Etapa '{etapa.nome}' falhou: {etapa.erro}"
+                self._persistir(job)
+                self._notificar("job_falhou", job)
+                self.logger.error(f"❌ [{job.case_id}] Job {job.job_id} falhou na etapa {etapa.nome}")
+                return
+
+        job.status = STATUS_CONCLUIDO
+        job.erro = None
+        self._persistir(job)
+        self._notificar("job_concluido", job)
+        self.logger.info(f"🎉 [{job.case_id}] Job {job.job_id} concluído")
+
+    async def _executar_etapa(self, job: Job, etapa: JobEtapa) -> bool:
+        funcao = self.etapas[etapa.nome]
+
+        while etapa.tentativas <= self.max_retries:
+            etapa.tentativas += 1
+            etapa.status = STATUS_EXECUTANDO
+            etapa.iniciado_em = datetime.now().isoformat()
+            etapa.erro = None
+            self._persistir(job)
+
+            try:
+                await funcao(job.case_id)
+                etapa.status = STATUS_CONCLUIDO
+                etapa.concluido_em = datetime.now().isoformat()
+                self._persistir(job)
+                return True
+            except asyncio.CancelledError:
+                # Shutdown: a etapa volta a ficar pendente para ser retomada
+                etapa.status = STATUS_PENDENTE
+                etapa.tentativas -= 1
+                self._persistir(job)
+                raise
+            except Exception as e:
+                etapa.erro = str(e)
+                self.logger.warning(
+                    f"⚠️ [{job.case_id}] Etapa {etapa.nome} falhou "
+                    f"(tentativa {etapa.tentativas}/{self.max_retries + 1}): {str(e)}"
+                )
+                if etapa.tentativas <= self.max_retries:
+                    self._notificar("job_nova_tentativa", job)
+                    await asyncio.sleep(self.retry_backoff * (2 ** (etapa.tentativas - 1)))
+
+        etapa.status = STATUS_FALHOU
+        etapa.concluido_em = datetime.now().isoformat()
+        self._persistir(job)
+        return False
+
+    def _notificar(self, evento: str, job: Job):
+        if self.observador is None:
+            return
+        try:
+            self.observador(evento, job)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Observador do job {job.job_id} falhou: {str(e)}")
+
+    # -------------------------
+    # PERSISTÊNCIA
+    # -------------------------
+    def _persistir(self, job: Job):
+        job.atualizado_em = datetime.now().isoformat()
+        conteudo = json.dumps(job.to_dict(), indent=2, ensure_ascii=False)
+
+        self._escrever(self.jobs_dir / f"{job.job_id}.json", conteudo)
+
+        case_dir = self.storage_dir / job.case_id
+        if case_dir.exists():
+            self._escrever(case_dir / "pipeline_status.json", conteudo)
+
+    def _escrever(self, destino: Path, conteudo: str):
+        # Sem fsync: o estado é regravado a cada transição e recuperado no próximo start
+        escrever_atomico(destino, conteudo, fsync=False)
+
+    def _em_execucao_em_outro_processo(self, job_id: str) -> bool:
+        reivindicacao = LockArquivo(self.jobs_dir / f"{job_id}.lock")
+        if not reivindicacao.tentar():
+            return True
+        reivindicacao.liberar()
+        return False
+
+    def _recuperar_jobs_pendentes(self) -> int:
+        recuperados = 0
+        for job_path in sorted(self.jobs_dir.glob("*.json")):
+            try:
+                job = Job.from_dict(json.loads(job_path.read_text(encoding='utf-8')))
+            except Exception as e:
+                self.logger.warning(f"Erro ao ler job {job_path.name}: {e}")
+                continue
+
+            if job.status in ESTADOS_FINAIS or job.job_id in self._jobs:
+                continue
+            if self._em_execucao_em_outro_processo(job.job_id):
+                continue
+
+            job.status = STATUS_NA_FILA
+            for etapa in job.etapas:
+                if etapa.status == STATUS_EXECUTANDO:
+                    etapa.status = STATUS_PENDENTE
+
+            self._jobs[job.job_id] = job
+            self._persistir(job)
+            self._enfileirar(job)
+            recuperados += 1
+
+        return recuperados
@@ -0,0 +1,278 @@
+"""
+Parser JSON Incremental para Respostas em Streaming
+Consome a resposta do LLM trecho a trecho acompanhando a estrutura (pilha de objetos/listas,
+strings e escapes): cada campo do objeto raiz é emitido assim que se fecha (ex.: a lista de
+partes antes de os pedidos chegarem). Uma resposta truncada é reparada pela estrutura: volta
+ao último valor completo (ou fecha a string em andamento) e fecha os níveis abertos.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+# Estados de um nível: objeto espera chave -> dois pontos -> valor; lista espera valor
+ESPERA_CHAVE = "chave"
+ESPERA_DOIS_PONTOS = "dois_pontos"
+ESPERA_VALOR = "valor"
+APOS_VALOR = "apos_valor"
+
+DELIMITADORES_ESCALAR = ",}] \t\r\n/"
+_ESPECIAIS_STRING = re.compile(r'["\\]')
+_NAO_ESPACO = re.compile(r"[^ \t\r\n]")
+
+
+@dataclass
+class _Nivel:
+    tipo: str  # "{" ou "["
+    estado: str
+
+
+class ParserJSONIncremental:
+    """
+    Alimentado com os trechos do stream (texto antes do primeiro "{"/"[", como cercas de
+    markdown, e depois do fim da raiz é ignorado; comentários // e /* */ são aceitos)
+
+    Args:
+        ao_concluir_campo: Chamado com (campo, valor) quando um campo do objeto raiz se fecha
+    """
+
+    def __init__(self, ao_concluir_campo: Optional[Callable[[str, Any], None]] = None):
+        self.ao_concluir_campo = ao_concluir_campo
+        self.campos = {}
+        self._texto = ""
+        self._posicao = 0
+        self._pilha: List[_Nivel] = []
+        self._inicio_raiz: Optional[int] = None
+        self._fim_raiz: Optional[int] = None
+        self._em_string = False
+        self._escape = False
+        self._string_chave = False
+        self._inicio_string = 0
+        self._inicio_escalar: Optional[int] = None
+        self._comentario: Optional[str] = None
+        self._inicio_comentario = 0
+        self._comentarios: List[Tuple[int, int]] = []  # Intervalos removidos do texto JSON
+        self._chave_raiz: Optional[str] = None
+        self._inicio_valor_raiz: Optional[int] = None
+        # (fim do último valor completo, tipos dos níveis abertos nesse ponto)
+        self._ponto_seguro: Optional[Tuple[int, Tuple[str, ...]]] = None
+
+    @property
+    def concluido(self) -> bool:
+        """True quando o valor raiz se fechou"""
+        return self._fim_raiz is not None
+
+    def alimentar(self, trecho: str) -> List[Tuple[str, Any]]:
+        """Processa o trecho; retorna os campos do objeto raiz concluídos nele"""
+        self._texto += trecho
+        concluidos: List[Tuple[str, Any]] = []
+        texto = self._texto
+        i = self._posicao
+        tamanho = len(texto)
+        while i < tamanho and self._fim_raiz is None:
+            c = texto[i]
+            if self._comentario:
+                if self._comentario == "//" and c == "\n":
+                    self._fechar_comentario(i)
+                elif (self._comentario == "/*" and c == "/" and texto[i - 1] == "*"
+                      and i > self._inicio_comentario + 2):
+                    self._fechar_comentario(i + 1)
+                i += 1
+                continue
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif c not in '"\\':
+                    # Salta direto para a próxima aspa ou barra (o grosso do texto está em strings)
+                    i = _proximo_especial(texto, i)
+                    continue
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._em_string = False
+                    self._concluir_string(i + 1, concluidos)
+                i += 1
+                continue
+            if self._inicio_escalar is not None:
+                if c not in DELIMITADORES_ESCALAR:
+                    i += 1
+                    continue
+                self._concluir_valor(i, concluidos)
+                self._inicio_escalar = None
+            if c in " \t\r\n":
+                encontrado = _NAO_ESPACO.search(texto, i)
+                i = encontrado.start() if encontrado else tamanho
+                continue
+            if c == "/" and self._pilha:
+                if i + 1 == tamanho:
+                    break  # Aguarda o próximo trecho para saber se é comentário
+                if texto[i + 1] in "/*":
+                    self._comentario = "/" + texto[i + 1]
+                    self._inicio_comentario = i
+                    i += 2
+                    continue
+            self._processar_estrutura(c, i, concluidos)
+            i += 1
+        self._posicao = i
+
+        if self.ao_concluir_campo:
+            for campo, valor in concluidos:
+                self.ao_concluir_campo(campo, valor)
+        return concluidos
+
+    def _fechar_comentario(self, fim: int):
+        self._comentarios.append((self._inicio_comentario, fim))
+        self._comentario = None
+
+    def _trecho(self, inicio: int, fim: int) -> str:
+        """Texto entre inicio e fim sem os comentários"""
+        partes, posicao = [], inicio
+        for inicio_comentario, fim_comentario in self._comentarios:
+            if fim_comentario <= posicao or inicio_comentario >= fim:
+                continue
+            partes.append(self._texto[posicao:inicio_comentario])
+            posicao = fim_comentario
+        partes.append(self._texto[posicao:fim])
+        return "".join(partes)
+
+    def _processar_estrutura(self, c: str, i: int, concluidos: List[Tuple[str, Any]]):
+        if not self._pilha:
+            if c in "{[":
+                self._inicio_raiz = i
+                self._abrir(c, i)
+            return
+        nivel = self._pilha[-1]
+        if c == '"':
+            self._em_string = True
+            self._inicio_string = i
+            self._string_chave = nivel.tipo == "{" and nivel.estado == ESPERA_CHAVE
+            if not self._string_chave:
+                self._iniciar_valor(i)
+        elif c in "{[":
+            self._iniciar_valor(i)
+            self._abrir(c, i)
+        elif c in "}]":
+            self._pilha.pop()
+            if not self._pilha:
+                self._fim_raiz = i + 1
+            else:
+                self._concluir_valor(i + 1, concluidos)
+        elif c == ":":
+            nivel.estado = ESPERA_VALOR
+        elif c == ",":
+            nivel.estado = ESPERA_CHAVE if nivel.tipo == "{" else ESPERA_VALOR
+        else:
+            self._iniciar_valor(i)
+            self._inicio_escalar = i
+
+    def _abrir(self, tipo: str, i: int):
+        self._pilha.append(_Nivel(tipo, ESPERA_CHAVE if tipo == "{" else ESPERA_VALOR))
+        if len(self._pilha) == 1:
+            # Níveis internos só entram no reparo com um valor completo (sem itens vazios)
+            self._ponto_seguro = (i + 1, self._tipos_abertos())
+
+    def _tipos_abertos(self) -> Tuple[str, ...]:
+        return tuple(nivel.tipo for nivel in self._pilha)
+
+    def _no_objeto_raiz(self) -> bool:
+        return len(self._pilha) == 1 and self._pilha[0].tipo == "{"
+
+    def _iniciar_valor(self, i: int):
+        if self._no_objeto_raiz():
+            self._inicio_valor_raiz = i
+
+    def _concluir_string(self, fim: int, concluidos: List[Tuple[str, Any]]):
+        if not self._string_chave:
+            self._concluir_valor(fim, concluidos)
+            return
+        self._pilha[-1].estado = ESPERA_DOIS_PONTOS
+        if self._no_objeto_raiz():
+            try:
+                self._chave_raiz = json.loads(self._texto[self._inicio_string:fim])
+            except json.JSONDecodeError:
+                self._chave_raiz = None
+
+    def _concluir_valor(self, fim: int, concluidos: List[Tuple[str, Any]]):
+        self._pilha[-1].estado = APOS_VALOR
+        self._ponto_seguro = (fim, self._tipos_abertos())
+        if not self._no_objeto_raiz() or self._inicio_valor_raiz is None or self._chave_raiz is None:
+            return
+        try:
+            valor = json.loads(self._trecho(self._inicio_valor_raiz, fim))
+        except json.JSONDecodeError:
+            return  # Valor inválido: o erro aparece no resultado final
+        self.campos[self._chave_raiz] = valor
+        concluidos.append((self._chave_raiz, valor))
+        self._inicio_valor_raiz = None
+
+    def reparar(self) -> str:
+        """
+        Texto JSON do valor raiz; se truncado, fecha a string de valor em andamento (ou volta ao
+        último valor completo, descartando chave/escalar incompletos) e fecha os níveis abertos
+
+        Raises:
+            ValueError: Nenhum objeto ou lista JSON no texto
+        """
+        if self._inicio_raiz is None:
+            raise ValueError("Não foi possível extrair JSON válido da resposta: nenhum objeto JSON encontrado")
+        if self._fim_raiz is not None:
+            return self._trecho(self._inicio_raiz, self._fim_raiz)
+
+        if self._em_string and not self._string_chave:
+            string = self._fechar_string(self._texto[self._inicio_string:])
+            if string is not None:
+                return (self._trecho(self._inicio_raiz, self._inicio_string) + string
+                        + _fechamentos(self._tipos_abertos()))
+
+        fim, tipos = self._ponto_seguro
+        return self._trecho(self._inicio_raiz, fim) + _fechamentos(tipos)
+
+    @staticmethod
+    def _fechar_string(parcial: str) -> Optional[str]:
+        """Fecha uma string truncada, descartando um escape incompleto no fim (ex.: \\u00)"""
+        for corte in range(0, 7):
+            candidata = parcial[:len(parcial) - corte] + '"'
+            try:
+                json.loads(candidata)
+                return candidata
+            except json.JSONDecodeError:
+                continue
+        return None
+
+    def finalizar(self) -> Any:
+        """
+        Valor raiz completo ou reparado; campos do objeto raiz ainda não emitidos (inclusive os
+        reparados, como uma lista de pedidos truncada) são emitidos agora
+
+        Raises:
+            ValueError: Nenhum JSON no texto ou JSON inválido mesmo após o reparo
+        """
+        try:
+            resultado = json.loads(self.reparar())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Não foi possível extrair JSON válido da resposta: {e}") from e
+        if isinstance(resultado, dict):
+            for campo, valor in resultado.items():
+                if campo not in self.campos or self.campos[campo] != valor:
+                    self.campos[campo] = valor
+                    if self.ao_concluir_campo:
+                        self.ao_concluir_campo(campo, valor)
+        return resultado
+
+
+def _proximo_especial(texto: str, inicio: int) -> int:
+    """Posição da próxima aspa ou barra invertida (ou o fim do texto)"""
+    encontrado = _ESPECIAIS_STRING.search(texto, inicio)
+    return encontrado.start() if encontrado else len(texto)
+
+
+def _fechamentos(tipos: Tuple[str, ...]) -> str:
+    return "".join("}" if tipo == "{" else "]" for tipo in reversed(tipos))
+
+
+def parsear_json(texto: str) -> Any:
+    """JSON completo ou reparado de uma resposta já recebida por inteiro"""
+    parser = ParserJSONIncremental()
+    parser.alimentar(texto)
+    return parser.finalizar()
@@ -0,0 +1,244 @@
+"""
+Cache Persistente de Respostas dos LLMs (SQLite)
+Prompts idênticos (reexecuções do /generate-from-existing, a extração estruturada repetida no
+diálogo, a análise da audiência no step2 e no pipeline automático) reaproveitam a resposta
+anterior. A chave é o SHA-256 de (provedor, modelo, configuração de geração, system prompt,
+mensagens); o tamanho total é limitado com despejo LRU.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import LLM_CACHE_CONSULTAS, LLM_CACHE_DESPEJOS
+from .tracing import span_atual
+
+ARQUIVO_CACHE_LLM = "llm_cache.db"
+
+# Políticas por chamada (cache_policy)
+POLITICA_USAR = "usar"  # Lê e grava
+POLITICA_RENOVAR = "renovar"  # Ignora a entrada existente e grava a nova resposta
+POLITICA_IGNORAR = "ignorar"  # Nem lê nem grava
+POLITICAS = (POLITICA_USAR, POLITICA_RENOVAR, POLITICA_IGNORAR)
+
+LIMITE_PADRAO_MB = 512
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respostas (
+    chave TEXT PRIMARY KEY,
+    provedor TEXT NOT NULL,
+    modelo TEXT,
+    texto TEXT NOT NULL,
+    metadados TEXT NOT NULL,
+    tamanho_bytes INTEGER NOT NULL,
+    criado_em REAL NOT NULL,
+    ultimo_uso REAL NOT NULL,
+    acessos INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_respostas_uso ON respostas (ultimo_uso);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def chave_requisicao(provedor: str, modelo: Optional[str], config: Dict[str, Any],
+                     system: Optional[str], mensagens: List[Dict[str, Any]]) -> str:
+    """SHA-256 da requisição em JSON canônico (chaves ordenadas, sem espaços)"""
+    conteudo = json.dumps(
+        {"provedor": provedor, "modelo": modelo, "config": config, "system": system, "mensagens": mensagens},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def resolver_politica(cache_policy: Optional[str] = None) -> str:
+    """Política da chamada, ou LLM_CACHE_POLITICA (padrão: usar)"""
+    politica = cache_policy or os.getenv("LLM_CACHE_POLITICA", POLITICA_USAR)
+    if politica not in POLITICAS:
+        raise ValueError(f"cache_policy inválida: {politica} (esperado: {', '.join(POLITICAS)})")
+    return politica
+
+
+@dataclass
+class BlocoTexto:
+    """Bloco de conteúdo no formato do SDK da Anthropic"""
+    text: str
+    type: str = "text"
+
+
+@dataclass
+class RespostaEmCache:
+    """
+    Resposta servida pelo cache, com os atributos que o código lê das respostas dos SDKs:
+    ``.text`` (Gemini) e ``.content[0].text`` / ``.stop_reason`` (Anthropic). Sem ``usage``:
+    uma resposta em cache não consome tokens.
+    """
+    text: str
+    stop_reason: Optional[str] = None
+    metadados: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def content(self) -> List[BlocoTexto]:
+        return [BlocoTexto(self.text)]
+
+
+class LLMResponseCache:
+    """Cache SQLite (WAL) com uma conexão por thread; cada escrita é uma transação"""
+
+    def __init__(self, caminho_db: Path, limite_bytes: Optional[int] = None):
+        self.caminho_db = Path(caminho_db)
+        self.caminho_db.parent.mkdir(parents=True, exist_ok=True)
+        self.limite_bytes = limite_bytes or int(
+            float(os.getenv("LLM_CACHE_LIMITE_MB", LIMITE_PADRAO_MB)) * 1024 * 1024
+        )
+        self._local = threading.local()
+
+        self._conexao().executescript(ESQUEMA)
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.caminho_db), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def buscar(self, chave: str) -> Optional[RespostaEmCache]:
+        """Resposta em cache (marcando o último uso para o LRU), ou None"""
+        conn = self._conexao()
+        linha = conn.execute("SELECT texto, metadados FROM respostas WHERE chave = ?", (chave,)).fetchone()
+        if linha is None:
+            return None
+        conn.execute(
+            "UPDATE respostas SET ultimo_uso = ?, acessos = acessos + 1 WHERE chave = ?", (time.time(), chave)
+        )
+        metadados = json.loads(linha["metadados"])
+        return RespostaEmCache(linha["texto"], metadados.get("stop_reason"), metadados)
+
+    def armazenar(self, chave: str, provedor: str, modelo: Optional[str], texto: str,
+                  metadados: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Grava (ou substitui) a resposta e despeja as menos usadas recentemente acima do limite
+
+        Returns:
+            Número de entradas despejadas
+        """
+        tamanho = len(texto.encode("utf-8"))
+        agora = time.time()
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """INSERT OR REPLACE INTO respostas
+                   (chave, provedor, modelo, texto, metadados, tamanho_bytes, criado_em, ultimo_uso)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (chave, provedor, modelo, texto, json.dumps(metadados or {}, ensure_ascii=False),
+                 tamanho, agora, agora)
+            )
+            despejadas = self._despejar(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        if despejadas:
+            LLM_CACHE_DESPEJOS.incrementar(despejadas)
+        return despejadas
+
+    def _despejar(self, conn: sqlite3.Connection) -> int:
+        """Remove as entradas de uso mais antigo até o total caber no limite"""
+        total = conn.execute("SELECT COALESCE(SUM(tamanho_bytes), 0) FROM respostas").fetchone()[0]
+        excesso = total - self.limite_bytes
+        if excesso <= 0:
+            return 0
+        remover = []
+        for linha in conn.execute("SELECT chave, tamanho_bytes FROM respostas ORDER BY ultimo_uso, chave"):
+            if excesso <= 0:
+                break
+            remover.append((linha["chave"],))
+            excesso -= linha["tamanho_bytes"]
+        conn.executemany("DELETE FROM respostas WHERE chave = ?", remover)
+        return len(remover)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Entradas, bytes ocupados e limite"""
+        linha = self._conexao().execute(
+            "SELECT COUNT(*) AS entradas, COALESCE(SUM(tamanho_bytes), 0) AS bytes FROM respostas"
+        ).fetchone()
+        return {"entradas": linha["entradas"], "bytes": linha["bytes"], "limite_bytes": self.limite_bytes}
+
+    def limpar(self) -> int:
+        """Remove todas as entradas; retorna quantas foram removidas"""
+        return self._conexao().execute("DELETE FROM respostas").rowcount
+
+
+_cache_global: Optional[LLMResponseCache] = None
+_lock_global = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Cache de respostas compartilhado pelo processo (LLM_CACHE_DIR, padrão: server/storage)"""
+    global _cache_global
+    with _lock_global:
+        if _cache_global is None:
+            diretorio = Path(os.getenv("LLM_CACHE_DIR", Path(__file__).resolve().parent.parent / "storage"))
+            _cache_global = LLMResponseCache(diretorio / ARQUIVO_CACHE_LLM)
+    return _cache_global
+
+
+def chamar_com_cache(provedor: str, modelo: Optional[str], config: Dict[str, Any], system: Optional[str],
+                     mensagens: List[Dict[str, Any]], chamada: Callable[[], Any],
+                     texto_da_resposta: Callable[[Any], str], cache_policy: Optional[str] = None,
+                     metadados_da_resposta: Optional[Callable[[Any], Dict[str, Any]]] = None) -> Any:
+    """
+    Executa ``chamada`` consultando antes o cache de respostas
+
+    Args:
+        config: Parâmetros de geração que alteram a saída (temperatura, max tokens, ...)
+        texto_da_resposta: Texto a armazenar; se levantar exceção (resposta bloqueada), nada é gravado
+        cache_policy: usar | renovar | ignorar (padrão: LLM_CACHE_POLITICA)
+
+    Returns:
+        A resposta do SDK, ou RespostaEmCache num acerto
+    """
+    politica = resolver_politica(cache_policy)
+    if politica == POLITICA_IGNORAR:
+        LLM_CACHE_CONSULTAS.incrementar(provedor=provedor, resultado="ignorado")
+        return chamada()
+
+    chave = chave_requisicao(provedor, modelo, config, system, mensagens)
+    cache = None
+    try:
+        cache = get_llm_response_cache()
+        if politica == POLITICA_USAR:
+            resposta = cache.buscar(chave)
+            if resposta is not None:
+                LLM_CACHE_CONSULTAS.incrementar(provedor=provedor, resultado="hit")
+                span_atual().definir(cache_llm="hit")
+                logger.info(f"♻️ Resposta do {provedor} em cache ({chave[:12]}…)")
+                return resposta
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Cache de respostas indisponível: {e}")
+
+    LLM_CACHE_CONSULTAS.incrementar(provedor=provedor, resultado="miss")
+    span_atual().definir(cache_llm="miss")
+    resposta = chamada()
+    try:
+        texto = texto_da_resposta(resposta)
+    except Exception:
+        return resposta
+    if cache is not None and texto:
+        try:
+            metadados = metadados_da_resposta(resposta) if metadados_da_resposta else {}
+            cache.armazenar(chave, provedor, modelo, texto, metadados)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Falha ao gravar resposta no cache: {e}")
+    return resposta
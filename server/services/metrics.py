@@ -0,0 +1,306 @@
+"""
+Métricas no Formato de Exposição do Prometheus
+Contadores, gauges e histogramas com labels, thread-safe, expostos em texto por /metrics
+(sem dependência do prometheus_client: apenas o formato text/plain version 0.0.4)
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Iterator
+
+from .tracing import span_atual
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets em segundos: de chamadas rápidas (extração de DOCX) a transcrições de horas de audiência
+BUCKETS_DURACAO = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 3600.0)
+
+ChaveLabels = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, descricao: str, labels: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _chave(self, valores: Dict[str, str]) -> ChaveLabels:
+        if set(valores) != set(self.labels):
+            raise ValueError(f"Métrica {self.nome} espera os labels {self.labels}, recebeu {tuple(valores)}")
+        return tuple(str(valores[label]) for label in self.labels)
+
+    def _labels_texto(self, chave: ChaveLabels, extra: Optional[Tuple[str, str]] = None) -> str:
+        pares = list(zip(self.labels, chave))
+        if extra:
+            pares.append(extra)
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{label}="{_escapar(valor)}"' for label, valor in pares) + "}"
+
+    def _amostras(self) -> List[str]:
+        raise NotImplementedError
+
+    def renderizar(self) -> str:
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+        linhas.extend(self._amostras())
+        return "\n".join(linhas)
+
+
+class Contador(_Metrica):
+    """Valor monotônico (ex.: tokens consumidos, retries)"""
+    tipo = "counter"
+
+    def __init__(self, nome: str, descricao: str, labels: Tuple[str, ...] = ()):
+        super().__init__(nome, descricao, labels)
+        self._valores: Dict[ChaveLabels, float] = {}
+
+    def incrementar(self, valor: float = 1.0, **labels):
+        if valor < 0:
+            raise ValueError("Contadores só podem ser incrementados")
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **labels) -> float:
+        with self._lock:
+            return self._valores.get(self._chave(labels), 0.0)
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{self._labels_texto(chave)} {_formatar_numero(valor)}" for chave, valor in itens]
+
+
+class Gauge(_Metrica):
+    """Valor instantâneo (ex.: casos em execução, profundidade da fila)"""
+    tipo = "gauge"
+
+    def __init__(self, nome: str, descricao: str, labels: Tuple[str, ...] = ()):
+        super().__init__(nome, descricao, labels)
+        self._valores: Dict[ChaveLabels, float] = {}
+
+    def definir(self, valor: float, **labels):
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = float(valor)
+
+    def incrementar(self, valor: float = 1.0, **labels):
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def decrementar(self, valor: float = 1.0, **labels):
+        self.incrementar(-valor, **labels)
+
+    def valor(self, **labels) -> float:
+        with self._lock:
+            return self._valores.get(self._chave(labels), 0.0)
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{self._labels_texto(chave)} {_formatar_numero(valor)}" for chave, valor in itens]
+
+
+class Histograma(_Metrica):
+    """Distribuição de durações em buckets cumulativos, com soma e contagem"""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, descricao: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS_DURACAO):
+        super().__init__(nome, descricao, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[ChaveLabels, Dict[str, object]] = {}
+
+    def observar(self, valor: float, **labels):
+        chave = self._chave(labels)
+        with self._lock:
+            serie = self._series.setdefault(chave, {"contagens": [0] * len(self.buckets), "soma": 0.0, "total": 0})
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie["contagens"][indice] += 1
+                    break
+            serie["soma"] += valor
+            serie["total"] += 1
+
+    @contextmanager
+    def cronometrar(self, **labels) -> Iterator[None]:
+        """Observa a duração do bloco (também quando ele levanta exceção)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **labels)
+
+    def contagem(self, **labels) -> int:
+        with self._lock:
+            serie = self._series.get(self._chave(labels))
+            return serie["total"] if serie else 0
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            itens = sorted((chave, dict(serie, contagens=list(serie["contagens"])))
+                           for chave, serie in self._series.items())
+        linhas = []
+        for chave, serie in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie["contagens"]):
+                acumulado += contagem
+                rotulo = self._labels_texto(chave, ("le", _formatar_numero(limite)))
+                linhas.append(f"{self.nome}_bucket{rotulo} {acumulado}")
+            linhas.append(f"{self.nome}_sum{self._labels_texto(chave)} {_formatar_numero(serie['soma'])}")
+            linhas.append(f"{self.nome}_count{self._labels_texto(chave)} {serie['total']}")
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas exposto pelo endpoint /metrics"""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                if type(existente) is not type(metrica) or existente.labels != metrica.labels:
+                    raise ValueError(f"Métrica {metrica.nome} já registrada com outro tipo ou labels")
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def contador(self, nome: str, descricao: str, labels: Tuple[str, ...] = ()) -> Contador:
+        return self._registrar(Contador(nome, descricao, labels))
+
+    def gauge(self, nome: str, descricao: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._registrar(Gauge(nome, descricao, labels))
+
+    def histograma(self, nome: str, descricao: str, labels: Tuple[str, ...] = (),
+                   buckets: Tuple[float, ...] = BUCKETS_DURACAO) -> Histograma:
+        return self._registrar(Histograma(nome, descricao, labels, buckets))
+
+    def renderizar(self) -> str:
+        """Todas as métricas no formato de exposição em texto"""
+        with self._lock:
+            metricas = [self._metricas[nome] for nome in sorted(self._metricas)]
+        return "\n".join(metrica.renderizar() for metrica in metricas) + "\n"
+
+
+_registro_global: Optional[RegistroMetricas] = None
+
+
+def get_metrics_registry() -> RegistroMetricas:
+    """Retorna o registro de métricas compartilhado pelo processo"""
+    global _registro_global
+    if _registro_global is None:
+        _registro_global = RegistroMetricas()
+    return _registro_global
+
+
+# -------------------------
+# MÉTRICAS DO PIPELINE
+# -------------------------
+_registro = get_metrics_registry()
+
+ETAPA_PIPELINE_DURACAO = _registro.histograma(
+    "sentencas_pipeline_etapa_duracao_segundos",
+    "Duração das etapas do pipeline do caso (transcricao, extracao, estruturacao, analise_audiencia, rag, geracao)",
+    labels=("etapa", "status")
+)
+ETAPA_DIALOGO_DURACAO = _registro.histograma(
+    "sentencas_dialogo_etapa_duracao_segundos",
+    "Duração das etapas do diálogo inteligente (ETAPA_1, ETAPA_2, ETAPA_3) efetivamente geradas",
+    labels=("etapa",)
+)
+SECAO_DURACAO = _registro.histograma(
+    "sentencas_secao_duracao_segundos",
+    "Duração da geração de cada seção long-form da sentença (chamadas e continuações)",
+    labels=("secao",)
+)
+LLM_TOKENS = _registro.contador(
+    "sentencas_llm_tokens_total",
+    "Tokens consumidos nas chamadas aos LLMs",
+    labels=("provedor", "tipo")
+)
+LLM_RETRIES = _registro.contador(
+    "sentencas_llm_retries_total",
+    "Retentativas de chamadas aos LLMs por rate limit (429)",
+    labels=("provedor",)
+)
+CASOS_EM_EXECUCAO = _registro.gauge(
+    "sentencas_casos_em_execucao",
+    "Jobs de casos em execução no JobRunner"
+)
+FILA_PROFUNDIDADE = _registro.gauge(
+    "sentencas_fila_jobs_profundidade",
+    "Jobs aguardando na fila do JobRunner"
+)
+ADMISSAO_ESPERA = _registro.histograma(
+    "sentencas_admissao_espera_segundos",
+    "Espera na fila de admissão antes de cada chamada ao LLM, por classe de prioridade",
+    labels=("provedor", "prioridade"),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+ADMISSAO_FILA = _registro.gauge(
+    "sentencas_admissao_fila_profundidade",
+    "Chamadas aguardando admissão por orçamento (provedor:modelo)",
+    labels=("orcamento",)
+)
+LLM_CACHE_CONSULTAS = _registro.contador(
+    "sentencas_llm_cache_consultas_total",
+    "Consultas ao cache de respostas dos LLMs (hit, miss ou ignorado por cache_policy)",
+    labels=("provedor", "resultado")
+)
+LLM_CACHE_DESPEJOS = _registro.contador(
+    "sentencas_llm_cache_despejos_total",
+    "Respostas removidas do cache dos LLMs pelo limite de tamanho (LRU)"
+)
+STORAGE_GC_BYTES = _registro.contador(
+    "sentencas_storage_gc_bytes_liberados_total",
+    "Bytes liberados pela coleta do storage, por tipo de ação",
+    labels=("tipo",)
+)
+
+
+def tokens_da_resposta(resposta) -> Tuple[Optional[int], Optional[int]]:
+    """Tokens de entrada e saída informados na resposta do SDK (Anthropic ou Gemini)"""
+    try:
+        uso = getattr(resposta, "usage", None)
+        if uso is not None:
+            return getattr(uso, "input_tokens", None), getattr(uso, "output_tokens", None)
+        uso = getattr(resposta, "usage_metadata", None)
+        if uso is None:
+            return None, None
+        return getattr(uso, "prompt_token_count", None), getattr(uso, "candidates_token_count", None)
+    except Exception:
+        return None, None  # Versões antigas do SDK sem metadados de uso
+
+
+def registrar_uso_llm(provedor: str, resposta) -> None:
+    """Contabiliza os tokens de entrada/saída informados na resposta do SDK (Anthropic ou Gemini)
+    nas métricas e no span de tracing ativo"""
+    entrada, saida = tokens_da_resposta(resposta)
+    if entrada:
+        LLM_TOKENS.incrementar(entrada, provedor=provedor, tipo="entrada")
+        span_atual().somar("tokens_entrada", entrada)
+    if saida:
+        LLM_TOKENS.incrementar(saida, provedor=provedor, tipo="saida")
+        span_atual().somar("tokens_saida", saida)
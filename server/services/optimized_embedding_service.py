@@ -6,12 +6,12 @@ Especializado em compreender nuances jurídicas e maximizar relevância
 import logging
 import numpy as np
 from typing import List, Dict, Any, Tuple, Optional
-from sentence_transformers import SentenceTransformer
-import torch
 from dataclasses import dataclass
 import re
 from pathlib import Path
 
+from .tracing import rastrear, span_atual
+
 @dataclass
 class EmbeddingResult:
     """Resultado de embedding com metadata"""
@@ -27,6 +27,9 @@ class OptimizedEmbeddingService:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
+        # sentence_transformers/torch só são carregados quando o serviço é instanciado
+        from sentence_transformers import SentenceTransformer
+
         # Modelo especializado em português jurídico
         self.model = SentenceTransformer('rufimelo/Legal-BERTimbau-sts-base-ma-v3')
         
@@ -178,9 +181,11 @@ class OptimizedEmbeddingService:
         
         return text
     
+    @rastrear("embeddings.batch")
     def create_batch_embeddings(self, texts: List[str]) -> List[EmbeddingResult]:
         """Cria embeddings em lote para eficiência"""
         results = []
+        span_atual().definir(textos=len(texts), caracteres=sum(len(text) for text in texts))
         
         try:
             # Preprocessar todos os textos
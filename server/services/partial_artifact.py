@@ -0,0 +1,118 @@
+"""
+Artefato Parcial com Leitura Contínua
+A geração anexa cada seção concluída ao arquivo parcial e só então confirma o novo tamanho
+no estado (escrita atômica); leitores acompanham o arquivo até a geração terminar,
+nunca entregando bytes de uma seção ainda não confirmada
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, Callable, Optional
+
+from .atomic_write import escrever_json_atomico
+
+STATUS_EM_ANDAMENTO = "em_andamento"
+STATUS_CONCLUIDO = "concluido"
+STATUS_INTERROMPIDO = "interrompido"   # Geração falhou; a retomada reinicia o arquivo
+
+
+class ArtefatoParcial:
+    """Arquivo de texto escrito por seções (ex.: sentenca_parcial.txt) + estado em <nome>.estado.json"""
+
+    def __init__(self, caminho: Path):
+        self.logger = logging.getLogger(__name__)
+        self.caminho = Path(caminho)
+        self.estado_path = self.caminho.with_name(f"{self.caminho.stem}.estado.json")
+
+    def _gravar_estado(self, status: str, tamanho: int, secoes: int):
+        estado = {
+            "status": status,
+            "bytes": tamanho,
+            "secoes": secoes,
+            "atualizado_em": datetime.now().isoformat()
+        }
+        escrever_json_atomico(self.estado_path, estado, indent=None, fsync=False)
+
+    def estado(self) -> Optional[Dict[str, Any]]:
+        """Estado confirmado do artefato, ou None se a geração nunca começou"""
+        try:
+            return json.loads(self.estado_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def iniciar(self, cabecalho: str = ""):
+        """Reinicia o artefato (nova geração ou retomada)"""
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        # Estado primeiro: leitores param de confiar no conteúdo antigo antes do truncamento
+        self._gravar_estado(STATUS_EM_ANDAMENTO, 0, 0)
+        dados = cabecalho.encode("utf-8")
+        with open(self.caminho, "wb") as arquivo:
+            arquivo.write(dados)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        self._gravar_estado(STATUS_EM_ANDAMENTO, len(dados), 0)
+
+    def anexar(self, texto: str):
+        """Anexa uma seção concluída e confirma o novo tamanho"""
+        estado = self.estado() or {"bytes": 0, "secoes": 0}
+        dados = texto.encode("utf-8")
+        with open(self.caminho, "ab") as arquivo:
+            arquivo.write(dados)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        self._gravar_estado(STATUS_EM_ANDAMENTO, estado["bytes"] + len(dados), estado["secoes"] + 1)
+
+    def finalizar(self, status: str = STATUS_CONCLUIDO):
+        """Marca o fim da geração (concluída ou interrompida)"""
+        estado = self.estado() or {"bytes": 0, "secoes": 0}
+        self._gravar_estado(status, estado["bytes"], estado["secoes"])
+
+    async def acompanhar(self,
+                         intervalo: float = 0.5,
+                         tamanho_bloco: int = 64 * 1024,
+                         timeout_inatividade: float = 1800.0,
+                         em_execucao: Optional[Callable[[], bool]] = None) -> AsyncIterator[bytes]:
+        """
+        Produz o conteúdo confirmado do artefato à medida que cresce (tail -f)
+
+        Encerra quando a geração é concluída ou interrompida, ou após timeout_inatividade
+        segundos sem novas seções (ex.: processo de geração encerrado abruptamente).
+        Antes da geração começar, aguarda enquanto em_execucao() indicar que o job segue ativo.
+        """
+        posicao = 0
+        ultima_atividade = time.monotonic()
+
+        while True:
+            estado = self.estado()
+            confirmado = estado["bytes"] if estado else 0
+
+            if confirmado < posicao:
+                # Geração reiniciada: o conteúdo já entregue foi descartado
+                self.logger.warning(f"⚠️ Artefato parcial reiniciado durante a leitura: {self.caminho}")
+                return
+
+            if confirmado > posicao:
+                with open(self.caminho, "rb") as arquivo:
+                    arquivo.seek(posicao)
+                    while posicao < confirmado:
+                        bloco = arquivo.read(min(tamanho_bloco, confirmado - posicao))
+                        if not bloco:
+                            break
+                        posicao += len(bloco)
+                        yield bloco
+                ultima_atividade = time.monotonic()
+                continue
+
+            if estado and estado["status"] != STATUS_EM_ANDAMENTO:
+                return
+            if estado is None and em_execucao is not None and not em_execucao():
+                return
+            if time.monotonic() - ultima_atividade > timeout_inatividade:
+                self.logger.warning(f"⚠️ Leitura do artefato parcial encerrada por inatividade: {self.caminho}")
+                return
+            await asyncio.sleep(intervalo)
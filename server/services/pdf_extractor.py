@@ -0,0 +1,307 @@
+"""
+Extração Paralela de Texto de PDF
+Divide as páginas do PDF em intervalos distribuídos entre processos (cada um abre o próprio
+documento com PyMuPDF), remonta os trechos na ordem das páginas e grava o resultado de forma
+incremental num temporário publicado atomicamente ao final. Páginas digitais saem idênticas
+à extração sequencial (``page.get_text("text") + "\\n"`` por página).
+
+Páginas digitalizadas (atas assinadas à mão, contratos antigos) quase não têm camada de
+texto: as que têm imagem e menos de OCR_MIN_CARACTERES caracteres passam por OCR (Tesseract)
+no mesmo pool, página a página, e entram no texto com o marcador ``[Página N - OCR]``.
+O OCR é reaproveitado pelo hash da imagem renderizada da página (cache de artefatos). Uma
+falha do OCR numa página (imagem inválida, idioma ausente, timeout) não interrompe a
+extração: a página fica com o texto nativo.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from .tracing import span_atual
+
+# Processos de extração (PDF_EXTRACAO_PROCESSOS; padrão: núcleos disponíveis)
+PROCESSOS_PADRAO = int(os.getenv("PDF_EXTRACAO_PROCESSOS", "0")) or (os.cpu_count() or 1)
+# Abaixo disso o custo de distribuir as páginas supera o ganho: extração no próprio processo
+PAGINAS_MINIMAS_PARALELO = int(os.getenv("PDF_EXTRACAO_PAGINAS_MINIMAS", "64"))
+PAGINAS_MINIMAS_POR_INTERVALO = 16
+INTERVALOS_POR_PROCESSO = 4  # Intervalos menores equilibram páginas de custo desigual (imagens, tabelas)
+
+# OCR de páginas digitalizadas (OCR_ATIVO=0 desliga)
+OCR_ATIVO = os.getenv("OCR_ATIVO", "1") == "1"
+OCR_MIN_CARACTERES = int(os.getenv("OCR_MIN_CARACTERES", "50"))
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_IDIOMA = os.getenv("OCR_IDIOMA", "por")
+
+logger = logging.getLogger(__name__)
+
+
+def _precisa_ocr(pagina, texto: str) -> bool:
+    """Pouco texto e alguma imagem: página digitalizada (páginas em branco não passam por OCR)"""
+    return len(texto.strip()) < OCR_MIN_CARACTERES and bool(pagina.get_images(full=False))
+
+
+def _extrair_intervalo(caminho: str, inicio: int, fim: int) -> Tuple[List[str], List[int]]:
+    """Texto de cada página em [inicio, fim) e as páginas candidatas a OCR — executado nos processos do pool"""
+    import fitz
+
+    textos, candidatas = [], []
+    with fitz.open(caminho) as documento:
+        for indice in range(inicio, fim):
+            pagina = documento[indice]
+            texto = pagina.get_text("text")
+            textos.append(texto)
+            if _precisa_ocr(pagina, texto):
+                candidatas.append(indice)
+    return textos, candidatas
+
+
+def _ocr_pagina(caminho: str, indice: int, cache_dir: Optional[str]) -> Tuple[Optional[str], bool, Optional[str]]:
+    """
+    OCR de uma página renderizada em tons de cinza; retorna (texto, veio do cache, erro). O erro
+    volta como texto em vez de exceção: uma página não derruba a extração do PDF inteiro.
+    """
+    try:
+        texto, do_cache = _executar_ocr(caminho, indice, cache_dir)
+    except Exception as e:
+        return None, False, f"{type(e).__name__}: {e}"
+    return texto, do_cache, None
+
+
+def _executar_ocr(caminho: str, indice: int, cache_dir: Optional[str]) -> Tuple[str, bool]:
+    import fitz
+
+    with fitz.open(caminho) as documento:
+        imagem = documento[indice].get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY)
+    hash_imagem = hashlib.sha256(f"{imagem.width}x{imagem.height}\0".encode() + imagem.samples).hexdigest()
+
+    cache = None
+    if cache_dir:
+        from .artifact_cache import ArtifactCache
+
+        cache = ArtifactCache(Path(cache_dir))
+        texto = cache.ler_texto("ocr_pagina", hash_imagem)
+        if texto is not None:
+            return texto, True
+
+    import pytesseract
+    from PIL import Image
+
+    texto = pytesseract.image_to_string(
+        Image.frombytes("L", (imagem.width, imagem.height), imagem.samples), lang=OCR_IDIOMA
+    )
+    if cache:
+        cache.armazenar_texto("ocr_pagina", hash_imagem, texto)
+    return texto, False
+
+
+def ocr_disponivel() -> bool:
+    """pytesseract instalado e binário do Tesseract no PATH"""
+    if not OCR_ATIVO:
+        return False
+    try:
+        import pytesseract
+    except ImportError:
+        return False
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+
+def _aplicar_ocr(textos: List[str], posicao: int, indice: int, texto_ocr: Optional[str]):
+    if texto_ocr and texto_ocr.strip():
+        textos[posicao] = f"[Página {indice + 1} - OCR]\n{texto_ocr.strip()}"
+
+
+def _juntar(textos: List[str]) -> str:
+    return "".join(texto + "\n" for texto in textos)
+
+
+def contar_paginas(caminho: Path) -> int:
+    import fitz
+
+    with fitz.open(str(caminho)) as documento:
+        return documento.page_count
+
+
+def dividir_paginas(total: int, processos: int) -> List[Tuple[int, int]]:
+    """Intervalos contíguos [inicio, fim) cobrindo as ``total`` páginas"""
+    if total <= 0:
+        return []
+    tamanho = max(PAGINAS_MINIMAS_POR_INTERVALO, -(-total // (processos * INTERVALOS_POR_PROCESSO)))
+    return [(inicio, min(inicio + tamanho, total)) for inicio in range(0, total, tamanho)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_processos = 0
+_pool_lock = threading.Lock()
+
+
+def _obter_pool(processos: int) -> ProcessPoolExecutor:
+    """Pool compartilhado pelo processo (spawn: seguro com as threads do servidor)"""
+    global _pool, _pool_processos
+    with _pool_lock:
+        # Um processo do pool que morre (ex.: OOM) invalida o pool inteiro: recriar
+        if _pool is None or _pool_processos != processos or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"))
+            _pool_processos = processos
+        return _pool
+
+
+def encerrar_pool():
+    """Finaliza os processos de extração (shutdown da aplicação)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class EstatisticasExtracao:
+    """OCR aplicado numa extração (páginas, acertos do cache e páginas com falha, numeradas a partir de 1)"""
+
+    def __init__(self):
+        self.paginas_ocr = 0
+        self.ocr_cache = 0
+        self.ocr_falhas: List[int] = []
+
+    def contar(self, indice: int, do_cache: bool, erro: Optional[str]):
+        if erro:
+            self.ocr_falhas.append(indice + 1)
+            logger.warning(f"⚠️ OCR da página {indice + 1} falhou ({erro}); mantido o texto nativo")
+            return
+        self.paginas_ocr += 1
+        self.ocr_cache += do_cache
+
+
+def extrair_texto_pdf(caminho: Path, destino: Optional[Path] = None, processos: Optional[int] = None,
+                      cache_dir: Optional[Path] = None, ocr: Optional[bool] = None,
+                      estatisticas: Optional[EstatisticasExtracao] = None) -> str:
+    """
+    Extrai o texto do PDF distribuindo intervalos de páginas (e o OCR das páginas digitalizadas)
+    entre processos
+
+    Args:
+        caminho: PDF de origem
+        destino: Arquivo de texto gravado incrementalmente (publicado ao final com os.replace)
+        processos: Processos do pool (padrão: PDF_EXTRACAO_PROCESSOS ou núcleos disponíveis)
+        cache_dir: Cache de artefatos onde o OCR de cada página é reaproveitado pelo hash da imagem
+        ocr: Aplica OCR às páginas digitalizadas (padrão: se o Tesseract estiver disponível)
+        estatisticas: Preenchido com o OCR aplicado (ex.: para não guardar em cache um texto
+            com páginas cujo OCR falhou)
+
+    Returns:
+        str: Texto completo, na ordem das páginas
+    """
+    caminho = Path(caminho)
+    processos = max(1, processos or PROCESSOS_PADRAO)
+    if ocr is None:
+        ocr = ocr_disponivel()
+    total_paginas = contar_paginas(caminho)
+    intervalos = dividir_paginas(total_paginas, processos)
+    estatisticas = estatisticas if estatisticas is not None else EstatisticasExtracao()
+
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.{uuid4().hex[:8]}.tmp") if destino else None
+    saida = open(temporario, "w", encoding="utf-8") if temporario else None
+    trechos: List[str] = []
+
+    def publicar(trecho: str):
+        trechos.append(trecho)
+        if saida:
+            saida.write(trecho)
+
+    argumentos = (str(caminho), intervalos, processos, str(cache_dir) if cache_dir else None, ocr, estatisticas, publicar)
+    try:
+        if processos > 1 and total_paginas >= PAGINAS_MINIMAS_PARALELO:
+            _extrair_em_paralelo(*argumentos)
+        else:
+            _extrair_no_processo(*argumentos)
+        if saida:
+            saida.close()
+            os.replace(temporario, destino)
+    except BaseException:
+        if saida:
+            saida.close()
+            temporario.unlink(missing_ok=True)
+        raise
+
+    span_atual().definir(paginas=total_paginas, intervalos=len(intervalos), processos=processos,
+                         paginas_ocr=estatisticas.paginas_ocr, ocr_cache=estatisticas.ocr_cache,
+                         ocr_falhas=len(estatisticas.ocr_falhas))
+    if estatisticas.ocr_falhas:
+        span_atual().definir(ocr_paginas_com_falha=estatisticas.ocr_falhas)
+    logger.info(
+        f"📄 PDF extraído: {total_paginas} páginas em {len(intervalos)} intervalos ({processos} processos); "
+        f"OCR em {estatisticas.paginas_ocr} páginas ({estatisticas.ocr_cache} do cache)"
+    )
+    return "".join(trechos)
+
+
+def _extrair_no_processo(caminho: str, intervalos: List[Tuple[int, int]], processos: int, cache_dir: Optional[str],
+                         ocr: bool, estatisticas: EstatisticasExtracao, publicar):
+    """PDF pequeno: texto no próprio processo; o OCR ainda usa o pool se houver várias páginas e núcleos"""
+    paginas: List[str] = []
+    candidatas: List[int] = []
+    for inicio, fim in intervalos:
+        textos, candidatas_intervalo = _extrair_intervalo(caminho, inicio, fim)
+        paginas.extend(textos)
+        candidatas.extend(candidatas_intervalo)
+    if not (ocr and candidatas):
+        publicar(_juntar(paginas))
+        return
+
+    if processos > 1 and len(candidatas) > 1:
+        resultados = _obter_pool(processos).map(_ocr_pagina, [caminho] * len(candidatas), candidatas,
+                                                [cache_dir] * len(candidatas))
+    else:
+        resultados = (_ocr_pagina(caminho, indice, cache_dir) for indice in candidatas)
+    for indice, (texto_ocr, do_cache, erro) in zip(candidatas, resultados):
+        estatisticas.contar(indice, do_cache, erro)
+        _aplicar_ocr(paginas, indice, indice, texto_ocr)
+    publicar(_juntar(paginas))
+
+
+def _extrair_em_paralelo(caminho: str, intervalos: List[Tuple[int, int]], processos: int, cache_dir: Optional[str],
+                         ocr: bool, estatisticas: EstatisticasExtracao, publicar):
+    """
+    Submete os intervalos ao pool; as páginas digitalizadas de cada intervalo concluído viram
+    tarefas de OCR no mesmo pool. Cada intervalo é publicado quando ele, seus OCRs e todos os
+    intervalos anteriores estiverem prontos.
+    """
+    pool = _obter_pool(processos)
+    tarefas = {pool.submit(_extrair_intervalo, caminho, inicio, fim): ("texto", indice)
+               for indice, (inicio, fim) in enumerate(intervalos)}
+    textos: Dict[int, List[str]] = {}
+    ocr_pendente: Dict[int, int] = {}
+    proximo = 0
+    try:
+        while tarefas:
+            concluidos, _ = wait(set(tarefas), return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                tipo, chave = tarefas.pop(futuro)
+                if tipo == "texto":
+                    paginas, candidatas = futuro.result()
+                    textos[chave] = paginas
+                    ocr_pendente[chave] = 0
+                    for pagina in candidatas if ocr else ():
+                        tarefas[pool.submit(_ocr_pagina, caminho, pagina, cache_dir)] = ("ocr", (chave, pagina))
+                        ocr_pendente[chave] += 1
+                else:
+                    intervalo, pagina = chave
+                    texto_ocr, do_cache, erro = futuro.result()
+                    estatisticas.contar(pagina, do_cache, erro)
+                    _aplicar_ocr(textos[intervalo], pagina - intervalos[intervalo][0], pagina, texto_ocr)
+                    ocr_pendente[intervalo] -= 1
+            while proximo in textos and ocr_pendente[proximo] == 0:
+                publicar(_juntar(textos.pop(proximo)))
+                proximo += 1
+    except BaseException:
+        for futuro in tarefas:
+            futuro.cancel()
+        raise
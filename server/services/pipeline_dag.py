@@ -0,0 +1,247 @@
+"""
+Executor de Pipeline em Grafo de Dependências (DAG)
+Cada etapa declara os artefatos que consome e produz; etapas independentes rodam em paralelo,
+respeitando limites de concorrência por classe de recurso, e o caminho crítico é registrado
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Callable, Awaitable
+
+ETAPA_CONCLUIDA = "concluida"
+ETAPA_FALHOU = "falhou"
+ETAPA_CANCELADA = "cancelada"   # Dependência falhou
+ETAPA_IGNORADA = "ignorada"     # Entrada obrigatória indisponível (ex.: caso sem audiência)
+
+
+@dataclass
+class EtapaDAG:
+    """Nó do pipeline"""
+    nome: str
+    executar: Callable[[str], Awaitable[Any]]              # async fn(case_id)
+    entradas: List[str] = field(default_factory=list)      # Artefatos obrigatórios
+    saidas: List[str] = field(default_factory=list)        # Artefatos produzidos
+    entradas_opcionais: List[str] = field(default_factory=list)  # Aguardados somente se alguma etapa os produzir
+    recurso: Optional[str] = None                          # Classe de recurso para limite de concorrência
+
+
+@dataclass
+class ExecucaoEtapa:
+    """Registro da execução de uma etapa"""
+    nome: str
+    status: str
+    recurso: Optional[str] = None
+    inicio: Optional[float] = None      # Segundos desde o início do pipeline
+    fim: Optional[float] = None
+    duracao_s: Optional[float] = None
+    erro: Optional[str] = None
+
+
+class FalhaPipeline(Exception):
+    """Uma ou mais etapas falharam; o relatório da execução acompanha a exceção"""
+
+    def __init__(self, mensagem: str, relatorio: Dict[str, Any]):
+        super().__init__(mensagem)
+        self.relatorio = relatorio
+
+
+class PipelineDAG:
+    """Executa as etapas de um caso na ordem parcial definida pelos artefatos"""
+
+    def __init__(self,
+                 etapas: List[EtapaDAG],
+                 limites_recurso: Optional[Dict[str, int]] = None,
+                 observador: Optional[Callable[[str, str, Dict[str, Any]], None]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.observador = observador  # Notificado com (case_id, evento, dados) no progresso das etapas
+        self.etapas: Dict[str, EtapaDAG] = {}
+        self.produtores: Dict[str, str] = {}
+        self.limites_recurso = dict(limites_recurso or {})
+
+        for etapa in etapas:
+            if etapa.nome in self.etapas:
+                raise ValueError(f"Etapa duplicada: {etapa.nome}")
+            self.etapas[etapa.nome] = etapa
+            for saida in etapa.saidas:
+                if saida in self.produtores:
+                    raise ValueError(f"Artefato '{saida}' produzido por mais de uma etapa")
+                self.produtores[saida] = etapa.nome
+
+        self.ordem = self._ordenar_topologicamente()
+
+        # Semáforos compartilhados entre execuções (limite global por recurso), recriados por event loop
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+        self._loop_semaforos = None
+
+    def dependencias(self, nome: str) -> Set[str]:
+        """Etapas que produzem as entradas (obrigatórias e opcionais) da etapa"""
+        etapa = self.etapas[nome]
+        return {
+            self.produtores[artefato]
+            for artefato in etapa.entradas + etapa.entradas_opcionais
+            if artefato in self.produtores
+        }
+
+    def _ordenar_topologicamente(self) -> List[str]:
+        ordem: List[str] = []
+        visitando: Set[str] = set()
+        visitadas: Set[str] = set()
+
+        def visitar(nome: str):
+            if nome in visitadas:
+                return
+            if nome in visitando:
+                raise ValueError(f"Ciclo de dependências envolvendo a etapa '{nome}'")
+            visitando.add(nome)
+            for dependencia in sorted(self.dependencias(nome)):
+                visitar(dependencia)
+            visitando.discard(nome)
+            visitadas.add(nome)
+            ordem.append(nome)
+
+        for nome in self.etapas:
+            visitar(nome)
+        return ordem
+
+    def planejar(self, disponiveis: Set[str]) -> List[str]:
+        """Etapas executáveis, em ordem topológica, a partir dos artefatos iniciais disponíveis"""
+        artefatos = set(disponiveis)
+        plano = []
+        for nome in self.ordem:
+            etapa = self.etapas[nome]
+            if all(artefato in artefatos for artefato in etapa.entradas):
+                plano.append(nome)
+                artefatos.update(etapa.saidas)
+        return plano
+
+    def _semaforo(self, recurso: Optional[str]) -> Optional[asyncio.Semaphore]:
+        if recurso is None or recurso not in self.limites_recurso:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._loop_semaforos is not loop:
+            self._semaforos = {}
+            self._loop_semaforos = loop
+        if recurso not in self._semaforos:
+            self._semaforos[recurso] = asyncio.Semaphore(max(1, self.limites_recurso[recurso]))
+        return self._semaforos[recurso]
+
+    async def executar(self, case_id: str, disponiveis: Set[str]) -> Dict[str, Any]:
+        """
+        Executa as etapas do caso com paralelismo máximo permitido pelas dependências
+
+        Args:
+            case_id: ID do caso repassado a cada etapa
+            disponiveis: Artefatos iniciais presentes (ex.: {"processo", "audiencia"})
+
+        Returns:
+            Relatório com tempos por etapa, caminho crítico e duração total
+
+        Raises:
+            FalhaPipeline: se alguma etapa falhar (etapas independentes ainda são concluídas)
+        """
+        plano = self.planejar(disponiveis)
+        execucoes = {nome: ExecucaoEtapa(nome=nome, status=ETAPA_IGNORADA, recurso=self.etapas[nome].recurso)
+                     for nome in self.ordem}
+        inicio_pipeline = time.perf_counter()
+        tarefas: Dict[str, asyncio.Task] = {}
+
+        async def rodar(nome: str):
+            etapa = self.etapas[nome]
+            execucao = execucoes[nome]
+
+            dependencias = [tarefas[d] for d in self.dependencias(nome) if d in tarefas]
+            if dependencias:
+                await asyncio.gather(*dependencias, return_exceptions=True)
+            falhas = [d for d in self.dependencias(nome)
+                      if d in tarefas and execucoes[d].status != ETAPA_CONCLUIDA]
+            if falhas:
+                execucao.status = ETAPA_CANCELADA
+                execucao.erro = f"Dependência não concluída: {', '.join(sorted(falhas))}"
+                self._notificar(case_id, "etapa_cancelada", etapa=nome, erro=execucao.erro)
+                return
+
+            semaforo = self._semaforo(etapa.recurso)
+            if semaforo:
+                await semaforo.acquire()
+            try:
+                execucao.inicio = time.perf_counter() - inicio_pipeline
+                self.logger.info(f"▶️ [{case_id}] Etapa '{nome}' iniciada")
+                self._notificar(case_id, "etapa_iniciada", etapa=nome, recurso=etapa.recurso)
+                await etapa.executar(case_id)
+                execucao.status = ETAPA_CONCLUIDA
+            except Exception as e:
+                execucao.status = ETAPA_FALHOU
+                execucao.erro = str(e)
+                self.logger.error(f"❌ [{case_id}] Etapa '{nome}' falhou: {e}")
+            finally:
+                execucao.fim = time.perf_counter() - inicio_pipeline
+                execucao.duracao_s = execucao.fim - execucao.inicio
+                if semaforo:
+                    semaforo.release()
+
+            if execucao.status == ETAPA_CONCLUIDA:
+                self._notificar(case_id, "etapa_concluida", etapa=nome, duracao_s=round(execucao.duracao_s, 3))
+            else:
+                self._notificar(case_id, "etapa_falhou", etapa=nome, erro=execucao.erro)
+
+        for nome in plano:
+            tarefas[nome] = asyncio.create_task(rodar(nome), name=f"dag-{case_id}-{nome}")
+        await asyncio.gather(*tarefas.values())
+
+        relatorio = self._relatorio(case_id, execucoes, time.perf_counter() - inicio_pipeline)
+        self.logger.info(
+            f"🕸️ [{case_id}] Pipeline em {relatorio['duracao_total_s']:.1f}s "
+            f"(soma das etapas {relatorio['soma_duracoes_s']:.1f}s) | "
+            f"caminho crítico: {' -> '.join(relatorio['caminho_critico'])}"
+        )
+
+        self._notificar(
+            case_id, "pipeline_finalizado",
+            duracao_total_s=relatorio["duracao_total_s"],
+            caminho_critico=relatorio["caminho_critico"]
+        )
+
+        falhas = [execucao for execucao in execucoes.values() if execucao.status == ETAPA_FALHOU]
+        if falhas:
+            raise FalhaPipeline(
+                "; ".join(f"{execucao.nome}: {execucao.erro}" for execucao in falhas),
+                relatorio
+            )
+        return relatorio
+
+    def _notificar(self, case_id: str, evento: str, **dados):
+        if self.observador is None:
+            return
+        try:
+            self.observador(case_id, evento, dados)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Observador do pipeline falhou: {str(e)}")
+
+    def _relatorio(self, case_id: str, execucoes: Dict[str, ExecucaoEtapa], duracao_total: float) -> Dict[str, Any]:
+        executadas = {nome: e for nome, e in execucoes.items() if e.fim is not None}
+        return {
+            "case_id": case_id,
+            "finalizado_em": datetime.now().isoformat(),
+            "duracao_total_s": round(duracao_total, 3),
+            "soma_duracoes_s": round(sum(e.duracao_s for e in executadas.values()), 3),
+            "caminho_critico": self._caminho_critico(executadas),
+            "etapas": [asdict(execucoes[nome]) for nome in self.ordem]
+        }
+
+    def _caminho_critico(self, executadas: Dict[str, ExecucaoEtapa]) -> List[str]:
+        """Cadeia de etapas que determinou o término: da última a terminar, segue a dependência mais tardia"""
+        if not executadas:
+            return []
+
+        atual = max(executadas.values(), key=lambda e: e.fim).nome
+        caminho = [atual]
+        while True:
+            anteriores = [executadas[d] for d in self.dependencias(atual) if d in executadas]
+            if not anteriores:
+                break
+            atual = max(anteriores, key=lambda e: e.fim).nome
+            caminho.append(atual)
+        return list(reversed(caminho))
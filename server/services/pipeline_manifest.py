@@ -0,0 +1,127 @@
+"""
+Manifesto de Checkpoints do Pipeline por Caso
+Registra cada etapa concluída (etapas do pipeline, etapas do diálogo, seções da sentença
+e chunks de continuação) com o hash das entradas, permitindo retomar do primeiro item ausente
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .atomic_write import escrever_atomico
+
+VERSAO_MANIFESTO = 1
+
+# Um lock por manifesto: pipeline (event loop) e diálogo (thread de geração) atualizam o mesmo arquivo
+_locks_manifesto: Dict[str, threading.Lock] = {}
+_lock_registro = threading.Lock()
+
+
+def _lock_do_manifesto(caminho: Path) -> threading.Lock:
+    with _lock_registro:
+        return _locks_manifesto.setdefault(str(caminho.resolve()), threading.Lock())
+
+
+def hash_conteudo(*partes: Any) -> str:
+    """SHA-256 determinístico de uma sequência de valores (texto, dicts, None...)"""
+    hash_partes = hashlib.sha256()
+    for parte in partes:
+        if not isinstance(parte, str):
+            parte = json.dumps(parte, sort_keys=True, ensure_ascii=False, default=str)
+        hash_partes.update(parte.encode("utf-8"))
+        hash_partes.update(b"\0")
+    return hash_partes.hexdigest()
+
+
+class PipelineManifest:
+    """
+    manifest.json do caso: chave do checkpoint -> hash da entrada, arquivo e SHA-256 do conteúdo.
+    O conteúdo de cada checkpoint fica em checkpoints/, e só é reaproveitado se o hash
+    da entrada coincidir e o arquivo estiver íntegro.
+    """
+
+    def __init__(self, case_dir: Path):
+        self.logger = logging.getLogger(__name__)
+        self.case_dir = Path(case_dir)
+        self.path = self.case_dir / "manifest.json"
+        self.checkpoints_dir = self.case_dir / "checkpoints"
+        self._lock = _lock_do_manifesto(self.path)
+
+    def _ler(self) -> Dict[str, Any]:
+        if self.path.exists():
+            try:
+                return json.loads(self.path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                self.logger.warning(f"⚠️ Manifesto corrompido, recriando: {self.path}")
+        return {"versao": VERSAO_MANIFESTO, "checkpoints": {}}
+
+    def _arquivo_checkpoint(self, chave: str) -> Path:
+        return self.checkpoints_dir / f"{hashlib.sha256(chave.encode('utf-8')).hexdigest()[:32]}.json"
+
+    def obter(self, chave: str, hash_entrada: str) -> Optional[Any]:
+        """
+        Valor do checkpoint, se concluído com a mesma entrada
+
+        Returns:
+            Valor registrado, ou None se ausente, desatualizado ou corrompido
+        """
+        with self._lock:
+            registro = self._ler()["checkpoints"].get(chave)
+        if not registro or registro["hash_entrada"] != hash_entrada:
+            return None
+
+        arquivo = self.case_dir / registro["arquivo"]
+        if not arquivo.exists():
+            return None
+        conteudo = arquivo.read_text(encoding="utf-8")
+        if hashlib.sha256(conteudo.encode("utf-8")).hexdigest() != registro["sha256"]:
+            self.logger.warning(f"⚠️ Checkpoint corrompido ignorado: {chave}")
+            return None
+        return json.loads(conteudo)["valor"]
+
+    def concluido(self, chave: str, hash_entrada: str) -> bool:
+        """Checkpoint registrado com a mesma entrada (sem ler o conteúdo)"""
+        with self._lock:
+            registro = self._ler()["checkpoints"].get(chave)
+        return bool(registro) and registro["hash_entrada"] == hash_entrada
+
+    def registrar(self, chave: str, hash_entrada: str, valor: Any = None):
+        """Grava o conteúdo do checkpoint e o registra no manifesto (ambos atomicamente)"""
+        self.checkpoints_dir.mkdir(parents=True, exist_ok=True)
+        arquivo = self._arquivo_checkpoint(chave)
+        conteudo = json.dumps({"chave": chave, "valor": valor}, ensure_ascii=False, default=str)
+        escrever_atomico(arquivo, conteudo)
+
+        with self._lock:
+            dados = self._ler()
+            dados["checkpoints"][chave] = {
+                "hash_entrada": hash_entrada,
+                "arquivo": str(arquivo.relative_to(self.case_dir)),
+                "sha256": hashlib.sha256(conteudo.encode("utf-8")).hexdigest(),
+                "concluido_em": datetime.now().isoformat()
+            }
+            dados["atualizado_em"] = datetime.now().isoformat()
+            escrever_atomico(self.path, json.dumps(dados, indent=2, ensure_ascii=False))
+
+    def remover(self, prefixo: str = "") -> int:
+        """Remove os checkpoints cuja chave começa com o prefixo (todos, por padrão)"""
+        with self._lock:
+            dados = self._ler()
+            chaves = [chave for chave in dados["checkpoints"] if chave.startswith(prefixo)]
+            for chave in chaves:
+                registro = dados["checkpoints"].pop(chave)
+                (self.case_dir / registro["arquivo"]).unlink(missing_ok=True)
+            if self.path.exists() or chaves:
+                escrever_atomico(self.path, json.dumps(dados, indent=2, ensure_ascii=False))
+        return len(chaves)
+
+    def chaves(self, prefixo: str = "") -> List[str]:
+        """Chaves dos checkpoints registrados, em ordem de conclusão"""
+        with self._lock:
+            checkpoints = self._ler()["checkpoints"]
+        ordenadas = sorted(checkpoints.items(), key=lambda item: item[1]["concluido_em"])
+        return [chave for chave, _ in ordenadas if chave.startswith(prefixo)]
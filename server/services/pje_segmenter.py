@@ -0,0 +1,302 @@
+"""
+Índice de Peças do Processo PJe
+Segmenta o texto extraído (processo_extraido.txt) em peças pelos marcadores do PJe: cabeçalho
+de página ``Fls.: N``, rodapé ``Assinado eletronicamente por: ... - Juntado em: ... - <id>`` e o
+SUMÁRIO ao final (Id., data, documento e tipo). O índice (processo_indice.json, ao lado do
+texto) guarda o ID, o tipo e os offsets de caractere/página de cada peça, para que as etapas
+enviem aos LLMs apenas as peças de que precisam em vez de cortar o início e o fim do texto.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .atomic_write import escrever_json_atomico
+
+ARQUIVO_INDICE = "processo_indice.json"
+VERSAO_INDICE = 1
+
+# Tipos de peça, na ordem de verificação (os mais específicos primeiro)
+TIPOS_PECA: List[Tuple[str, str]] = [
+    ("replica", r"r[ée]plica|impugna[çc][ãa]o [àa] (contesta|defesa)|manifesta[çc][ãa]o sobre a (contesta|defesa)"),
+    ("peticao_inicial", r"peti[çc][ãa]o inicial|reclama[çc][ãa]o trabalhista|a[çc][ãa]o trabalhista"),
+    ("contestacao", r"contesta[çc][ãa]o|\bdefesa\b"),
+    ("prova_emprestada", r"prova emprestada"),
+    ("ata_audiencia", r"\bata\b|termo de audi[êe]ncia"),
+    ("sentenca", r"senten[çc]a"),
+    ("laudo", r"laudo|per[íi]cia"),
+    ("recurso", r"recurso|embargos"),
+    ("decisao", r"decis[ãa]o|despacho"),
+    ("procuracao", r"procura[çc][ãa]o|substabelecimento"),
+    ("manifestacao", r"manifesta[çc][ãa]o|impugna[çc][ãa]o"),
+]
+TIPO_DOCUMENTO = "documento"
+TIPO_CAPA = "capa"
+TIPO_SUMARIO = "sumario"
+
+NOMES_TIPOS = {
+    "replica": "RÉPLICA", "peticao_inicial": "PETIÇÃO INICIAL", "contestacao": "CONTESTAÇÃO",
+    "prova_emprestada": "PROVA EMPRESTADA", "ata_audiencia": "ATA DE AUDIÊNCIA", "sentenca": "SENTENÇA",
+    "laudo": "LAUDO", "recurso": "RECURSO", "decisao": "DECISÃO/DESPACHO", "procuracao": "PROCURAÇÃO",
+    "manifestacao": "MANIFESTAÇÃO", TIPO_DOCUMENTO: "DOCUMENTO", TIPO_CAPA: "CAPA", TIPO_SUMARIO: "SUMÁRIO",
+}
+
+# Peças que sustentam o relatório e a fundamentação da sentença
+PECAS_ESSENCIAIS = ("peticao_inicial", "contestacao", "replica", "ata_audiencia")
+
+_CABECALHO_PAGINA = re.compile(r"^Fls\.:\s*(\d+)\s*$", re.MULTILINE)
+_RODAPE = re.compile(
+    r"Assinado eletronicamente por:\s*(?P<assinante>.+?)\s*-\s*Juntado em:\s*"
+    r"(?P<data>\d{2}/\d{2}/\d{4}(?: \d{2}:\d{2}(?::\d{2})?)?)\s*-\s*(?P<id>[0-9a-f]{7})\b"
+)
+_INICIO_SUMARIO = re.compile(r"^SUMÁRIO\s*\nDocumentos\s*\nId\.", re.MULTILINE)
+_ENTRADA_SUMARIO = re.compile(r"^([0-9a-f]{7})\s*\n(\d{2}/\d{2}/\d{4} \d{2}:\d{2})\s*\n", re.MULTILINE)
+_MARCADOR_CAPA = "PAGINA_CAPA_PROCESSO_PJE"
+_CABECA_CLASSIFICACAO = 1500  # Caracteres iniciais da peça usados quando o sumário não a descreve
+
+logger = logging.getLogger(__name__)
+
+
+def classificar_peca(descricao: str) -> str:
+    """Tipo da peça a partir do título/tipo do sumário ou do início do texto"""
+    for tipo, padrao in TIPOS_PECA:
+        if re.search(padrao, descricao, re.IGNORECASE):
+            return tipo
+    return TIPO_DOCUMENTO
+
+
+@dataclass
+class Peca:
+    """Peça (documento juntado) do processo"""
+    tipo: str
+    inicio: int                          # Offset de caractere no processo_extraido.txt
+    fim: int
+    id: Optional[str] = None             # ID curto do PJe (7 hex)
+    titulo: Optional[str] = None         # Documento/Tipo no sumário
+    juntado_em: Optional[str] = None
+    assinado_por: Optional[str] = None
+    pagina_inicial: Optional[int] = None  # Fls. no PJe (ou página do PDF)
+    pagina_final: Optional[int] = None
+
+    @property
+    def rotulo(self) -> str:
+        partes = [NOMES_TIPOS.get(self.tipo, self.tipo.upper())]
+        if self.id:
+            partes.append(f"ID {self.id}")
+        if self.pagina_inicial is not None:
+            partes.append(f"fls. {self.pagina_inicial}-{self.pagina_final}")
+        return " - ".join(partes)
+
+
+@dataclass
+class IndiceProcesso:
+    """Índice de peças e páginas de processo_extraido.txt"""
+    caracteres: int
+    pecas: List[Peca] = field(default_factory=list)
+    paginas: List[Tuple[int, int]] = field(default_factory=list)  # (offset inicial, número da página)
+    versao: int = VERSAO_INDICE
+
+    def pecas_do_tipo(self, *tipos: str) -> List[Peca]:
+        return [peca for peca in self.pecas if peca.tipo in tipos]
+
+    def peca_por_id(self, id_peca: str) -> Optional[Peca]:
+        return next((peca for peca in self.pecas if peca.id == id_peca), None)
+
+    @property
+    def segmentado(self) -> bool:
+        """Há peças tipadas além de um único documento genérico"""
+        return any(peca.tipo not in (TIPO_DOCUMENTO, TIPO_CAPA, TIPO_SUMARIO) for peca in self.pecas)
+
+    def resumo(self, max_linhas: int = 80) -> str:
+        """Lista compacta das peças (tipo, ID, folhas e título) para os prompts"""
+        linhas = [
+            f"- {peca.rotulo}" + (f": {peca.titulo}" if peca.titulo else "")
+            for peca in self.pecas if peca.tipo not in (TIPO_CAPA, TIPO_SUMARIO)
+        ]
+        if len(linhas) > max_linhas:
+            linhas = linhas[:max_linhas] + [f"- ... mais {len(linhas) - max_linhas} peças"]
+        return "\n".join(linhas)
+
+    def fatiar(self, texto, tipos=PECAS_ESSENCIAIS, limite_caracteres: int = 30000) -> str:
+        """
+        Texto das peças dos tipos pedidos, na ordem dos autos, dentro do limite (``texto``: str
+        ou TextoCaso — só os trechos das peças são lidos)
+
+        O limite é repartido igualmente entre as peças; as que cabem na sua parte cedem a
+        sobra às demais, e as maiores mantêm o início (onde ficam pedidos, teses e qualificação).
+        """
+        pecas = [peca for peca in self.pecas if peca.tipo in tipos]
+        cotas = _repartir(limite_caracteres, [max(0, min(peca.fim, len(texto)) - peca.inicio) for peca in pecas])
+        blocos = []
+        for peca, cota in zip(pecas, cotas):
+            trecho = texto[peca.inicio:min(peca.fim, len(texto), peca.inicio + cota)].strip()
+            if not trecho:
+                continue
+            if peca.inicio + cota < min(peca.fim, len(texto)):
+                trecho += "\n[... PEÇA TRUNCADA ...]"
+            blocos.append(f"=== {peca.rotulo} ===\n{trecho}")
+        return "\n\n".join(blocos)
+
+    def para_dict(self) -> Dict:
+        return {
+            "versao": self.versao,
+            "caracteres": self.caracteres,
+            "paginas": [list(pagina) for pagina in self.paginas],
+            "pecas": [asdict(peca) for peca in self.pecas],
+        }
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> "IndiceProcesso":
+        return cls(
+            caracteres=dados["caracteres"],
+            pecas=[Peca(**peca) for peca in dados.get("pecas", [])],
+            paginas=[tuple(pagina) for pagina in dados.get("paginas", [])],
+            versao=dados.get("versao", VERSAO_INDICE),
+        )
+
+
+def _repartir(limite: int, tamanhos: List[int]) -> List[int]:
+    """Divide ``limite`` entre os tamanhos (water-filling): nenhum recebe mais do que precisa"""
+    cotas = [0] * len(tamanhos)
+    restantes = sorted(range(len(tamanhos)), key=lambda i: tamanhos[i])
+    disponivel = limite
+    while restantes:
+        parte = disponivel // len(restantes)
+        indice = restantes.pop(0)
+        cotas[indice] = min(tamanhos[indice], parte)
+        disponivel -= cotas[indice]
+    return cotas
+
+
+def _limites_paginas(texto: str, inicios_paginas: Optional[List[int]]) -> List[Tuple[int, int, int]]:
+    """(inicio, fim, número) de cada página: cabeçalhos Fls. do PJe, offsets da extração ou rodapés"""
+    marcadores = [(m.start(), int(m.group(1))) for m in _CABECALHO_PAGINA.finditer(texto)]
+    if not marcadores and inicios_paginas:
+        marcadores = [(inicio, numero) for numero, inicio in enumerate(inicios_paginas, start=1)]
+    if not marcadores:
+        # Sem páginas conhecidas: cada rodapé de assinatura encerra um trecho
+        fins = [texto.find("\n", m.end()) for m in _RODAPE.finditer(texto)]
+        inicios = [0] + [fim + 1 for fim in fins if fim != -1]
+        marcadores = [(inicio, numero) for numero, inicio in enumerate(sorted(set(inicios)), start=1)]
+    if marcadores[0][0] > 0:
+        marcadores.insert(0, (0, marcadores[0][1] - 1 if marcadores[0][1] > 1 else 0))
+    limites = []
+    for indice, (inicio, numero) in enumerate(marcadores):
+        fim = marcadores[indice + 1][0] if indice + 1 < len(marcadores) else len(texto)
+        if fim > inicio:
+            limites.append((inicio, fim, numero))
+    return limites
+
+
+def _ler_sumario(texto: str, inicio_sumario: int) -> Dict[str, str]:
+    """ID -> "documento / tipo" das entradas do SUMÁRIO"""
+    trecho = texto[inicio_sumario:]
+    entradas = list(_ENTRADA_SUMARIO.finditer(trecho))
+    descricoes = {}
+    for indice, entrada in enumerate(entradas):
+        fim = entradas[indice + 1].start() if indice + 1 < len(entradas) else len(trecho)
+        linhas = [linha.strip() for linha in trecho[entrada.end():fim].splitlines() if linha.strip()]
+        # Rodapés/cabeçalhos de página podem cair no meio do sumário
+        linhas = [linha for linha in linhas if not _CABECALHO_PAGINA.match(linha) and "Assinado eletronicamente" not in linha]
+        descricoes[entrada.group(1)] = " / ".join(linhas)
+    return descricoes
+
+
+def segmentar_processo(texto: str, inicios_paginas: Optional[List[int]] = None) -> IndiceProcesso:
+    """
+    Segmenta o texto do processo em peças
+
+    Args:
+        texto: Conteúdo de processo_extraido.txt
+        inicios_paginas: Offsets das páginas do PDF (usados quando o texto não traz ``Fls.: N``)
+
+    Returns:
+        IndiceProcesso: Peças contíguas cobrindo todo o texto, na ordem dos autos
+    """
+    paginas = _limites_paginas(texto, inicios_paginas) if texto else []
+    sumario = _INICIO_SUMARIO.search(texto)
+    descricoes = _ler_sumario(texto, sumario.start()) if sumario else {}
+
+    pecas: List[Peca] = []
+    for inicio, fim, numero in paginas:
+        rodapes = list(_RODAPE.finditer(texto, inicio, fim))
+        if rodapes:
+            rodape = rodapes[-1]
+            chave = ("id", rodape.group("id"))
+        elif sumario and inicio >= sumario.start() - 20:
+            rodape, chave = None, (TIPO_SUMARIO, None)
+        elif _MARCADOR_CAPA in texto[inicio:fim]:
+            rodape, chave = None, (TIPO_CAPA, None)
+        elif pecas:
+            # Página sem rodapé (ex.: imagem sem OCR) continua a peça anterior
+            rodape, chave = None, None
+        else:
+            rodape, chave = None, (TIPO_DOCUMENTO, None)
+
+        atual = pecas[-1] if pecas else None
+        if chave is None or (atual and (atual.id and chave == ("id", atual.id) or
+                                        not atual.id and chave[0] == atual.tipo and chave[0] != "id")):
+            atual.fim, atual.pagina_final = fim, numero
+            continue
+
+        if chave[0] == "id":
+            pecas.append(Peca(
+                tipo=TIPO_DOCUMENTO, inicio=inicio, fim=fim, id=chave[1], titulo=descricoes.get(chave[1]),
+                juntado_em=rodape.group("data"), assinado_por=rodape.group("assinante").strip(),
+                pagina_inicial=numero, pagina_final=numero
+            ))
+        else:
+            pecas.append(Peca(tipo=chave[0], inicio=inicio, fim=fim, pagina_inicial=numero, pagina_final=numero))
+
+    for peca in pecas:
+        if peca.tipo == TIPO_DOCUMENTO:
+            descricao = peca.titulo or texto[peca.inicio:min(peca.fim, peca.inicio + _CABECA_CLASSIFICACAO)]
+            peca.tipo = classificar_peca(descricao)
+
+    indice = IndiceProcesso(caracteres=len(texto), pecas=pecas, paginas=[(inicio, numero) for inicio, _, numero in paginas])
+    logger.info(f"🗂️ Processo segmentado: {len(pecas)} peças em {len(paginas)} páginas")
+    return indice
+
+
+def salvar_indice(caminho: Path, indice: IndiceProcesso):
+    escrever_json_atomico(Path(caminho), indice.para_dict(), indent=None)
+
+
+def carregar_indice(case_dir: Path, texto=None) -> Optional[IndiceProcesso]:
+    """
+    Índice do caso (processo_indice.json); reconstruído a partir do texto se ausente,
+    de versão anterior ou de outro texto (ex.: processo_extraido.txt truncado depois)
+
+    Args:
+        case_dir: Diretório do caso
+        texto: str ou TextoCaso de processo_extraido.txt (padrão: mapeado pelo CaseTextStore)
+
+    Returns:
+        IndiceProcesso, ou None se não houver índice nem texto do processo
+    """
+    case_dir = Path(case_dir)
+    caminho = case_dir / ARQUIVO_INDICE
+    if texto is None:
+        texto_path = case_dir / "processo_extraido.txt"
+        if texto_path.exists():
+            from .case_text_store import get_case_text_store
+
+            texto = get_case_text_store().abrir(texto_path)
+    try:
+        dados = json.loads(caminho.read_text(encoding="utf-8"))
+        if dados.get("versao") == VERSAO_INDICE and (texto is None or dados["caracteres"] == len(texto)):
+            return IndiceProcesso.de_dict(dados)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    if texto is None:
+        return None
+    indice = segmentar_processo(str(texto))
+    try:
+        salvar_indice(caminho, indice)
+    except OSError as e:
+        logger.warning(f"⚠️ Não foi possível salvar {caminho}: {e}")
+    return indice
@@ -7,11 +7,10 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict, Any, Optional, List
-import chromadb
-from chromadb.config import Settings
 import uuid
 from datetime import datetime
 
+from .atomic_write import escrever_json_atomico
 from .gemini_processor import ProcessoEstruturado
 
 class RAGService:
@@ -22,6 +21,8 @@ class RAGService:
         self.logger = logging.getLogger(__name__)
         
         # Inicializar ChromaDB
+        import chromadb
+        from chromadb.config import Settings
         chroma_dir = Path(__file__).resolve().parent.parent / "chroma_db"
         chroma_dir.mkdir(exist_ok=True)
         
@@ -199,10 +200,7 @@ LEGISLAÇÃO FUNDAMENTAL:
             caso_dir.mkdir(exist_ok=True)
             
             conhecimento_path = caso_dir / "conhecimento_rag.json"
-            conhecimento_path.write_text(
-                json.dumps(conhecimento_caso, indent=2, ensure_ascii=False), 
-                encoding='utf-8'
-            )
+            escrever_json_atomico(conhecimento_path, conhecimento_caso)
             
             self.logger.info(f"[{case_id}] Conhecimento salvo no RAG")
             
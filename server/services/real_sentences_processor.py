@@ -7,8 +7,6 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
-import fitz  # PyMuPDF
-from docx import Document
 import hashlib
 from datetime import datetime
 from dataclasses import dataclass, asdict
@@ -16,6 +14,8 @@ from dataclasses import dataclass, asdict
 from .judge_style_analyzer import JudgeStyleAnalyzer, JudgeStyleProfile
 from .legal_knowledge_manager import LegalKnowledgeManager
 from .optimized_embedding_service import OptimizedEmbeddingService
+from .service_registry import obter_servico
+from .document_extractor import get_document_extractor
 
 @dataclass
 class ProcessedSentence:
@@ -54,7 +54,7 @@ class RealSentencesProcessor:
         
         # Componentes de análise
         self.style_analyzer = JudgeStyleAnalyzer()
-        self.embedding_service = OptimizedEmbeddingService()
+        self.embedding_service = obter_servico("embeddings")
         
         # Cache
         self._processed_sentences = {}
@@ -64,24 +64,21 @@ class RealSentencesProcessor:
         """Extrai texto de arquivo (PDF, DOCX, DOC)"""
         try:
             if file_path.suffix.lower() == '.pdf':
-                # PDF com PyMuPDF
-                doc = fitz.open(str(file_path))
-                text = ""
-                for page in doc:
-                    text += page.get_text("text") + "\\n"
-                doc.close()
-                return text.strip()
-                
-            elif file_path.suffix.lower() in ['.docx', '.doc']:
-                # DOCX/DOC com python-docx
+                # PDF pelo extrator compartilhado (cache enquanto o arquivo não mudar)
+                return get_document_extractor().extrair(file_path).strip()
+
+            elif file_path.suffix.lower() == '.docx':
                 try:
-                    doc = Document(str(file_path))
-                    text = '\\n'.join([par.text for par in doc.paragraphs if par.text.strip()])
-                    return text.strip()
+                    return get_document_extractor().extrair(file_path).strip()
                 except Exception as e:
                     self.logger.warning(f"Erro python-docx em {file_path}, tentando fallback: {e}")
                     # Fallback: tentar como texto puro
                     return file_path.read_text(encoding='utf-8', errors='ignore')
+                
+            elif file_path.suffix.lower() == '.doc':
+                # DOC não é lido pelo python-docx: texto puro como fallback
+                self.logger.warning(f"Formato .doc sem extrator, lendo como texto: {file_path}")
+                return file_path.read_text(encoding='utf-8', errors='ignore')
             
             else:
                 self.logger.warning(f"Tipo de arquivo não suportado: {file_path.suffix}")
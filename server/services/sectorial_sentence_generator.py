@@ -8,6 +8,7 @@ from dataclasses import dataclass
 from .claude_service import ClaudeService
 from .gemini_processor import GeminiProcessor, ProcessoEstruturado
 from .enhanced_rag_service import EnhancedRAGService
+from .service_registry import obter_servico
 
 logger = logging.getLogger(__name__)
 
@@ -25,10 +26,11 @@ class SectorialSentenceGenerator:
     que supera limitações de contexto e gera sentenças detalhadas
     """
     
-    def __init__(self, case_id: str = None):
-        self.claude = ClaudeService()
-        self.gemini = GeminiProcessor()
+    def __init__(self, case_id: str = None, cache_policy: Optional[str] = None):
+        self.claude: ClaudeService = obter_servico("claude")
+        self.gemini: GeminiProcessor = obter_servico("gemini")
         self.case_id = case_id
+        self.cache_policy = cache_policy  # Política do cache de respostas do Claude
         # RAG será inicializado quando necessário
         
     def gerar_sentenca_completa(self, case_id: str, dados_processo, 
@@ -151,7 +153,7 @@ Seja EXTREMAMENTE DETALHADO - como um juiz real analisaria.
 """
 
         try:
-            response = self.claude.gerar_resposta(prompt_analise)
+            response = self.claude.gerar_resposta(prompt_analise, cache_policy=self.cache_policy)
             return {"analise_detalhada": response}
         except Exception as e:
             logger.error(f"Erro na análise probatória: {str(e)}")
@@ -185,7 +187,7 @@ INSTRUÇÕES:
 Seja preciso e completo - este é o início da sentença.
 """
 
-        conteudo = self.claude.gerar_resposta(prompt_relatorio)
+        conteudo = self.claude.gerar_resposta(prompt_relatorio, cache_policy=self.cache_policy)
         return SecaoSentenca(
             titulo="RELATÓRIO",
             conteudo=conteudo,
@@ -219,7 +221,7 @@ INSTRUÇÕES:
 Formate como seção de sentença com fundamentos robustos.
 """
             
-            conteudo = self.claude.gerar_resposta(prompt_preliminar)
+            conteudo = self.claude.gerar_resposta(prompt_preliminar, cache_policy=self.cache_policy)
             secoes.append(SecaoSentenca(
                 titulo=f"PRELIMINAR - {preliminar.upper()}",
                 conteudo=conteudo,
@@ -293,7 +295,7 @@ Analisa-se.
 Seja preciso, técnico e completo como uma sentença real.
 """
             
-            conteudo = self.claude.gerar_resposta(prompt_merito)
+            conteudo = self.claude.gerar_resposta(prompt_merito, cache_policy=self.cache_policy)
             secoes.append(SecaoSentenca(
                 titulo=f"DO(A) {pedido.categoria.upper()}",
                 conteudo=conteudo,
@@ -358,7 +360,7 @@ INSTRUÇÕES:
 Redija de forma técnica e robusta.
 """
             
-            conteudo = self.claude.gerar_resposta(prompt_secao)
+            conteudo = self.claude.gerar_resposta(prompt_secao, cache_policy=self.cache_policy)
             secoes.append(SecaoSentenca(
                 titulo=titulo,
                 conteudo=conteudo,
@@ -397,7 +399,7 @@ INSTRUÇÕES:
 Seja técnico, preciso e completo.
 """
         
-        conteudo = self.claude.gerar_resposta(prompt_dispositivo)
+        conteudo = self.claude.gerar_resposta(prompt_dispositivo, cache_policy=self.cache_policy)
         return SecaoSentenca(
             titulo="DISPOSITIVO",
             conteudo=conteudo,
@@ -0,0 +1,147 @@
+"""
+Registro de Serviços do Processo
+Cria uma única vez por processo os clientes e modelos caros (SentenceTransformers,
+SDKs Claude/Gemini/OpenAI, ChromaDB) e os compartilha entre requisições e casos
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional
+
+
+def _criar_embeddings():
+    from .optimized_embedding_service import OptimizedEmbeddingService
+    return OptimizedEmbeddingService()
+
+
+def _criar_claude():
+    from .claude_service import ClaudeService
+    return ClaudeService()
+
+
+def _criar_gemini():
+    from .gemini_processor import GeminiProcessor
+    return GeminiProcessor()
+
+
+def _criar_whisper():
+    from .whisper_service import WhisperService
+    return WhisperService()
+
+
+def _criar_rag():
+    from .rag_service import RAGService
+    return RAGService()
+
+
+# Serviços compartilhados: clientes HTTP dos SDKs são thread-safe, os modelos de embedding
+# são usados apenas em inferência e as escritas no ChromaDB passam pelo executor "chroma" (1 thread)
+FABRICAS_PADRAO: Dict[str, Callable[[], Any]] = {
+    "embeddings": _criar_embeddings,
+    "claude": _criar_claude,
+    "gemini": _criar_gemini,
+    "whisper": _criar_whisper,
+    "rag": _criar_rag,
+}
+
+
+class ServiceRegistry:
+    """Instâncias únicas por processo, criadas sob demanda ou no aquecimento da aplicação"""
+
+    def __init__(self, fabricas: Optional[Dict[str, Callable[[], Any]]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.fabricas = dict(fabricas or FABRICAS_PADRAO)
+
+        self._instancias: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {nome: threading.Lock() for nome in self.fabricas}
+        self._tempos_criacao: Dict[str, float] = {}
+        self._erros: Dict[str, str] = {}
+        self._aquecimento_concluido = False
+
+    def obter(self, nome: str) -> Any:
+        """
+        Retorna a instância compartilhada do serviço, criando-a na primeira chamada
+
+        Args:
+            nome: Nome do serviço (embeddings, claude, gemini, whisper, rag)
+
+        Returns:
+            Instância do serviço
+        """
+        instancia = self._instancias.get(nome)
+        if instancia is not None:
+            return instancia
+
+        if nome not in self.fabricas:
+            raise KeyError(f"Serviço desconhecido: {nome}")
+
+        # Lock por serviço: criações concorrentes do mesmo serviço aguardam a primeira
+        with self._locks[nome]:
+            if nome not in self._instancias:
+                inicio = time.perf_counter()
+                self._instancias[nome] = self.fabricas[nome]()
+                self._tempos_criacao[nome] = time.perf_counter() - inicio
+                self._erros.pop(nome, None)
+                self.logger.info(f"✅ Serviço '{nome}' criado em {self._tempos_criacao[nome]:.1f}s")
+        return self._instancias[nome]
+
+    def registrar(self, nome: str, instancia: Any):
+        """Registra uma instância já criada (ex.: fakes em testes)"""
+        self._locks.setdefault(nome, threading.Lock())
+        self._instancias[nome] = instancia
+
+    def aquecer(self, nomes: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Cria os serviços antecipadamente. Chamada bloqueante (carrega modelos).
+
+        Falhas (ex.: chave de API ausente) são registradas e não interrompem os demais serviços.
+
+        Returns:
+            Estado do registro após o aquecimento
+        """
+        for nome in nomes or list(self.fabricas):
+            try:
+                self.obter(nome)
+            except Exception as e:
+                self._erros[nome] = str(e)
+                self.logger.error(f"❌ Falha ao aquecer serviço '{nome}': {e}")
+
+        self._aquecimento_concluido = True
+        return self.status()
+
+    @property
+    def pronto(self) -> bool:
+        """Aquecimento concluído sem falhas"""
+        return self._aquecimento_concluido and not self._erros
+
+    def status(self) -> Dict[str, Any]:
+        """Estado de cada serviço para o endpoint de prontidão"""
+        return {
+            "pronto": self.pronto,
+            "aquecimento_concluido": self._aquecimento_concluido,
+            "servicos": {
+                nome: {
+                    "carregado": nome in self._instancias,
+                    "tempo_criacao_s": round(self._tempos_criacao[nome], 3) if nome in self._tempos_criacao else None,
+                    "erro": self._erros.get(nome)
+                }
+                for nome in self.fabricas
+            }
+        }
+
+
+_registry_global: Optional[ServiceRegistry] = None
+
+
+def get_service_registry() -> ServiceRegistry:
+    """Retorna o registro de serviços compartilhado pelo processo"""
+    global _registry_global
+    if _registry_global is None:
+        _registry_global = ServiceRegistry()
+    return _registry_global
+
+
+def obter_servico(nome: str) -> Any:
+    """Atalho para get_service_registry().obter(nome)"""
+    return get_service_registry().obter(nome)
@@ -0,0 +1,439 @@
+"""
+Retenção, Coleta de Lixo e Compactação do Storage
+Aplica políticas de idade, tamanho total (LRU) e referências sobre storage/ e rag_storage/:
+remove casos inativos, backups antigos e entradas do cache de artefatos sem referência,
+move instâncias Chroma órfãs para cleanup_backup e compacta casos frios.
+Toda execução gera um relatório; com dry_run nada é alterado.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from .artifact_cache import vincular_arquivo
+from .atomic_write import escrever_json_atomico
+from .case_lock import lock_caso, caminho_lock_caso
+from .metrics import STORAGE_GC_BYTES
+
+# Diretórios de storage/ que não são casos
+DIRETORIOS_RESERVADOS = {"rag_storage", "artifact_cache", "batches", "jobs"}
+
+# Status do caso no catálogo que impedem a remoção (job na fila ou em execução)
+STATUS_ATIVOS = {"pending", "queued", "running"}
+
+DIA_S = 24 * 3600
+
+_lock_execucao = threading.Lock()
+
+
+class GCEmExecucao(Exception):
+    """Outra coleta já está em andamento neste processo"""
+
+
+@dataclass
+class PoliticaRetencao:
+    """Políticas de retenção (None desliga a política)"""
+    idade_max_caso_dias: Optional[float] = None    # Casos sem atividade há mais tempo são removidos
+    limite_total_gb: Optional[float] = None        # Acima do limite, remove os casos menos recentes (LRU)
+    idade_max_backup_dias: Optional[float] = 30    # rag_storage/cleanup_backup
+    idade_max_cache_dias: Optional[float] = 30     # Entradas do cache de artefatos sem nenhum caso vinculado
+    carencia_orfaos_horas: Optional[float] = 24    # Instâncias Chroma sem caso (movidas para cleanup_backup)
+    compactar_apos_dias: Optional[float] = 7       # Casos frios: deduplica sentença e template, limpa temporários
+
+    @classmethod
+    def do_ambiente(cls) -> "PoliticaRetencao":
+        """Política a partir de STORAGE_* (valor vazio ou 0 desliga a política)"""
+        def _valor(nome: str, padrao: Optional[float]) -> Optional[float]:
+            bruto = os.getenv(nome)
+            if bruto is None:
+                return padrao
+            return float(bruto) if bruto.strip() and float(bruto) > 0 else None
+
+        return cls(
+            idade_max_caso_dias=_valor("STORAGE_RETENCAO_CASOS_DIAS", None),
+            limite_total_gb=_valor("STORAGE_LIMITE_GB", None),
+            idade_max_backup_dias=_valor("STORAGE_RETENCAO_BACKUP_DIAS", 30),
+            idade_max_cache_dias=_valor("STORAGE_RETENCAO_CACHE_DIAS", 30),
+            carencia_orfaos_horas=_valor("STORAGE_CARENCIA_ORFAOS_H", 24),
+            compactar_apos_dias=_valor("STORAGE_COMPACTAR_APOS_DIAS", 7),
+        )
+
+
+@dataclass
+class AcaoGC:
+    """Ação planejada (ou executada) pela coleta"""
+    tipo: str
+    caminho: str
+    bytes: int
+    motivo: str
+    case_id: Optional[str] = None
+
+
+@dataclass
+class RelatorioGC:
+    """Relatório da coleta: ações, bytes liberados (ou liberáveis, em dry_run) e erros"""
+    dry_run: bool
+    iniciado_em: str = field(default_factory=lambda: datetime.now().isoformat())
+    duracao_s: float = 0.0
+    casos_analisados: int = 0
+    bytes_casos: int = 0
+    acoes: List[AcaoGC] = field(default_factory=list)
+    erros: List[str] = field(default_factory=list)
+
+    @property
+    def bytes_liberados(self) -> int:
+        return sum(acao.bytes for acao in self.acoes)
+
+    def resumo(self) -> Dict[str, Dict[str, int]]:
+        """Quantidade de ações e bytes por tipo de ação"""
+        por_tipo: Dict[str, Dict[str, int]] = {}
+        for acao in self.acoes:
+            item = por_tipo.setdefault(acao.tipo, {"quantidade": 0, "bytes": 0})
+            item["quantidade"] += 1
+            item["bytes"] += acao.bytes
+        return por_tipo
+
+    def to_dict(self) -> Dict[str, Any]:
+        dados = asdict(self)
+        dados["bytes_liberados"] = self.bytes_liberados
+        dados["resumo"] = self.resumo()
+        return dados
+
+
+@dataclass
+class _Caso:
+    case_id: str
+    diretorios: List[Path]
+    bytes: int                # Tamanho aparente (storage/{id} + rag_storage/processo_{id})
+    bytes_liberaveis: int     # Apenas arquivos sem outros hardlinks (não compartilhados com o cache)
+    ultimo_acesso: float
+    status: Optional[str]
+
+
+def _tamanho(diretorio: Path) -> Tuple[int, int]:
+    """(bytes aparentes, bytes de arquivos sem outros hardlinks) de uma árvore"""
+    total = liberavel = 0
+    pendentes = [diretorio]
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            with os.scandir(atual) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        pendentes.append(entrada.path)
+                        continue
+                    info = entrada.stat(follow_symlinks=False)
+                    total += info.st_size
+                    if info.st_nlink <= 1:
+                        liberavel += info.st_size
+        except FileNotFoundError:
+            continue
+    return total, liberavel
+
+
+class StorageGC:
+    """Coleta de lixo do storage de casos, instâncias RAG e cache de artefatos"""
+
+    def __init__(self,
+                 storage_dir: Path,
+                 politica: Optional[PoliticaRetencao] = None,
+                 catalogo=None,
+                 protegido: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            storage_dir: Raiz do storage (casos, rag_storage/, artifact_cache/)
+            politica: Políticas de retenção (padrão: variáveis de ambiente)
+            catalogo: CaseCatalog para status/última atividade dos casos (opcional)
+            protegido: Callback extra que impede a remoção de um caso (ex.: job ativo)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.storage_dir = Path(storage_dir)
+        self.rag_storage = self.storage_dir / "rag_storage"
+        self.backup_dir = self.rag_storage / "cleanup_backup"
+        self.template_master = self.rag_storage / "template_master"
+        self.cache_dir = self.storage_dir / "artifact_cache"
+        self.politica = politica or PoliticaRetencao.do_ambiente()
+        self.catalogo = catalogo
+        self.protegido = protegido
+
+    # --------------------------------------------------------------- execução
+
+    def executar(self, dry_run: bool = True) -> RelatorioGC:
+        """
+        Planeja e (se não for dry_run) aplica a coleta
+
+        Entradas do cache que perderem a última referência nesta execução (caso removido)
+        são coletadas na próxima, após o prazo de retenção do cache.
+        """
+        if not _lock_execucao.acquire(blocking=False):
+            raise GCEmExecucao("Coleta do storage já em andamento")
+        try:
+            inicio = time.perf_counter()
+            agora = time.time()
+            relatorio = RelatorioGC(dry_run=dry_run)
+
+            casos = self._inventariar_casos()
+            relatorio.casos_analisados = len(casos)
+            relatorio.bytes_casos = sum(caso.bytes for caso in casos)
+
+            removidos = self._planejar_remocao_casos(casos, agora, relatorio)
+            self._planejar_compactacao([c for c in casos if c.case_id not in removidos], agora, relatorio)
+            self._planejar_orfaos({caso.case_id for caso in casos}, agora, relatorio)
+            self._planejar_backups(agora, relatorio)
+            self._planejar_cache(agora, relatorio)
+
+            if not dry_run:
+                self._aplicar(relatorio)
+
+            relatorio.duracao_s = round(time.perf_counter() - inicio, 3)
+            self.logger.info(
+                f"🧹 Storage GC{' (dry-run)' if dry_run else ''}: {len(relatorio.acoes)} ações, "
+                f"{relatorio.bytes_liberados / 1024 / 1024:.1f}MB {'liberáveis' if dry_run else 'liberados'} "
+                f"em {relatorio.duracao_s:.1f}s ({relatorio.casos_analisados} casos)"
+            )
+            return relatorio
+        finally:
+            _lock_execucao.release()
+
+    # ------------------------------------------------------------- inventário
+
+    def _inventariar_casos(self) -> List[_Caso]:
+        registros = self.catalogo.resumo_casos() if self.catalogo else {}
+        casos = []
+        with os.scandir(self.storage_dir) as entradas:
+            for entrada in entradas:
+                if (not entrada.is_dir(follow_symlinks=False) or entrada.name in DIRETORIOS_RESERVADOS
+                        or entrada.name.startswith(".")):
+                    continue
+                case_id = entrada.name
+                diretorios = [Path(entrada.path)]
+                instancia = self.rag_storage / f"processo_{case_id}"
+                if instancia.is_dir():
+                    diretorios.append(instancia)
+
+                total = liberavel = 0
+                for diretorio in diretorios:
+                    t, l = _tamanho(diretorio)
+                    total += t
+                    liberavel += l
+
+                ultimo_acesso = entrada.stat().st_mtime
+                status, atualizado_em = registros.get(case_id, (None, None))
+                if atualizado_em:
+                    ultimo_acesso = max(ultimo_acesso, datetime.fromisoformat(atualizado_em).timestamp())
+                casos.append(_Caso(case_id, diretorios, total, liberavel, ultimo_acesso, status))
+        return casos
+
+    def _pode_remover(self, caso: _Caso) -> bool:
+        if caso.status in STATUS_ATIVOS:
+            return False
+        return not (self.protegido and self.protegido(caso.case_id))
+
+    # ----------------------------------------------------------- planejamento
+
+    def _planejar_remocao_casos(self, casos: List[_Caso], agora: float, relatorio: RelatorioGC) -> set:
+        politica = self.politica
+        removidos = set()
+
+        def _remover(caso: _Caso, motivo: str):
+            removidos.add(caso.case_id)
+            relatorio.acoes.append(AcaoGC("remover_caso", str(caso.diretorios[0]), caso.bytes_liberaveis,
+                                          motivo, caso.case_id))
+
+        if politica.idade_max_caso_dias is not None:
+            limite = agora - politica.idade_max_caso_dias * DIA_S
+            for caso in casos:
+                if caso.ultimo_acesso < limite and self._pode_remover(caso):
+                    _remover(caso, f"sem atividade há mais de {politica.idade_max_caso_dias:g} dias")
+
+        if politica.limite_total_gb is not None:
+            limite_bytes = politica.limite_total_gb * 1024 ** 3
+            restante = sum(caso.bytes for caso in casos if caso.case_id not in removidos)
+            for caso in sorted(casos, key=lambda c: c.ultimo_acesso):
+                if restante <= limite_bytes:
+                    break
+                if caso.case_id in removidos or not self._pode_remover(caso):
+                    continue
+                _remover(caso, f"storage acima de {politica.limite_total_gb:g}GB (menos recente)")
+                restante -= caso.bytes
+        return removidos
+
+    def _planejar_compactacao(self, casos: List[_Caso], agora: float, relatorio: RelatorioGC):
+        if self.politica.compactar_apos_dias is None:
+            return
+        limite = agora - self.politica.compactar_apos_dias * DIA_S
+        templates = {
+            arquivo.name: arquivo.stat() for arquivo in self.template_master.glob("*.json")
+        } if self.template_master.exists() else {}
+
+        for caso in casos:
+            if caso.ultimo_acesso >= limite or caso.status in STATUS_ATIVOS:
+                continue
+            case_dir = caso.diretorios[0]
+
+            # Sentença repetida dentro do resultado completo do diálogo
+            resultado = case_dir / "dialogo_resultado_completo.json"
+            sentenca = case_dir / "sentenca_gerada.txt"
+            if resultado.exists() and sentenca.exists() and resultado.stat().st_size > sentenca.stat().st_size:
+                relatorio.acoes.append(AcaoGC(
+                    "compactar_resultado_dialogo", str(resultado), sentenca.stat().st_size,
+                    "sentenca_final duplicada em sentenca_gerada.txt", caso.case_id
+                ))
+
+            instancia = self.rag_storage / f"processo_{caso.case_id}"
+            if not instancia.is_dir():
+                continue
+
+            # Cópias do template_master: substituídas por hardlinks
+            for nome, info_master in templates.items():
+                copia = instancia / "estilo_juiza" / nome
+                try:
+                    info = copia.stat()
+                except FileNotFoundError:
+                    continue
+                if info.st_ino != info_master.st_ino and info.st_size == info_master.st_size:
+                    relatorio.acoes.append(AcaoGC(
+                        "deduplicar_template", str(copia), info.st_size, "cópia do template_master", caso.case_id
+                    ))
+
+            # Temporários de geração
+            temporarios = instancia / "temp_generation"
+            if temporarios.is_dir():
+                for arquivo in temporarios.iterdir():
+                    tamanho, _ = _tamanho(arquivo) if arquivo.is_dir() else (arquivo.stat().st_size, 0)
+                    relatorio.acoes.append(AcaoGC(
+                        "remover_temporario", str(arquivo), tamanho, "temporário de geração", caso.case_id
+                    ))
+
+    def _planejar_orfaos(self, case_ids: set, agora: float, relatorio: RelatorioGC):
+        if self.politica.carencia_orfaos_horas is None or not self.rag_storage.exists():
+            return
+        limite = agora - self.politica.carencia_orfaos_horas * 3600
+        with os.scandir(self.rag_storage) as entradas:
+            for entrada in entradas:
+                if not entrada.is_dir(follow_symlinks=False) or not entrada.name.startswith("processo_"):
+                    continue
+                case_id = entrada.name[len("processo_"):]
+                if case_id in case_ids or entrada.stat().st_mtime >= limite:
+                    continue
+                total, _ = _tamanho(Path(entrada.path))
+                relatorio.acoes.append(AcaoGC(
+                    "mover_instancia_orfa", entrada.path, 0,
+                    f"instância Chroma sem caso em storage/ ({total} bytes movidos para cleanup_backup)", case_id
+                ))
+
+    def _planejar_backups(self, agora: float, relatorio: RelatorioGC):
+        if self.politica.idade_max_backup_dias is None or not self.backup_dir.exists():
+            return
+        limite = agora - self.politica.idade_max_backup_dias * DIA_S
+        for backup in self.backup_dir.iterdir():
+            if backup.stat().st_mtime < limite:
+                _, liberavel = _tamanho(backup) if backup.is_dir() else (0, backup.stat().st_size)
+                relatorio.acoes.append(AcaoGC(
+                    "remover_backup", str(backup), liberavel,
+                    f"backup com mais de {self.politica.idade_max_backup_dias:g} dias"
+                ))
+
+    def _planejar_cache(self, agora: float, relatorio: RelatorioGC):
+        """Entradas do cache de artefatos sem referência (nenhum caso com hardlink) e não usadas no prazo"""
+        if self.politica.idade_max_cache_dias is None or not self.cache_dir.exists():
+            return
+        limite = agora - self.politica.idade_max_cache_dias * DIA_S
+        for meta_path in self.cache_dir.glob("*/*/meta.json"):
+            entrada_dir = meta_path.parent
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                arquivos = [(entrada_dir / nome).stat() for nome in meta["arquivos"]]
+            except (OSError, ValueError, KeyError):
+                continue
+            referencias = min((info.st_nlink - 1 for info in arquivos), default=0)
+            # meta.json é tocado a cada cache hit (ordem LRU)
+            if referencias == 0 and meta_path.stat().st_mtime < limite:
+                relatorio.acoes.append(AcaoGC(
+                    "remover_cache", str(entrada_dir), sum(info.st_size for info in arquivos),
+                    f"sem referências e sem uso há mais de {self.politica.idade_max_cache_dias:g} dias"
+                ))
+
+    # -------------------------------------------------------------- aplicação
+
+    def _aplicar(self, relatorio: RelatorioGC):
+        aplicadas = []
+        for acao in relatorio.acoes:
+            try:
+                getattr(self, f"_aplicar_{acao.tipo}")(acao)
+                aplicadas.append(acao)
+                STORAGE_GC_BYTES.incrementar(acao.bytes, tipo=acao.tipo)
+            except Exception as e:
+                relatorio.erros.append(f"{acao.tipo} {acao.caminho}: {e}")
+                self.logger.warning(f"⚠️ Storage GC: falha em {acao.tipo} {acao.caminho}: {e}")
+        relatorio.acoes = aplicadas
+
+    def _aplicar_remover_caso(self, acao: AcaoGC):
+        # Sem espera: um caso em uso por outro worker fica para a próxima coleta (registrado em erros)
+        with lock_caso(self.storage_dir, acao.case_id, timeout=0):
+            shutil.rmtree(acao.caminho, ignore_errors=True)
+            shutil.rmtree(self.rag_storage / f"processo_{acao.case_id}", ignore_errors=True)
+            if self.catalogo:
+                self.catalogo.remover_caso(acao.case_id)
+                self.catalogo.atualizar_status_instancia(acao.case_id, "removed")
+            caminho_lock_caso(self.storage_dir, acao.case_id).unlink(missing_ok=True)
+
+    def _aplicar_compactar_resultado_dialogo(self, acao: AcaoGC):
+        # Com o lock do caso: uma geração manual (/generate-from-existing) pode estar regravando o resultado
+        with lock_caso(self.storage_dir, acao.case_id, timeout=0):
+            resultado = Path(acao.caminho)
+            sentenca = (resultado.parent / "sentenca_gerada.txt").read_text(encoding="utf-8")
+            dados = json.loads(resultado.read_text(encoding="utf-8"))
+            if dados.get("sentenca_final") != sentenca:
+                acao.bytes = 0
+                return
+            dados.pop("sentenca_final")
+            dados["sentenca_final_arquivo"] = "sentenca_gerada.txt"
+            tamanho_anterior = resultado.stat().st_size
+            escrever_json_atomico(resultado, dados)
+            acao.bytes = tamanho_anterior - resultado.stat().st_size
+
+    def _aplicar_deduplicar_template(self, acao: AcaoGC):
+        with lock_caso(self.storage_dir, acao.case_id, timeout=0):
+            copia = Path(acao.caminho)
+            master = self.template_master / copia.name
+            if copia.read_bytes() != master.read_bytes():
+                acao.bytes = 0
+                return
+            vincular_arquivo(master, copia)
+
+    def _aplicar_remover_temporario(self, acao: AcaoGC):
+        with lock_caso(self.storage_dir, acao.case_id, timeout=0):
+            caminho = Path(acao.caminho)
+            if caminho.is_dir():
+                shutil.rmtree(caminho)
+            else:
+                caminho.unlink(missing_ok=True)
+
+    def _aplicar_mover_instancia_orfa(self, acao: AcaoGC):
+        destino = self.backup_dir / f"{Path(acao.caminho).name}_orfa_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        shutil.move(acao.caminho, str(destino))
+        if self.catalogo:
+            self.catalogo.atualizar_status_instancia(acao.case_id, "removed")
+
+    def _aplicar_remover_backup(self, acao: AcaoGC):
+        caminho = Path(acao.caminho)
+        if caminho.is_dir():
+            shutil.rmtree(caminho)
+        else:
+            caminho.unlink(missing_ok=True)
+
+    def _aplicar_remover_cache(self, acao: AcaoGC):
+        entrada_dir = Path(acao.caminho)
+        # Renomeia antes de apagar: leitores concorrentes veem a entrada ausente, nunca parcial
+        descartada = entrada_dir.parent / f".{entrada_dir.name}.gc"
+        os.rename(entrada_dir, descartada)
+        shutil.rmtree(descartada, ignore_errors=True)
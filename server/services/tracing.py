@@ -0,0 +1,156 @@
+"""
+Rastreamento (Tracing) do Pipeline por Caso
+Spans aninhados via contextvars (propagados ao event loop e às threads do AsyncExecutor),
+com atributos (caracteres de prompt, tokens, chunks, cache) exportados em JSONL
+para storage/{case_id}/trace.jsonl
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, Callable
+from uuid import uuid4
+
+ARQUIVO_TRACE = "trace.jsonl"
+
+_span_atual: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span_atual", default=None)
+
+_locks_arquivos: Dict[str, threading.Lock] = {}
+_lock_registro = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def tracing_ativo() -> bool:
+    """Tracing habilitado (TRACING_ATIVO=0 desliga a exportação)"""
+    return os.getenv("TRACING_ATIVO", "1") == "1"
+
+
+class Span:
+    """Trecho cronometrado do pipeline de um caso"""
+
+    def __init__(self, nome: str, case_id: str, case_dir: Path, trace_id: str,
+                 parent_id: Optional[str], atributos: Dict[str, Any]):
+        self.nome = nome
+        self.case_id = case_id
+        self.case_dir = case_dir
+        self.trace_id = trace_id
+        self.span_id = uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.atributos = dict(atributos)
+        self.inicio = time.time()
+        self._inicio_perf = time.perf_counter()
+        self.status = "ok"
+        self.erro: Optional[str] = None
+
+    def definir(self, **atributos):
+        """Define atributos do span"""
+        self.atributos.update(atributos)
+
+    def somar(self, chave: str, valor: float = 1):
+        """Acumula um atributo numérico (ex.: tokens de várias chamadas)"""
+        self.atributos[chave] = self.atributos.get(chave, 0) + valor
+
+    def to_dict(self, duracao_ms: float) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "case_id": self.case_id,
+            "nome": self.nome,
+            "inicio": self.inicio,
+            "duracao_ms": round(duracao_ms, 3),
+            "status": self.status,
+            "erro": self.erro,
+            "thread": threading.current_thread().name,
+            "atributos": self.atributos
+        }
+
+
+class _SpanNulo:
+    """Span sem caso associado (chamada fora de um trace): atributos são descartados"""
+
+    def definir(self, **atributos):
+        pass
+
+    def somar(self, chave: str, valor: float = 1):
+        pass
+
+
+SPAN_NULO = _SpanNulo()
+
+
+def span_atual():
+    """Span ativo no contexto atual (ou um span nulo)"""
+    return _span_atual.get() or SPAN_NULO
+
+
+def _exportar(span: Span, duracao_ms: float):
+    caminho = span.case_dir / ARQUIVO_TRACE
+    with _lock_registro:
+        lock = _locks_arquivos.setdefault(str(caminho), threading.Lock())
+    linha = json.dumps(span.to_dict(duracao_ms), ensure_ascii=False, default=str)
+    try:
+        with lock, open(caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(linha + "\n")
+    except OSError as e:
+        logger.warning(f"⚠️ Não foi possível exportar o span {span.nome}: {e}")
+
+
+@contextmanager
+def span(nome: str, case_id: Optional[str] = None, case_dir: Optional[Path] = None, **atributos) -> Iterator[Any]:
+    """
+    Abre um span filho do span atual
+
+    Com case_id/case_dir inicia (ou continua, se já houver span do mesmo caso) o trace do caso;
+    sem eles e sem span ativo, nada é registrado.
+    """
+    pai = _span_atual.get()
+    if not tracing_ativo() or (pai is None and case_dir is None):
+        yield SPAN_NULO
+        return
+
+    if pai is not None and (case_id is None or case_id == pai.case_id):
+        novo = Span(nome, pai.case_id, pai.case_dir, pai.trace_id, pai.span_id, atributos)
+    else:
+        novo = Span(nome, case_id or Path(case_dir).name, Path(case_dir), uuid4().hex, None, atributos)
+
+    token = _span_atual.set(novo)
+    try:
+        yield novo
+    except BaseException as e:
+        novo.status = "erro"
+        novo.erro = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _span_atual.reset(token)
+        if novo.case_dir.exists():
+            _exportar(novo, (time.perf_counter() - novo._inicio_perf) * 1000)
+
+
+def rastrear(nome: Optional[str] = None, **atributos) -> Callable:
+    """Decorador: executa a função (síncrona ou assíncrona) dentro de um span"""
+    def decorador(funcao: Callable) -> Callable:
+        nome_span = nome or funcao.__qualname__
+
+        if inspect.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def envoltorio_assincrono(*args, **kwargs):
+                with span(nome_span, **atributos):
+                    return await funcao(*args, **kwargs)
+            return envoltorio_assincrono
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with span(nome_span, **atributos):
+                return funcao(*args, **kwargs)
+        return envoltorio
+
+    return decorador
@@ -0,0 +1,267 @@
+"""
+Recepção de Uploads em Streaming com Memória Constante
+Grava as partes multipart diretamente em disco, em chunks, calculando SHA-256,
+identificando o tipo real do arquivo e aplicando o limite de tamanho durante a transferência
+"""
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional, Set, BinaryIO, Callable, Tuple
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart <= 0.0.12
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Bytes iniciais inspecionados para identificar o tipo do arquivo
+TAMANHO_CABECALHO = 4096
+# Folga sobre o limite total para delimitadores e cabeçalhos das partes multipart
+FOLGA_MULTIPART = 1024 * 1024
+
+
+@dataclass
+class RegraCampo:
+    """Regras de aceitação de um campo de arquivo do formulário"""
+    prefixo: str                         # Nome base do arquivo salvo (ex.: "processo")
+    extensoes: Set[str]                  # Extensões aceitas
+    max_bytes: int                       # Limite de tamanho aplicado durante o streaming
+    tipos_por_extensao: Dict[str, Set[str]]  # Tipos detectados aceitos para cada extensão
+
+
+@dataclass
+class ArquivoRecebido:
+    """Arquivo gravado a partir do upload"""
+    campo: str
+    nome_original: str
+    caminho: str
+    tamanho_bytes: int
+    sha256: str
+    tipo_detectado: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class UploadInvalido(Exception):
+    """Upload rejeitado (extensão, tipo ou tamanho inválidos)"""
+
+    def __init__(self, mensagem: str, status_code: int = 400):
+        super().__init__(mensagem)
+        self.status_code = status_code
+
+
+def detectar_tipo(cabecalho: bytes) -> Optional[str]:
+    """Identifica o tipo do arquivo pelos bytes iniciais (magic numbers)"""
+    if b"%PDF-" in cabecalho[:1024]:
+        return "pdf"
+    if cabecalho.startswith(b"PK\x03\x04"):
+        return "zip"  # DOCX é um pacote ZIP
+    if len(cabecalho) >= 12 and cabecalho[4:8] == b"ftyp":
+        return "mp4"  # Família ISO BMFF (mp4, m4a)
+    if cabecalho.startswith(b"RIFF") and cabecalho[8:12] == b"WAVE":
+        return "wav"
+    if cabecalho.startswith(b"ID3"):
+        return "mp3"
+    if len(cabecalho) >= 2 and cabecalho[0] == 0xFF:
+        if cabecalho[1] & 0xF6 == 0xF0:
+            return "aac"  # ADTS
+        if cabecalho[1] & 0xE0 == 0xE0:
+            return "mp3"  # Frame sync MPEG
+    return None
+
+
+class _ParteEmGravacao:
+    """Estado de uma parte de arquivo sendo gravada em disco"""
+
+    def __init__(self, campo: str, nome_original: str, extensao: str, regra: RegraCampo, destino_dir: Path):
+        self.campo = campo
+        self.nome_original = nome_original
+        self.extensao = extensao
+        self.regra = regra
+        self.destino = destino_dir / f"{regra.prefixo}.{extensao}"
+        self.temporario = destino_dir / f".{regra.prefixo}.{extensao}.part"
+        self.arquivo: BinaryIO = open(self.temporario, "wb")
+        self.hash = hashlib.sha256()
+        self.tamanho = 0
+        self.cabecalho = b""
+        self.tipo_detectado: Optional[str] = None
+        self.tipo_validado = False
+
+    def escrever(self, dados: bytes):
+        self.tamanho += len(dados)
+        if self.tamanho > self.regra.max_bytes:
+            raise UploadInvalido(
+                f"Arquivo '{self.campo}' excede o limite de {self.regra.max_bytes // (1024 * 1024)}MB",
+                status_code=413
+            )
+
+        if not self.tipo_validado:
+            self.cabecalho += dados[:TAMANHO_CABECALHO - len(self.cabecalho)]
+            if len(self.cabecalho) >= TAMANHO_CABECALHO:
+                self._validar_tipo()
+
+        self.hash.update(dados)
+        self.arquivo.write(dados)
+
+    def _validar_tipo(self):
+        self.tipo_detectado = detectar_tipo(self.cabecalho)
+        aceitos = self.regra.tipos_por_extensao.get(self.extensao, set())
+        if self.tipo_detectado not in aceitos:
+            raise UploadInvalido(
+                f"Conteúdo do arquivo '{self.campo}' não corresponde à extensão .{self.extensao} "
+                f"(detectado: {self.tipo_detectado or 'desconhecido'})",
+                status_code=415
+            )
+        self.tipo_validado = True
+
+    def finalizar(self) -> ArquivoRecebido:
+        if not self.tipo_validado:
+            self._validar_tipo()
+        self.arquivo.close()
+        os.replace(self.temporario, self.destino)
+        return ArquivoRecebido(
+            campo=self.campo,
+            nome_original=self.nome_original,
+            caminho=str(self.destino),
+            tamanho_bytes=self.tamanho,
+            sha256=self.hash.hexdigest(),
+            tipo_detectado=self.tipo_detectado
+        )
+
+    def descartar(self):
+        if not self.arquivo.closed:
+            self.arquivo.close()
+        self.temporario.unlink(missing_ok=True)
+
+
+class ReceptorUploadStreaming:
+    """
+    Consome o corpo multipart da requisição chunk a chunk e grava cada arquivo em disco.
+
+    O uso de memória por upload é proporcional ao tamanho do chunk recebido,
+    independente do tamanho dos arquivos enviados.
+
+    Por padrão cada campo de ``regras`` é gravado em ``destino_dir``; com ``resolver``,
+    o nome do campo recebido é mapeado para (regra, diretório) — ex.: ``processo_3``
+    de um lote gravado no diretório do terceiro caso.
+    """
+
+    def __init__(self,
+                 destino_dir: Optional[Path],
+                 regras: Dict[str, RegraCampo],
+                 resolver: Optional[Callable[[str], Optional[Tuple[RegraCampo, Path]]]] = None,
+                 limite_total: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.destino_dir = Path(destino_dir) if destino_dir else None
+        self.regras = regras
+        self.resolver = resolver
+        self.limite_total = limite_total
+
+        self._parte: Optional[_ParteEmGravacao] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_campo = b""
+        self._header_valor = b""
+        self._recebidos: Dict[str, ArquivoRecebido] = {}
+
+    async def receber(self, request) -> Dict[str, ArquivoRecebido]:
+        """
+        Lê o corpo da requisição em streaming e grava os arquivos aceitos
+
+        Args:
+            request: Request do Starlette/FastAPI com corpo multipart/form-data
+
+        Returns:
+            Dict campo -> ArquivoRecebido
+        """
+        content_type, opcoes = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in opcoes:
+            raise UploadInvalido("Envie os arquivos como multipart/form-data")
+
+        limite_total = self.limite_total or sum(regra.max_bytes for regra in self.regras.values())
+        limite_total += FOLGA_MULTIPART
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limite_total:
+            raise UploadInvalido("Upload excede o tamanho máximo permitido", status_code=413)
+
+        parser = MultipartParser(opcoes[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+        # Content-Length ausente (chunked) ou incorreto: o total também é conferido durante o stream
+        total_recebido = 0
+        try:
+            async for chunk in request.stream():
+                if chunk:
+                    total_recebido += len(chunk)
+                    if total_recebido > limite_total:
+                        raise UploadInvalido("Upload excede o tamanho máximo permitido", status_code=413)
+                    parser.write(chunk)
+            parser.finalize()
+        except Exception:
+            if self._parte:
+                self._parte.descartar()
+                self._parte = None
+            raise
+
+        return self._recebidos
+
+    # -------------------------
+    # CALLBACKS DO PARSER MULTIPART
+    # -------------------------
+    def _on_part_begin(self):
+        self._headers = {}
+        self._parte = None
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_campo += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_valor += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_campo.lower()] = self._header_valor
+        self._header_campo = b""
+        self._header_valor = b""
+
+    def _on_headers_finished(self):
+        _, opcoes = parse_options_header(self._headers.get(b"content-disposition", b""))
+        campo = opcoes.get(b"name", b"").decode("utf-8", errors="replace")
+        nome_arquivo = opcoes.get(b"filename")
+
+        if self.resolver:
+            regra, destino_dir = self.resolver(campo) or (None, None)
+        else:
+            regra, destino_dir = self.regras.get(campo), self.destino_dir
+        if regra is None or nome_arquivo is None:
+            return  # Campo desconhecido ou não-arquivo: ignorado
+
+        nome_original = nome_arquivo.decode("utf-8", errors="replace")
+        extensao = nome_original.split(".")[-1].lower()
+        if extensao not in regra.extensoes:
+            self.logger.error(f"❌ Extensão inválida do campo {campo}: .{extensao}")
+            raise UploadInvalido(f"Extensão do {campo} inválida: .{extensao}")
+
+        self._parte = _ParteEmGravacao(campo, nome_original, extensao, regra, destino_dir)
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._parte:
+            self._parte.escrever(data[start:end])
+
+    def _on_part_end(self):
+        if self._parte:
+            arquivo = self._parte.finalizar()
+            self._recebidos[arquivo.campo] = arquivo
+            self.logger.info(
+                f"✅ {arquivo.campo.capitalize()} salvo: {arquivo.caminho} "
+                f"({arquivo.tamanho_bytes} bytes, sha256={arquivo.sha256[:12]}…)"
+            )
+            self._parte = None
@@ -3,15 +3,17 @@ Serviço de transcrição de áudio usando OpenAI Whisper
 Transcreve gravações de audiências (MP4) para texto
 """
 
-import openai
 import os
 from pathlib import Path
 from typing import Dict, Optional, Any
-import json
 import logging
 from dataclasses import dataclass
 import time
 
+from .atomic_write import escrever_atomico, escrever_json_atomico
+from .admission_control import chamar_llm
+from .tracing import span
+
 @dataclass
 class TranscricaoAudiencia:
     """Resultado da transcrição de audiência"""
@@ -31,6 +33,8 @@ class WhisperService:
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
         
+        import openai
+
         self.client = openai.OpenAI(api_key=self.api_key)
         self.logger = logging.getLogger(__name__)
         
@@ -49,7 +53,8 @@ class WhisperService:
         Returns:
             TranscricaoAudiencia: Resultado da transcrição
         """
-        
+        import openai
+
         if not arquivo_audio.exists():
             raise FileNotFoundError(f"Arquivo de áudio não encontrado: {arquivo_audio}")
         
@@ -63,16 +68,20 @@ class WhisperService:
         try:
             inicio = time.time()
             
-            # Realizar transcrição
-            with open(arquivo_audio, 'rb') as audio_file:
-                response = self.client.audio.transcriptions.create(
-                    model=self.model,
-                    file=audio_file,
-                    language="pt",  # Português brasileiro
-                    response_format="verbose_json",
-                    temperature=0.0,  # Mais determinístico
-                    prompt="Esta é uma gravação de audiência trabalhista no Brasil. Transcreva com precisão termos jurídicos, nomes das partes, depoimentos de testemunhas e decisões judiciais."
-                )
+            # Realizar transcrição (o arquivo é reaberto a cada tentativa: um retry após 429
+            # enviaria um handle já lido até o fim)
+            def transcrever():
+                with open(arquivo_audio, 'rb') as audio_file:
+                    return self.client.audio.transcriptions.create(
+                        model=self.model,
+                        file=audio_file,
+                        language="pt",  # Português brasileiro
+                        response_format="verbose_json",
+                        temperature=0.0,  # Mais determinístico
+                        prompt="Esta é uma gravação de audiência trabalhista no Brasil. Transcreva com precisão termos jurídicos, nomes das partes, depoimentos de testemunhas e decisões judiciais."
+                    )
+
+            response = chamar_llm("whisper", self.model, transcrever)
             
             duracao_transcricao = time.time() - inicio
             
@@ -143,7 +152,7 @@ class WhisperService:
         
         # Salvar texto completo
         arquivo_texto = diretorio_caso / "audiencia_transcricao.txt"
-        arquivo_texto.write_text(transcricao.texto_completo, encoding='utf-8')
+        escrever_atomico(arquivo_texto, transcricao.texto_completo)
         
         # Salvar dados estruturados
         arquivo_json = diretorio_caso / "audiencia_transcricao.json"
@@ -156,28 +165,30 @@ class WhisperService:
             'metadados': transcricao.metadados
         }
         
-        arquivo_json.write_text(json.dumps(dados_estruturados, indent=2, ensure_ascii=False), encoding='utf-8')
+        escrever_json_atomico(arquivo_json, dados_estruturados)
         
         self.logger.info(f"Transcrição salva em: {arquivo_texto}")
         return arquivo_texto
     
-    def processar_audiencia_com_gemini(self, transcricao: TranscricaoAudiencia, case_id: str) -> Dict[str, Any]:
+    def processar_audiencia_com_gemini(self, transcricao: TranscricaoAudiencia, case_id: str,
+                                       cache_policy: Optional[str] = None) -> Dict[str, Any]:
         """
         Processa transcrição da audiência usando Gemini para extrair informações estruturadas
         
         Args:
             transcricao: Resultado da transcrição
             case_id: ID do caso
+            cache_policy: Política do cache de respostas do Gemini (usar | renovar | ignorar)
             
         Returns:
             Dict com informações estruturadas da audiência
         """
         
-        # Importar Gemini processor
-        from .gemini_processor import GeminiProcessor
+        # Gemini processor compartilhado pelo processo
+        from .service_registry import obter_servico
         
         try:
-            processor = GeminiProcessor()
+            processor = obter_servico("gemini")
             
             # Prompt específico para análise de audiência
             prompt_audiencia = f"""
@@ -236,13 +247,8 @@ FORMATO DE RESPOSTA (JSON):
 Responda APENAS com o JSON estruturado.
 """
 
-            response = processor.model.generate_content(
-                prompt_audiencia,
-                generation_config=processor.generation_config
-            )
-            
-            # Parse da resposta
-            resultado_json = processor._extrair_json_resposta(response.text)
+            with span("gemini.analisar_audiencia", prompt_chars=len(prompt_audiencia)):
+                resultado_json = processor.gerar_json(prompt_audiencia, cache_policy=cache_policy)
             
             self.logger.info(f"[{case_id}] Análise da audiência concluída")
             return resultado_json
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse com vários workers do uvicorn
+Sobe ``uvicorn main:app --workers N`` e dispara requisições concorrentes sobre os mesmos
+casos e sobre casos diferentes (upload, lote, geração a partir dos arquivos existentes e
+consulta de status). Ao final valida que todos os artefatos JSON dos casos e dos jobs são
+legíveis, que não sobraram temporários e que nenhum job foi executado em duplicidade.
+
+As etapas que dependem de LLM falham sem chaves de API; o objetivo é a integridade do
+storage sob concorrência entre processos, não o resultado do pipeline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+SERVER_DIR = Path(__file__).resolve().parent
+STORAGE_DIR = SERVER_DIR / "storage"
+
+
+def pdf_sintetico(indice: int) -> bytes:
+    """PDF mínimo com texto (PyMuPDF, se disponível)"""
+    try:
+        import fitz
+    except ImportError:
+        return b"%PDF-1.4\n%stress\n" + f"processo {indice}".encode() + b"\n%%EOF\n"
+    documento = fitz.open()
+    pagina = documento.new_page()
+    pagina.insert_text((72, 72), f"RECLAMAÇÃO TRABALHISTA {indice}\nHoras extras e intervalo intrajornada.")
+    conteudo = documento.tobytes()
+    documento.close()
+    return conteudo
+
+
+def iniciar_servidor(porta: int, workers: int) -> subprocess.Popen:
+    ambiente = {
+        **os.environ,
+        "AQUECER_SERVICOS": "0",
+        "STORAGE_GC_INTERVALO_H": "0",
+        "JOB_MAX_RETRIES": "0",
+        "LOCK_CASO_TIMEOUT_S": "0.5",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=SERVER_DIR, env=ambiente
+    )
+
+
+async def aguardar_servidor(cliente: httpx.AsyncClient, timeout: float = 120):
+    fim = time.monotonic() + timeout
+    while time.monotonic() < fim:
+        try:
+            if (await cliente.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("Servidor não respondeu ao /health")
+
+
+async def martelar(cliente: httpx.AsyncClient, casos: int, repeticoes: int) -> tuple:
+    """Cria casos e dispara operações concorrentes; retorna (case_ids, contagem de status HTTP)"""
+    respostas = Counter()
+
+    async def upload(indice: int):
+        resposta = await cliente.post("/upload-caso", files={
+            "processo": (f"processo_{indice}.pdf", pdf_sintetico(indice), "application/pdf")
+        })
+        respostas[f"upload {resposta.status_code}"] += 1
+        return resposta.json().get("case_id") if resposta.status_code == 201 else None
+
+    case_ids = [case_id for case_id in await asyncio.gather(*(upload(i) for i in range(casos))) if case_id]
+
+    async def operacao(case_id: str, tipo: str):
+        try:
+            if tipo == "gerar":
+                resposta = await cliente.post(f"/generate-from-existing/{case_id}")
+            elif tipo == "lote":
+                resposta = await cliente.post("/batch", params={"case_ids": [case_id]})
+            else:
+                resposta = await cliente.get(f"/cases/{case_id}/status")
+            respostas[f"{tipo} {resposta.status_code}"] += 1
+        except httpx.TransportError:
+            # Sem chaves de API a geração responde 500 e o uvicorn pode encerrar a conexão
+            respostas[f"{tipo} conexão encerrada"] += 1
+
+    # Mesmo caso: todas as operações sobre o primeiro caso; casos diferentes: uma de cada por caso
+    tarefas = [operacao(case_ids[0], tipo) for tipo in ("gerar", "lote", "status") for _ in range(repeticoes)]
+    tarefas += [operacao(case_id, tipo) for case_id in case_ids for tipo in ("gerar", "lote", "status")]
+    await asyncio.gather(*tarefas)
+    return case_ids, respostas
+
+
+def validar(case_ids: list) -> list:
+    """Lista de problemas de integridade encontrados no storage"""
+    problemas = []
+    jobs_por_caso = Counter()
+    for case_id in case_ids:
+        case_dir = STORAGE_DIR / case_id
+        for arquivo in case_dir.rglob("*"):
+            if arquivo.name.endswith(".tmp"):
+                problemas.append(f"temporário remanescente: {arquivo}")
+            elif arquivo.suffix == ".json":
+                try:
+                    json.loads(arquivo.read_text(encoding="utf-8"))
+                except (OSError, ValueError) as e:
+                    problemas.append(f"JSON inválido: {arquivo} ({e})")
+
+    for job_path in (STORAGE_DIR / "jobs").glob("*.json"):
+        try:
+            job = json.loads(job_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            problemas.append(f"job ilegível: {job_path} ({e})")
+            continue
+        if job["case_id"] in case_ids:
+            jobs_por_caso[job["case_id"]] += 1
+            # Uma etapa executada por dois workers acumularia mais tentativas que o permitido (retries=0)
+            for etapa in job["etapas"]:
+                if etapa["tentativas"] > 1:
+                    problemas.append(f"job {job['job_id']}: etapa {etapa['nome']} executada {etapa['tentativas']}x")
+    return problemas
+
+
+def limpar(case_ids: list):
+    from services.case_catalog import get_case_catalog
+
+    catalogo = get_case_catalog(STORAGE_DIR)
+    for case_id in case_ids:
+        shutil.rmtree(STORAGE_DIR / case_id, ignore_errors=True)
+        shutil.rmtree(STORAGE_DIR / "rag_storage" / f"processo_{case_id}", ignore_errors=True)
+        (STORAGE_DIR / ".locks" / f"{case_id}.lock").unlink(missing_ok=True)
+        catalogo.remover_caso(case_id)
+    for job_path in (STORAGE_DIR / "jobs").glob("*.json"):
+        try:
+            job = json.loads(job_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if job["case_id"] in case_ids:
+            job_path.unlink(missing_ok=True)
+            job_path.with_suffix(".lock").unlink(missing_ok=True)
+    for lote_path in (STORAGE_DIR / "batches").glob("*.json"):
+        try:
+            lote = json.loads(lote_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if all(item["case_id"] in case_ids for item in lote.get("itens", [])):
+            lote_path.unlink(missing_ok=True)
+
+
+async def executar(workers: int, casos: int, repeticoes: int, porta: int, espera_s: float, manter: bool):
+    print("📊 ESTRESSE COM VÁRIOS WORKERS")
+    print(f"   Workers: {workers} | Casos: {casos} | Repetições no mesmo caso: {repeticoes}")
+
+    servidor = iniciar_servidor(porta, workers)
+    case_ids, problemas = [], []
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{porta}", timeout=120) as cliente:
+            await aguardar_servidor(cliente)
+            inicio = time.perf_counter()
+            case_ids, respostas = await martelar(cliente, casos, repeticoes)
+            print(f"   Requisições concluídas em {time.perf_counter() - inicio:.1f}s")
+            for chave, quantidade in sorted(respostas.items()):
+                print(f"      {chave:<24} {quantidade:>6}")
+
+            # Jobs em background continuam nos workers; aguardar antes de validar
+            await asyncio.sleep(espera_s)
+    finally:
+        servidor.terminate()
+        servidor.wait(30)
+        try:
+            problemas = validar(case_ids)
+        finally:
+            if not manter:
+                limpar(case_ids)
+
+    print(f"\n   Casos validados: {len(case_ids)} | Problemas: {len(problemas)}")
+    for problema in problemas[:20]:
+        print(f"      ❌ {problema}")
+    return 1 if problemas else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Workers do uvicorn")
+    parser.add_argument("--casos", type=int, default=20, help="Casos criados por upload")
+    parser.add_argument("--repeticoes", type=int, default=10, help="Operações concorrentes de cada tipo no mesmo caso")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--espera", type=float, default=10, help="Espera pelos jobs em background (s)")
+    parser.add_argument("--manter", action="store_true", help="Não remover os casos criados")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(executar(args.workers, args.casos, args.repeticoes, args.porta, args.espera, args.manter)))
+
+
+if __name__ == "__main__":
+    main()
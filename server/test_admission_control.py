@@ -0,0 +1,171 @@
+"""
+Teste do controle de admissão das chamadas aos LLMs
+Valida o limite de concorrência e de tokens por janela, a prioridade das rotas interativas
+sobre os jobs em lote, a partilha justa entre casos e a pausa global após um 429
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import admission_control
+from services.admission_control import (
+    ControladorAdmissao, Orcamento, AdmissaoExpirada, contexto_admissao,
+    PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE
+)
+
+
+class ErroRateLimit(Exception):
+    status_code = 429
+
+
+def _em_threads(alvos):
+    threads = [threading.Thread(target=alvo) for alvo in alvos]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+
+def _ordem_de_atendimento(controlador, pedidos):
+    """Ocupa a única vaga, enfileira ``pedidos`` (case_id, prioridade) e devolve a ordem de admissão"""
+    ordem = []
+    liberar = threading.Event()
+
+    def ocupar():
+        with controlador.admitir("llm"):
+            liberar.wait(5)
+
+    def pedir(case_id, prioridade):
+        with contexto_admissao(case_id=case_id, prioridade=prioridade):
+            with controlador.admitir("llm"):
+                ordem.append(case_id)
+
+    ocupante = threading.Thread(target=ocupar)
+    ocupante.start()
+    time.sleep(0.05)
+    threads = []
+    for case_id, prioridade in pedidos:
+        threads.append(threading.Thread(target=pedir, args=(case_id, prioridade)))
+        threads[-1].start()
+        time.sleep(0.02)
+    liberar.set()
+    for thread in [ocupante, *threads]:
+        thread.join(5)
+    return ordem
+
+
+def test_limite_de_concorrencia():
+    """Nunca há mais chamadas simultâneas que o orçamento do provedor"""
+    controlador = ControladorAdmissao({"llm": Orcamento(concorrencia=2)})
+    ativos, pico = [0], [0]
+    lock = threading.Lock()
+
+    def chamar():
+        with controlador.admitir("llm"):
+            with lock:
+                ativos[0] += 1
+                pico[0] = max(pico[0], ativos[0])
+            time.sleep(0.03)
+            with lock:
+                ativos[0] -= 1
+
+    _em_threads([chamar] * 8)
+    assert pico[0] == 2
+
+
+def test_orcamento_de_tokens_por_janela():
+    """Sem saldo de tokens o pedido aguarda a reposição do balde; o prazo gera AdmissaoExpirada"""
+    controlador = ControladorAdmissao({"llm": Orcamento(concorrencia=10, tokens_por_minuto=100, janela_s=0.5)})
+
+    inicio = time.monotonic()
+    for _ in range(3):
+        with controlador.admitir("llm", tokens_estimados=100):
+            pass
+    # Balde cheio no primeiro pedido; os dois seguintes aguardam uma janela cada
+    assert time.monotonic() - inicio >= 0.9
+
+    with pytest.raises(AdmissaoExpirada):
+        with controlador.admitir("llm", tokens_estimados=100, timeout=0.05):
+            pass
+
+
+def test_orcamento_por_modelo_e_reconciliacao():
+    """O modelo com orçamento próprio usa seu balde; a resposta real devolve o excesso estimado"""
+    controlador = ControladorAdmissao({
+        "llm": Orcamento(concorrencia=1, tokens_por_minuto=1000),
+        "llm:pequeno": Orcamento(concorrencia=1, tokens_por_minuto=100, janela_s=600),
+    })
+    assert controlador.orcamento("llm", "grande")[1].tokens_por_minuto == 1000
+
+    resposta = SimpleNamespace(usage=SimpleNamespace(input_tokens=10, output_tokens=10))
+    controlador.executar("llm", "pequeno", lambda: resposta, tokens_estimados=100)
+    # Estimou 100, consumiu 20: sobra saldo para outro pedido de 80 sem esperar a janela
+    with controlador.admitir("llm", "pequeno", tokens_estimados=80, timeout=0.1):
+        pass
+
+
+def test_interativo_passa_a_frente_do_lote():
+    controlador = ControladorAdmissao({"llm": Orcamento(concorrencia=1)})
+    ordem = _ordem_de_atendimento(controlador, [
+        ("lote-1", PRIORIDADE_LOTE), ("lote-2", PRIORIDADE_LOTE), ("interativo", PRIORIDADE_INTERATIVA)
+    ])
+    assert ordem[0] == "interativo"
+    assert ordem[1:] == ["lote-1", "lote-2"]
+
+
+def test_partilha_justa_entre_casos():
+    """Um caso que acabou de consumir o orçamento cede a vez a um caso que ainda não consumiu"""
+    controlador = ControladorAdmissao({"llm": Orcamento(concorrencia=1)})
+    with contexto_admissao(case_id="caso-pesado"):
+        for _ in range(5):
+            with controlador.admitir("llm", tokens_estimados=1000):
+                pass
+
+    ordem = _ordem_de_atendimento(controlador, [
+        ("caso-pesado", PRIORIDADE_LOTE), ("caso-pesado", PRIORIDADE_LOTE), ("caso-leve", PRIORIDADE_LOTE)
+    ])
+    assert ordem[0] == "caso-leve"
+
+
+def test_rate_limit_pausa_o_orcamento_para_todos(monkeypatch):
+    """Após um 429 nenhum outro chamador é admitido antes do fim da pausa; a chamada é repetida"""
+    monkeypatch.setattr(admission_control, "BACKOFF_BASE_S", 0.3)
+    monkeypatch.setattr(admission_control, "JITTER_MAXIMO_S", 0.0)
+    controlador = ControladorAdmissao({"llm": Orcamento(concorrencia=4)})
+    tentativas = []
+
+    def chamada():
+        tentativas.append(time.monotonic())
+        if len(tentativas) == 1:
+            raise ErroRateLimit("429 rate limit")
+        return "ok"
+
+    inicio = time.monotonic()
+    assert controlador.executar("llm", None, chamada) == "ok"
+    assert len(tentativas) == 2
+    assert tentativas[1] - inicio >= 0.3
+
+    # Outro chamador também respeita a pausa vigente
+    controlador.backend.pausar("llm", 0.2)
+    inicio = time.monotonic()
+    with controlador.admitir("llm"):
+        assert time.monotonic() - inicio >= 0.15
+
+
+def test_erro_que_nao_e_rate_limit_nao_e_repetido():
+    controlador = ControladorAdmissao({"llm": Orcamento(concorrencia=1)})
+    chamadas = []
+
+    def chamada():
+        chamadas.append(1)
+        raise ValueError("prompt inválido")
+
+    with pytest.raises(ValueError):
+        controlador.executar("llm", None, chamada)
+    assert len(chamadas) == 1
+    # A vaga foi devolvida
+    with controlador.admitir("llm", timeout=0.1):
+        pass
@@ -0,0 +1,82 @@
+"""
+Teste do cache de artefatos endereçado por conteúdo
+Valida vínculo entre casos, invalidação por versão e reaproveitamento no pipeline automático
+"""
+
+import asyncio
+from pathlib import Path
+
+import main
+from services.artifact_cache import ArtifactCache, VERSOES_ARTEFATOS, sha256_arquivo
+
+
+def test_cache_vincula_artefatos_entre_casos(tmp_path: Path):
+    """Artefato publicado por um caso é vinculado (mesmo conteúdo) em outro caso"""
+    cache = ArtifactCache(tmp_path / "cache")
+    caso_a, caso_b = tmp_path / "a", tmp_path / "b"
+    caso_a.mkdir()
+    caso_b.mkdir()
+    (caso_a / "audiencia_transcricao.txt").write_text("TRANSCRIÇÃO", encoding='utf-8')
+
+    assert not cache.materializar("transcricao", "hash-audio", caso_b)
+    cache.armazenar("transcricao", "hash-audio", [caso_a / "audiencia_transcricao.txt"])
+    assert cache.materializar("transcricao", "hash-audio", caso_b)
+
+    assert (caso_b / "audiencia_transcricao.txt").read_text(encoding='utf-8') == "TRANSCRIÇÃO"
+    assert not cache.materializar("transcricao", "outro-hash", caso_b)
+
+
+def test_nova_versao_invalida_cache(tmp_path: Path):
+    """Alterar a versão do extrator/modelo/prompt gera outra chave"""
+    caso = tmp_path / "caso"
+    caso.mkdir()
+    ArtifactCache(tmp_path / "cache").armazenar_json("analise_audiencia", "h", caso / "audiencia_analise.json", {"a": 1})
+
+    versoes_novas = dict(VERSOES_ARTEFATOS, analise_audiencia="gemini/audiencia/v2")
+    assert ArtifactCache(tmp_path / "cache").ler_json("analise_audiencia", "h") == {"a": 1}
+    assert ArtifactCache(tmp_path / "cache", versoes_novas).ler_json("analise_audiencia", "h") is None
+
+
+def test_pipeline_reaproveita_extracao_e_gemini(tmp_path: Path, monkeypatch):
+    """Segundo upload do mesmo processo não repete extração nem chamada ao Gemini"""
+    import services.service_registry as service_registry
+    from services.service_registry import ServiceRegistry
+    from services.gemini_processor import GeminiProcessor, ProcessoEstruturado, ParteProcesso
+
+    chamadas = {"extracao": 0, "gemini": 0}
+
+    def extrair_texto(processo_path, destino, ocr=None, estatisticas=None):
+        chamadas["extracao"] += 1
+        destino.write_text("TEXTO DO PROCESSO", encoding='utf-8')
+        return "TEXTO DO PROCESSO"
+
+    class GeminiFake(GeminiProcessor):
+        def __init__(self):
+            pass  # Sem GOOGLE_API_KEY
+
+        def extrair_informacoes_processo(self, texto_processo, ao_concluir_campo=None):
+            chamadas["gemini"] += 1
+            return ProcessoEstruturado(
+                numero_processo="0000001-00.2024.5.09.0001",
+                partes=[ParteProcesso(nome="Fulano", tipo="requerente")],
+                pedidos=[], fatos_relevantes=[], testemunhas=[], normas_coletivas=[],
+                periodo_contratual=None, valor_causa=None, competencia=None,
+                jurisprudencias_citadas=[], decisao_final=None, fundamentacao_resumida=None
+            )
+
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(main, "_extrair_texto_documento", extrair_texto)
+    monkeypatch.setattr(main, "_salvar_no_rag", lambda *args: None)
+    registry = ServiceRegistry()
+    registry.registrar("gemini", GeminiFake())
+    monkeypatch.setattr(service_registry, "_registry_global", registry)
+
+    for case_id in ("caso1", "caso2"):
+        (tmp_path / case_id).mkdir()
+        (tmp_path / case_id / "processo.pdf").write_bytes(b"%PDF-1.4 mesmo processo")
+        asyncio.run(main.executar_processamento_automatico(case_id))
+
+    assert chamadas == {"extracao": 1, "gemini": 1}
+    caso2 = tmp_path / "caso2"
+    assert (caso2 / "processo_extraido.txt").read_text(encoding='utf-8') == "TEXTO DO PROCESSO"
+    assert sha256_arquivo(caso2 / "processo_estruturado.json") == sha256_arquivo(tmp_path / "caso1" / "processo_estruturado.json")
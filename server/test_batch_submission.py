@@ -0,0 +1,136 @@
+"""
+Teste do envio de casos em lote
+Valida a fila por prioridade do JobRunner (casos menores primeiro) e os endpoints /batch
+"""
+
+import asyncio
+from pathlib import Path
+
+import httpx
+
+import main
+from services.job_runner import JobRunner, STATUS_CONCLUIDO
+from test_job_runner import _aguardar
+
+
+def test_fila_executa_menor_prioridade_primeiro(tmp_path: Path):
+    """Jobs enfileirados juntos rodam em ordem de prioridade; empates seguem a ordem de chegada"""
+    executados = []
+
+    async def etapa(case_id):
+        executados.append(case_id)
+
+    async def cenario():
+        runner = JobRunner(tmp_path, {"pipeline": etapa}, max_workers=1, retry_backoff=0)
+        jobs = [
+            runner.submit("grande", ["pipeline"], prioridade=50.0),
+            runner.submit("pequeno", ["pipeline"], prioridade=1.0),
+            runner.submit("medio_a", ["pipeline"], prioridade=10.0),
+            runner.submit("medio_b", ["pipeline"], prioridade=10.0),
+        ]
+        await runner.start()
+        for job in jobs:
+            await _aguardar(runner, job.job_id)
+        await runner.stop()
+
+    asyncio.run(cenario())
+    assert executados == ["pequeno", "medio_a", "medio_b", "grande"]
+
+
+def test_batch_enfileira_uploads_e_casos_existentes(tmp_path: Path, monkeypatch):
+    """O lote cria casos para os pares enviados, aceita case_ids existentes e reporta a vazão"""
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    existente = tmp_path / "caso-existente"
+    existente.mkdir()
+    (existente / "processo.pdf").write_bytes(b"%PDF-1.4\n" + b"0" * 50_000)
+
+    executados = []
+
+    async def pipeline_fake(case_id):
+        executados.append(case_id)
+
+    async def cenario():
+        runner = JobRunner(tmp_path, {"pipeline": pipeline_fake}, max_workers=1, retry_backoff=0)
+        monkeypatch.setattr(main, "job_runner", runner)
+        await runner.start()
+
+        arquivos = {
+            "processo_1": ("grande.pdf", b"%PDF-1.4\n" + b"1" * 400_000, "application/pdf"),
+            "audiencia_1": ("grande.mp3", b"ID3" + b"\x00" * 600_000, "audio/mpeg"),
+            "processo_2": ("pequeno.pdf", b"%PDF-1.4\n" + b"2" * 1_000, "application/pdf"),
+        }
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            resposta = await client.post(
+                "/batch", files=arquivos, params={"case_ids": ["caso-existente", "inexistente"]}
+            )
+            lote = resposta.json()
+            for caso in lote["casos"]:
+                await _aguardar(runner, caso["job_id"])
+            resumo = (await client.get(f"/batch/{lote['batch_id']}")).json()
+            nao_encontrado = await client.get("/batch/nao-existe")
+
+        await runner.stop()
+        return resposta, lote, resumo, nao_encontrado
+
+    resposta, lote, resumo, nao_encontrado = asyncio.run(cenario())
+
+    assert resposta.status_code == 201
+    assert lote["rejeitados"] == [{"case_id": "inexistente", "motivo": "case_id não encontrado"}]
+    assert set(lote["orcamentos"]) >= {"whisper", "gemini", "claude"}
+
+    casos = {caso["origem"]: caso for caso in lote["casos"]}
+    assert set(casos) == {"upload:1", "upload:2", "existente"}
+    assert (tmp_path / casos["upload:1"]["case_id"] / "audiencia.mp3").exists()
+    assert (tmp_path / casos["upload:2"]["case_id"] / "arquivos.json").exists()
+
+    # Menor custo estimado primeiro
+    assert executados == [casos["upload:2"]["case_id"], casos["existente"]["case_id"], casos["upload:1"]["case_id"]]
+
+    assert resumo["finalizado"] and resumo["concluidos"] == 3
+    assert resumo["por_status"] == {STATUS_CONCLUIDO: 3}
+    assert resumo["vazao"]["casos_por_hora"] > 0
+    assert nao_encontrado.status_code == 404
+
+
+def test_batch_rejeita_case_ids_que_nao_sao_strings(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(main, "job_runner", JobRunner(tmp_path, {}, max_workers=1))
+
+    async def cenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.post("/batch", json=corpo)
+                    for corpo in ({"case_ids": [123]}, {"case_ids": "caso-1"}, {"case_ids": [None, "caso-1"]})]
+
+    for resposta in asyncio.run(cenario()):
+        assert resposta.status_code == 400
+        assert "case_ids" in resposta.json()["detail"]
+
+
+def test_batch_chunked_acima_do_limite_total_retorna_413(tmp_path: Path, monkeypatch):
+    """Sem Content-Length (chunked), o limite total do lote é conferido durante o stream"""
+    casos = tmp_path / "casos"
+    casos.mkdir()
+    monkeypatch.setattr(main, "STORAGE_DIR", casos)
+    monkeypatch.setattr(main, "MAX_BATCH_TOTAL_MB", 1)
+    monkeypatch.setattr(main, "job_runner", JobRunner(tmp_path, {}, max_workers=1))
+    fronteira = "lote-chunked"
+
+    async def corpo():
+        for indice in range(1, 4):
+            yield (f"--{fronteira}\r\nContent-Disposition: form-data; name=\"processo_{indice}\"; "
+                   f"filename=\"p{indice}.pdf\"\r\nContent-Type: application/pdf\r\n\r\n").encode()
+            yield b"%PDF-1.4\n" + b"0" * 1_000_000 + b"\r\n"
+        yield f"--{fronteira}--\r\n".encode()
+
+    async def cenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/batch", content=corpo(), headers={"content-type": f"multipart/form-data; boundary={fronteira}"}
+            )
+
+    resposta = asyncio.run(cenario())
+    assert resposta.status_code == 413
+    assert not list(casos.iterdir())
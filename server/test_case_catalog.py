@@ -0,0 +1,140 @@
+"""
+Teste do catálogo SQLite de casos
+Valida escrita transacional, listagem paginada por índice, indexação inicial do storage
+e a localização de arquivos enviados sem sondar extensões
+"""
+
+import json
+
+import pytest
+
+import main
+from services.case_catalog import CaseCatalog, get_case_catalog, ARQUIVO_CATALOGO
+
+
+def test_registro_transacional(tmp_path):
+    """Caso, artefatos e etapas são gravados juntos; um erro desfaz a transação inteira"""
+    catalogo = CaseCatalog(tmp_path / ARQUIVO_CATALOGO)
+    processo = tmp_path / "caso1" / "processo.pdf"
+    processo.parent.mkdir()
+    processo.write_bytes(b"%PDF-1.4 teste")
+
+    catalogo.registrar_caso("caso1", processo.parent, artefatos={
+        "processo": {"caminho": str(processo), "sha256": "abc"}
+    })
+    catalogo.registrar_etapa("caso1", processo.parent, "extracao", "concluida", 1.5)
+
+    caso = catalogo.obter_caso("caso1")
+    assert caso["status"] == "received"
+    assert caso["artefatos"]["processo"] == {
+        "caminho": str(processo), "sha256": "abc", "tamanho_bytes": processo.stat().st_size,
+        "atualizado_em": caso["artefatos"]["processo"]["atualizado_em"]
+    }
+    assert caso["etapas"]["extracao"]["status"] == "concluida"
+    assert catalogo.localizar_artefato("caso1", "processo") == processo
+
+    with pytest.raises(KeyError):
+        catalogo.registrar_caso("caso2", tmp_path / "caso2", artefatos={
+            "processo": {"caminho": str(processo)},
+            "audiencia": {"sha256": "sem caminho"}
+        })
+    assert catalogo.obter_caso("caso2") is None
+
+    catalogo.remover_caso("caso1")
+    assert catalogo.obter_caso("caso1") is None
+    assert catalogo.artefatos("caso1") == {}
+
+
+def test_listagem_paginada_usa_indices(tmp_path):
+    """Listagem por status/data percorre o índice (sem varredura da tabela) e pagina por chave"""
+    catalogo = CaseCatalog(tmp_path / ARQUIVO_CATALOGO)
+    for i in range(300):
+        catalogo.registrar_caso(
+            f"caso{i:04d}", tmp_path / f"caso{i:04d}",
+            status="completed" if i % 3 else "failed",
+            criado_em=f"2026-01-{1 + i % 28:02d}T00:00:{i % 60:02d}"
+        )
+
+    paginas, apos = [], None
+    while True:
+        pagina = catalogo.listar_casos(status="failed", limite=40, apos=apos)
+        paginas.extend(pagina)
+        if len(pagina) < 40:
+            break
+        apos = pagina[-1]["case_id"]
+
+    assert len(paginas) == 100
+    assert len({c["case_id"] for c in paginas}) == 100
+    chaves = [(c["criado_em"], c["case_id"]) for c in paginas]
+    assert chaves == sorted(chaves, reverse=True)
+
+    no_intervalo = catalogo.listar_casos(criado_desde="2026-01-10", criado_ate="2026-01-11", limite=1000)
+    assert no_intervalo and all(c["criado_em"].startswith("2026-01-10") for c in no_intervalo)
+    assert catalogo.contar_por_status() == {"completed": 200, "failed": 100}
+
+    conn = catalogo._conexao()
+    plano = " ".join(
+        linha["detail"] for linha in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM casos WHERE status = ? ORDER BY criado_em DESC, case_id DESC LIMIT 40",
+            ("failed",)
+        )
+    )
+    assert "idx_casos_status" in plano and "TEMP B-TREE" not in plano
+    plano_artefato = " ".join(
+        linha["detail"] for linha in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT caminho FROM artefatos WHERE case_id = ? AND nome = ?", ("x", "processo")
+        )
+    )
+    assert plano_artefato.startswith("SEARCH")
+
+
+def test_indexa_storage_existente_e_instancias_rag(tmp_path):
+    """Na primeira abertura, casos e instâncias RAG já em disco são catalogados"""
+    caso_dir = tmp_path / "caso-antigo"
+    caso_dir.mkdir()
+    (caso_dir / "audiencia.mp3").write_bytes(b"ID3" + b"0" * 10)
+    (caso_dir / "sentenca_gerada.txt").write_text("SENTENÇA", encoding="utf-8")
+    (tmp_path / "batches").mkdir()
+
+    instancia = tmp_path / "rag_storage" / "processo_caso-antigo"
+    instancia.mkdir(parents=True)
+    (instancia / "instance_metadata.json").write_text(json.dumps({
+        "case_id": "caso-antigo", "status": "active", "created_at": "2026-01-01T00:00:00",
+        "directories": {"instance_root": str(instancia)}
+    }), encoding="utf-8")
+
+    catalogo = get_case_catalog(tmp_path)
+
+    assert [c["case_id"] for c in catalogo.listar_casos()] == ["caso-antigo"]
+    assert set(catalogo.artefatos("caso-antigo")) == {"audiencia", "sentenca_gerada.txt"}
+    assert [i["case_id"] for i in catalogo.listar_instancias_rag()] == ["caso-antigo"]
+
+    catalogo.atualizar_status_instancia("caso-antigo", "removed")
+    assert catalogo.listar_instancias_rag() == []
+    assert catalogo.obter_instancia_rag("caso-antigo")["status"] == "removed"
+
+
+def test_encontrar_arquivo_consulta_catalogo(tmp_path, monkeypatch):
+    """O arquivo enviado é localizado pelo catálogo; casos não catalogados são sondados e registrados"""
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    case_dir = tmp_path / "caso1"
+    case_dir.mkdir()
+    processo = case_dir / "processo.docx"
+    processo.write_bytes(b"PK\x03\x04")
+
+    assert main._encontrar_arquivo(case_dir, "processo", main.ALLOWED_PROCESSO) == processo
+    catalogo = main._case_catalog()
+    assert catalogo.localizar_artefato("caso1", "processo") == processo
+
+    # Após o registro, a localização não depende mais de sondar as extensões
+    sondados = []
+    original_exists = type(processo).exists
+
+    def exists_rastreado(caminho):
+        sondados.append(caminho.name)
+        return original_exists(caminho)
+
+    monkeypatch.setattr(type(processo), "exists", exists_rastreado)
+    assert main._encontrar_arquivo(case_dir, "processo", {"pdf", "docx"}) == processo
+    assert sondados == ["processo.docx"]
+    assert main._encontrar_arquivo(case_dir, "audiencia", main.ALLOWED_AUDIENCIA) is None
@@ -0,0 +1,142 @@
+"""
+Teste de locks por caso e escrita atômica entre processos
+Simula vários workers (processos) sobre o mesmo storage: exclusão mútua por caso,
+leitores que nunca veem JSON parcial e jobs que não executam em duplicidade
+"""
+
+import asyncio
+import json
+import multiprocessing
+import time
+from pathlib import Path
+
+import pytest
+
+from services.atomic_write import escrever_json_atomico
+from services.case_lock import lock_caso, lock_caso_async, LockIndisponivel
+from services.job_runner import JobRunner, STATUS_CONCLUIDO
+
+PROCESSOS = 4
+INCREMENTOS = 25
+
+
+def _incrementar(storage: str, case_id: str):
+    """Leitura-modificação-escrita não atômica, protegida apenas pelo lock do caso"""
+    contador = Path(storage) / case_id / "contador.txt"
+    for _ in range(INCREMENTOS):
+        with lock_caso(storage, case_id):
+            valor = int(contador.read_text())
+            time.sleep(0.001)
+            contador.write_text(str(valor + 1))
+
+
+def _escrever_repetidamente(caminho: str, marcador: int, repeticoes: int):
+    for i in range(repeticoes):
+        escrever_json_atomico(Path(caminho), {"escritor": marcador, "i": i, "carga": "x" * 50000}, fsync=False)
+
+
+def _manter_lock(storage: str, case_id: str, obtido, liberar):
+    with lock_caso(storage, case_id):
+        obtido.set()
+        liberar.wait(10)
+
+
+def _executar_processos(alvo, argumentos):
+    processos = [multiprocessing.Process(target=alvo, args=args) for args in argumentos]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(60)
+        assert processo.exitcode == 0
+
+
+def test_lock_exclusivo_entre_processos(tmp_path):
+    """Processos no mesmo caso se serializam; casos diferentes não interferem"""
+    for case_id in ("caso-a", "caso-b"):
+        (tmp_path / case_id).mkdir()
+        (tmp_path / case_id / "contador.txt").write_text("0")
+
+    argumentos = [(str(tmp_path), "caso-a" if i % 2 else "caso-b") for i in range(PROCESSOS * 2)]
+    _executar_processos(_incrementar, argumentos)
+
+    for case_id in ("caso-a", "caso-b"):
+        assert int((tmp_path / case_id / "contador.txt").read_text()) == PROCESSOS * INCREMENTOS
+
+
+def test_lock_timeout_e_reentrancia(tmp_path):
+    """Lock mantido por outro processo esgota o prazo; o mesmo fluxo pode reentrar"""
+    contexto = multiprocessing.get_context()
+    obtido, liberar = contexto.Event(), contexto.Event()
+    processo = contexto.Process(target=_manter_lock, args=(str(tmp_path), "caso", obtido, liberar))
+    processo.start()
+    try:
+        assert obtido.wait(10)
+        with pytest.raises(LockIndisponivel):
+            with lock_caso(tmp_path, "caso", timeout=0.05):
+                pass
+
+        async def tentar_async():
+            async with lock_caso_async(tmp_path, "caso", timeout=0.05):
+                pass
+
+        with pytest.raises(LockIndisponivel):
+            asyncio.run(tentar_async())
+    finally:
+        liberar.set()
+        processo.join(10)
+
+    with lock_caso(tmp_path, "caso", timeout=1):
+        with lock_caso(tmp_path, "caso", timeout=0):
+            pass
+
+
+def test_escrita_atomica_sem_leitura_parcial(tmp_path):
+    """Leitores concorrentes sempre obtêm um JSON completo de algum escritor"""
+    destino = tmp_path / "artefato.json"
+    escrever_json_atomico(destino, {"escritor": -1, "i": 0, "carga": ""})
+
+    escritores = [multiprocessing.Process(target=_escrever_repetidamente, args=(str(destino), i, 200))
+                  for i in range(PROCESSOS)]
+    for escritor in escritores:
+        escritor.start()
+
+    leituras = 0
+    while any(escritor.is_alive() for escritor in escritores):
+        dados = json.loads(destino.read_text(encoding="utf-8"))
+        assert dados["escritor"] == -1 or len(dados["carga"]) == 50000
+        leituras += 1
+    for escritor in escritores:
+        escritor.join()
+        assert escritor.exitcode == 0
+
+    assert leituras > 0
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_job_nao_executa_em_dois_runners(tmp_path):
+    """Dois runners (workers) sobre o mesmo storage executam um job pendente uma única vez"""
+    execucoes = []
+
+    async def etapa(case_id):
+        execucoes.append(case_id)
+        await asyncio.sleep(0.2)
+
+    async def cenario():
+        (tmp_path / "caso1").mkdir()
+        primeiro = JobRunner(tmp_path, {"etapa": etapa}, retry_backoff=0)
+        job = primeiro.submit("caso1", ["etapa"])
+
+        # O segundo runner recupera o job do disco enquanto o primeiro o executa
+        segundo = JobRunner(tmp_path, {"etapa": etapa}, retry_backoff=0)
+        await primeiro.start()
+        await asyncio.sleep(0.05)
+        await segundo.start()
+        await asyncio.sleep(0.5)
+        await primeiro.stop()
+        await segundo.stop()
+        return json.loads((tmp_path / "jobs" / f"{job.job_id}.json").read_text(encoding="utf-8"))
+
+    resultado = asyncio.run(cenario())
+
+    assert execucoes == ["caso1"]
+    assert resultado["status"] == STATUS_CONCLUIDO
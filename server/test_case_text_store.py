@@ -0,0 +1,79 @@
+"""
+Teste do texto do caso mapeado em memória
+Fatias por offset de caractere (acentos e quebras \\r\\n atravessando os blocos) são idênticas às
+do texto lido com read_text, o mapeamento é reaproveitado até o arquivo mudar, e peças e páginas
+saem pelo índice do PJe
+"""
+
+import os
+
+import pytest
+
+from services import case_text_store
+from services.case_text_store import CaseTextStore, TextoCaso
+from test_pje_segmenter import _processo
+
+
+@pytest.fixture
+def blocos_pequenos(monkeypatch):
+    monkeypatch.setattr(case_text_store, "BLOCO_BYTES", 64)
+
+
+def test_fatias_identicas_as_da_str(tmp_path, blocos_pequenos):
+    quebras = ("\n", "\r\n", "\r")
+    bruto = "".join(f"Linha {i}: reclamação, ação, súmula nº {i} – “€”{quebras[i % 3]}" for i in range(300))
+    caminho = tmp_path / "processo_extraido.txt"
+    caminho.write_bytes(bruto.encode("utf-8"))
+    texto = caminho.read_text(encoding="utf-8")  # Mesmos offsets da leitura em modo texto
+
+    mapeado = TextoCaso(caminho)
+    assert len(mapeado) == len(texto) and mapeado.texto() == texto
+    for inicio, fim in ((0, 1), (5, 700), (63, 65), (1000, len(texto)), (len(texto) - 3, len(texto) + 50)):
+        assert mapeado[inicio:fim] == texto[inicio:fim]
+    assert mapeado[-40:] == texto[-40:] and mapeado[:15] == texto[:15]
+    assert mapeado[7] == texto[7] and mapeado[-1] == texto[-1]
+    assert mapeado.numero_de_linhas == 300
+    assert mapeado.linha(1) == "Linha 0: reclamação, ação, súmula nº 0 – “€”"
+    assert mapeado.linha(300).startswith("Linha 299")
+
+
+def test_arquivo_vazio(tmp_path):
+    caminho = tmp_path / "vazio.txt"
+    caminho.write_bytes(b"")
+    mapeado = TextoCaso(caminho)
+    assert len(mapeado) == 0 and mapeado[0:10] == "" and mapeado.texto() == ""
+
+
+def test_store_reaproveita_ate_o_arquivo_mudar(tmp_path):
+    store = CaseTextStore(max_abertos=2)
+    caminho = tmp_path / "processo_extraido.txt"
+    caminho.write_text("primeira extração", encoding="utf-8")
+
+    primeiro = store.abrir(caminho)
+    assert store.abrir(caminho) is primeiro
+
+    # Nova extração publicada atomicamente: outro inode, novo mapeamento; o antigo segue legível
+    temporario = tmp_path / ".processo_extraido.txt.tmp"
+    temporario.write_text("segunda extração, mais longa", encoding="utf-8")
+    os.replace(temporario, caminho)
+    segundo = store.abrir(caminho)
+    assert segundo is not primeiro and segundo.texto() == "segunda extração, mais longa"
+    assert primeiro.texto() == "primeira extração"
+
+    outros = [tmp_path / f"outro_{i}.txt" for i in range(2)]
+    for outro in outros:
+        outro.write_text("x", encoding="utf-8")
+        store.abrir(outro)
+    assert store.abrir(caminho) is not segundo  # Removido pelo LRU
+
+
+def test_pecas_e_paginas_pelo_indice(tmp_path, blocos_pequenos):
+    texto = _processo()
+    (tmp_path / "processo_extraido.txt").write_text(texto, encoding="utf-8")
+    mapeado = CaseTextStore().abrir(tmp_path / "processo_extraido.txt")
+
+    assert mapeado.peca("78a3f60").startswith("Fls.: 6\nAta da audiência")
+    assert mapeado.pagina(4).startswith("Fls.: 4\nOutorgo poderes")
+    assert mapeado.peca("0000000") is None and mapeado.pagina(99) is None
+    assert (tmp_path / "processo_indice.json").exists()
+    assert mapeado.indice.fatiar(mapeado, limite_caracteres=3000) == mapeado.indice.fatiar(texto, limite_caracteres=3000)
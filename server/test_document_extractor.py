@@ -0,0 +1,129 @@
+"""
+Teste do extrator de documentos com cache
+PDF e DOCX extraídos uma vez por conteúdo e versão do extrator; arquivos inalterados não são
+relidos (nem para o hash), e alterar o arquivo ou a versão invalida a entrada
+"""
+
+import fitz
+import pytest
+from docx import Document
+
+from services import document_extractor
+from services.artifact_cache import VERSOES_ARTEFATOS, ArtifactCache
+from services.document_extractor import DocumentExtractor, extrair_texto_documento
+
+
+def _gerar_docx(caminho, paragrafos):
+    documento = Document()
+    for paragrafo in paragrafos:
+        documento.add_paragraph(paragrafo)
+    documento.save(str(caminho))
+
+
+def _gerar_pdf(caminho, texto: str):
+    documento = fitz.open()
+    documento.new_page().insert_text((72, 72), texto)
+    documento.save(str(caminho))
+    documento.close()
+
+
+@pytest.fixture
+def extracoes(monkeypatch):
+    """Conta as extrações reais (fora do cache)"""
+    chamadas = []
+    original = document_extractor.extrair_texto_documento
+
+    def contar(caminho, *args, **kwargs):
+        chamadas.append(caminho.name)
+        return original(caminho, *args, **kwargs)
+
+    monkeypatch.setattr(document_extractor, "extrair_texto_documento", contar)
+    return chamadas
+
+
+def test_pdf_e_docx_extraidos_uma_vez(tmp_path, extracoes):
+    _gerar_docx(tmp_path / "sentenca.docx", ["SENTENÇA", "", "Vistos etc.", "JULGO PROCEDENTES os pedidos."])
+    _gerar_pdf(tmp_path / "sentenca.pdf", "RELATÓRIO\nFUNDAMENTAÇÃO")
+    extrator = DocumentExtractor(tmp_path / "artifact_cache")
+
+    docx = extrator.extrair(tmp_path / "sentenca.docx")
+    pdf = extrator.extrair(tmp_path / "sentenca.pdf", ocr=False)
+    assert docx == "SENTENÇA\nVistos etc.\nJULGO PROCEDENTES os pedidos."
+    assert pdf == extrair_texto_documento(tmp_path / "sentenca.pdf", ocr=False)
+    assert len(extracoes) == 2
+
+    # Outro processo (novo extrator, sem memória): hash pelo índice de estados, texto do cache
+    novo = DocumentExtractor(tmp_path / "artifact_cache")
+    assert novo.extrair(tmp_path / "sentenca.docx") == docx
+    assert novo.extrair(tmp_path / "sentenca.pdf", ocr=False) == pdf
+    assert len(extracoes) == 2
+
+
+def test_hash_nao_relido_para_arquivo_inalterado(tmp_path, monkeypatch):
+    _gerar_docx(tmp_path / "modelo.docx", ["Texto"])
+    DocumentExtractor(tmp_path / "artifact_cache").extrair(tmp_path / "modelo.docx")
+
+    def sem_leitura(caminho):
+        raise AssertionError(f"{caminho} relido para calcular o hash")
+
+    monkeypatch.setattr(document_extractor, "sha256_arquivo", sem_leitura)
+    assert DocumentExtractor(tmp_path / "artifact_cache").extrair(tmp_path / "modelo.docx") == "Texto"
+
+
+def test_arquivo_alterado_ou_nova_versao_reextrai(tmp_path, extracoes):
+    caminho = tmp_path / "modelo.docx"
+    _gerar_docx(caminho, ["Versão 1"])
+    cache_dir = tmp_path / "artifact_cache"
+    extrator = DocumentExtractor(cache_dir)
+    assert extrator.extrair(caminho) == "Versão 1"
+
+    _gerar_docx(caminho, ["Versão 2", "com outro parágrafo"])
+    assert extrator.extrair(caminho) == "Versão 2\ncom outro parágrafo"
+    assert len(extracoes) == 2
+
+    extrator.cache = ArtifactCache(cache_dir, versoes={**VERSOES_ARTEFATOS, "texto_documento": "outro/v2"})
+    extrator.extrair(caminho)
+    assert len(extracoes) == 3
+
+
+def _gerar_pdf_digitalizado(caminho):
+    """Página só com imagem (sem camada de texto): candidata a OCR"""
+    rascunho = fitz.open()
+    pagina = rascunho.new_page()
+    pagina.insert_text((72, 72), "ATA DE AUDIÊNCIA")
+    imagem = pagina.get_pixmap(dpi=72)
+    rascunho.close()
+
+    documento = fitz.open()
+    documento.new_page().insert_image(fitz.Rect(0, 0, 595, 842), pixmap=imagem)
+    documento.save(str(caminho))
+    documento.close()
+
+
+def test_texto_sem_ocr_ou_com_falha_de_ocr_nao_e_reaproveitado(tmp_path, extracoes, monkeypatch):
+    import pytesseract
+
+    caminho = tmp_path / "ata.pdf"
+    _gerar_pdf_digitalizado(caminho)
+    extrator = DocumentExtractor(tmp_path / "artifact_cache")
+    assert "[Página 1 - OCR]" not in extrator.extrair(caminho, ocr=False)
+
+    def ocr_falho(imagem, lang):
+        raise pytesseract.TesseractError(1, "Failed loading language 'por'")
+
+    # Com OCR ligado, a entrada extraída sem OCR não serve; a extração com falha não é guardada
+    monkeypatch.setattr(pytesseract, "image_to_string", ocr_falho)
+    assert "[Página 1 - OCR]" not in extrator.extrair(caminho, ocr=True)
+    assert len(extracoes) == 2
+
+    monkeypatch.setattr(pytesseract, "image_to_string", lambda imagem, lang: "ATA DE AUDIÊNCIA")
+    texto = extrator.extrair(caminho, ocr=True)
+    assert "[Página 1 - OCR]\nATA DE AUDIÊNCIA" in texto
+    assert extrator.extrair(caminho, ocr=True) == texto
+    assert len(extracoes) == 3
+
+
+def test_extensao_nao_suportada(tmp_path):
+    (tmp_path / "antigo.doc").write_bytes(b"\xd0\xcf\x11\xe0")
+    with pytest.raises(ValueError):
+        DocumentExtractor(tmp_path / "artifact_cache").extrair(tmp_path / "antigo.doc")
@@ -0,0 +1,59 @@
+"""
+Teste de regressão: o event loop não pode ser bloqueado pela geração
+Mantém /health respondendo enquanto um provedor lento (fake) executa o diálogo
+"""
+
+import asyncio
+import time
+from pathlib import Path
+
+import httpx
+
+import main
+
+LATENCIA_MAXIMA_HEALTH = 0.25  # segundos
+DURACAO_PROVEDOR_LENTO = 1.5   # segundos
+
+
+def test_health_responde_durante_geracao_lenta(tmp_path: Path, monkeypatch):
+    """/health mantém latência estável enquanto /generate-from-existing roda"""
+    case_dir = tmp_path / "caso_lento"
+    case_dir.mkdir()
+    (case_dir / "processo_extraido.txt").write_text("TEXTO DO PROCESSO", encoding='utf-8')
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+
+    def dialogo_lento(case_id, texto_processo, transcricao_audiencia, cache_policy=None):
+        # Simula SDK síncrono com backoff via time.sleep (como em _claude_request)
+        time.sleep(DURACAO_PROVEDOR_LENTO)
+        return {"etapas_executadas": ["ETAPA_1", None, "ETAPA_3"], "sentenca_final": "SENTENÇA"}
+
+    monkeypatch.setattr(main, "_executar_dialogo", dialogo_lento)
+
+    async def medir_health(client):
+        inicio = time.perf_counter()
+        resposta = await client.get("/health")
+        assert resposta.status_code == 200
+        return time.perf_counter() - inicio
+
+    async def cenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            latencia_base = max([await medir_health(client) for _ in range(5)])
+
+            geracao = asyncio.create_task(client.post("/generate-from-existing/caso_lento"))
+            await asyncio.sleep(0.1)
+
+            latencias = []
+            while not geracao.done():
+                latencias.append(await medir_health(client))
+                await asyncio.sleep(0.05)
+
+            return latencia_base, latencias, await geracao
+
+    latencia_base, latencias, resposta_geracao = asyncio.run(cenario())
+
+    assert resposta_geracao.status_code == 200
+    assert (tmp_path / "caso_lento" / "sentenca_gerada.txt").read_text(encoding='utf-8') == "SENTENÇA"
+    # Com o loop bloqueado haveria no máximo 1 medição, com ~1.5s de latência
+    assert len(latencias) >= 5
+    assert max(latencias) < max(LATENCIA_MAXIMA_HEALTH, latencia_base * 10)
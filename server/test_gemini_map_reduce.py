@@ -0,0 +1,136 @@
+"""
+Teste da extração map-reduce do GeminiProcessor
+Fragmentos respeitam peças e o limite de caracteres, são extraídos em paralelo com o contexto
+da chamada, e a mescla deduplica partes/pedidos/testemunhas de forma determinística
+"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import gemini_processor
+from services.admission_control import _caso_atual, contexto_admissao
+from services.gemini_processor import GeminiProcessor, dividir_em_fragmentos, mesclar_extracoes
+from test_pje_segmenter import _pagina
+
+
+def _processo_longo() -> str:
+    paginas = [_pagina(1, "Processo 0000398-03.2024.5.09.0010\nPAGINA_CAPA_PROCESSO_PJE")]
+    for fls in range(2, 12):
+        paginas.append(_pagina(fls, "PETIÇÃO INICIAL horas extras\n" + "a" * 900, "2d38a1c"))
+    for fls in range(12, 20):
+        paginas.append(_pagina(fls, "DEFESA da reclamada\n" + "b" * 900, "4e7ee51"))
+    paginas.append(_pagina(20, "Ata da audiência - testemunha JOÃO DA SILVA", "78a3f60"))
+    paginas.append(_pagina(21, "SUMÁRIO\nDocumentos\nId.\nData da\nAssinatura\nDocumento\nTipo\n"
+                               "2d38a1c\n15/04/2024 10:20\nPetição Inicial\nPetição Inicial\n"))
+    return "".join(paginas)
+
+
+def test_fragmentos_por_peca_dentro_do_limite():
+    texto = _processo_longo()
+    fragmentos = dividir_em_fragmentos(texto, max_caracteres=4000)
+
+    assert all(len(trecho) <= 4000 for trecho, _ in fragmentos)
+    assert "".join(trecho for trecho, _ in fragmentos) == texto[:texto.index("Fls.: 21")]
+    # Peças longas cortadas em páginas: cada fragmento começa num cabeçalho Fls.
+    assert all(trecho.startswith("Fls.: ") for trecho, _ in fragmentos)
+    assert fragmentos[-1][1][-1].startswith("ATA DE AUDIÊNCIA - ID 78a3f60")
+    assert len(dividir_em_fragmentos("linha\n" * 1000, max_caracteres=600)) == 10
+
+
+def test_mescla_deterministica_com_deduplicacao():
+    parciais = [
+        {"numero_processo": "0000398-03.2024.5.09.0010", "decisao_final": None,
+         "partes": [{"nome": "THIAGO RODRIGUES", "tipo": "requerente", "qualificacao": None}],
+         "pedidos": [{"descricao": "Horas extras", "categoria": "horas_extras"}],
+         "jurisprudencias_citadas": ["Súmula 338 do TST"]},
+        {"numero_processo": "0000398-03.2024.5.09.0010", "salario_final": "R$ 3.000,00",
+         "partes": [{"nome": "Thiago Rodrigues.", "tipo": "requerente", "qualificacao": "motorista"},
+                    {"nome": "PEPSICO DO BRASIL LTDA", "tipo": "requerida"}],
+         "pedidos": [{"descricao": "HORAS EXTRAS", "categoria": "horas_extras", "valor_estimado": "R$ 50.000,00"}],
+         "testemunhas": [{"nome": "João da Silva", "pontos_relevantes": ["jornada"]}],
+         "jurisprudencias_citadas": ["sumula 338 do tst", "OJ 415"]},
+        {"salario_final": "R$ 3.500,00",
+         "testemunhas": [{"nome": "JOAO DA SILVA", "pontos_relevantes": ["jornada", "intervalo"]}]},
+    ]
+
+    mesclado = mesclar_extracoes(parciais)
+    assert mesclado == mesclar_extracoes(json.loads(json.dumps(parciais)))
+    assert [p["nome"] for p in mesclado["partes"]] == ["THIAGO RODRIGUES", "PEPSICO DO BRASIL LTDA"]
+    assert mesclado["partes"][0]["qualificacao"] == "motorista"
+    assert mesclado["pedidos"] == [{"descricao": "Horas extras", "categoria": "horas_extras",
+                                    "valor_estimado": "R$ 50.000,00"}]
+    assert mesclado["testemunhas"][0]["pontos_relevantes"] == ["jornada", "intervalo"]
+    assert mesclado["jurisprudencias_citadas"] == ["Súmula 338 do TST", "OJ 415"]
+    assert mesclado["salario_final"] == "R$ 3.500,00"  # Último valor dos autos
+    assert mesclado["decisao_final"] is None
+
+
+class GeminiFake(GeminiProcessor):
+    def __init__(self, falhar_trecho=None):
+        # Sem GOOGLE_API_KEY: respostas derivadas do próprio trecho
+        self.falhar_trecho = falhar_trecho
+        self.prompts, self.casos = [], []
+        self.simultaneas = self.maximo = 0
+        self._lock = threading.Lock()
+
+    def gerar_conteudo(self, prompt, cache_policy=None, novo_receptor=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.casos.append(_caso_atual.get())
+            self.simultaneas += 1
+            self.maximo = max(self.maximo, self.simultaneas)
+        time.sleep(0.02)
+        with self._lock:
+            self.simultaneas -= 1
+        if self.falhar_trecho and f"TRECHO {self.falhar_trecho} de" in prompt:
+            raise TimeoutError("Gemini: tempo limite da chamada")
+        dados = {"numero_processo": "0000398-03.2024.5.09.0010" if "PAGINA_CAPA" in prompt else None,
+                 "partes": [{"nome": "Thiago Rodrigues", "tipo": "requerente"}], "pedidos": []}
+        if "DEFESA" in prompt:
+            dados["partes"].append({"nome": "PEPSICO DO BRASIL LTDA", "tipo": "requerida"})
+        if "testemunha JOÃO" in prompt:
+            dados["testemunhas"] = [{"nome": "João da Silva", "parte_convite": "requerente",
+                                     "resumo_depoimento": "jornada", "pontos_relevantes": []}]
+        if novo_receptor:
+            novo_receptor()(json.dumps(dados))
+        return SimpleNamespace(text=json.dumps(dados))
+
+
+@pytest.fixture
+def fragmentos_pequenos(monkeypatch):
+    monkeypatch.setattr(gemini_processor, "MAP_REDUCE_LIMIAR_CARACTERES", 5000)
+    monkeypatch.setattr(gemini_processor, "FRAGMENTO_MAX_CARACTERES", 4000)
+    monkeypatch.setattr(gemini_processor, "MAP_REDUCE_PARALELO", 2)
+
+
+def test_map_reduce_em_paralelo_com_contexto(fragmentos_pequenos):
+    gemini = GeminiFake()
+    with contexto_admissao("caso-longo"):
+        processo = gemini.extrair_informacoes_processo(_processo_longo())
+
+    total = len(gemini.prompts)
+    assert total == len(dividir_em_fragmentos(_processo_longo(), 4000)) > 2
+    assert all(f"de {total} do processo" in prompt for prompt in gemini.prompts)
+    assert gemini.maximo == 2 and set(gemini.casos) == {"caso-longo"}
+    assert processo.numero_processo == "0000398-03.2024.5.09.0010"
+    assert [(p.nome, p.tipo) for p in processo.partes] == [("Thiago Rodrigues", "requerente"),
+                                                         ("PEPSICO DO BRASIL LTDA", "requerida")]
+    assert [t.nome for t in processo.testemunhas] == ["João da Silva"]
+
+
+def test_fragmento_com_falha_nao_gera_extracao_parcial(fragmentos_pequenos):
+    gemini = GeminiFake(falhar_trecho=1)
+    with pytest.raises(Exception, match="1 de .* fragmentos falharam"):
+        gemini.extrair_informacoes_processo(_processo_longo())
+    # Os demais fragmentos foram extraídos mesmo assim (ficam no cache de respostas para a nova tentativa)
+    assert len(gemini.prompts) == len(dividir_em_fragmentos(_processo_longo(), 4000))
+
+
+def test_texto_curto_mantem_chamada_unica(fragmentos_pequenos):
+    gemini = GeminiFake()
+    gemini.extrair_informacoes_processo("PAGINA_CAPA curta")
+    assert len(gemini.prompts) == 1 and "TRECHO" not in gemini.prompts[0]
@@ -0,0 +1,112 @@
+"""
+Teste do motor de jobs em background
+Valida execução ordenada das etapas, retries, persistência e retomada após reinício
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+from services.job_runner import JobRunner, STATUS_CONCLUIDO, STATUS_FALHOU
+
+
+async def _aguardar(runner: JobRunner, job_id: str, timeout: float = 5.0):
+    """Aguarda o job atingir um estado final"""
+    fim = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < fim:
+        job = runner.get_job(job_id)
+        if job["status"] in (STATUS_CONCLUIDO, STATUS_FALHOU):
+            return job
+        await asyncio.sleep(0.01)
+    raise TimeoutError(f"Job {job_id} não finalizou")
+
+
+def test_job_executa_etapas_em_ordem(tmp_path: Path):
+    """Etapas rodam em ordem e o estado é espelhado no diretório do caso"""
+    executadas = []
+
+    async def etapa_a(case_id):
+        executadas.append(("a", case_id))
+
+    async def etapa_b(case_id):
+        executadas.append(("b", case_id))
+
+    async def cenario():
+        (tmp_path / "caso1").mkdir()
+        runner = JobRunner(tmp_path, {"a": etapa_a, "b": etapa_b}, max_workers=2, retry_backoff=0)
+        await runner.start()
+        job = runner.submit("caso1", ["a", "b"])
+        resultado = await _aguardar(runner, job.job_id)
+        await runner.stop()
+        return resultado
+
+    resultado = asyncio.run(cenario())
+
+    assert resultado["status"] == STATUS_CONCLUIDO
+    assert executadas == [("a", "caso1"), ("b", "caso1")]
+    status_caso = json.loads((tmp_path / "caso1" / "pipeline_status.json").read_text(encoding='utf-8'))
+    assert status_caso["job_id"] == resultado["job_id"]
+
+
+def test_job_retry_e_falha(tmp_path: Path):
+    """Etapa instável é repetida; etapa sempre falhando marca o job como falho"""
+    chamadas = {"instavel": 0, "quebrada": 0}
+
+    async def instavel(case_id):
+        chamadas["instavel"] += 1
+        if chamadas["instavel"] < 2:
+            raise RuntimeError("429 rate limit")
+
+    async def quebrada(case_id):
+        chamadas["quebrada"] += 1
+        raise RuntimeError("erro permanente")
+
+    async def cenario():
+        runner = JobRunner(tmp_path, {"instavel": instavel, "quebrada": quebrada},
+                           max_retries=1, retry_backoff=0)
+        await runner.start()
+        ok = runner.submit("caso_ok", ["instavel"])
+        falho = runner.submit("caso_falho", ["quebrada"])
+        resultados = (await _aguardar(runner, ok.job_id), await _aguardar(runner, falho.job_id))
+        await runner.stop()
+        return resultados
+
+    ok, falho = asyncio.run(cenario())
+
+    assert ok["status"] == STATUS_CONCLUIDO
+    assert ok["etapas"][0]["tentativas"] == 2
+    assert falho["status"] == STATUS_FALHOU
+    assert chamadas["quebrada"] == 2
+    assert "erro permanente" in falho["erro"]
+
+
+def test_job_retomado_apos_reinicio(tmp_path: Path):
+    """Job não finalizado em disco é retomado sem repetir etapas concluídas"""
+    executadas = []
+
+    async def etapa(nome):
+        async def _executar(case_id):
+            executadas.append(nome)
+        return _executar
+
+    async def cenario():
+        etapas = {"a": await etapa("a"), "b": await etapa("b")}
+
+        # Primeiro runner: job submetido sem workers (simula queda antes da execução)
+        runner = JobRunner(tmp_path, etapas)
+        job = runner.submit("caso1", ["a", "b"])
+        dados = runner.get_job(job.job_id)
+        dados["etapas"][0]["status"] = STATUS_CONCLUIDO
+        (tmp_path / "jobs" / f"{job.job_id}.json").write_text(json.dumps(dados), encoding='utf-8')
+
+        # Segundo runner: recupera o job do disco
+        novo_runner = JobRunner(tmp_path, etapas, retry_backoff=0)
+        await novo_runner.start()
+        resultado = await _aguardar(novo_runner, job.job_id)
+        await novo_runner.stop()
+        return resultado
+
+    resultado = asyncio.run(cenario())
+
+    assert resultado["status"] == STATUS_CONCLUIDO
+    assert executadas == ["b"]
@@ -0,0 +1,169 @@
+"""
+Teste do parser JSON incremental e da geração em streaming do Gemini
+Campos do objeto raiz são emitidos assim que se fecham, respostas truncadas são reparadas pela
+estrutura (qualquer prefixo vira JSON válido) e a extração repassa partes antes do fim do stream
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services import admission_control, gemini_processor
+from services.admission_control import ControladorAdmissao, Orcamento
+from services.gemini_processor import GeminiProcessor
+from services.json_incremental import ParserJSONIncremental, parsear_json
+from services.llm_response_cache import RespostaEmCache
+
+PROCESSO = {
+    "numero_processo": "0000398-03.2024.5.09.0010",
+    "partes": [{"nome": "THIAGO \"TH\" RODRIGUES", "tipo": "requerente"},
+               {"nome": "PEPSICO DO BRASIL LTDA", "tipo": "requerida"}],
+    "pedidos": [{"descricao": "Horas extras [50%]", "categoria": "horas_extras", "valor_estimado": 1.5e3}],
+    "fatos_relevantes": [],
+    "salario_final": None,
+    "justica_gratuita": True,
+}
+
+
+def test_campos_emitidos_ao_fechar():
+    texto = "Segue o JSON:\n```json\n" + json.dumps(PROCESSO, ensure_ascii=False, indent=2) + "\n```\n[fim]"
+    emitidos = []
+    parser = ParserJSONIncremental(lambda campo, valor: emitidos.append(campo))
+
+    posicao_partes = None
+    for inicio in range(0, len(texto), 5):
+        parser.alimentar(texto[inicio:inicio + 5])
+        if "partes" in emitidos and posicao_partes is None:
+            posicao_partes = inicio
+    assert parser.concluido and parser.finalizar() == PROCESSO
+    assert emitidos == list(PROCESSO)
+    # Partes emitidas logo após o "]" que as fecha, muito antes do fim da resposta
+    assert posicao_partes < texto.index('"pedidos"')
+
+
+def test_qualquer_prefixo_e_reparado():
+    texto = json.dumps(PROCESSO, ensure_ascii=False)
+    anterior = {}
+    for corte in range(1, len(texto) + 1):
+        reparado = parsear_json(texto[:corte])
+        assert isinstance(reparado, dict)
+        # O reparo só acrescenta: nenhum campo concluído antes some com mais texto
+        assert set(anterior) <= set(reparado)
+        anterior = reparado
+
+    truncado = texto[:texto.index("Horas extras") + 5]
+    assert parsear_json(truncado)["pedidos"] == [{"descricao": "Horas"}]
+    assert parsear_json('{"a": 1, "b": tru') == {"a": 1}
+    assert parsear_json('{"s": "abc\\u00') == {"s": "abc"}
+    assert parsear_json('{"a": 1, // comentário\n "b": /* x */ [1, 2]}') == {"a": 1, "b": [1, 2]}
+    with pytest.raises(ValueError):
+        parsear_json("Não foi possível analisar o processo.")
+
+
+class StreamFake:
+    """Resposta em streaming do SDK: trechos entregues sob demanda; .text completo após o consumo"""
+
+    def __init__(self, trechos):
+        self.trechos = trechos
+        self.text = ""
+
+    def __iter__(self):
+        for trecho in self.trechos:
+            self.text += trecho
+            yield SimpleNamespace(text=trecho)
+
+
+def _gemini(trechos, eventos):
+    gemini = GeminiProcessor.__new__(GeminiProcessor)
+
+    def generate_content(prompt, generation_config, stream=False):
+        assert stream
+        eventos.append("stream")
+        return StreamFake(trechos)
+
+    gemini.model = SimpleNamespace(model_name="gemini-x", generate_content=generate_content)
+    gemini.parametros_geracao = {"temperature": 0.1}
+    gemini.generation_config = SimpleNamespace(max_output_tokens=100)
+    return gemini
+
+
+@pytest.fixture(autouse=True)
+def sem_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_POLITICA", "ignorar")
+    monkeypatch.setenv("ADMISSAO_ATIVA", "0")
+    monkeypatch.setattr(gemini_processor, "MODO_EXTRACAO", "unico")
+
+
+def test_extracao_em_streaming_emite_partes_antes_do_fim():
+    texto = json.dumps(PROCESSO, ensure_ascii=False)
+    corte = texto.index('"pedidos"')
+    eventos = []
+
+    class Trechos(list):
+        def __iter__(self):
+            yield texto[:corte]
+            eventos.append("segundo_trecho")
+            yield texto[corte:]
+
+    gemini = _gemini(Trechos(), eventos)
+    processo = gemini.extrair_informacoes_processo(
+        "PROCESSO", ao_concluir_campo=lambda campo, valor: eventos.append(campo)
+    )
+
+    assert eventos[:4] == ["stream", "numero_processo", "partes", "segundo_trecho"]
+    assert [p.nome for p in processo.partes] == ['THIAGO "TH" RODRIGUES', "PEPSICO DO BRASIL LTDA"]
+
+
+def test_stream_truncado_reparado_pela_estrutura():
+    texto = json.dumps(PROCESSO, ensure_ascii=False)
+    gemini = _gemini([texto[:40], texto[40:texto.index("PEPSICO") + 3]], [])
+
+    processo = gemini.extrair_informacoes_processo("PROCESSO")
+    assert processo.numero_processo == PROCESSO["numero_processo"]
+    assert [p.nome for p in processo.partes] == ['THIAGO "TH" RODRIGUES', "PEP"]
+    assert processo.pedidos == []
+
+
+class ErroRateLimit(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "0"})
+
+
+def test_429_no_meio_do_stream_recomeca_em_parser_novo(monkeypatch):
+    monkeypatch.setenv("ADMISSAO_ATIVA", "1")
+    monkeypatch.setattr(admission_control, "_controlador_global",
+                        ControladorAdmissao({"gemini": Orcamento(concorrencia=1)}))
+    texto = json.dumps(PROCESSO, ensure_ascii=False)
+    corte = texto.index('"pedidos"')
+    tentativas = []
+
+    def interrompido():
+        yield SimpleNamespace(text=texto[:corte].replace("THIAGO", "PARCIAL"))
+        raise ErroRateLimit("429 Resource exhausted")
+
+    gemini = _gemini([texto[:corte], texto[corte:]], [])
+    completo = gemini.model.generate_content
+
+    def generate_content(*args, **kwargs):
+        tentativas.append(1)
+        return interrompido() if len(tentativas) == 1 else completo(*args, **kwargs)
+
+    gemini.model.generate_content = generate_content
+
+    emitidos = []
+    processo = gemini.gerar_json("PROCESSO", ao_concluir_campo=lambda campo, valor: emitidos.append((campo, valor)))
+    assert len(tentativas) == 2 and processo == PROCESSO
+    # O texto parcial da primeira tentativa não contamina a segunda; o último valor emitido vale
+    assert dict(emitidos) == PROCESSO
+    assert emitidos[1][1][0]["nome"].startswith("PARCIAL")
+
+
+def test_json_invalido_mesmo_apos_renovar_levanta_erro(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_POLITICA", "usar")
+    monkeypatch.setattr(gemini_processor, "chamar_com_cache",
+                        lambda *args, **kwargs: RespostaEmCache("Não consegui estruturar o processo."))
+    gemini = _gemini([], [])
+
+    with pytest.raises(ValueError):
+        gemini.gerar_json("PROCESSO")
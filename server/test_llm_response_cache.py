@@ -0,0 +1,130 @@
+"""
+Teste do cache persistente de respostas dos LLMs
+Chave sensível a modelo/configuração/mensagens, políticas por chamada (usar, renovar, ignorar),
+despejo LRU pelo tamanho e integração com o Gemini e o Claude sem chamadas repetidas ao SDK
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services import llm_response_cache, metrics
+from services.claude_service import criar_mensagem_com_cache
+from services.gemini_processor import GeminiProcessor
+from services.llm_response_cache import (
+    LLMResponseCache, RespostaEmCache, chamar_com_cache, chave_requisicao, ARQUIVO_CACHE_LLM
+)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Cache do processo isolado em tmp_path, sem controle de admissão"""
+    cache = LLMResponseCache(tmp_path / ARQUIVO_CACHE_LLM)
+    monkeypatch.setattr(llm_response_cache, "_cache_global", cache)
+    monkeypatch.setenv("ADMISSAO_ATIVA", "0")
+    monkeypatch.delenv("LLM_CACHE_POLITICA", raising=False)
+    return cache
+
+
+def test_chave_canonica():
+    mensagens = [{"role": "user", "content": "Resuma o processo"}]
+    chave = chave_requisicao("claude", "modelo", {"temperature": 0.1, "max_tokens": 10}, "S", mensagens)
+
+    assert chave == chave_requisicao("claude", "modelo", {"max_tokens": 10, "temperature": 0.1}, "S", mensagens)
+    assert chave != chave_requisicao("claude", "outro", {"temperature": 0.1, "max_tokens": 10}, "S", mensagens)
+    assert chave != chave_requisicao("claude", "modelo", {"temperature": 0.2, "max_tokens": 10}, "S", mensagens)
+    assert chave != chave_requisicao("claude", "modelo", {"temperature": 0.1, "max_tokens": 10}, None, mensagens)
+    assert chave != chave_requisicao("gemini", "modelo", {"temperature": 0.1, "max_tokens": 10}, "S", mensagens)
+
+
+def test_politicas_por_chamada(cache):
+    chamadas = []
+
+    def chamar(politica=None, resposta="A"):
+        return chamar_com_cache(
+            "gemini", "modelo", {}, None, [{"role": "user", "content": "P"}],
+            lambda: chamadas.append(resposta) or SimpleNamespace(text=resposta),
+            lambda r: r.text, cache_policy=politica
+        )
+
+    hits = metrics.LLM_CACHE_CONSULTAS.valor(provedor="gemini", resultado="hit")
+    assert chamar().text == "A"
+    segunda = chamar(resposta="B")
+    assert isinstance(segunda, RespostaEmCache) and segunda.text == "A" and chamadas == ["A"]
+    assert metrics.LLM_CACHE_CONSULTAS.valor(provedor="gemini", resultado="hit") - hits == 1
+
+    assert chamar("ignorar", "C").text == "C"  # Não lê nem grava
+    assert chamar("renovar", "D").text == "D"  # Substitui a entrada
+    assert chamar().text == "D" and chamadas == ["A", "C", "D"]
+    with pytest.raises(ValueError):
+        chamar("sempre")
+
+
+def test_resposta_bloqueada_nao_e_gravada(cache):
+    def texto(_resposta):
+        raise ValueError("resposta bloqueada pelo filtro de segurança")
+
+    resposta = chamar_com_cache("gemini", "m", {}, None, [], lambda: SimpleNamespace(), texto)
+    assert not isinstance(resposta, RespostaEmCache)
+    assert cache.estatisticas()["entradas"] == 0
+
+
+def test_despejo_lru_pelo_tamanho(tmp_path):
+    cache = LLMResponseCache(tmp_path / ARQUIVO_CACHE_LLM, limite_bytes=2500)
+    for chave in ("a", "b", "c"):
+        cache.armazenar(chave, "claude", "m", chave * 1000)
+    assert cache.buscar("a") is None  # Excedeu o limite: a menos usada saiu
+    assert cache.estatisticas() == {"entradas": 2, "bytes": 2000, "limite_bytes": 2500}
+
+    cache.buscar("b")  # "c" passa a ser a menos usada recentemente
+    cache.armazenar("d", "claude", "m", "d" * 1000)
+    assert [c for c in "bcd" if cache.buscar(c)] == ["b", "d"]
+
+
+def test_claude_em_cache_preserva_stop_reason(cache):
+    criadas = []
+
+    def criar(**parametros):
+        criadas.append(parametros)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text="SENTENÇA")], stop_reason="max_tokens")
+
+    client = SimpleNamespace(messages=SimpleNamespace(create=criar))
+    parametros = {"model": "claude-x", "max_tokens": 100, "temperature": 0.1, "system": "S",
+                  "messages": [{"role": "user", "content": "Redija"}]}
+
+    criar_mensagem_com_cache(client, parametros)
+    resposta = criar_mensagem_com_cache(client, dict(parametros))
+    assert len(criadas) == 1
+    assert resposta.content[0].text == "SENTENÇA" and resposta.stop_reason == "max_tokens"
+
+    criar_mensagem_com_cache(client, {**parametros, "system": "OUTRO"})
+    assert len(criadas) == 2
+
+
+class StreamFake:
+    """Resposta em streaming do SDK: iterável de trechos, com .text completo"""
+
+    def __init__(self, texto: str, tamanho_trecho: int = 8):
+        self.text = texto
+        self._trechos = [texto[i:i + tamanho_trecho] for i in range(0, len(texto), tamanho_trecho)]
+
+    def __iter__(self):
+        return iter(SimpleNamespace(text=trecho) for trecho in self._trechos)
+
+
+def test_gemini_renova_json_invalido_em_cache(cache):
+    respostas = iter(["Não consegui estruturar o processo.", json.dumps({"numero_processo": "123"})])
+    gemini = GeminiProcessor.__new__(GeminiProcessor)
+    gemini.model = SimpleNamespace(
+        model_name="gemini-x",
+        generate_content=lambda prompt, generation_config, stream=False: StreamFake(next(respostas))
+    )
+    gemini.parametros_geracao = {"temperature": 0.1}
+    gemini.generation_config = SimpleNamespace(max_output_tokens=100)
+
+    with pytest.raises(Exception):
+        gemini.gerar_json("Extraia")
+    # A resposta inválida ficou em cache: a próxima chamada gera de novo e substitui a entrada
+    assert gemini.gerar_json("Extraia") == {"numero_processo": "123"}
+    assert gemini.gerar_json("Extraia") == {"numero_processo": "123"}
@@ -0,0 +1,82 @@
+"""
+Teste das métricas Prometheus
+Valida o formato de exposição, a contabilização de tokens/retries do Claude e o endpoint /metrics
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import httpx
+
+import main
+from services import metrics
+from services.metrics import RegistroMetricas
+from services.intelligent_dialogue_service import IntelligentDialogueService
+
+
+def test_formato_de_exposicao():
+    """Histogramas têm buckets cumulativos, _sum e _count; labels são escapados"""
+    registro = RegistroMetricas()
+    duracao = registro.histograma("etapa_segundos", "Duração", labels=("etapa",), buckets=(1.0, 10.0))
+    tokens = registro.contador("tokens_total", "Tokens", labels=("tipo",))
+
+    duracao.observar(0.5, etapa="extracao")
+    duracao.observar(5.0, etapa="extracao")
+    duracao.observar(50.0, etapa="extracao")
+    tokens.incrementar(120, tipo='saida "longa"')
+
+    texto = registro.renderizar()
+    assert "# TYPE etapa_segundos histogram" in texto
+    assert 'etapa_segundos_bucket{etapa="extracao",le="1"} 1' in texto
+    assert 'etapa_segundos_bucket{etapa="extracao",le="10"} 2' in texto
+    assert 'etapa_segundos_bucket{etapa="extracao",le="+Inf"} 3' in texto
+    assert 'etapa_segundos_sum{etapa="extracao"} 55.5' in texto
+    assert 'etapa_segundos_count{etapa="extracao"} 3' in texto
+    assert 'tokens_total{tipo="saida \\"longa\\""} 120' in texto
+
+
+def test_claude_request_contabiliza_tokens_e_retries(monkeypatch):
+    """Cada 429 incrementa o contador de retries; a resposta final soma os tokens"""
+    monkeypatch.setattr("services.admission_control.BACKOFF_BASE_S", 0.0)
+    monkeypatch.setattr("services.admission_control.JITTER_MAXIMO_S", 0.0)
+    chamadas = {"n": 0}
+
+    def criar(**kwargs):
+        chamadas["n"] += 1
+        if chamadas["n"] <= 2:
+            raise RuntimeError("Error code: 429 - rate limit")
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="ok")],
+            usage=SimpleNamespace(input_tokens=1000, output_tokens=250)
+        )
+
+    servico = IntelligentDialogueService.__new__(IntelligentDialogueService)
+    servico.logger = logging.getLogger("test")
+    servico.claude = SimpleNamespace(model="modelo", client=SimpleNamespace(messages=SimpleNamespace(create=criar)))
+    servico.cache_policy = "ignorar"  # Toda execução chama o SDK (sem resposta em cache)
+
+    retries_antes = metrics.LLM_RETRIES.valor(provedor="claude")
+    saida_antes = metrics.LLM_TOKENS.valor(provedor="claude", tipo="saida")
+
+    servico._claude_request(system="S", user="U", max_tokens=10, temperature=0)
+
+    assert metrics.LLM_RETRIES.valor(provedor="claude") - retries_antes == 2
+    assert metrics.LLM_TOKENS.valor(provedor="claude", tipo="saida") - saida_antes == 250
+
+
+def test_endpoint_metrics(tmp_path, monkeypatch):
+    """/metrics expõe as séries do pipeline e os gauges da fila"""
+    metrics.ETAPA_PIPELINE_DURACAO.observar(1.2, etapa="transcricao", status="concluida")
+
+    async def cenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/metrics")
+
+    resposta = asyncio.run(cenario())
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'sentencas_pipeline_etapa_duracao_segundos_count{etapa="transcricao",status="concluida"}' in resposta.text
+    assert "# TYPE sentencas_fila_jobs_profundidade gauge" in resposta.text
+    assert "# TYPE sentencas_llm_retries_total counter" in resposta.text
@@ -0,0 +1,148 @@
+"""
+Teste da extração paralela de PDF
+O texto remontado a partir dos intervalos de páginas é idêntico ao da extração sequencial,
+e o arquivo de destino é publicado sem deixar temporários
+"""
+
+import fitz
+import pytest
+
+from services import pdf_extractor
+from services.pdf_extractor import dividir_paginas, extrair_texto_pdf, ocr_disponivel
+
+
+def _gerar_pdf(caminho, paginas: int):
+    documento = fitz.open()
+    for indice in range(paginas):
+        pagina = documento.new_page()
+        pagina.insert_text((72, 72), f"Página {indice + 1}\nRECLAMAÇÃO TRABALHISTA - fl. {indice + 1}")
+    documento.save(str(caminho))
+    documento.close()
+
+
+def _extracao_sequencial(caminho) -> str:
+    texto = ""
+    with fitz.open(str(caminho)) as documento:
+        for pagina in documento:
+            texto += pagina.get_text("text") + "\n"
+    return texto
+
+
+def test_intervalos_cobrem_todas_as_paginas():
+    for total, processos in ((1, 4), (100, 1), (1000, 4), (3001, 8)):
+        intervalos = dividir_paginas(total, processos)
+        assert intervalos[0][0] == 0 and intervalos[-1][1] == total
+        assert all(fim == proximo for (_, fim), (proximo, _) in zip(intervalos, intervalos[1:]))
+    assert dividir_paginas(0, 4) == []
+
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_texto_identico_ao_sequencial(tmp_path, monkeypatch, processos):
+    monkeypatch.setattr(pdf_extractor, "PAGINAS_MINIMAS_PARALELO", 1)
+    pdf = tmp_path / "processo.pdf"
+    _gerar_pdf(pdf, 150)
+    destino = tmp_path / "processo_extraido.txt"
+
+    try:
+        texto = extrair_texto_pdf(pdf, destino, processos=processos)
+    finally:
+        pdf_extractor.encerrar_pool()
+
+    esperado = _extracao_sequencial(pdf)
+    assert texto == esperado
+    assert destino.read_text(encoding="utf-8") == esperado
+    assert texto.index("Página 149") < texto.index("Página 150")
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_falha_preserva_destino_anterior(tmp_path):
+    destino = tmp_path / "processo_extraido.txt"
+    destino.write_text("EXTRAÇÃO ANTERIOR", encoding="utf-8")
+    invalido = tmp_path / "corrompido.pdf"
+    invalido.write_bytes(b"nao e um pdf")
+
+    with pytest.raises(Exception):
+        extrair_texto_pdf(invalido, destino, processos=2)
+
+    assert destino.read_text(encoding="utf-8") == "EXTRAÇÃO ANTERIOR"
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def _gerar_pdf_com_pagina_digitalizada(caminho):
+    """Página 1 digital, página 2 só com imagem (digitalizada), página 3 em branco"""
+    rascunho = fitz.open()
+    pagina = rascunho.new_page()
+    pagina.insert_text((72, 72), "ATA DE AUDIÊNCIA - assinada à mão")
+    imagem = pagina.get_pixmap(dpi=72)
+    rascunho.close()
+
+    documento = fitz.open()
+    documento.new_page().insert_text((72, 72), "PETIÇÃO INICIAL\n" + "Horas extras habituais. " * 5)
+    documento.new_page().insert_image(fitz.Rect(0, 0, 595, 842), pixmap=imagem)
+    documento.new_page()
+    documento.save(str(caminho))
+    documento.close()
+
+
+def test_ocr_apenas_nas_paginas_digitalizadas_com_cache(tmp_path, monkeypatch):
+    """Só a página sem camada de texto passa por OCR; o resultado entra com marcador e é reaproveitado"""
+    import pytesseract
+
+    chamadas = []
+
+    def ocr_fake(imagem, lang):
+        chamadas.append((imagem.size, lang))
+        return "ATA DE AUDIÊNCIA (OCR)\n"
+
+    monkeypatch.setattr(pytesseract, "image_to_string", ocr_fake)
+    pdf = tmp_path / "processo.pdf"
+    _gerar_pdf_com_pagina_digitalizada(pdf)
+    cache_dir = tmp_path / "artifact_cache"
+
+    texto = extrair_texto_pdf(pdf, tmp_path / "processo_extraido.txt", processos=1, cache_dir=cache_dir, ocr=True)
+
+    assert len(chamadas) == 1
+    assert "[Página 2 - OCR]\nATA DE AUDIÊNCIA (OCR)\n" in texto
+    assert texto.startswith(_extracao_sequencial(pdf).split("\n\n")[0])
+    assert "[Página 3" not in texto
+    assert len(list((cache_dir / "ocr_pagina").glob("*/meta.json"))) == 1
+
+    # Mesma imagem de página (outro upload do mesmo processo): OCR vem do cache
+    assert extrair_texto_pdf(pdf, processos=1, cache_dir=cache_dir, ocr=True) == texto
+    assert len(chamadas) == 1
+
+
+def test_falha_do_ocr_mantem_texto_nativo_da_pagina(tmp_path, monkeypatch):
+    """Um erro do Tesseract numa página não derruba a extração: a página fica com o texto nativo"""
+    import pytesseract
+
+    def ocr_falho(imagem, lang):
+        raise pytesseract.TesseractError(1, "Failed loading language 'por'")
+
+    monkeypatch.setattr(pytesseract, "image_to_string", ocr_falho)
+    pdf = tmp_path / "processo.pdf"
+    _gerar_pdf_com_pagina_digitalizada(pdf)
+
+    destino = tmp_path / "processo_extraido.txt"
+    texto = extrair_texto_pdf(pdf, destino, processos=1, ocr=True)
+    assert texto == _extracao_sequencial(pdf)
+    assert destino.read_text(encoding="utf-8") == texto
+
+
+def test_sem_ocr_mantem_texto_nativo(tmp_path):
+    pdf = tmp_path / "processo.pdf"
+    _gerar_pdf_com_pagina_digitalizada(pdf)
+    assert extrair_texto_pdf(pdf, processos=1, ocr=False) == _extracao_sequencial(pdf)
+
+
+@pytest.mark.skipif(not ocr_disponivel(), reason="Tesseract não instalado")
+def test_ocr_paralelo_com_tesseract(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extractor, "PAGINAS_MINIMAS_PARALELO", 1)
+    pdf = tmp_path / "processo.pdf"
+    _gerar_pdf_com_pagina_digitalizada(pdf)
+    try:
+        texto = extrair_texto_pdf(pdf, processos=2, cache_dir=tmp_path / "artifact_cache")
+    finally:
+        pdf_extractor.encerrar_pool()
+    assert "[Página 2 - OCR]" in texto
+    assert "AUDI" in texto.split("[Página 2 - OCR]")[1]
@@ -0,0 +1,100 @@
+"""
+Teste do executor de pipeline em DAG
+Valida paralelismo entre etapas independentes, limites por recurso, caminho crítico e falhas
+"""
+
+import asyncio
+
+import pytest
+
+from services.pipeline_dag import (
+    PipelineDAG, EtapaDAG, FalhaPipeline,
+    ETAPA_CONCLUIDA, ETAPA_CANCELADA, ETAPA_IGNORADA
+)
+
+
+def _etapa_lenta(duracao: float, registro=None):
+    async def _executar(case_id):
+        if registro is not None:
+            registro["ativas"] += 1
+            registro["max_ativas"] = max(registro["max_ativas"], registro["ativas"])
+        await asyncio.sleep(duracao)
+        if registro is not None:
+            registro["ativas"] -= 1
+    return _executar
+
+
+def _status(relatorio):
+    return {etapa["nome"]: etapa["status"] for etapa in relatorio["etapas"]}
+
+
+def test_etapas_independentes_em_paralelo_e_caminho_critico():
+    """Duração total segue a cadeia mais longa, não a soma das etapas"""
+    dag = PipelineDAG([
+        EtapaDAG("transcricao", _etapa_lenta(0.3), entradas=["audiencia"], saidas=["transcricao"]),
+        EtapaDAG("extracao", _etapa_lenta(0.1), entradas=["processo"], saidas=["texto"]),
+        EtapaDAG("estruturacao", _etapa_lenta(0.3), entradas=["texto"], saidas=["estruturado"]),
+        EtapaDAG("geracao", _etapa_lenta(0.1), entradas=["texto", "estruturado"],
+                 entradas_opcionais=["transcricao"], saidas=["sentenca"]),
+    ])
+
+    relatorio = asyncio.run(dag.executar("caso", {"processo", "audiencia"}))
+
+    assert set(_status(relatorio).values()) == {ETAPA_CONCLUIDA}
+    assert relatorio["soma_duracoes_s"] >= 0.8
+    assert relatorio["duracao_total_s"] < 0.7
+    assert relatorio["caminho_critico"] == ["extracao", "estruturacao", "geracao"]
+
+
+def test_limite_de_concorrencia_por_recurso():
+    """Etapas independentes do mesmo recurso respeitam o limite configurado"""
+    registro = {"ativas": 0, "max_ativas": 0}
+    dag = PipelineDAG([
+        EtapaDAG(f"gemini_{i}", _etapa_lenta(0.05, registro), saidas=[f"saida_{i}"], recurso="gemini")
+        for i in range(4)
+    ], limites_recurso={"gemini": 2})
+
+    asyncio.run(dag.executar("caso", set()))
+
+    assert registro["max_ativas"] == 2
+
+
+def test_entrada_opcional_ausente_nao_bloqueia():
+    """Sem audiência a transcrição é ignorada e a geração roda mesmo assim"""
+    dag = PipelineDAG([
+        EtapaDAG("transcricao", _etapa_lenta(0), entradas=["audiencia"], saidas=["transcricao"]),
+        EtapaDAG("geracao", _etapa_lenta(0), entradas=["processo"],
+                 entradas_opcionais=["transcricao"], saidas=["sentenca"]),
+    ])
+
+    relatorio = asyncio.run(dag.executar("caso", {"processo"}))
+
+    assert _status(relatorio) == {"transcricao": ETAPA_IGNORADA, "geracao": ETAPA_CONCLUIDA}
+
+
+def test_falha_cancela_dependentes_e_conclui_independentes():
+    """Etapa falha: dependentes são canceladas, ramos independentes terminam"""
+    async def quebrada(case_id):
+        raise RuntimeError("Gemini indisponível")
+
+    dag = PipelineDAG([
+        EtapaDAG("estruturacao", quebrada, entradas=["processo"], saidas=["estruturado"]),
+        EtapaDAG("rag", _etapa_lenta(0), entradas=["estruturado"], saidas=["rag"]),
+        EtapaDAG("transcricao", _etapa_lenta(0.05), entradas=["audiencia"], saidas=["transcricao"]),
+    ])
+
+    with pytest.raises(FalhaPipeline) as falha:
+        asyncio.run(dag.executar("caso", {"processo", "audiencia"}))
+
+    status = _status(falha.value.relatorio)
+    assert status["rag"] == ETAPA_CANCELADA
+    assert status["transcricao"] == ETAPA_CONCLUIDA
+    assert "Gemini indisponível" in str(falha.value)
+
+
+def test_ciclo_rejeitado():
+    with pytest.raises(ValueError):
+        PipelineDAG([
+            EtapaDAG("a", _etapa_lenta(0), entradas=["y"], saidas=["x"]),
+            EtapaDAG("b", _etapa_lenta(0), entradas=["x"], saidas=["y"]),
+        ])
@@ -0,0 +1,122 @@
+"""
+Teste de retomada do pipeline por checkpoints
+Valida o manifesto do caso e a retomada da geração long-form a partir da primeira chamada ausente
+"""
+
+import logging
+import re
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from services.pipeline_manifest import PipelineManifest, hash_conteudo
+from services.intelligent_dialogue_service import IntelligentDialogueService
+
+
+def test_manifesto_valida_hash_e_integridade(tmp_path: Path):
+    """Checkpoint só é reaproveitado com a mesma entrada e conteúdo íntegro"""
+    manifest = PipelineManifest(tmp_path)
+    manifest.registrar("dialogo:ETAPA_1", "h1", {"conteudo_completo": "RESUMO"})
+    manifest.registrar("pipeline:extracao", "h2")
+
+    assert PipelineManifest(tmp_path).obter("dialogo:ETAPA_1", "h1") == {"conteudo_completo": "RESUMO"}
+    assert manifest.obter("dialogo:ETAPA_1", "outra-entrada") is None
+    assert manifest.concluido("pipeline:extracao", "h2")
+
+    arquivo = next(a for a in (tmp_path / "checkpoints").iterdir() if "RESUMO" in a.read_text(encoding='utf-8'))
+    arquivo.write_text(arquivo.read_text(encoding='utf-8').replace("RESUMO", "ADULTERADO"), encoding='utf-8')
+    assert manifest.obter("dialogo:ETAPA_1", "h1") is None
+
+    assert manifest.remover("dialogo:") == 1
+    assert manifest.chaves() == ["pipeline:extracao"]
+
+
+class _ClaudeFake:
+    """Respostas determinísticas por seção; pode falhar a partir da N-ésima chamada"""
+
+    def __init__(self, falhar_na_chamada=None):
+        self.chamadas = 0
+        self.falhar_na_chamada = falhar_na_chamada
+
+    def __call__(self, system, user, max_tokens, temperature):
+        self.chamadas += 1
+        if self.falhar_na_chamada and self.chamadas >= self.falhar_na_chamada:
+            raise RuntimeError("429 rate limit")
+        secao = re.search(r"seção '([^']+)'", user).group(1)
+        trecho = f"{secao} trecho {len(user) % 97} " + "x" * 500
+        return SimpleNamespace(content=[SimpleNamespace(text=trecho)])
+
+
+def _servico(case_dir: Path, claude_fake: _ClaudeFake) -> IntelligentDialogueService:
+    """Serviço de diálogo sem clientes externos (apenas o necessário para a geração long-form)"""
+    servico = IntelligentDialogueService.__new__(IntelligentDialogueService)
+    servico.case_id = "caso"
+    servico.case_dir = case_dir
+    servico.logger = logging.getLogger("test")
+    servico.manifest = PipelineManifest(case_dir)
+    servico._hash_entradas = hash_conteudo("PROCESSO", "TRANSCRICAO")
+    servico.claude = SimpleNamespace(system_prompt="SYSTEM", max_tokens=8192, temperature=0.1)
+    servico._claude_request = claude_fake
+    return servico
+
+
+def _gerar(servico: IntelligentDialogueService) -> str:
+    return servico._gerar_sentenca_longform(
+        prompt_base="PROMPT BASE",
+        resumo_processo="RESUMO",
+        prova_oral="PROVA ORAL",
+        conhecimento_fundamentacao={"estilo": ["trecho"]},
+        questoes_claude="PERGUNTAS",
+        respostas_gemini="RESPOSTAS",
+        alvo_caracteres_total=15000
+    )
+
+
+def test_longform_retoma_da_primeira_chamada_ausente(tmp_path: Path):
+    """Após falha na chamada N, a retomada faz apenas as chamadas restantes e gera o mesmo texto"""
+    referencia = _ClaudeFake()
+    texto_referencia = _gerar(_servico(tmp_path / "referencia", referencia))
+
+    falha_na_chamada = 10
+    with pytest.raises(RuntimeError):
+        _gerar(_servico(tmp_path / "caso", _ClaudeFake(falhar_na_chamada=falha_na_chamada)))
+
+    retomada = _ClaudeFake()
+    texto_retomado = _gerar(_servico(tmp_path / "caso", retomada))
+
+    assert texto_retomado == texto_referencia
+    assert retomada.chamadas == referencia.chamadas - (falha_na_chamada - 1)
+
+    # Nova execução completa: nenhuma chamada ao Claude
+    sem_chamadas = _ClaudeFake()
+    assert _gerar(_servico(tmp_path / "caso", sem_chamadas)) == texto_referencia
+    assert sem_chamadas.chamadas == 0
+
+
+def test_etapa_concluida_sem_artefatos_e_reexecutada(tmp_path: Path, monkeypatch):
+    """O checkpoint da etapa só é reaproveitado se os arquivos que ela produz ainda existem"""
+    import asyncio
+
+    import main
+
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    case_dir = tmp_path / "caso"
+    case_dir.mkdir()
+    (case_dir / "processo.pdf").write_bytes(b"%PDF-1.4\n")
+    execucoes = []
+
+    async def extrair(case_id):
+        execucoes.append(case_id)
+        for nome in main.ARTEFATOS_POR_ETAPA["extracao"]:
+            (case_dir / nome).write_text("TEXTO", encoding="utf-8")
+
+    etapa = main._etapa_com_checkpoint("extracao", extrair)
+    asyncio.run(etapa("caso"))
+    asyncio.run(etapa("caso"))
+    assert len(execucoes) == 1  # Reaproveitada
+
+    (case_dir / "processo_extraido.txt").unlink()
+    asyncio.run(etapa("caso"))
+    assert len(execucoes) == 2
+    assert (case_dir / "processo_extraido.txt").exists()
@@ -0,0 +1,93 @@
+"""
+Teste do índice de peças do PJe
+Páginas com o mesmo ID no rodapé formam uma peça, o tipo vem do SUMÁRIO (ou do início da
+peça), e o fatiamento entrega as peças essenciais dentro do limite de caracteres
+"""
+
+import json
+
+from services.pje_segmenter import (
+    ARQUIVO_INDICE, PECAS_ESSENCIAIS, carregar_indice, classificar_peca, segmentar_processo
+)
+
+
+def _pagina(fls: int, corpo: str, id_peca: str = None) -> str:
+    rodape = (f"Assinado eletronicamente por: FULANO DE TAL - Juntado em: 15/04/2024 10:20:30 - {id_peca}\n"
+              if id_peca else "")
+    return f"Fls.: {fls}\n{corpo}\n{rodape}"
+
+
+def _processo() -> str:
+    paginas = [
+        _pagina(1, "Processo Judicial Eletrônico\nPAGINA_CAPA_PROCESSO_PJE"),
+        _pagina(2, "EXMO. SR. JUIZ\nPedidos: horas extras. " + "x" * 4000, "2d38a1c"),
+        _pagina(3, "continuação da inicial " + "y" * 4000, "2d38a1c"),
+        _pagina(4, "Outorgo poderes", "99bd9f2"),
+        _pagina(5, "DEFESA DA RECLAMADA " + "z" * 9000, "4e7ee51"),
+        _pagina(6, "Ata da audiência de instrução", "78a3f60"),
+        _pagina(7, "RÉPLICA - o reclamante impugna a defesa", "aa11bb2"),
+        _pagina(8, "SUMÁRIO\nDocumentos\nId.\nData da\nAssinatura\nDocumento\nTipo\n"
+                   "2d38a1c\n15/04/2024 10:20\nPetição Inicial\nPetição Inicial\n"
+                   "99bd9f2\n15/04/2024 10:20\n01 Procuração\nProcuração\n"
+                   "4e7ee51\n20/05/2024 09:00\n(Pipek) DEFESA\nContestação\n"
+                   "78a3f60\n21/05/2024 14:00\nAta da Audiência\nAta da Audiência\n"),
+    ]
+    return "".join(paginas)
+
+
+def test_pecas_agrupadas_por_id_e_tipadas_pelo_sumario():
+    texto = _processo()
+    indice = segmentar_processo(texto)
+
+    tipos = [(peca.tipo, peca.id) for peca in indice.pecas]
+    assert tipos == [
+        ("capa", None), ("peticao_inicial", "2d38a1c"), ("procuracao", "99bd9f2"), ("contestacao", "4e7ee51"),
+        ("ata_audiencia", "78a3f60"), ("replica", "aa11bb2"), ("sumario", None),
+    ]
+    inicial = indice.peca_por_id("2d38a1c")
+    assert (inicial.pagina_inicial, inicial.pagina_final) == (2, 3)
+    assert inicial.juntado_em == "15/04/2024 10:20:30" and inicial.assinado_por == "FULANO DE TAL"
+    assert texto[inicial.inicio:].startswith("Fls.: 2\nEXMO.")
+    # Peças contíguas cobrindo todo o texto
+    assert indice.pecas[0].inicio == 0 and indice.pecas[-1].fim == len(texto)
+    assert all(a.fim == b.inicio for a, b in zip(indice.pecas, indice.pecas[1:]))
+    assert "CONTESTAÇÃO - ID 4e7ee51 - fls. 5-5" in indice.resumo()
+
+
+def test_fatiar_respeita_limite_e_ordem_dos_autos():
+    texto = _processo()
+    indice = segmentar_processo(texto)
+
+    fatia = indice.fatiar(texto, PECAS_ESSENCIAIS, limite_caracteres=6000)
+    cabecalhos = [linha for linha in fatia.splitlines() if linha.startswith("=== ")]
+    assert [c.split(" - ")[0] for c in cabecalhos] == [
+        "=== PETIÇÃO INICIAL", "=== CONTESTAÇÃO", "=== ATA DE AUDIÊNCIA", "=== RÉPLICA"
+    ]
+    # Peças curtas entram inteiras; as longas são truncadas no início
+    assert "Ata da audiência de instrução" in fatia and "impugna a defesa" in fatia
+    assert fatia.count("[... PEÇA TRUNCADA ...]") == 2
+    conteudo = sum(len(texto[p.inicio:p.fim]) for p in indice.pecas_do_tipo(*PECAS_ESSENCIAIS))
+    assert len(fatia) < 6000 + 400 < conteudo
+
+
+def test_sem_marcadores_classifica_pelo_inicio():
+    indice = segmentar_processo("RECLAMAÇÃO TRABALHISTA\nO reclamante pede horas extras.")
+    assert [peca.tipo for peca in indice.pecas] == ["peticao_inicial"]
+    assert classificar_peca("Impugnação à Contestação") == "replica"
+    assert classificar_peca("Documento Diverso") == "documento"
+
+
+def test_indice_persistido_e_reconstruido_quando_texto_muda(tmp_path):
+    texto = _processo()
+    (tmp_path / "processo_extraido.txt").write_text(texto, encoding="utf-8")
+
+    indice = carregar_indice(tmp_path)
+    salvo = json.loads((tmp_path / ARQUIVO_INDICE).read_text(encoding="utf-8"))
+    assert salvo["caracteres"] == len(texto) and len(salvo["pecas"]) == len(indice.pecas)
+    assert carregar_indice(tmp_path) == indice
+
+    # Texto regravado (ex.: nova extração): o índice antigo não vale mais
+    novo = texto + _pagina(9, "Sentença", "bb22cc3")
+    (tmp_path / "processo_extraido.txt").write_text(novo, encoding="utf-8")
+    assert carregar_indice(tmp_path).peca_por_id("bb22cc3").tipo == "sentenca"
+    assert carregar_indice(tmp_path / "inexistente") is None
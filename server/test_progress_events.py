@@ -0,0 +1,105 @@
+"""
+Teste do stream de progresso do caso
+Valida o barramento de eventos (publicação a partir de threads, histórico e encerramento)
+e o endpoint SSE /cases/{case_id}/events
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+
+import main
+from services import event_bus
+from services.event_bus import EventBus
+
+
+def test_barramento_entrega_historico_e_encerra_no_evento_final():
+    """Eventos publicados por threads chegam em ordem; reconexão reenvia apenas os posteriores ao id"""
+    bus = EventBus()
+
+    async def cenario():
+        bus.publicar("caso", "job_iniciado")
+        recebidos = []
+
+        async def consumir():
+            async for evento in bus.assinar("caso", intervalo_heartbeat=5):
+                recebidos.append(evento)
+
+        consumidor = asyncio.create_task(consumir())
+        await asyncio.sleep(0.05)
+
+        def produzir():
+            for i in range(3):
+                bus.publicar("caso", "chunk", iteracao=i + 1)
+            bus.publicar("caso", "job_concluido")
+
+        thread = threading.Thread(target=produzir)
+        thread.start()
+        await asyncio.wait_for(consumidor, timeout=5)
+        thread.join()
+        return recebidos
+
+    recebidos = asyncio.run(cenario())
+    assert [e["tipo"] for e in recebidos] == ["job_iniciado", "chunk", "chunk", "chunk", "job_concluido"]
+    assert [e["dados"].get("iteracao") for e in recebidos[1:4]] == [1, 2, 3]
+
+    # Reconexão (Last-Event-ID): apenas os eventos após o último recebido
+    async def reconectar():
+        return [e async for e in bus.assinar("caso", desde_id=recebidos[1]["id"], intervalo_heartbeat=5)]
+
+    assert [e["tipo"] for e in asyncio.run(reconectar())] == ["chunk", "chunk", "job_concluido"]
+
+
+def test_endpoint_sse_transmite_eventos_do_caso(tmp_path, monkeypatch):
+    """O stream SSE entrega etapas e seções no formato id/event/data e fecha com o fim do job"""
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(event_bus, "_bus_global", EventBus())
+    (tmp_path / "caso").mkdir()
+
+    async def cenario():
+        async def publicar():
+            await asyncio.sleep(0.1)
+            event_bus.publicar_evento("caso", "etapa_iniciada", etapa="extracao")
+            event_bus.publicar_evento("caso", "secao_concluida", secao="RELATÓRIO", caracteres=7, texto="RELATÓRIO")
+            event_bus.publicar_evento("caso", "job_concluido", status="concluido")
+            event_bus.publicar_evento("outro", "etapa_iniciada", etapa="extracao")
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/cases/inexistente/events")).status_code == 404
+            produtor = asyncio.create_task(publicar())
+            resposta = await asyncio.wait_for(client.get("/cases/caso/events"), timeout=5)
+            await produtor
+        return resposta
+
+    resposta = asyncio.run(cenario())
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/event-stream")
+
+    blocos = [bloco for bloco in resposta.text.split("\n\n") if bloco.strip()]
+    eventos = [dict(linha.split(": ", 1) for linha in bloco.splitlines()) for bloco in blocos]
+    assert [e["event"] for e in eventos] == ["estado", "etapa_iniciada", "secao_concluida", "job_concluido"]
+    assert json.loads(eventos[2]["data"])["dados"]["secao"] == "RELATÓRIO"
+    assert eventos[3]["id"] == str(json.loads(eventos[3]["data"])["id"])
+
+
+def test_historico_expira_apos_evento_final_e_limita_casos():
+    bus = EventBus(retencao_apos_final_s=0.05, max_casos=2)
+    bus.publicar("concluido", "job_iniciado")
+    bus.publicar("concluido", "secao_concluida", texto="FUNDAMENTAÇÃO " * 100)
+    bus.publicar("concluido", "job_concluido")
+    assert len(bus.historico("concluido")) == 3  # Ainda disponível para uma reconexão
+
+    time.sleep(0.06)
+    bus.publicar("em_andamento", "job_iniciado")
+    assert bus.historico("concluido") == []
+
+    # Acima de max_casos, sai o caso publicado há mais tempo
+    bus.publicar("outro", "job_iniciado")
+    bus.publicar("em_andamento", "chunk", texto="...")
+    bus.publicar("terceiro", "job_iniciado")
+    assert bus.historico("outro") == []
+    assert [e["tipo"] for e in bus.historico("em_andamento")] == ["job_iniciado", "chunk"]
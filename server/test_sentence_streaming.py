@@ -0,0 +1,64 @@
+"""
+Teste do download da sentença durante a geração
+Valida o artefato parcial escrito por seções e o modo stream=true do endpoint de download
+"""
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+import main
+from services.partial_artifact import ArtefatoParcial, STATUS_CONCLUIDO, STATUS_INTERROMPIDO
+from test_pipeline_resume import _ClaudeFake, _gerar, _servico
+
+
+def test_longform_anexa_secoes_ao_artefato_parcial(tmp_path: Path):
+    """O parcial contém apenas seções concluídas e, ao final, o texto integral da sentença"""
+    with pytest.raises(RuntimeError):
+        _gerar(_servico(tmp_path, _ClaudeFake(falhar_na_chamada=5)))
+
+    parcial = ArtefatoParcial(tmp_path / "sentenca_parcial.txt")
+    estado = parcial.estado()
+    assert estado["status"] == STATUS_INTERROMPIDO
+    conteudo = parcial.caminho.read_text(encoding="utf-8")
+    assert conteudo.startswith("SENTENÇA\nRELATÓRIO")
+    assert estado["secoes"] >= 1 and conteudo.endswith("\n\n")
+    assert len(conteudo.encode("utf-8")) == estado["bytes"]
+
+    texto_final = _gerar(_servico(tmp_path, _ClaudeFake()))
+    assert parcial.estado()["status"] == STATUS_CONCLUIDO
+    assert parcial.caminho.read_text(encoding="utf-8").strip() == texto_final
+
+
+def test_download_em_stream_acompanha_a_geracao(tmp_path, monkeypatch):
+    """Com stream=true o cliente recebe as seções enquanto são escritas, até a conclusão"""
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    monkeypatch.setenv("SENTENCA_STREAM_INTERVALO_S", "0.02")
+    (tmp_path / "caso").mkdir()
+    parcial = ArtefatoParcial(tmp_path / "caso" / "sentenca_parcial.txt")
+    parcial.iniciar("SENTENÇA\n")
+    secoes = [f"SEÇÃO {i}\n" + "texto " * 200 + "\n\n" for i in range(5)]
+
+    def gerar():
+        for secao in secoes:
+            time.sleep(0.05)
+            parcial.anexar(secao)
+        parcial.finalizar()
+
+    async def cenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/download/caso/sentenca")).status_code == 404
+            gerador = threading.Thread(target=gerar)
+            gerador.start()
+            resposta = await asyncio.wait_for(client.get("/download/caso/sentenca", params={"stream": "true"}), 10)
+            gerador.join()
+        return resposta
+
+    resposta = asyncio.run(cenario())
+    assert resposta.status_code == 200
+    assert resposta.text == "SENTENÇA\n" + "".join(secoes)
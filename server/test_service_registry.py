@@ -0,0 +1,63 @@
+"""
+Teste do registro de serviços compartilhados
+Valida criação única por processo, registro de falhas e o endpoint de prontidão
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+
+import main
+import services.service_registry as service_registry
+from services.service_registry import ServiceRegistry
+
+
+def test_servico_criado_uma_vez_sob_concorrencia():
+    """Chamadas concorrentes aguardam a primeira criação e recebem a mesma instância"""
+    criacoes = []
+
+    def modelo_lento():
+        time.sleep(0.2)
+        criacoes.append(1)
+        return object()
+
+    registry = ServiceRegistry({"embeddings": modelo_lento})
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(registry.obter("embeddings"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(criacoes) == 1
+    assert all(instancia is resultados[0] for instancia in resultados)
+
+
+def test_ready_somente_apos_aquecimento(monkeypatch):
+    """/ready responde 503 até o aquecimento terminar sem falhas"""
+
+    def sem_chave():
+        raise ValueError("ANTHROPIC_API_KEY não encontrada nas variáveis de ambiente")
+
+    registry = ServiceRegistry({"gemini": object, "claude": sem_chave})
+    monkeypatch.setattr(service_registry, "_registry_global", registry)
+
+    async def consultar():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ready")
+
+    assert asyncio.run(consultar()).status_code == 503
+
+    estado = registry.aquecer()
+    assert estado["servicos"]["gemini"]["carregado"]
+    assert "ANTHROPIC_API_KEY" in estado["servicos"]["claude"]["erro"]
+    assert asyncio.run(consultar()).status_code == 503
+
+    registry.fabricas["claude"] = object
+    registry.aquecer()
+    resposta = asyncio.run(consultar())
+    assert resposta.status_code == 200
+    assert resposta.json()["pronto"] is True
@@ -0,0 +1,39 @@
+"""
+Teste do orçamento de inicialização
+Importar main, o pacote services ou um serviço isolado não pode carregar torch, chromadb
+nem os SDKs dos LLMs, e o tempo de import fica dentro de ORCAMENTO_MS (benchmark_startup.py)
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from benchmark_startup import ORCAMENTO_MS, SERVER_DIR, medir_importacao
+
+
+@pytest.mark.parametrize("modulo", sorted(ORCAMENTO_MS))
+def test_import_dentro_do_orcamento(modulo):
+    # Melhor de três: o orçamento vale para o custo do import, não para ruído da máquina
+    medidas = [medir_importacao(modulo) for _ in range(3)]
+    assert not medidas[0][2], f"{modulo} carregou dependências pesadas: {medidas[0][2]}"
+    melhor = min(total for total, _, _ in medidas)
+    assert melhor <= ORCAMENTO_MS[modulo], f"{modulo}: {melhor:.0f}ms > {ORCAMENTO_MS[modulo]}ms"
+
+
+def test_exportacoes_do_pacote_carregam_sob_demanda():
+    """``from services import X`` carrega só o submódulo de X; nomes inválidos geram AttributeError"""
+    codigo = (
+        "import sys, services\n"
+        "from services import SemanticChunker, ChunkType\n"
+        "assert SemanticChunker.__module__ == 'services.semantic_chunker'\n"
+        "assert 'services.enhanced_rag_service' not in sys.modules\n"
+        "assert 'IntelligentDialogueService' in dir(services)\n"
+        "try:\n"
+        "    services.Inexistente\n"
+        "except AttributeError:\n"
+        "    pass\n"
+        "else:\n"
+        "    raise SystemExit('esperava AttributeError')\n"
+    )
+    subprocess.run([sys.executable, "-c", codigo], cwd=SERVER_DIR, check=True)
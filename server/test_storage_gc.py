@@ -0,0 +1,175 @@
+"""
+Teste da coleta de lixo do storage
+Valida o relatório em dry-run, a remoção por idade e por limite de tamanho (LRU), a proteção
+de casos ativos, a contagem de referências do cache, instâncias órfãs e a compactação
+"""
+
+import json
+import os
+import threading
+import time
+
+from services.artifact_cache import ArtifactCache, vincular_arquivo
+from services.case_catalog import CaseCatalog, ARQUIVO_CATALOGO
+from services.case_lock import lock_caso
+from services.storage_gc import StorageGC, PoliticaRetencao
+
+DIA_S = 24 * 3600
+
+
+def _envelhecer(caminho, dias: float):
+    instante = time.time() - dias * DIA_S
+    os.utime(caminho, (instante, instante))
+
+
+def _criar_caso(storage, case_id: str, dias: float, tamanho: int = 1000):
+    case_dir = storage / case_id
+    case_dir.mkdir()
+    (case_dir / "processo.pdf").write_bytes(b"x" * tamanho)
+    _envelhecer(case_dir, dias)
+    return case_dir
+
+
+def _arvore(tmp_path):
+    """Storage sintético com casos, instâncias, backups e cache em diferentes idades"""
+    storage = tmp_path / "storage"
+    rag = storage / "rag_storage"
+    (rag / "template_master").mkdir(parents=True)
+    (rag / "template_master" / "estilo_juiza.json").write_text('{"formal": true}', encoding="utf-8")
+
+    catalogo = CaseCatalog(storage / ARQUIVO_CATALOGO)
+
+    antigo = _criar_caso(storage, "antigo", dias=90)
+    catalogo.registrar_caso("antigo", antigo, status="completed", criado_em="2025-01-01T00:00:00")
+
+    # Cold case: sentença duplicada no resultado do diálogo, cópia do template, temporários
+    frio = _criar_caso(storage, "frio", dias=10)
+    (frio / "sentenca_gerada.txt").write_text("SENTENÇA " * 200, encoding="utf-8")
+    (frio / "dialogo_resultado_completo.json").write_text(
+        json.dumps({"etapas_executadas": [1, 2, 3], "sentenca_final": "SENTENÇA " * 200}), encoding="utf-8"
+    )
+    instancia_fria = rag / "processo_frio"
+    (instancia_fria / "estilo_juiza").mkdir(parents=True)
+    (instancia_fria / "estilo_juiza" / "estilo_juiza.json").write_text('{"formal": true}', encoding="utf-8")
+    (instancia_fria / "temp_generation").mkdir()
+    (instancia_fria / "temp_generation" / "rascunho.txt").write_text("x" * 500, encoding="utf-8")
+    _envelhecer(frio, 10)
+
+    em_execucao = _criar_caso(storage, "em-execucao", dias=90)
+    catalogo.registrar_caso("em-execucao", em_execucao, status="running")
+    catalogo._conexao().execute("UPDATE casos SET atualizado_em = '2025-01-01T00:00:00'")
+
+    _criar_caso(storage, "recente", dias=0)
+
+    orfa = rag / "processo_sem-caso"
+    (orfa / "chroma_db").mkdir(parents=True)
+    (orfa / "chroma_db" / "chroma.sqlite3").write_bytes(b"x" * 2000)
+    _envelhecer(orfa, 3)
+
+    backup = rag / "cleanup_backup" / "processo_velho_20250101_000000"
+    backup.mkdir(parents=True)
+    (backup / "instance_metadata.json").write_text("{}", encoding="utf-8")
+    _envelhecer(backup, 60)
+
+    # Cache: uma entrada vinculada a um caso (referenciada) e outra sem referência
+    cache = ArtifactCache(storage / "artifact_cache")
+    entradas = []
+    for hash_entrada in ("hash-a", "hash-b"):
+        origem = tmp_path / "processo_extraido.txt"
+        origem.write_text(f"texto extraído {hash_entrada}", encoding="utf-8")
+        entradas.append(cache.armazenar("processo_extraido", hash_entrada, [origem]))
+        origem.unlink()
+    referenciada, sem_referencia = entradas
+    vincular_arquivo(referenciada / "processo_extraido.txt", storage / "recente" / "processo_extraido.txt")
+    for entrada in (referenciada, sem_referencia):
+        _envelhecer(entrada / "meta.json", 45)
+
+    return storage, catalogo, referenciada, sem_referencia
+
+
+def test_dry_run_relata_sem_alterar(tmp_path):
+    """O dry-run lista as ações e os bytes liberáveis sem tocar no disco"""
+    storage, catalogo, _, sem_referencia = _arvore(tmp_path)
+    antes = sorted(str(p) for p in storage.rglob("*"))
+
+    relatorio = StorageGC(storage, PoliticaRetencao(idade_max_caso_dias=30), catalogo).executar(dry_run=True)
+
+    assert sorted(str(p) for p in storage.rglob("*")) == antes
+    por_tipo = {(acao.tipo, acao.case_id or acao.caminho) for acao in relatorio.acoes}
+    assert ("remover_caso", "antigo") in por_tipo
+    assert ("mover_instancia_orfa", "sem-caso") in por_tipo
+    assert ("remover_cache", str(sem_referencia)) in por_tipo
+    assert {"compactar_resultado_dialogo", "deduplicar_template", "remover_temporario", "remover_backup"} <= {
+        acao.tipo for acao in relatorio.acoes
+    }
+    # Caso com job em execução, caso recente e entrada do cache referenciada são preservados
+    assert not any(acao.case_id in ("em-execucao", "recente") for acao in relatorio.acoes)
+    assert relatorio.casos_analisados == 4
+    assert relatorio.to_dict()["resumo"]["remover_caso"]["bytes"] == 1000
+
+
+def test_coleta_aplica_politicas(tmp_path):
+    """A execução real remove, move e compacta conforme o relatório"""
+    storage, catalogo, referenciada, sem_referencia = _arvore(tmp_path)
+    rag = storage / "rag_storage"
+
+    relatorio = StorageGC(storage, PoliticaRetencao(idade_max_caso_dias=30), catalogo).executar(dry_run=False)
+
+    assert not relatorio.erros
+    assert not (storage / "antigo").exists() and catalogo.obter_caso("antigo") is None
+    assert (storage / "em-execucao").exists() and (storage / "recente").exists()
+    assert not (rag / "processo_sem-caso").exists()
+    assert any(p.name.startswith("processo_sem-caso_orfa_") for p in (rag / "cleanup_backup").iterdir())
+    assert not (rag / "cleanup_backup" / "processo_velho_20250101_000000").exists()
+    assert referenciada.exists() and not sem_referencia.exists()
+
+    resultado = json.loads((storage / "frio" / "dialogo_resultado_completo.json").read_text(encoding="utf-8"))
+    assert "sentenca_final" not in resultado and resultado["sentenca_final_arquivo"] == "sentenca_gerada.txt"
+    copia = rag / "processo_frio" / "estilo_juiza" / "estilo_juiza.json"
+    assert copia.stat().st_ino == (rag / "template_master" / "estilo_juiza.json").stat().st_ino
+    assert list((rag / "processo_frio" / "temp_generation").iterdir()) == []
+    assert relatorio.bytes_liberados > 0
+
+
+def test_limite_de_tamanho_remove_menos_recentes(tmp_path):
+    """Acima do limite total, os casos menos recentes são removidos até caber"""
+    storage = tmp_path / "storage"
+    storage.mkdir()
+    for case_id, dias in (("c1", 5), ("c2", 3), ("c3", 1)):
+        _criar_caso(storage, case_id, dias=dias, tamanho=400 * 1024)
+
+    politica = PoliticaRetencao(limite_total_gb=900 * 1024 / 1024 ** 3, compactar_apos_dias=None)
+    relatorio = StorageGC(storage, politica).executar(dry_run=False)
+
+    assert [acao.case_id for acao in relatorio.acoes] == ["c1"]
+    assert sorted(p.name for p in storage.iterdir() if not p.name.startswith(".")) == ["c2", "c3"]
+
+
+def test_acoes_por_caso_respeitam_o_lock_do_caso(tmp_path):
+    """Compactação, deduplicação e temporários de um caso em uso por outro worker ficam para a próxima coleta"""
+    storage, catalogo, _, _ = _arvore(tmp_path)
+    rag = storage / "rag_storage"
+    resultado_path = storage / "frio" / "dialogo_resultado_completo.json"
+    resultado_antes = resultado_path.read_text(encoding="utf-8")
+
+    obtido, liberar = threading.Event(), threading.Event()
+
+    def geracao_manual():
+        with lock_caso(storage, "frio"):
+            obtido.set()
+            liberar.wait(5)
+
+    # Outra thread (contexto próprio): o lock não é reentrante para a coleta
+    thread = threading.Thread(target=geracao_manual)
+    thread.start()
+    obtido.wait(5)
+    try:
+        relatorio = StorageGC(storage, PoliticaRetencao(idade_max_caso_dias=30), catalogo).executar(dry_run=False)
+    finally:
+        liberar.set()
+        thread.join(5)
+
+    assert not any(acao.case_id == "frio" for acao in relatorio.acoes)
+    assert len([erro for erro in relatorio.erros if "frio" in erro]) == 3
+    assert resultado_path.read_text(encoding="utf-8") == resultado_antes
+    assert list((rag / "processo_frio" / "temp_generation").iterdir())
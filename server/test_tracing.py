@@ -0,0 +1,87 @@
+"""
+Teste do tracing por caso
+Valida o aninhamento de spans através das threads do AsyncExecutor, os atributos de tokens
+e o relatório gerado a partir de storage/{case_id}/trace.jsonl
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import trace_report
+from services.async_executor import AsyncExecutor
+from services.metrics import registrar_uso_llm
+from services.tracing import span, rastrear, span_atual, ARQUIVO_TRACE
+
+
+@rastrear("claude.chamada")
+def _chamada_llm(prompt: str) -> str:
+    span_atual().definir(prompt_chars=len(prompt))
+    registrar_uso_llm("claude", SimpleNamespace(usage=SimpleNamespace(input_tokens=300, output_tokens=40)))
+    return "ok"
+
+
+def test_spans_aninhados_atravessam_executor(tmp_path):
+    """Spans abertos em threads do executor ficam sob o span do event loop que os disparou"""
+    executor = AsyncExecutor({"claude": 2})
+
+    async def pipeline():
+        with span("pipeline", case_id="caso1", case_dir=tmp_path):
+            with span("etapa:geracao"):
+                await asyncio.gather(
+                    executor.run("claude", _chamada_llm, "abc"),
+                    executor.run("claude", _chamada_llm, "abcdef")
+                )
+
+    try:
+        asyncio.run(pipeline())
+    finally:
+        executor.shutdown()
+
+    spans = trace_report.carregar_spans(tmp_path / ARQUIVO_TRACE)
+    por_nome = {}
+    for s in spans:
+        por_nome.setdefault(s["nome"], []).append(s)
+
+    raiz = por_nome["pipeline"][0]
+    etapa = por_nome["etapa:geracao"][0]
+    chamadas = por_nome["claude.chamada"]
+
+    assert raiz["parent_id"] is None and raiz["case_id"] == "caso1"
+    assert etapa["parent_id"] == raiz["span_id"]
+    assert len(chamadas) == 2
+    assert all(c["parent_id"] == etapa["span_id"] for c in chamadas)
+    assert {s["trace_id"] for s in spans} == {raiz["trace_id"]}
+    assert sorted(c["atributos"]["prompt_chars"] for c in chamadas) == [3, 6]
+    assert all(c["atributos"]["tokens_entrada"] == 300 and c["atributos"]["tokens_saida"] == 40 for c in chamadas)
+
+
+def test_sem_caso_nada_e_registrado(tmp_path):
+    """Fora de um trace, spans e atributos são descartados sem erro"""
+    assert _chamada_llm("x") == "ok"
+    assert not (tmp_path / ARQUIVO_TRACE).exists()
+
+
+def test_erro_marca_span_e_relatorio(tmp_path):
+    """Exceções marcam o span; o relatório mostra a árvore do trace mais recente"""
+    with span("pipeline", case_id="caso1", case_dir=tmp_path):
+        pass
+    try:
+        with span("pipeline", case_id="caso1", case_dir=tmp_path):
+            with span("etapa:extracao"):
+                _chamada_llm("prompt")
+            with span("etapa:rag"):
+                raise ValueError("falhou")
+    except ValueError:
+        pass
+
+    spans = trace_report.selecionar_trace(trace_report.carregar_spans(tmp_path / ARQUIVO_TRACE))
+    assert len(spans) == 4
+    assert next(s for s in spans if s["nome"] == "etapa:rag")["status"] == "erro"
+
+    linhas = trace_report.renderizar_arvore(trace_report.montar_arvore(spans))
+    assert "pipeline" in linhas[0] and "100.0%" in linhas[0]
+    assert any("  claude.chamada" in l and "tokens_entrada=300" in l for l in linhas)
+    assert any("etapa:rag" in l and "ERRO ValueError: falhou" in l for l in linhas)
+
+    resumo = trace_report.resumo_por_nome(spans)
+    assert any(l.startswith("claude.chamada") and l.rstrip().endswith("340") for l in resumo)
@@ -0,0 +1,75 @@
+"""
+Teste do upload em streaming do /upload-caso
+Limite por arquivo aplicado durante a transferência (413), tipo real conferido pelos magic
+numbers (415) e SHA-256/tamanho registrados em arquivos.json, sem deixar arquivos parciais
+"""
+
+import hashlib
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.upload_storage import RegraCampo
+
+LIMITE_BYTES = 64 * 1024
+
+PDF = b"%PDF-1.4\n" + b"1" * 20_000
+MP4 = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 30_000
+
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    """App com o storage em tmp_path, limites pequenos por arquivo e sem o pipeline automático"""
+    monkeypatch.setattr(main, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(main, "_regras_upload", lambda: {
+        campo: RegraCampo(prefixo=campo, extensoes=extensoes, max_bytes=LIMITE_BYTES,
+                          tipos_por_extensao=main.TIPOS_POR_EXTENSAO)
+        for campo, extensoes in (("processo", main.ALLOWED_PROCESSO), ("audiencia", main.ALLOWED_AUDIENCIA))
+    })
+    monkeypatch.setattr(main, "_enfileirar_pipeline", lambda case_id: SimpleNamespace(job_id="job-teste"))
+    return TestClient(main.app)
+
+
+def _casos(storage_dir):
+    return [caminho for caminho in storage_dir.iterdir() if caminho.is_dir()]
+
+
+def test_arquivos_json_registra_sha256_e_tamanho(cliente, tmp_path):
+    resposta = cliente.post("/upload-caso", files={
+        "processo": ("processo.pdf", PDF, "application/pdf"),
+        "audiencia": ("audiencia.mp4", MP4, "video/mp4"),
+    })
+
+    assert resposta.status_code == 201
+    case_dir = tmp_path / resposta.json()["case_id"]
+    arquivos = json.loads((case_dir / "arquivos.json").read_text(encoding="utf-8"))
+    for campo, conteudo, tipo in (("processo", PDF, "pdf"), ("audiencia", MP4, "mp4")):
+        assert arquivos[campo]["sha256"] == hashlib.sha256(conteudo).hexdigest()
+        assert arquivos[campo]["tamanho_bytes"] == len(conteudo)
+        assert arquivos[campo]["tipo_detectado"] == tipo
+    assert (case_dir / "processo.pdf").read_bytes() == PDF
+    assert not list(case_dir.glob(".*.part"))
+
+
+def test_arquivo_acima_do_limite_retorna_413_durante_o_stream(cliente, tmp_path):
+    grande = b"%PDF-1.4\n" + b"0" * (LIMITE_BYTES * 3)
+    resposta = cliente.post("/upload-caso", files={"processo": ("processo.pdf", grande, "application/pdf")})
+
+    assert resposta.status_code == 413
+    assert "processo" in resposta.json()["detail"]
+    assert _casos(tmp_path) == []
+
+
+@pytest.mark.parametrize("nome, conteudo", [
+    ("processo.pdf", b"PK\x03\x04" + b"\x00" * 8_000),  # ZIP com extensão .pdf
+    ("processo.docx", PDF),                              # PDF com extensão .docx
+])
+def test_conteudo_que_nao_corresponde_a_extensao_retorna_415(cliente, tmp_path, nome, conteudo):
+    resposta = cliente.post("/upload-caso", files={"processo": (nome, conteudo, "application/octet-stream")})
+
+    assert resposta.status_code == 415
+    assert "não corresponde" in resposta.json()["detail"]
+    assert _casos(tmp_path) == []
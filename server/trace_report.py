@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Relatório de tracing de um caso
+Lê storage/{case_id}/trace.jsonl e imprime a árvore de spans (estilo flame graph),
+com duração, tempo próprio, atributos e um resumo agregado por nome de span
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+STORAGE_DIR = Path(__file__).parent / "storage"
+
+# Atributos exibidos ao lado de cada span (os demais ficam no JSONL)
+ATRIBUTOS_EXIBIDOS = (
+    "prompt_chars", "tokens_entrada", "tokens_saida", "retries_429", "caracteres", "textos",
+    "chunks_candidatos", "resultados", "reaproveitado", "reaproveitada", "arquivos", "bytes"
+)
+
+
+@dataclass
+class NoSpan:
+    span: Dict[str, Any]
+    filhos: List["NoSpan"] = field(default_factory=list)
+
+    @property
+    def duracao_ms(self) -> float:
+        return self.span["duracao_ms"]
+
+    @property
+    def proprio_ms(self) -> float:
+        """Tempo não coberto pelos filhos (filhos paralelos podem somar mais que o pai)"""
+        return max(0.0, self.duracao_ms - sum(filho.duracao_ms for filho in self.filhos))
+
+
+def carregar_spans(caminho: Path) -> List[Dict[str, Any]]:
+    """Spans do arquivo JSONL (linhas inválidas, ex.: escrita interrompida, são ignoradas)"""
+    spans = []
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                spans.append(json.loads(linha))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def selecionar_trace(spans: List[Dict[str, Any]], trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Spans de um trace (por padrão, o iniciado mais recentemente)"""
+    if not spans:
+        return []
+    if trace_id is None:
+        inicio_por_trace: Dict[str, float] = {}
+        for s in spans:
+            inicio_por_trace[s["trace_id"]] = min(inicio_por_trace.get(s["trace_id"], s["inicio"]), s["inicio"])
+        trace_id = max(inicio_por_trace, key=inicio_por_trace.get)
+    return [s for s in spans if s["trace_id"].startswith(trace_id)]
+
+
+def montar_arvore(spans: List[Dict[str, Any]]) -> List[NoSpan]:
+    """Raízes da árvore de spans; spans cujo pai não foi exportado viram raízes"""
+    nos = {s["span_id"]: NoSpan(s) for s in spans}
+    raizes = []
+    for no in nos.values():
+        pai = nos.get(no.span.get("parent_id"))
+        (pai.filhos if pai else raizes).append(no)
+    for no in nos.values():
+        no.filhos.sort(key=lambda filho: filho.span["inicio"])
+    raizes.sort(key=lambda raiz: raiz.span["inicio"])
+    return raizes
+
+
+def _formatar_duracao(ms: float) -> str:
+    if ms >= 60_000:
+        return f"{ms / 60_000:.1f}min"
+    if ms >= 1000:
+        return f"{ms / 1000:.1f}s"
+    return f"{ms:.0f}ms"
+
+
+def _atributos(span: Dict[str, Any]) -> str:
+    atributos = span.get("atributos", {})
+    partes = [f"{chave}={atributos[chave]}" for chave in ATRIBUTOS_EXIBIDOS if chave in atributos]
+    partes += [f"{chave}={valor}" for chave, valor in atributos.items() if chave.startswith("cache_")]
+    if span.get("status") == "erro":
+        partes.append(f"ERRO {span.get('erro')}")
+    return " ".join(partes)
+
+
+def renderizar_arvore(raizes: List[NoSpan], largura: int = 30, min_ms: float = 0.0) -> List[str]:
+    """Linhas da árvore: barra proporcional à raiz, duração, % da raiz, tempo próprio e atributos"""
+    linhas = []
+
+    def visitar(no: NoSpan, nivel: int, total_ms: float, inicio_raiz: float):
+        if no.duracao_ms < min_ms and nivel > 0:
+            return
+        deslocamento = (no.span["inicio"] - inicio_raiz) * 1000
+        inicio_barra = int(largura * deslocamento / total_ms) if total_ms else 0
+        tamanho_barra = max(1, int(largura * no.duracao_ms / total_ms)) if total_ms else 1
+        inicio_barra = min(inicio_barra, largura - 1)
+        barra = (" " * inicio_barra + "█" * tamanho_barra)[:largura].ljust(largura)
+        percentual = 100 * no.duracao_ms / total_ms if total_ms else 100
+        linhas.append(
+            f"|{barra}| {_formatar_duracao(no.duracao_ms):>8} {percentual:5.1f}% "
+            f"(próprio {_formatar_duracao(no.proprio_ms):>7})  {'  ' * nivel}{no.span['nome']}  {_atributos(no.span)}".rstrip()
+        )
+        for filho in no.filhos:
+            visitar(filho, nivel + 1, total_ms, inicio_raiz)
+
+    for raiz in raizes:
+        visitar(raiz, 0, raiz.duracao_ms, raiz.span["inicio"])
+    return linhas
+
+
+def resumo_por_nome(spans: List[Dict[str, Any]], limite: int = 15) -> List[str]:
+    """Spans agregados por nome (sem sufixos de chunk), ordenados pelo tempo total"""
+    agregados: Dict[str, Dict[str, float]] = {}
+    for s in spans:
+        nome = s["nome"].split(":chunk:")[0] + (" [chunks]" if ":chunk:" in s["nome"] else "")
+        agregado = agregados.setdefault(nome, {"quantidade": 0, "total_ms": 0.0, "tokens": 0})
+        agregado["quantidade"] += 1
+        agregado["total_ms"] += s["duracao_ms"]
+        atributos = s.get("atributos", {})
+        agregado["tokens"] += atributos.get("tokens_entrada", 0) + atributos.get("tokens_saida", 0)
+
+    linhas = [f"{'span':<60} {'qtd':>5} {'total':>9} {'tokens':>9}"]
+    for nome, agregado in sorted(agregados.items(), key=lambda item: -item[1]["total_ms"])[:limite]:
+        linhas.append(
+            f"{nome[:60]:<60} {agregado['quantidade']:>5} "
+            f"{_formatar_duracao(agregado['total_ms']):>9} {int(agregado['tokens']):>9}"
+        )
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("alvo", help="case_id (em storage/) ou caminho de um trace.jsonl")
+    parser.add_argument("--trace", help="ID (ou prefixo) do trace; padrão: o mais recente")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="Oculta spans mais curtos que N ms")
+    parser.add_argument("--largura", type=int, default=30, help="Largura da barra de tempo")
+    args = parser.parse_args()
+
+    caminho = Path(args.alvo)
+    if not caminho.is_file():
+        caminho = STORAGE_DIR / args.alvo / "trace.jsonl"
+    if not caminho.exists():
+        print(f"❌ Trace não encontrado: {caminho}")
+        sys.exit(1)
+
+    spans = selecionar_trace(carregar_spans(caminho), args.trace)
+    if not spans:
+        print("❌ Nenhum span registrado")
+        sys.exit(1)
+
+    print(f"🔎 Trace {spans[0]['trace_id']} | caso {spans[0]['case_id']} | {len(spans)} spans\n")
+    print("\n".join(renderizar_arvore(montar_arvore(spans), args.largura, args.min_ms)))
+    print("\n📊 Tempo por span")
+    print("\n".join(resumo_por_nome(spans)))
+
+
+if __name__ == "__main__":
+    main()